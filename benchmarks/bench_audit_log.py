@@ -0,0 +1,83 @@
+"""Write/read benchmark for the group-commit audit log.
+
+Many concurrent reviewers append actions (each append waits until its
+batch is fsynced), then case and reviewer histories are queried at
+random and the hash chain is verified end to end.
+
+Run with: python -m benchmarks.bench_audit_log [--actions 20000] [--writers 64]
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from utils.audit_log import AuditLog
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+async def run(args):
+    workdir = tempfile.mkdtemp(prefix="kyb-audit-")
+    log = AuditLog(path=os.path.join(workdir, "audit.db"))
+    await log.open()
+    rng = random.Random(7)
+    actions = ["approve", "reject", "flag"]
+    latencies = []
+
+    async def writer(n):
+        for _ in range(n):
+            t0 = time.perf_counter()
+            await log.append(rng.choice(actions), f"case_{rng.randrange(args.cases):08d}",
+                             f"U{rng.randrange(args.reviewers):04d}",
+                             {"rule_ids": ["watchlist.pep"], "passed": False})
+            latencies.append(time.perf_counter() - t0)
+
+    per_writer = args.actions // args.writers
+    start = time.perf_counter()
+    await asyncio.gather(*(writer(per_writer) for _ in range(args.writers)))
+    write_s = time.perf_counter() - start
+    stats = log.stats()
+
+    read_latencies = []
+    for _ in range(args.reads):
+        t0 = time.perf_counter()
+        if rng.random() < 0.8:
+            await log.history(f"case_{rng.randrange(args.cases):08d}", limit=50)
+        else:
+            await log.by_reviewer(f"U{rng.randrange(args.reviewers):04d}", limit=50)
+        read_latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    intact, checked, _ = await log.verify()
+    verify_s = time.perf_counter() - t0
+    await log.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+    total = per_writer * args.writers
+    print(f"appends:             {total} from {args.writers} concurrent writers")
+    print(f"append rate:         {total / write_s:8.0f} actions/s (durable)")
+    print(f"append p50/p99:      {percentile(latencies, 50) * 1e3:.2f} / {percentile(latencies, 99) * 1e3:.2f} ms")
+    print(f"commits:             {stats['commits']} (avg batch {stats['avg_batch']}, max {stats['max_batch']})")
+    print(f"history p50/p99:     {percentile(read_latencies, 50) * 1e3:.2f} / "
+          f"{percentile(read_latencies, 99) * 1e3:.2f} ms ({args.reads} queries)")
+    print(f"chain verify:        {checked} records in {verify_s:.2f} s, intact={intact}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--actions", type=int, default=20000)
+    parser.add_argument("--writers", type=int, default=64)
+    parser.add_argument("--cases", type=int, default=5000)
+    parser.add_argument("--reviewers", type=int, default=50)
+    parser.add_argument("--reads", type=int, default=2000)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark: validate_kyb_checklist_batch vs the scalar checklist paths.
+
+"batch" screens every case through PolicyEngine.evaluate with one pinned
+``as_of``; "scalar" is validate_kyb_checklist per case and "legacy" the
+original list/strptime implementation; both are timed on a subset and
+scaled up. The cyclic GC is paused around the batch (``--gc`` leaves it
+on): a million live results otherwise set off repeated full collections.
+
+Run with: python -m benchmarks.bench_batch [--cases 1000000] [--scalar-cases 100000] [--gc]
+"""
+import argparse
+import gc
+import random
+import time
+from datetime import datetime
+
+from benchmarks.bench_policy import legacy_validate_kyb_checklist, make_cases
+from utils.batch import validate_kyb_checklist_batch
+from utils.checklist import validate_kyb_checklist
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cases", type=int, default=1000000)
+    parser.add_argument("--scalar-cases", type=int, default=100000,
+                        help="scalar path is timed on this many cases and extrapolated")
+    parser.add_argument("--verify", type=int, default=20000,
+                        help="number of random cases compared against the scalar result")
+    parser.add_argument("--gc", action="store_true", help="keep the cyclic GC enabled during the batch")
+    args = parser.parse_args()
+
+    # Distinct dicts are expensive to build; reuse a pool of templates
+    pool = make_cases(min(args.cases, 50000))
+    cases = [pool[i % len(pool)] for i in range(args.cases)]
+    as_of = datetime.now()
+
+    scalar_n = min(args.scalar_cases, args.cases)
+    start = time.perf_counter()
+    for case in cases[:scalar_n]:
+        validate_kyb_checklist(case, as_of=as_of)
+    scalar_s = (time.perf_counter() - start) * args.cases / scalar_n
+
+    start = time.perf_counter()
+    for case in cases[:scalar_n]:
+        legacy_validate_kyb_checklist(case)
+    legacy_s = (time.perf_counter() - start) * args.cases / scalar_n
+
+    # Last, so the scalar paths don't run with a million results alive
+    if not args.gc:
+        gc.disable()
+    try:
+        start = time.perf_counter()
+        result = validate_kyb_checklist_batch(cases, as_of)
+        batch_s = time.perf_counter() - start
+    finally:
+        gc.enable()
+
+    rng = random.Random(1)
+    for i in rng.sample(range(args.cases), min(args.verify, args.cases)):
+        assert result[i] == validate_kyb_checklist(cases[i], as_of=as_of), i
+
+    print(f"cases:          {args.cases}")
+    print(f"batch:          {batch_s:8.2f} s  ({batch_s / args.cases * 1e6:.2f} us/case)")
+    print(f"scalar (est.):  {scalar_s:8.2f} s  ({scalar_s / args.cases * 1e6:.2f} us/case)")
+    print(f"legacy (est.):  {legacy_s:8.2f} s  ({legacy_s / args.cases * 1e6:.2f} us/case)")
+    print(f"vs scalar:      {scalar_s / batch_s:8.1f}x")
+    print(f"vs legacy:      {legacy_s / batch_s:8.1f}x")
+    print(f"passed:         {sum(result.passed)}")
+    for rule_id, count in result.failure_counts().items():
+        print(f"  {rule_id:40s} {count}")
+
+
+if __name__ == "__main__":
+    main()
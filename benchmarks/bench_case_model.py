@@ -0,0 +1,127 @@
+"""Benchmark: decoded Case model vs the plain-dict path for Persona cases.
+
+For a set of synthetic GET /cases/{id} response bodies (tools.mock_persona)
+it times, per case:
+
+  parse_dict        json.loads + unwrapping data.attributes (the dict path)
+  parse_model       persona_client.models.decode_case on the raw bytes
+  parse_included    decode_case on the same cases with owners and the
+                    control person sent as JSON:API ``included`` objects
+  evaluate_dict     PolicyEngine.evaluate on the flattened dict
+  evaluate_model    PolicyEngine.evaluate on the Case
+
+and the memory retained per parsed case (tracemalloc) for both forms.
+Also prints which JSON decoder is in use (orjson when installed).
+
+Run with: python -m benchmarks.bench_case_model [--cases 5000] [--rounds 3] [--save-baseline | --compare]
+"""
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List
+
+from benchmarks.bench_micro import time_calls
+from benchmarks.harness import add_baseline_arguments, finish, format_summary, latency_summary
+from persona_client.models import JSON_DECODER, decode_case
+from tools.mock_persona import make_case
+from utils.policy import get_policy_engine
+
+
+def as_dict(raw: bytes) -> Dict[str, Any]:
+    """What the pipeline did before the model: parse, then flatten data.attributes"""
+    data = json.loads(raw)["data"]
+    fields = dict(data.get("attributes") or {})
+    fields["id"] = data.get("id")
+    return fields
+
+
+def with_included(case: Dict[str, Any]) -> Dict[str, Any]:
+    """The same case with its people moved into ``included``, Persona style"""
+    attributes = dict(case["attributes"])
+    people = [("control", attributes.pop("control_person"))]
+    people += [(f"owner-{n}", owner) for n, owner in enumerate(attributes.pop("beneficial_owners"))]
+    included = []
+    for ref, person in people:
+        if not person:
+            continue
+        first, _, last = person["full_name"].rpartition(" ")
+        included.append({"type": "person", "id": f"{case['id']}-{ref}", "attributes": {
+            "name-first": first, "name-last": last, "ownership-percent": person.get("ownership")}})
+    relationships = {
+        "control-person": {"data": {"type": "person", "id": f"{case['id']}-control"}},
+        "beneficial-owners": {"data": [{"type": "person", "id": obj["id"]}
+                                       for obj in included if "-owner-" in obj["id"]]},
+    }
+    return {"data": {"type": "case", "id": case["id"], "attributes": attributes,
+                     "relationships": relationships}, "included": included}
+
+
+def retained_bytes(build: Callable[[bytes], Any], bodies: List[bytes]) -> int:
+    """Bytes still allocated after parsing every body and keeping the results"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        kept = [build(body) for body in bodies]
+        after = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    del kept
+    return after - before
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=3)
+    add_baseline_arguments(parser, "case_model")
+    args = parser.parse_args()
+
+    synthetic = [make_case(i) for i in range(args.cases)]
+    bodies = [json.dumps({"data": case}).encode() for case in synthetic]
+    included_bodies = [json.dumps(with_included(case)).encode() for case in synthetic]
+    dicts = [as_dict(body) for body in bodies]
+    models = [decode_case(body) for body in bodies]
+
+    engine = get_policy_engine()
+    as_of = datetime.now()
+    mismatched = sum(engine.evaluate(d, as_of=as_of).rule_ids != engine.evaluate(m, as_of=as_of).rule_ids
+                     for d, m in zip(dicts, models))
+    mismatched += sum(engine.evaluate(decode_case(body), as_of=as_of).rule_ids
+                      != engine.evaluate(m, as_of=as_of).rule_ids
+                      for body, m in zip(included_bodies, models))
+
+    benchmarks = {
+        "parse_dict": (as_dict, bodies),
+        "parse_model": (decode_case, bodies),
+        "parse_included": (decode_case, included_bodies),
+        "evaluate_dict": (lambda case: engine.evaluate(case, as_of=as_of), dicts),
+        "evaluate_model": (lambda case: engine.evaluate(case, as_of=as_of), models),
+    }
+    print(f"JSON decoder: {JSON_DECODER}")
+    results: Dict[str, Dict[str, Any]] = {}
+    for name, (fn, inputs) in benchmarks.items():
+        latencies, elapsed = time_calls(fn, inputs, args.rounds)
+        results[name] = latency_summary(latencies, elapsed, unit="us")
+        print(format_summary(name, results[name]))
+
+    dict_bytes = retained_bytes(as_dict, bodies)
+    model_bytes = retained_bytes(decode_case, bodies)
+    results["memory"] = {
+        "dict_bytes_per_case": round(dict_bytes / args.cases),
+        "model_bytes_per_case": round(model_bytes / args.cases),
+        "errors": mismatched,
+    }
+    print(f"\nretained per case: dict {dict_bytes / args.cases:,.0f} B, "
+          f"model {model_bytes / args.cases:,.0f} B ({model_bytes / dict_bytes - 1:+.0%})")
+    if mismatched:
+        print(f"{mismatched} case(s) evaluated differently as dict and model")
+
+    return finish(args, results, {"cases": args.cases, "rounds": args.rounds, "decoder": JSON_DECODER})
+
+
+if __name__ == "__main__":
+    sys.exit(main())
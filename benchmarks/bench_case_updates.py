@@ -0,0 +1,177 @@
+"""Benchmark: Slack calls and rule work for a noisy stream of case updates.
+
+Boots the app in-process against mock Persona and mock Slack (review
+messages posted through the Web API to a channel) like load_test, sends
+a case.created webhook for every case, then --rounds of case.updated
+webhooks. Before each update the case is changed in mock Persona
+(PATCH), picked at random:
+
+  noop      an attribute the review doesn't use (nothing to re-run or send)
+  status    the case status (shown in the message; no rule reads it)
+  poa       proof of address approved <-> pending (one rule step)
+  country   business country flips (country rule)
+
+It reports Slack chat.postMessage / chat.update calls and policy steps
+run, next to what re-screening and re-posting every event would cost.
+Every final review must match a full evaluation of the final case.
+
+Run with: python -m benchmarks.bench_case_updates [--cases 100] [--rounds 5] [--save-baseline | --compare]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from typing import Any, Dict
+
+import httpx
+
+from benchmarks.harness import add_baseline_arguments, finish, serve_in_thread
+from tools.mock_persona import case_id_for, create_mock_persona_app
+from tools.mock_slack import create_mock_slack_app
+
+WEBHOOK_SECRET = "w" * 24
+CHANGES = ("noop", "status", "poa", "country")
+
+
+def webhook_body(name: str, case_id: str, event_id: str) -> bytes:
+    return json.dumps({"data": {
+        "type": "event", "id": event_id,
+        "attributes": {"name": name, "payload": {"data": {"type": "case", "id": case_id}}},
+    }}).encode()
+
+
+def change(kind: str, round_index: int) -> Dict[str, Any]:
+    if kind == "noop":
+        return {"updated_at": f"2024-06-{round_index + 1:02d}T00:00:00Z"}
+    if kind == "status":
+        return {"status": ("pending", "needs_review")[round_index % 2]}
+    if kind == "poa":
+        return {"proof_of_address": {"status": ("approved", "pending")[round_index % 2],
+                                     "document_date": "2020-01-01"}}
+    return {"business": {"name": "Acme", "legal_name": "Acme LLC", "ein": "12-3456789",
+                         "address": "1 Main St", "country": ("US", "Iran")[round_index % 2]}}
+
+
+async def run(args) -> int:
+    persona_app = create_mock_persona_app(args.cases)
+    slack_app = create_mock_slack_app()
+    persona_server, persona_base = serve_in_thread(persona_app)
+    slack_server, slack_base = serve_in_thread(slack_app)
+    workdir = tempfile.mkdtemp(prefix="kyb-updates-")
+    os.environ.update(
+        SLACK_API_TOKEN="xoxb-bench", SLACK_SIGNING_SECRET="bench-signing-secret",
+        SLACK_API_URL=f"{slack_base}/api/", SLACK_WEBHOOK_URL=f"{slack_base}/hooks/main",
+        SLACK_REVIEW_CHANNEL="C0MOCK", SLACK_VERIFICATION_TOKEN="v" * 24, SLACK_OUTBOX_INTERVAL="0",
+        PERSONA_API_KEY="bench", PERSONA_WEBHOOK_SECRET=WEBHOOK_SECRET,
+        PERSONA_BASE_URL=f"{persona_base}/api/v1", ENCRYPTION_KEY="e" * 44,
+        AUDIT_LOG_PATH=os.path.join(workdir, "audit.db"),
+        WEBHOOK_QUEUE_PATH=os.path.join(workdir, "queue.db"),
+        REVIEW_MESSAGES_PATH=os.path.join(workdir, "review_messages.db"),
+        IMPACT_INDEX_PATH=os.path.join(workdir, "impact_index.db"),
+        ENTITY_INDEX_PATH=os.path.join(workdir, "entity_index.db"),
+        REPORTS_PATH=os.path.join(workdir, "reports.db"),
+    )
+    import main  # after the environment is set
+    from persona_client.cache import get_case_cache
+    from slack_notify.outbox import get_slack_outbox
+    from slack_notify.review_messages import get_review_messages
+    from utils.evaluation import _STEPS_REUSED, _STEPS_RUN, evaluate_case, get_recent_evaluations
+    from utils.policy import STEPS
+    from utils.webhook_queue import get_webhook_queue
+
+    logging.getLogger().setLevel(logging.WARNING)
+    rng = random.Random(args.seed)
+    events = 0
+    mismatched = 0
+    begin = time.perf_counter()
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://kyb-bot") as client, \
+                httpx.AsyncClient(base_url=f"{persona_base}/api/v1") as persona:
+
+            async def settle() -> None:
+                queue, outbox, messages = get_webhook_queue(), get_slack_outbox(), get_review_messages()
+                while True:
+                    stats = await queue.stats()
+                    if (stats["processed"] + stats["dead"] >= events and outbox.stats()["queue_depth"] == 0
+                            and messages.stats()["in_flight"] == 0):
+                        return
+                    await asyncio.sleep(0.02)
+
+            async def send(name: str, case_id: str) -> None:
+                nonlocal events
+                events += 1
+                response = await client.post("/persona/webhook", content=webhook_body(name, case_id, f"evt_{events}"),
+                                             headers={"Persona-Signature": WEBHOOK_SECRET,
+                                                      "Content-Type": "application/json"})
+                response.raise_for_status()
+
+            for i in range(args.cases):
+                await send("case.created", case_id_for(i))
+            await settle()
+            created_calls = dict(slack_app.state.received)
+
+            for round_index in range(args.rounds):
+                for i in range(args.cases):
+                    kind = rng.choice(CHANGES)
+                    response = await persona.patch(f"/cases/{case_id_for(i)}",
+                                                   json={"attributes": change(kind, round_index)})
+                    response.raise_for_status()
+                    await send("case.updated", case_id_for(i))
+                await settle()
+
+            # Every incremental result must equal a fresh evaluation
+            recent = get_recent_evaluations()
+            for i in range(args.cases):
+                case = await get_case_cache().get_case(case_id_for(i))
+                evaluation = recent.get(case_id_for(i))
+                if evaluation is None or evaluation.rule_ids != evaluate_case(case).rule_ids:
+                    mismatched += 1
+            review_stats = get_review_messages().stats()
+
+    persona_server.should_exit = slack_server.should_exit = True
+    elapsed = time.perf_counter() - begin
+    received = slack_app.state.received
+    updates = events - args.cases
+    posts = received["chat.postMessage"] - created_calls.get("chat.postMessage", 0)
+    edits = received["chat.update"]
+    steps_run, steps_reused = int(_STEPS_RUN.value), int(_STEPS_REUSED.value)
+    results = {"updates": {
+        "requests": updates,
+        "errors": mismatched + posts,
+        "slack_calls": posts + edits,
+        "slack_calls_naive": updates,
+        "rule_steps_run": steps_run,
+        "rule_steps_naive": updates * len(STEPS),
+        "unchanged": review_stats["unchanged"],
+        "coalesced": review_stats["coalesced"],
+        "throughput_per_s": round(events / elapsed, 1),
+    }}
+    summary = results["updates"]
+    print(f"{updates} updates for {args.cases} cases: {edits} chat.update + {posts} new posts "
+          f"(re-posting every event: {updates}), {summary['unchanged']} unchanged")
+    print(f"policy steps run {steps_run} of {steps_run + steps_reused} "
+          f"({steps_reused} carried over; full re-screening: {updates * len(STEPS)})")
+    if mismatched:
+        print(f"{mismatched} case(s) whose incremental review differs from a full evaluation")
+    return finish(args, results, {key: value for key, value in vars(args).items()
+                                  if key not in ("save_baseline", "compare", "tolerance")})
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=5, help="updates per case")
+    parser.add_argument("--seed", type=int, default=1)
+    add_baseline_arguments(parser, "case_updates")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
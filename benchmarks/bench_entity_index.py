@@ -0,0 +1,198 @@
+"""Benchmark: linking a case to flagged or rejected cases through the entity index.
+
+Bulk-loads --cases synthetic cases into a fresh index (about 2% flagged
+or rejected by a reviewer), then links --probes new cases to it:
+
+  ein        a risky case's EIN, written without the dash
+  address    a risky case's address spelled out ("Street", "Suite")
+             and in upper case
+  owner      a risky case's beneficial owner as "Last, First"
+  unrelated  a fresh random case
+
+Reports the lookup latency on the index thread (``lookup``) and the
+full ``link()`` call from the event loop, which also stores the case
+(``link``). A planted link that isn't found counts as an error; links
+found for unrelated probes are reported as ``unexpected``. Also
+reports the database size per stored case.
+
+Run with: python -m benchmarks.bench_entity_index [--cases 1000000] [--probes 2000] [--save-baseline | --compare]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.harness import add_baseline_arguments, finish, format_summary, latency_summary
+from persona_client.models import Case
+from utils.entity_index import EntityIndex, entity_keys
+
+FIRST = ["James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David", "Elizabeth",
+         "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos", "Maria",
+         "Wei", "Mei", "Ahmed", "Fatima", "Ivan", "Olga", "Kenji", "Yuki", "Raj", "Priya"]
+LAST = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez", "Martinez",
+        "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson", "Martin",
+        "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson",
+        "Chen", "Wang", "Kim", "Nguyen", "Patel", "Singh", "Ivanov", "Tanaka", "Khan", "Muller"]
+STREETS = ["Main", "Oak", "Pine", "Maple", "Cedar", "Elm", "Washington", "Lake", "Hill", "Park", "Sunset",
+           "Market", "Broadway", "Church", "Mill", "River", "Spring", "Ridge", "Highland", "Franklin"]
+SUFFIXES = [("St", "Street"), ("Ave", "Avenue"), ("Rd", "Road"), ("Blvd", "Boulevard"), ("Dr", "Drive")]
+CITIES = ["Springfield", "Riverside", "Fairview", "Madison", "Georgetown", "Austin", "Denver", "Portland"]
+
+
+def person(rng: random.Random) -> Dict[str, Any]:
+    born = date(1950, 1, 1) + timedelta(days=rng.randrange(50 * 365))
+    return {"full_name": f"{rng.choice(FIRST)} {rng.choice(LAST)}", "birthdate": born.isoformat()}
+
+
+def make_case(rng: random.Random, case_id: str) -> Dict[str, Any]:
+    ein = f"{rng.randrange(10, 100)}-{rng.randrange(10 ** 7):07d}"
+    suffix = rng.choice(SUFFIXES)[0]
+    address = f"{rng.randrange(1, 9999)} {rng.choice(STREETS)} {suffix} Ste {rng.randrange(1, 500)}, " \
+              f"{rng.choice(CITIES)}"
+    return {
+        "business": {"name": f"Biz {case_id}", "legal_name": f"Biz {case_id} LLC", "ein": ein,
+                     "address": address, "country": "United States"},
+        "control_person": person(rng),
+        "beneficial_owners": [dict(person(rng), ownership=rng.choice([25, 30, 50]))
+                              for _ in range(rng.randint(1, 2))],
+    }
+
+
+def variant(attributes: Dict[str, Any], kind: str, rng: random.Random) -> Dict[str, Any]:
+    """A fresh case sharing one entity with ``attributes``"""
+    probe = make_case(rng, "probe")
+    business = attributes["business"]
+    if kind == "ein":
+        probe["business"]["ein"] = business["ein"].replace("-", "")
+    elif kind == "address":
+        address = business["address"]
+        for short, long in SUFFIXES:
+            address = address.replace(f" {short} ", f" {long} ")
+        probe["business"]["address"] = address.replace(" Ste ", " Suite ").upper()
+    elif kind == "owner":
+        owner = attributes["beneficial_owners"][0]
+        first, last = owner["full_name"].split(" ", 1)
+        probe["beneficial_owners"][0] = dict(owner, full_name=f"{last}, {first}")
+    return probe
+
+
+def bulk_load(index: EntityIndex, n: int, risky_share: float, rng: random.Random,
+              batch: int = 50_000) -> Tuple[List[Tuple[str, Dict[str, Any]]], float]:
+    """Store ``n`` cases directly on the calling thread; returns the risky ones"""
+    risky: List[Tuple[str, Dict[str, Any]]] = []
+    begin = time.perf_counter()
+    for start in range(0, n, batch):
+        rows = []
+        for i in range(start, min(start + batch, n)):
+            case_id = f"case_{i}"
+            attributes = make_case(rng, case_id)
+            case = Case.from_attributes(case_id, attributes)
+            verdict: Optional[str] = None
+            if rng.random() < risky_share:
+                verdict = rng.choice(["flagged", "rejected"])
+                risky.append((case_id, attributes))
+            rows.append((case_id, attributes["business"]["legal_name"], verdict, entity_keys(case)))
+        index._store_many_sync(rows)
+    return risky, time.perf_counter() - begin
+
+
+def make_probes(risky: List[Tuple[str, Dict[str, Any]]], count: int,
+                rng: random.Random) -> List[Tuple[str, Optional[str], Case]]:
+    """(kind, expected linked case id, case) for each probe"""
+    kinds = ["ein", "address", "owner", "unrelated"]
+    probes = []
+    for i in range(count):
+        kind = kinds[i % len(kinds)]
+        case_id = f"probe_{i}"
+        if kind == "unrelated":
+            probes.append((kind, None, Case.from_attributes(case_id, make_case(rng, case_id))))
+        else:
+            target, attributes = rng.choice(risky)
+            probes.append((kind, target, Case.from_attributes(case_id, variant(attributes, kind, rng))))
+    return probes
+
+
+def score(kind: str, expected: Optional[str], found: List[str], counts: Dict[str, Dict[str, int]]) -> None:
+    tally = counts.setdefault(kind, {"errors": 0, "unexpected": 0})
+    if expected is not None and expected not in found:
+        tally["errors"] += 1
+    tally["unexpected"] += len([case_id for case_id in found if case_id != expected])
+
+
+def run_lookups(index: EntityIndex, probes) -> Tuple[Dict[str, Any], Dict[str, Dict[str, int]]]:
+    latencies = []
+    counts: Dict[str, Dict[str, int]] = {}
+    begin = time.perf_counter()
+    for kind, expected, case in probes:
+        keys = entity_keys(case)
+        t0 = time.perf_counter()
+        links = index._lookup_sync(case.id, keys)
+        latencies.append(time.perf_counter() - t0)
+        score(kind, expected, [link.case_id for link in links], counts)
+    return latency_summary(latencies, time.perf_counter() - begin, unit="us"), counts
+
+
+async def run_links(index: EntityIndex, probes) -> Tuple[Dict[str, Any], Dict[str, Dict[str, int]]]:
+    latencies = []
+    counts: Dict[str, Dict[str, int]] = {}
+    begin = time.perf_counter()
+    for kind, expected, case in probes:
+        t0 = time.perf_counter()
+        links = await index.link(case)
+        latencies.append(time.perf_counter() - t0)
+        score(kind, expected, [link.case_id for link in links], counts)
+    return latency_summary(latencies, time.perf_counter() - begin, unit="us"), counts
+
+
+def report(name: str, summary: Dict[str, Any], counts: Dict[str, Dict[str, int]]) -> Dict[str, Any]:
+    summary["errors"] = sum(tally["errors"] for tally in counts.values())
+    summary["unexpected"] = sum(tally["unexpected"] for tally in counts.values())
+    detail = " ".join(f"{kind}={tally['errors']}/{tally['unexpected']}" for kind, tally in counts.items())
+    print(f"{format_summary(name, summary)}  missed/unexpected: {detail}")
+    return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=1_000_000)
+    parser.add_argument("--probes", type=int, default=2000)
+    parser.add_argument("--risky-share", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=23)
+    add_baseline_arguments(parser, "entity_index")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="kyb-entities-") as workdir:
+        path = os.path.join(workdir, "entity_index.db")
+        index = EntityIndex(path)
+        index._open_sync()
+        risky, load_s = bulk_load(index, args.cases, args.risky_share, rng)
+        index._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        size = os.path.getsize(path)
+        print(f"{args.cases} cases ({len(risky)} flagged or rejected) loaded in {load_s:.1f} s; "
+              f"{size / 2 ** 20:.0f} MiB, {size / args.cases:.0f} bytes per case")
+        results["storage"] = {"requests": args.cases, "errors": 0, "bytes_per_case": round(size / args.cases)}
+
+        probes = make_probes(risky, args.probes, rng)
+        results["lookup"] = report("lookup", *run_lookups(index, probes))
+        index._close_sync()
+
+        async def linked():
+            await index.open()
+            try:
+                return await run_links(index, probes)
+            finally:
+                await index.close()
+        results["link"] = report("link", *asyncio.run(linked()))
+    return finish(args, results, {key: value for key, value in vars(args).items()
+                                  if key not in ("save_baseline", "compare", "tolerance")})
+
+
+if __name__ == "__main__":
+    sys.exit(main())
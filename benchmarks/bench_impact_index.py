@@ -0,0 +1,154 @@
+"""Benchmark: which cases a policy edit affects, from the impact index.
+
+Screens --cases synthetic cases (bench_policy.make_cases), indexes them,
+then applies policy edits to config/config.yaml in memory:
+
+  add_country      a prohibited country added (Mexico)
+  remove_country   one removed
+  add_industry     a prohibited industry added (Logistics)
+  required_field   industry becomes a required business field
+  poa_window       proof of address max age 90 -> 60 days
+  poa_crossing     documents that start to count as expired today
+
+Reports the index lookup latency (--repeat runs) next to one full
+re-screen of every case. The full re-screen is also the check: every
+case whose outcome changes must be in the affected set. A missed case
+counts as an error. Also times saving the index to SQLite and loading
+it back, as at startup.
+
+Run with: python -m benchmarks.bench_impact_index [--cases 200000] [--repeat 50] [--save-baseline | --compare]
+"""
+import argparse
+import asyncio
+import copy
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Set
+
+import yaml
+
+from benchmarks.bench_policy import make_cases
+from benchmarks.harness import add_baseline_arguments, finish, format_summary, latency_summary
+from persona_client.models import Case
+from utils.evaluation import evaluate_case
+from utils.impact_index import ImpactIndex, PolicySnapshot, diff_policies
+from utils.policy import DEFAULT_CONFIG_PATH, PolicyEngine
+
+
+def load_policy() -> Dict[str, Any]:
+    with open(DEFAULT_CONFIG_PATH, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)["policy"]
+
+
+def edited(policy: Dict[str, Any], edit: Callable[[Dict[str, Any]], None]) -> PolicyEngine:
+    policy = copy.deepcopy(policy)
+    edit(policy)
+    policy["version"] = policy.get("version", 1) + 1
+    return PolicyEngine(policy)
+
+
+EDITS = {
+    "add_country": lambda p: p["prohibited_countries"].append("Mexico"),
+    "remove_country": lambda p: p["prohibited_countries"].remove(p["prohibited_countries"][0]),
+    "add_industry": lambda p: p["prohibited_industries"].append("Logistics"),
+    "required_field": lambda p: p["business"]["required_fields"].append("industry"),
+    "poa_window": lambda p: p["proof_of_address"].update(max_age_days=60),
+}
+
+
+def timed_lookups(lookup: Callable[[], Set[str]], repeat: int) -> Dict[str, Any]:
+    latencies = []
+    begin = time.perf_counter()
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        lookup()
+        latencies.append(time.perf_counter() - t0)
+    return latency_summary(latencies, time.perf_counter() - begin)
+
+
+def changed_cases(cases: List[Case], before: Dict[str, List[str]], engine: PolicyEngine,
+                  as_of: datetime) -> Set[str]:
+    return {case.id for case in cases if engine.evaluate_model(case, as_of).rule_ids != before[case.id]}
+
+
+async def persistence(index: ImpactIndex, evaluations) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="kyb-impact-") as workdir:
+        path = os.path.join(workdir, "impact_index.db")
+        store = ImpactIndex(path)
+        await store.open()
+        t0 = time.perf_counter()
+        await store.record_many(evaluations)
+        saved = time.perf_counter() - t0
+        await store.close()
+        reopened = ImpactIndex(path)
+        t0 = time.perf_counter()
+        await reopened.open()
+        loaded = time.perf_counter() - t0
+        await reopened.close()
+    return {"requests": len(reopened), "errors": int(len(reopened) != len(index)),
+            "save_ms": round(saved * 1000, 1), "open_ms": round(loaded * 1000, 1)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=50)
+    add_baseline_arguments(parser, "impact_index")
+    args = parser.parse_args()
+
+    policy = load_policy()
+    engine = PolicyEngine(policy)
+    as_of = datetime.combine(datetime.now().date(), datetime.min.time()) + timedelta(hours=12)
+    cases = [Case.from_attributes(d["id"], d) for d in make_cases(args.cases)]
+    t0 = time.perf_counter()
+    evaluations = [evaluate_case(case, engine, as_of) for case in cases]
+    screen_s = time.perf_counter() - t0
+    before = {evaluation.case_id: evaluation.rule_ids for evaluation in evaluations}
+
+    index = ImpactIndex()
+    t0 = time.perf_counter()
+    asyncio.run(index.record_many(evaluations))
+    build_s = time.perf_counter() - t0
+    print(f"{args.cases} cases: screened in {screen_s:.2f} s, indexed in {build_s:.2f} s")
+
+    results: Dict[str, Dict[str, Any]] = {}
+    snapshot = PolicySnapshot.from_engine(engine)
+    for name, edit in EDITS.items():
+        new_engine = edited(policy, edit)
+        diff = diff_policies(snapshot, PolicySnapshot.from_engine(new_engine))
+        affected = index.affected(diff, as_of)
+        summary = timed_lookups(lambda: index.affected(diff, as_of), args.repeat)
+        t0 = time.perf_counter()
+        changed = changed_cases(cases, before, new_engine, as_of)
+        summary["full_rescreen_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+        summary["errors"] = len(changed - affected)
+        summary["affected"] = len(affected)
+        summary["changed"] = len(changed)
+        results[name] = summary
+        print(f"{format_summary(name, summary)}  affected={len(affected)} changed={len(changed)} "
+              f"(full re-screen {summary['full_rescreen_ms']:.0f} ms)")
+
+    # Pending documents that start to count as expired today
+    max_age = engine.poa_max_age.days
+    crossing = index.poa_crossing(as_of.date(), max_age)
+    summary = timed_lookups(lambda: index.poa_crossing(as_of.date(), max_age), args.repeat)
+    yesterday = {case.id: engine.evaluate_model(case, as_of - timedelta(days=1)).rule_ids for case in cases}
+    changed = changed_cases(cases, yesterday, engine, as_of)
+    summary["errors"] = len(changed ^ crossing)
+    summary["affected"] = len(crossing)
+    summary["changed"] = len(changed)
+    results["poa_crossing"] = summary
+    print(f"{format_summary('poa_crossing', summary)}  affected={len(crossing)} changed={len(changed)}")
+
+    results["persistence"] = asyncio.run(persistence(index, evaluations))
+    print(f"SQLite: saved {args.cases} cases in {results['persistence']['save_ms']:.0f} ms, "
+          f"loaded in {results['persistence']['open_ms']:.0f} ms")
+    return finish(args, results, {key: value for key, value in vars(args).items()
+                                  if key not in ("save_baseline", "compare", "tolerance")})
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Cold-start benchmark for the web app.
+
+Runs ``python -X importtime -c "import main"`` in fresh interpreters and
+reports the median import time, the heaviest top-level packages, and
+whether any lazily-loaded dependency slipped back into the import path.
+Then times a full boot (import + lifespan startup and shutdown, with
+throwaway settings and data files) the way a dyno or test run pays it.
+Exits non-zero when a budget is exceeded, so it can gate CI.
+
+Run with: python -m benchmarks.bench_import_time [--runs 5] [--budget-ms 800] [--boot-budget-ms 1500]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use (Slack request, Persona call, screening); importing
+# main must not pull them in
+LAZY_MODULES = ("slack_bolt", "slack_sdk", "aiohttp", "httpx", "numpy", "requests", "cryptography", "yaml")
+
+BOOT_SCRIPT = """
+import asyncio, time
+t0 = time.perf_counter()
+import main
+t1 = time.perf_counter()
+async def boot():
+    async with main.lifespan(main.app):
+        t2 = time.perf_counter()
+    return t2
+t2 = asyncio.run(boot())
+print(f"{(t1 - t0) * 1e3:.1f} {(t2 - t1) * 1e3:.1f}")
+"""
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self us, cumulative us) for each ``-X importtime`` line"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def bench_env(workdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # measure with warm .pyc files, as deployed
+    env.update(
+        SLACK_API_TOKEN="xoxb-bench", SLACK_SIGNING_SECRET="bench-signing-secret",
+        PERSONA_API_KEY="bench", PERSONA_WEBHOOK_SECRET="b" * 16,
+        SLACK_VERIFICATION_TOKEN="v" * 24, ENCRYPTION_KEY="e" * 44,
+        AUDIT_LOG_PATH=os.path.join(workdir, "audit.db"),
+        WEBHOOK_QUEUE_PATH=os.path.join(workdir, "queue.db"),
+        REVIEW_MESSAGES_PATH=os.path.join(workdir, "review_messages.db"),
+        IMPACT_INDEX_PATH=os.path.join(workdir, "impact_index.db"),
+        ENTITY_INDEX_PATH=os.path.join(workdir, "entity_index.db"),
+        REPORTS_PATH=os.path.join(workdir, "reports.db"),
+    )
+    return env
+
+
+def run_import(env: Dict[str, str]) -> List[Tuple[str, int, int]]:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    return parse_importtime(result.stderr)
+
+
+def run_boot(env: Dict[str, str]) -> Tuple[float, float, float]:
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", BOOT_SCRIPT],
+                            cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    wall_ms = (time.perf_counter() - start) * 1e3
+    import_ms, startup_ms = (float(v) for v in result.stdout.split())
+    return import_ms, startup_ms, wall_ms
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=800.0,
+                        help="median 'import main' budget (default 800 ms)")
+    parser.add_argument("--boot-budget-ms", type=float, default=1500.0,
+                        help="median process start to app ready budget (default 1500 ms)")
+    parser.add_argument("--top", type=int, default=8)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="kyb-import-bench-")
+    env = bench_env(workdir)
+    run_import(env)  # compile .pyc files first
+
+    totals = []
+    packages: Counter = Counter()
+    loaded = set()
+    for _ in range(args.runs):
+        rows = run_import(env)
+        totals.append(next(cumulative for name, _, cumulative in rows if name == "main") / 1e3)
+        for name, self_us, _ in rows:
+            packages[name.split(".")[0]] += self_us / 1e3 / args.runs
+            loaded.add(name)
+    boots = [run_boot(env) for _ in range(args.runs)]
+
+    import_ms = statistics.median(totals)
+    boot_wall = [wall for _, _, wall in boots]
+    eager = sorted({name.split(".")[0] for name in loaded} & set(LAZY_MODULES))
+
+    print(f"import main:         p50 {import_ms:.0f} ms, max {max(totals):.0f} ms ({args.runs} runs)")
+    print("heaviest packages:   " + ", ".join(f"{name} {ms:.0f} ms"
+                                              for name, ms in packages.most_common(args.top)))
+    print(f"eager lazy modules:  {', '.join(eager) or 'none'}")
+    print(f"boot import/startup: p50 {statistics.median(b[0] for b in boots):.0f} / "
+          f"{statistics.median(b[1] for b in boots):.0f} ms")
+    print(f"boot wall (process): p50 {statistics.median(boot_wall):.0f} ms, "
+          f"p95 {percentile(boot_wall, 95):.0f} ms")
+
+    failures = []
+    if import_ms > args.budget_ms:
+        failures.append(f"import main {import_ms:.0f} ms > budget {args.budget_ms:.0f} ms")
+    if statistics.median(boot_wall) > args.boot_budget_ms:
+        failures.append(f"boot {statistics.median(boot_wall):.0f} ms > budget {args.boot_budget_ms:.0f} ms")
+    if eager:
+        failures.append(f"imported at module load: {', '.join(eager)}")
+    for failure in failures:
+        print(f"OVER BUDGET: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,123 @@
+"""Benchmark: what logging costs a request, before and after the pipeline.
+
+Each simulated request logs what a webhook request logs in main.py: two
+INFO lines (one with a case snippet holding an SSN and EIN) and one
+DEBUG line that is filtered out. The time is measured on the calling
+thread, which stands in for the event loop.
+
+  sync      the old setup: basicConfig's StreamHandler, the text format,
+            and f-string messages built at the call site
+  pipeline  utils.structured_logging: %-style calls, and records queued
+            for a listener thread that formats, redacts and writes JSON
+
+Both run against two sinks:
+
+  fast      /dev/null
+  slow      each write sleeps --sink-delay-us (a stderr pipe that a log
+            shipper isn't reading fast enough)
+
+A record the pipeline can't queue is dropped, not waited for. The
+``dropped`` count shows whether the queue was big enough.
+
+Run with: python -m benchmarks.bench_logging [--requests 2000] [--sink-delay-us 200] [--save-baseline | --compare]
+"""
+import argparse
+import io
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict
+
+from benchmarks.harness import add_baseline_arguments, finish, format_summary, latency_summary
+from utils.request_context import RequestIdFilter, bind_request_id
+from utils.structured_logging import TEXT_FORMAT, LoggingPipeline
+
+CASE = {"id": "inq_bench", "status": "pending",
+        "business": {"name": "Acme", "ein": "12-3456789"}, "ubo": {"name": "Jo Doe", "ssn": "123-45-6789"}}
+
+
+class SlowSink(io.TextIOBase):
+    """A stream whose writes block for a while, like a full pipe"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def write(self, text: str) -> int:
+        time.sleep(self.delay)
+        return len(text)
+
+
+def make_sink(kind: str, delay: float):
+    return SlowSink(delay) if kind == "slow" else open(os.devnull, "w")
+
+
+def request_sync(logger: logging.Logger, i: int) -> None:
+    logger.info(f"Persona webhook: case.updated evt_{i} ({'queued'})")
+    logger.debug(f"Fetched case: {CASE}")
+    logger.info(f"Processing case {CASE['id']}: {CASE}")
+
+
+def request_lazy(logger: logging.Logger, i: int) -> None:
+    logger.info("Persona webhook: %s %s (%s)", "case.updated", f"evt_{i}", "queued")
+    logger.debug("Fetched case: %s", CASE)
+    logger.info("Processing case %s: %s", CASE["id"], CASE)
+
+
+def run_mode(mode: str, sink_kind: str, args) -> Dict[str, Any]:
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    sink = make_sink(sink_kind, args.sink_delay_us / 1e6)
+    pipeline = None
+    if mode == "sync":
+        handler = logging.StreamHandler(sink)
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handler.addFilter(RequestIdFilter())
+        root.addHandler(handler)
+        root.setLevel(logging.INFO)
+        request = request_sync
+    else:
+        pipeline = LoggingPipeline(stream=sink, queue_size=args.queue_size)
+        pipeline.install()
+        request = request_lazy
+
+    logger = logging.getLogger("main")
+    latencies = []
+    begin = time.perf_counter()
+    for i in range(args.requests):
+        with bind_request_id():
+            t0 = time.perf_counter()
+            request(logger, i)
+            latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - begin
+    if pipeline is not None:
+        # The listener's backlog isn't on the request path; wait it out
+        pipeline.stop()
+    summary = latency_summary(latencies, elapsed, unit="us")
+    summary["dropped"] = pipeline.stats()["queue_full"] if pipeline is not None else 0
+    print(f"{format_summary(f'{sink_kind}/{mode}', summary)}  dropped={summary['dropped']}")
+    return summary
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--sink-delay-us", type=float, default=200.0, help="per write on the slow sink")
+    parser.add_argument("--queue-size", type=int, default=10_000)
+    add_baseline_arguments(parser, "logging")
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, Any]] = {}
+    for sink_kind in ("fast", "slow"):
+        for mode in ("sync", "pipeline"):
+            results[f"{sink_kind}_{mode}"] = run_mode(mode, sink_kind, args)
+    for sink_kind in ("fast", "slow"):
+        before, after = results[f"{sink_kind}_sync"], results[f"{sink_kind}_pipeline"]
+        print(f"{sink_kind} sink: p99 per request {before['p99_us']:.1f} -> {after['p99_us']:.1f} us")
+    return finish(args, results, {key: value for key, value in vars(args).items()
+                                  if key not in ("save_baseline", "compare", "tolerance")})
+
+
+if __name__ == "__main__":
+    sys.exit(main())
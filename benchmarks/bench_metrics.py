@@ -0,0 +1,122 @@
+"""Overhead of the metrics layer on the hot path.
+
+Times the primitives (counter, histogram, stage timer), the per-request
+cost of MetricsMiddleware on a bare ASGI app, the case pipeline
+(evaluate + format) with and without its stage timers, and a /metrics
+render. Exits non-zero when a stage timer or middleware pass costs
+more than its budget.
+
+Run with: python -m benchmarks.bench_metrics [--iterations 200000] [--stage-budget-us 2] [--request-budget-us 25]
+"""
+import argparse
+import asyncio
+import sys
+import time
+import timeit
+
+from benchmarks.bench_policy import make_cases
+from slack_notify.notify import build_slack_payload
+from utils.evaluation import evaluate_case
+from utils.metrics import MetricsMiddleware, MetricsRegistry, Stage, get_metrics
+
+
+def per_call_ns(stmt, number: int) -> float:
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e9
+
+
+async def asgi_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def request_us(app, requests: int) -> float:
+    scope = {"type": "http", "method": "GET", "path": "/", "headers": [(b"host", b"kyb-bot")]}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(requests):
+            await app(dict(scope), receive, send)
+        best = min(best, (time.perf_counter() - start) / requests)
+    return best * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--cases", type=int, default=2000)
+    parser.add_argument("--stage-budget-us", type=float, default=2.0)
+    parser.add_argument("--request-budget-us", type=float, default=25.0)
+    args = parser.parse_args()
+    n = args.iterations
+
+    registry = MetricsRegistry()
+    counter = registry.counter("bench_total", "bench").labels()
+    histogram = registry.histogram("bench_seconds", "bench").labels()
+    timer = Stage("bench", registry)
+
+    def timed():
+        with timer.time():
+            pass
+
+    baseline_ns = per_call_ns(lambda: None, n)
+    counter_ns = per_call_ns(lambda: counter.inc(), n) - baseline_ns
+    observe_ns = per_call_ns(lambda: histogram.observe(0.042), n) - baseline_ns
+    stage_ns = per_call_ns(timed, n) - baseline_ns
+
+    bare_us = asyncio.run(request_us(asgi_app, n // 20))
+    wrapped_us = asyncio.run(request_us(MetricsMiddleware(asgi_app, registry), n // 20))
+    middleware_us = wrapped_us - bare_us
+
+    # The real pipeline: evaluate + format, with and without stage timers
+    cases = make_cases(args.cases)
+    checklist = Stage("checklist", registry)
+
+    def pipeline_plain():
+        for case in cases:
+            build_slack_payload(case, evaluation=evaluate_case(case))
+
+    def pipeline_timed():
+        for case in cases:
+            with checklist.time():
+                evaluation = evaluate_case(case)
+            build_slack_payload(case, evaluation=evaluation)  # format stage is always on
+
+    pipeline_timed()  # warm up the policy engine
+    # Interleaved so drift on a busy machine hits both sides alike
+    plain, timed_ = [], []
+    for _ in range(15):
+        plain.append(timeit.timeit(pipeline_plain, number=1))
+        timed_.append(timeit.timeit(pipeline_timed, number=1))
+    plain_us = min(plain) / len(cases) * 1e6
+    timed_us = min(timed_) / len(cases) * 1e6
+
+    render_ms = min(timeit.repeat(get_metrics().render, number=10, repeat=3)) / 10 * 1e3
+    series = sum(1 for line in get_metrics().render().splitlines() if not line.startswith("#"))
+
+    print(f"counter.inc:         {counter_ns:6.0f} ns")
+    print(f"histogram.observe:   {observe_ns:6.0f} ns")
+    print(f"stage timer:         {stage_ns:6.0f} ns (with block incl. gauge, histogram)")
+    print(f"middleware:          {middleware_us:6.1f} us/request ({bare_us:.1f} -> {wrapped_us:.1f} us on a bare ASGI app)")
+    print(f"case pipeline:       {plain_us:6.1f} -> {timed_us:.1f} us/case "
+          f"({(timed_us - plain_us) / plain_us * 100:+.1f}% with the checklist timer)")
+    print(f"/metrics render:     {render_ms:6.2f} ms ({series} samples)")
+
+    failures = []
+    if stage_ns / 1e3 > args.stage_budget_us:
+        failures.append(f"stage timer {stage_ns / 1e3:.2f} us > {args.stage_budget_us} us")
+    if middleware_us > args.request_budget_us:
+        failures.append(f"middleware {middleware_us:.1f} us > {args.request_budget_us} us")
+    for failure in failures:
+        print(f"OVER BUDGET: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
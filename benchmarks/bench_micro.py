@@ -0,0 +1,72 @@
+"""Microbenchmarks for the per-case hot path.
+
+Times validate_kyb_checklist, evaluate_case, format_kyb_message and
+build_slack_payload call by call over a fixed synthetic case set and
+reports p50/p95/p99 and calls per second. Results can be saved as a
+baseline and later runs compared against it.
+
+Run with: python -m benchmarks.bench_micro [--cases 5000] [--rounds 3] [--save-baseline | --compare]
+"""
+import argparse
+import gc
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.bench_policy import make_cases
+from benchmarks.harness import add_baseline_arguments, finish, format_summary, latency_summary
+from slack_notify.notify import build_slack_payload, format_kyb_message
+from utils.checklist import validate_kyb_checklist
+from utils.evaluation import evaluate_case
+
+
+def time_calls(fn, inputs, rounds: int):
+    """Per-call latencies of ``fn(item)``; the fastest round is kept"""
+    best = None
+    for _ in range(rounds):
+        latencies = []
+        clock = time.perf_counter
+        gc.disable()
+        try:
+            start = clock()
+            for item in inputs:
+                t0 = clock()
+                fn(item)
+                latencies.append(clock() - t0)
+            elapsed = clock() - start
+        finally:
+            gc.enable()
+        if best is None or elapsed < best[1]:
+            best = (latencies, elapsed)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=3)
+    add_baseline_arguments(parser, "micro")
+    args = parser.parse_args()
+
+    as_of = datetime.now()
+    cases = make_cases(args.cases)
+    evaluations = [evaluate_case(case, as_of=as_of) for case in cases]  # also warms the engine
+    paired = list(zip(cases, evaluations))
+
+    benchmarks = {
+        "validate_kyb_checklist": (lambda case: validate_kyb_checklist(case, as_of=as_of), cases),
+        "evaluate_case": (lambda case: evaluate_case(case, as_of=as_of), cases),
+        "format_kyb_message": (lambda pair: format_kyb_message(pair[0], pair[1]), paired),
+        "build_slack_payload": (lambda pair: build_slack_payload(pair[0], evaluation=pair[1]), paired),
+    }
+    results = {}
+    for name, (fn, inputs) in benchmarks.items():
+        latencies, elapsed = time_calls(fn, inputs, args.rounds)
+        results[name] = latency_summary(latencies, elapsed, unit="us")
+        print(format_summary(name, results[name]))
+
+    return finish(args, results, {"cases": args.cases, "rounds": args.rounds})
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Benchmark: fetching a case with its related objects, sequential vs fan-out.
+
+Runs mock Persona with --related (each case references four reports, a
+document and an inquiry) and injected latency, then loads cases through
+the real fetch path (decode, PersonaClient.get_related, with_related):
+
+  sequential  related objects fetched one after another (per-case limit 1)
+  fanout      related objects fetched concurrently (the app's setting)
+
+With L ms per call, sequential is about 7L per case and the fan-out about
+2L (the case, then its slowest related object). Every assembled case is
+checked against the flat mock case and must screen identically (a
+mismatch or a failed case fetch counts as an error). With --error-rate
+or a --timeout-ms below the latency, cases come back marked incomplete
+instead of failing.
+
+Run with: python -m benchmarks.bench_related [--cases 200] [--latency-ms 40] [--jitter-ms 10]
+          [--error-rate 0.05] [--timeout-ms 100] [--save-baseline | --compare]
+"""
+import argparse
+import asyncio
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict
+
+import httpx
+
+from benchmarks.harness import add_baseline_arguments, finish, format_summary, latency_summary, serve_in_thread
+from persona_client.client import PersonaClient
+from persona_client.models import decode_case, with_related
+from tools.faults import FaultSettings
+from tools.mock_persona import case_id_for, create_mock_persona_app, make_case
+from utils.policy import get_policy_engine
+
+
+async def run_mode(client: PersonaClient, args, per_case: int) -> Dict[str, Any]:
+    engine = get_policy_engine()
+    as_of = datetime.now()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    latencies, incomplete, errors = [], 0, 0
+
+    async def one(i: int) -> None:
+        nonlocal incomplete, errors
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                case, _ = await client.get_case_if_modified(case_id_for(i), decode=decode_case)
+            except httpx.HTTPError:
+                errors += 1  # the case itself failed; nothing to fan out
+                return
+            fetched, missing = await client.get_related(case.related, per_case=per_case)
+            case = with_related(case, fetched, missing)
+            latencies.append(time.perf_counter() - t0)
+        if case.incomplete:
+            incomplete += 1
+        elif (engine.evaluate(case, as_of=as_of).rule_ids
+              != engine.evaluate(decode_case(make_case(i)), as_of=as_of).rule_ids):
+            errors += 1
+
+    begin = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.cases)))
+    summary = latency_summary(latencies, time.perf_counter() - begin, errors)
+    summary["incomplete"] = incomplete
+    return summary
+
+
+async def run(args) -> int:
+    faults = FaultSettings(args.latency_ms / 1000, args.jitter_ms / 1000, args.error_rate, seed=1)
+    server, base_url = serve_in_thread(create_mock_persona_app(args.cases, faults=faults, related=True))
+    client = PersonaClient(api_key="bench", base_url=f"{base_url}/api/v1",
+                           max_connections=100, max_keepalive_connections=100,
+                           related_concurrency=args.global_limit, related_per_case=args.per_case,
+                           related_timeout=args.timeout_ms / 1000)
+    await client.open()
+    results = {}
+    try:
+        for name, per_case in (("sequential", 1), ("fanout", args.per_case)):
+            results[name] = await run_mode(client, args, per_case)
+            print(f"{format_summary(name, results[name])}  incomplete={results[name]['incomplete']}")
+    finally:
+        await client.close()
+        server.should_exit = True
+    speedup = results["sequential"]["p50_ms"] / max(results["fanout"]["p50_ms"], 1e-9)
+    print(f"\nfan-out p50 is {speedup:.1f}x faster; client: {client.stats()}")
+    return finish(args, results, {key: value for key, value in vars(args).items()
+                                  if key not in ("save_baseline", "compare", "tolerance")})
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=2, help="cases loaded at once")
+    parser.add_argument("--per-case", type=int, default=8, help="related requests in flight per case")
+    parser.add_argument("--global-limit", type=int, default=32, help="related requests in flight overall")
+    parser.add_argument("--timeout-ms", type=float, default=2000.0, help="per related object")
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    add_baseline_arguments(parser, "related")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
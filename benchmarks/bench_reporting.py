@@ -0,0 +1,209 @@
+"""Benchmark: weekly compliance reports from running aggregates vs a rescan.
+
+Feeds --cases screenings over --days days into a fresh report store
+(utils.reporting), as process_case and the Slack actions do: some cases
+are screened again (about half of those the same day), and most get a
+reviewer action hours or days later. Outcomes come from screening mock
+Persona cases with the real policy.
+
+  record    time per record_screening/record_action call on the event
+            loop (a queue put); the writer's throughput is reported too,
+            with the feed paused while the queue is over half full
+  report    a weekly report from the daily aggregates, for every week
+  rescan    the same report recomputed from every stored event, which
+            is what grepping logs amounts to
+
+Every weekly report is checked against its rescan; a mismatch counts as
+an error. ``export`` writes all events to day-partitioned Parquet files
+(skipped when pyarrow isn't installed).
+
+Run with: python -m benchmarks.bench_reporting [--cases 200000] [--days 91] [--save-baseline | --compare]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.harness import add_baseline_arguments, finish, format_summary, latency_summary
+from persona_client.models import decode_case
+from tools.mock_persona import make_case
+from utils.evaluation import evaluate_case
+from utils.policy import RULE_PROHIBITED_COUNTRY
+from utils.reporting import KIND_SCREENING, ReportStore, build_report, utc_day
+
+DAY = 86400
+
+
+def make_evaluations(count: int) -> List[Any]:
+    return [evaluate_case(decode_case(json.dumps(make_case(i)))) for i in range(count)]
+
+
+class Clone:
+    """A screened mock case under another case ID"""
+    __slots__ = ("case_id", "result", "passed", "needs_review", "rule_ids", "country_code", "industry")
+
+    def __init__(self, case_id: str, evaluation):
+        self.case_id = case_id
+        self.result = evaluation.result
+        self.passed = evaluation.passed
+        self.needs_review = evaluation.needs_review
+        self.rule_ids = evaluation.rule_ids
+        self.country_code = evaluation.country_code
+        self.industry = evaluation.industry
+
+
+def make_events(args, evaluations: List[Any], start: float) -> List[Tuple[float, str, Any]]:
+    """(ts, "screen"|action, Clone or case ID) in time order"""
+    rng = random.Random(args.seed)
+    span = args.days * DAY
+    events = []
+    for i in range(args.cases):
+        case_id = f"case_{i}"
+        ts = start + rng.random() * span
+        events.append((ts, "screen", Clone(case_id, rng.choice(evaluations))))
+        if rng.random() < 0.2:
+            later = ts + (rng.random() * 3600 if rng.random() < 0.5 else rng.random() * 10 * DAY)
+            events.append((later, "screen", Clone(case_id, rng.choice(evaluations))))
+        if rng.random() < 0.7:
+            action = rng.choices(["approve", "flag", "reject"], [0.7, 0.2, 0.1])[0]
+            events.append((ts + rng.expovariate(1 / (8 * 3600)), action, case_id))
+    events.sort(key=lambda event: event[0])
+    return [event for event in events if event[0] < start + span]
+
+
+async def record_all(store: ReportStore, events) -> Tuple[Dict[str, Any], float]:
+    latencies = []
+    begin = time.perf_counter()
+    for i, (ts, kind, item) in enumerate(events):
+        t0 = time.perf_counter()
+        if kind == "screen":
+            store.record_screening(item, ts)
+        else:
+            store.record_action(kind, item, ts)
+        latencies.append(time.perf_counter() - t0)
+        if i % 1000 == 999:
+            # Let the writer run, as it would between requests; this feed
+            # is far faster than real traffic, so don't outrun the queue
+            await asyncio.sleep(0)
+            while store.stats()["queued"] > store.max_pending // 2:
+                await asyncio.sleep(0.001)
+    recorded = time.perf_counter() - begin
+    while store.stats()["recorded"] + store.stats()["dropped"] < len(events):
+        await asyncio.sleep(0.01)
+    summary = latency_summary(latencies, recorded, errors=store.stats()["dropped"], unit="us")
+    return summary, len(events) / (time.perf_counter() - begin)
+
+
+def rescan(conn, since: str, until: str) -> Dict[str, Any]:
+    """The report recomputed from every event: latest outcome per case and day, turnaround from first screening"""
+    first: Dict[str, float] = {}
+    latest: Dict[Tuple[str, str], Tuple[int, int, List[str]]] = {}
+    totals: Dict[Tuple[str, str], float] = defaultdict(float)
+    for ts, kind, case_id, action, passed, needs_review, rule_ids in conn.execute(
+            "SELECT ts, kind, case_id, action, passed, needs_review, rule_ids FROM report_events ORDER BY seq"):
+        day = utc_day(ts)
+        if kind == KIND_SCREENING:
+            first.setdefault(case_id, ts)
+            if since <= day <= until:
+                totals[("screenings", "")] += 1
+                latest[(case_id, day)] = (passed, needs_review, json.loads(rule_ids))
+        elif since <= day <= until:
+            totals[("decisions", action)] += 1
+            if case_id in first:
+                totals[("turnaround_n", action)] += 1
+                totals[("turnaround_s", action)] += max(0.0, ts - first[case_id])
+    for passed, needs_review, rule_ids in latest.values():
+        totals[("cases", "")] += 1
+        totals[("passed", "")] += passed
+        totals[("needs_review", "")] += needs_review
+        for rule_id in rule_ids:
+            totals[("rule", rule_id)] += 1
+        totals[("country_hit", "")] += RULE_PROHIBITED_COUNTRY in rule_ids
+    return build_report(since, until, totals)
+
+
+def same(report: Dict[str, Any], expected: Dict[str, Any]) -> bool:
+    # Histogram quantiles aren't recomputed by the rescan
+    keys = ("cases_screened", "screenings", "passed", "needs_review", "failures_by_rule",
+            "prohibited_country_hits", "prohibited_country_hit_rate")
+    if any(report[key] != expected[key] for key in keys):
+        return False
+    return all(report["decisions"].get(action, {}).get(field) == decision[field]
+               for action, decision in expected["decisions"].items() for field in ("count", "timed", "mean_hours"))
+
+
+async def run(args, workdir: str) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    today = datetime.now(timezone.utc).date()
+    start_day = today - timedelta(days=args.days)
+    start = datetime.combine(start_day, datetime.min.time(), tzinfo=timezone.utc).timestamp()
+    events = make_events(args, make_evaluations(args.mock_cases), start)
+
+    store = ReportStore(os.path.join(workdir, "reports.db"))
+    await store.open()
+    summary, rate = await record_all(store, events)
+    summary["writer_per_s"] = round(rate, 1)
+    results["record"] = summary
+    print(f"{format_summary('record', summary)}  writer {rate:.0f} events/s")
+
+    weeks = []
+    monday = start_day - timedelta(days=start_day.weekday())
+    while monday <= today:
+        weeks.append((monday.isoformat(), (monday + timedelta(days=6)).isoformat()))
+        monday += timedelta(days=7)
+    latencies, rescans, errors = [], [], 0
+    for since, until in weeks:
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            report = await store.report(date.fromisoformat(since), date.fromisoformat(until))
+            latencies.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        expected = await store._run(rescan, store._conn, since, until)
+        rescans.append(time.perf_counter() - t0)
+        errors += not same(report, expected)
+    results["report"] = latency_summary(latencies, sum(latencies), errors=errors)
+    results["rescan"] = latency_summary(rescans, sum(rescans))
+    print(format_summary("report", results["report"]))
+    print(format_summary("rescan", results["rescan"]))
+
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        print("export: skipped, pyarrow is not installed")
+    else:
+        t0 = time.perf_counter()
+        exported = await store.export(os.path.join(workdir, "export"), "parquet")
+        elapsed = time.perf_counter() - t0
+        results["export"] = {"requests": exported["events"], "errors": int(exported["events"] != len(events)),
+                             "export_ms": round(elapsed * 1000, 1),
+                             "events_per_s": round(exported["events"] / elapsed, 1)}
+        print(f"export: {exported['events']} events to {len(exported['files'])} Parquet files "
+              f"in {elapsed:.2f} s")
+    await store.close()
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=200_000)
+    parser.add_argument("--days", type=int, default=91)
+    parser.add_argument("--repeat", type=int, default=20, help="report queries per week")
+    parser.add_argument("--mock-cases", type=int, default=500, help="distinct screened cases to draw from")
+    parser.add_argument("--seed", type=int, default=24)
+    add_baseline_arguments(parser, "reporting")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory(prefix="kyb-reports-") as workdir:
+        results = asyncio.run(run(args, workdir))
+    return finish(args, results, {key: value for key, value in vars(args).items()
+                                  if key not in ("save_baseline", "compare", "tolerance")})
+
+
+if __name__ == "__main__":
+    sys.exit(main())
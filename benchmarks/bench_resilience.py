@@ -0,0 +1,180 @@
+"""Benchmark: Persona client resilience against the fault-injecting mock.
+
+Three scenarios, each through the real PersonaClient:
+
+  errors    5% injected 503s; cases fetched without and with the
+            resilience layer (retries with backoff and a retry budget).
+            Without it every injected fault is a failed case.
+  tail      a slow tail (--tail-rate of requests take --tail-ms); hedging
+            off vs on (a second copy after the recent p90). Compares p99.
+  outage    a warm CaseCache, then Persona fails every request: the
+            circuit breaker opens, calls fail fast and the cache serves
+            its last snapshots marked stale. Persona then recovers and a
+            half-open trial closes the breaker again.
+
+Each scenario prints the resilience counters (retries, hedges, budget
+refusals, breaker transitions) next to its latencies.
+
+Run with: python -m benchmarks.bench_resilience [--cases 300] [--latency-ms 20]
+          [--tail-rate 0.05] [--tail-ms 400] [--save-baseline | --compare]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from benchmarks.harness import add_baseline_arguments, finish, format_summary, latency_summary, serve_in_thread
+from persona_client.cache import CaseCache
+from persona_client.client import PersonaClient
+from persona_client.models import decode_case
+from persona_client.resilience import Resilience
+from tools.faults import FaultSettings
+from tools.mock_persona import case_id_for, create_mock_persona_app
+
+COUNTERS = ("retries", "budget_exhausted", "gave_up", "hedges", "hedge_wins", "attempt_timeouts",
+            "breaker_opened", "breaker_half_open", "breaker_closed", "breaker_rejected")
+
+
+def make_client(base_url: str, resilience: Optional[Resilience]) -> PersonaClient:
+    return PersonaClient(api_key="bench", base_url=f"{base_url}/api/v1", max_connections=100,
+                         max_keepalive_connections=100, resilience=resilience)
+
+
+def counters(client: PersonaClient) -> Dict[str, Any]:
+    if client.resilience is None:
+        return {}
+    stats = client.resilience.stats()
+    return {name: stats[name] for name in COUNTERS if stats[name]}
+
+
+async def fetch_all(client: PersonaClient, cases: int, concurrency: int) -> Dict[str, Any]:
+    """Fetch every case once; a case that fails after all attempts is an error"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                await client.get_case_if_modified(case_id_for(i), decode=decode_case)
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    begin = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(cases)))
+    return latency_summary(latencies, time.perf_counter() - begin, errors)
+
+
+async def compare(base_url: str, args, name: str, modes) -> Dict[str, Any]:
+    results = {}
+    for mode, resilience in modes:
+        client = make_client(base_url, resilience)
+        await client.open()
+        try:
+            results[mode] = await fetch_all(client, args.cases, args.concurrency)
+            results[mode].update(counters(client))
+        finally:
+            await client.close()
+        print(f"{format_summary(f'{name}/{mode}', results[mode])}  {counters(client)}")
+    return results
+
+
+async def outage(base_url: str, faults: FaultSettings, args) -> Dict[str, Any]:
+    """Warm cache -> total outage (stale + fail fast) -> recovery"""
+    resilience = Resilience(max_retries=1, backoff_base=0.01, breaker_failures=5,
+                            breaker_reset=args.breaker_reset, seed=1)
+    client = make_client(base_url, resilience)
+    await client.open()
+
+    async def fetch(case_id, etag):
+        return await client.get_case_if_modified(case_id, etag, decode=decode_case)
+
+    cache = CaseCache(ttl=0.0, fetcher=fetch)
+    cases = min(args.cases, 50)
+    results: Dict[str, Any] = {}
+
+    async def phase(name: str) -> None:
+        latencies, stale, errors = [], 0, 0
+        begin = time.perf_counter()
+        for i in range(cases):
+            t0 = time.perf_counter()
+            try:
+                case = await cache.get_case(case_id_for(i))
+                stale += case.stale_since is not None
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+        results[name] = latency_summary(latencies, time.perf_counter() - begin, errors)
+        results[name]["stale"] = stale
+        results[name].update(counters(client))
+        print(f"{format_summary(f'outage/{name}', results[name])}  stale={stale}  "
+              f"breaker={resilience.breaker.state}  {counters(client)}")
+
+    try:
+        await phase("warm")
+        faults.update({"error_rate": 1.0, "error_status": 503})
+        await phase("down")
+        faults.update({"error_rate": 0.0})
+        await asyncio.sleep(args.breaker_reset)
+        await phase("recovered")
+    finally:
+        await client.close()
+    results["recovered"]["breaker_closed_after"] = int(resilience.breaker.state == "closed")
+    return results
+
+
+async def run(args) -> int:
+    faults = FaultSettings(args.latency_ms / 1000, args.jitter_ms / 1000, seed=1)
+    server, base_url = serve_in_thread(create_mock_persona_app(args.cases, faults=faults))
+    results: Dict[str, Any] = {}
+    try:
+        faults.update({"error_rate": args.error_rate, "error_status": 503})
+        for mode, summary in (await compare(base_url, args, "errors", (
+                ("plain", None),
+                ("resilient", Resilience(backoff_base=0.02, seed=1))))).items():
+            results[f"errors_{mode}"] = summary
+
+        faults.update({"error_rate": 0.0, "tail_rate": args.tail_rate, "tail_latency": args.tail_ms / 1000})
+        for mode, summary in (await compare(base_url, args, "tail", (
+                ("no_hedge", Resilience(seed=1)),
+                ("hedged", Resilience(hedge_percentile=90, hedge_min_delay=0.01, seed=1))))).items():
+            results[f"tail_{mode}"] = summary
+
+        faults.update({"tail_rate": 0.0})
+        for phase, summary in (await outage(base_url, faults, args)).items():
+            results[f"outage_{phase}"] = summary
+    finally:
+        server.should_exit = True
+
+    print(f"\nerrors: {results['errors_plain']['errors']} -> {results['errors_resilient']['errors']} "
+          f"failed cases; tail p99: {results['tail_no_hedge']['p99_ms']:.0f} -> "
+          f"{results['tail_hedged']['p99_ms']:.0f} ms; outage p99 {results['outage_down']['p99_ms']:.1f} ms "
+          f"with {results['outage_down']['stale']} stale case(s) served")
+    return finish(args, results, {key: value for key, value in vars(args).items()
+                                  if key not in ("save_baseline", "compare", "tolerance")})
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=5.0)
+    parser.add_argument("--error-rate", type=float, default=0.05, help="injected 503s in the errors scenario")
+    parser.add_argument("--tail-rate", type=float, default=0.05, help="slow requests in the tail scenario")
+    parser.add_argument("--tail-ms", type=float, default=400.0)
+    parser.add_argument("--breaker-reset", type=float, default=0.5, help="seconds before a half-open trial")
+    add_baseline_arguments(parser, "resilience")
+    # one "serving stale" warning per case would drown the results
+    logging.getLogger("persona_client.cache").setLevel(logging.ERROR)
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Load test for Slack button clicks on the async Bolt app.
+
+Fires many signed ``block_actions`` requests at /slack/events at once and
+measures how fast each click is acknowledged, how long it takes until
+every reply has reached Slack (a local mock) and every action is in the
+audit log, and how many threads the process used while doing it.
+
+Run with: python -m benchmarks.bench_slack_actions [--clicks 1000] [--concurrency 500]
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import threading
+import time
+
+import httpx
+
+from benchmarks.harness import percentile, serve_in_thread, slack_signature_headers
+from benchmarks.load_test import block_action_body
+from tools.mock_slack import create_mock_slack_app
+
+SIGNING_SECRET = "bench-signing-secret"
+
+
+def signed_click(i: int, base: str):
+    body = block_action_body(i, base)
+    return body, slack_signature_headers(body, SIGNING_SECRET)
+
+
+async def run(args):
+    mock, base = serve_in_thread(create_mock_slack_app())
+    workdir = tempfile.mkdtemp(prefix="kyb-slack-bench-")
+    os.environ.update(
+        SLACK_API_TOKEN="xoxb-bench", SLACK_SIGNING_SECRET=SIGNING_SECRET,
+        SLACK_API_URL=f"{base}/api/", SLACK_WEBHOOK_URL=f"{base}/hooks/main",
+        SLACK_OUTBOX_WORKERS=str(args.outbox_workers), SLACK_OUTBOX_MAX_QUEUE=str(max(args.clicks, 1000)),
+        PERSONA_API_KEY="bench", PERSONA_WEBHOOK_SECRET="b" * 16,
+        SLACK_VERIFICATION_TOKEN="v" * 24, ENCRYPTION_KEY="e" * 44,
+        AUDIT_LOG_PATH=os.path.join(workdir, "audit.db"),
+        WEBHOOK_QUEUE_PATH=os.path.join(workdir, "queue.db"),
+        REVIEW_MESSAGES_PATH=os.path.join(workdir, "review_messages.db"),
+        IMPACT_INDEX_PATH=os.path.join(workdir, "impact_index.db"),
+        ENTITY_INDEX_PATH=os.path.join(workdir, "entity_index.db"),
+        REPORTS_PATH=os.path.join(workdir, "reports.db"),
+    )
+    import main  # after the environment is set
+    from slack_notify.outbox import get_slack_outbox
+    from utils.audit_log import get_audit_log
+
+    clicks = [signed_click(i, base) for i in range(args.clicks)]
+    ack_latencies = []
+    peak_threads = threading.active_count()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def watch_threads():
+        nonlocal peak_threads
+        while True:
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.01)
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://kyb-bot") as client, \
+                httpx.AsyncClient(base_url=base) as mock_client:
+            async def click(body, headers):
+                async with semaphore:
+                    t0 = time.perf_counter()
+                    response = await client.post("/slack/events", content=body, headers=headers)
+                    ack_latencies.append(time.perf_counter() - t0)
+                    assert response.status_code == 200, response.text
+
+            watcher = asyncio.ensure_future(watch_threads())
+            start = time.perf_counter()
+            await asyncio.gather(*(click(body, headers) for body, headers in clicks))
+            acked_s = time.perf_counter() - start
+
+            # Replies go out through the outbox and actions through the audit log
+            while True:
+                received = (await mock_client.get("/stats")).json()
+                outbox = get_slack_outbox().stats()
+                if (received.get("webhook", 0) + outbox["dropped"] + outbox["failed"] >= args.clicks
+                        and get_audit_log().stats()["appended"] >= args.clicks):
+                    break
+                await asyncio.sleep(0.05)
+            done_s = time.perf_counter() - start
+            watcher.cancel()
+            audit = get_audit_log().stats()
+
+    mock.should_exit = True
+    print(f"clicks:              {args.clicks} ({args.concurrency} in flight)")
+    print(f"acked in:            {acked_s:.2f} s ({args.clicks / acked_s:.0f} clicks/s)")
+    print(f"ack p50/p99/max:     {percentile(ack_latencies, 50) * 1e3:.1f} / "
+          f"{percentile(ack_latencies, 99) * 1e3:.1f} / {max(ack_latencies) * 1e3:.1f} ms")
+    print(f"all replied+audited: {done_s:.2f} s")
+    print(f"audit commits:       {audit['commits']} (avg batch {audit['avg_batch']})")
+    print(f"outbox:              sent {outbox['sent']}, dropped {outbox['dropped']}, failed {outbox['failed']}")
+    print(f"peak threads:        {peak_threads}")
+    print(f"mock Slack saw:      {received}")
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clicks", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--outbox-workers", type=int, default=16)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main_cli()
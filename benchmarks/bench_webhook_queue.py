@@ -0,0 +1,95 @@
+"""Throughput benchmark for the durable webhook queue.
+
+Offers events at a fixed rate (default 1k/s), measures the latency of the
+durable append that gates the webhook ack, and how far the worker pool
+lags behind with a simulated per-event processing cost.
+
+Run with: python -m benchmarks.bench_webhook_queue [--rate 1000] [--seconds 5]
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+from utils.webhook_queue import WebhookProcessor, WebhookQueue
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+async def run(args):
+    path = os.path.join(tempfile.mkdtemp(prefix="kyb-bench-"), "queue.db")
+    queue = WebhookQueue(path=path)
+    await queue.open()
+
+    received = {}
+    finished = []
+
+    async def handler(event):
+        await asyncio.sleep(args.work_ms / 1000)
+        finished.append(time.perf_counter() - received[event["event_id"]])
+
+    processor = WebhookProcessor(queue, handler, workers=args.workers, batch_size=args.batch)
+    await processor.start()
+
+    total = int(args.rate * args.seconds)
+    ack_latencies = []
+    interval = 1.0 / args.rate
+    start = time.perf_counter()
+
+    async def ingest(i):
+        event_id = f"evt_{i}"
+        body = json.dumps({"data": {"id": event_id, "attributes": {"name": "case.updated"}}}).encode()
+        t0 = time.perf_counter()
+        received[event_id] = t0
+        await queue.put(event_id, f"case_{i % 5000}", "case.updated", body)
+        ack_latencies.append(time.perf_counter() - t0)
+        processor.notify()
+
+    pending = []
+    for i in range(total):
+        target = start + i * interval
+        delay = target - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        pending.append(asyncio.ensure_future(ingest(i)))
+    await asyncio.gather(*pending)
+    ingest_s = time.perf_counter() - start
+
+    # Redeliveries must be dropped
+    dup_body = json.dumps({"data": {"id": "evt_0"}}).encode()
+    assert not await queue.put("evt_0", "case_0", "case.updated", dup_body)
+
+    while len(finished) < total:
+        await asyncio.sleep(0.05)
+    drain_s = time.perf_counter() - start
+    await processor.stop()
+    stats = await queue.stats()
+    await queue.close()
+
+    print(f"events:            {total} offered at {args.rate}/s")
+    print(f"ingest rate:       {total / ingest_s:8.0f} events/s")
+    print(f"ack p50/p99/max:   {percentile(ack_latencies, 50) * 1e3:.2f} / "
+          f"{percentile(ack_latencies, 99) * 1e3:.2f} / {max(ack_latencies) * 1e3:.2f} ms")
+    print(f"processed rate:    {total / drain_s:8.0f} events/s "
+          f"({args.workers} workers, {args.work_ms} ms/event)")
+    print(f"e2e p50/p99:       {percentile(finished, 50) * 1e3:.1f} / {percentile(finished, 99) * 1e3:.1f} ms")
+    print(f"queue:             {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rate", type=float, default=1000)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--batch", type=int, default=50)
+    parser.add_argument("--work-ms", type=float, default=2.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
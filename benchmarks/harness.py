@@ -0,0 +1,171 @@
+"""Shared pieces of the benchmark and load-test scripts.
+
+Latency summaries, mock servers on background threads, Slack request
+signing, and baseline files: results are saved as JSON next to the
+machine they came from, and later runs are compared metric by metric
+(``*_ms``/``*_us`` lower is better, ``*_per_s`` higher is better).
+"""
+import hashlib
+import hmac
+import json
+import os
+import platform
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+UNITS = {"ms": 1e3, "us": 1e6}
+
+
+def latency_summary(latencies: Sequence[float], elapsed: float, errors: int = 0,
+                    unit: str = "ms") -> Dict[str, Any]:
+    """p50/p95/p99/max (in ``unit``) plus throughput for one scenario"""
+    scale = UNITS[unit]
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        f"p50_{unit}": round(percentile(ordered, 50) * scale, 3),
+        f"p95_{unit}": round(percentile(ordered, 95) * scale, 3),
+        f"p99_{unit}": round(percentile(ordered, 99) * scale, 3),
+        f"max_{unit}": round(ordered[-1] * scale, 3) if ordered else 0.0,
+        "throughput_per_s": round(len(ordered) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def format_summary(name: str, summary: Dict[str, Any]) -> str:
+    unit = "us" if "p50_us" in summary else "ms"
+    return (f"{name:<22} n={summary['requests']:<6} err={summary['errors']:<4} "
+            f"p50 {summary[f'p50_{unit}']:8.2f}  p95 {summary[f'p95_{unit}']:8.2f}  "
+            f"p99 {summary[f'p99_{unit}']:8.2f} {unit}  {summary['throughput_per_s']:10.1f}/s")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_in_thread(app, port: Optional[int] = None):
+    """Run an ASGI app under uvicorn on a daemon thread; returns (server, base URL)"""
+    import uvicorn
+
+    port = port or free_port()
+    server = uvicorn.Server(uvicorn.Config(app, port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def slack_signature_headers(body: str, signing_secret: str) -> Dict[str, str]:
+    """Headers of a form post signed the way Slack signs requests"""
+    ts = str(int(time.time()))
+    signature = "v0=" + hmac.new(signing_secret.encode(), f"v0:{ts}:{body}".encode(),
+                                 hashlib.sha256).hexdigest()
+    return {
+        "Content-Type": "application/x-www-form-urlencoded",
+        "X-Slack-Request-Timestamp": ts,
+        "X-Slack-Signature": signature,
+    }
+
+
+# ===== BASELINES =====
+def baseline_path(name: str) -> str:
+    return os.path.join(BASELINE_DIR, f"{name}.json")
+
+
+def save_baseline(path: str, results: Dict[str, Dict[str, Any]], settings: Dict[str, Any]) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    document = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "machine": {"python": platform.python_version(), "platform": platform.platform(),
+                    "cpus": os.cpu_count()},
+        "settings": settings,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def compare_baseline(path: str, results: Dict[str, Dict[str, Any]],
+                     tolerance: float = 0.25) -> Tuple[List[str], List[str]]:
+    """(report lines, regressions) of ``results`` against a saved baseline.
+
+    A ``*_ms``/``*_us`` metric regresses when it grows by more than ``tolerance``,
+    a ``*_per_s`` metric when it shrinks by more than ``tolerance``, and
+    ``errors`` whenever it goes up.
+    """
+    with open(path, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+    lines, regressions = [], []
+    for scenario, metrics in results.items():
+        old = baseline.get(scenario)
+        if old is None:
+            lines.append(f"{scenario}: not in baseline")
+            continue
+        for metric, value in metrics.items():
+            before = old.get(metric)
+            if metric == "errors" and value > (before or 0):
+                line = f"{scenario}.errors: {before or 0} -> {value}"
+                lines.append(line + "  REGRESSION")
+                regressions.append(line)
+                continue
+            if not isinstance(before, (int, float)) or not before or metric.startswith("max"):
+                continue
+            if metric.endswith(("_ms", "_us")):
+                change = value / before - 1
+                worse = change > tolerance
+            elif metric.endswith("_per_s"):
+                change = value / before - 1
+                worse = change < -tolerance
+            else:
+                continue
+            line = f"{scenario}.{metric}: {before} -> {value} ({change:+.0%})"
+            lines.append(line + ("  REGRESSION" if worse else ""))
+            if worse:
+                regressions.append(line)
+    return lines, regressions
+
+
+def add_baseline_arguments(parser, name: str) -> None:
+    parser.add_argument("--save-baseline", nargs="?", const=baseline_path(name), metavar="PATH",
+                        help=f"write results as the new baseline (default {os.path.relpath(baseline_path(name))})")
+    parser.add_argument("--compare", nargs="?", const=baseline_path(name), metavar="PATH",
+                        help="compare against a saved baseline and exit 1 on regression")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown before a metric counts as a regression")
+
+
+def finish(args, results: Dict[str, Dict[str, Any]], settings: Dict[str, Any]) -> int:
+    """Save and/or compare per the command line; returns the exit status"""
+    status = 0
+    if args.compare:
+        if not os.path.exists(args.compare):
+            print(f"No baseline at {args.compare}; run with --save-baseline first")
+            status = 1
+        else:
+            lines, regressions = compare_baseline(args.compare, results, args.tolerance)
+            print(f"\nvs baseline {os.path.relpath(args.compare)} (tolerance {args.tolerance:.0%}):")
+            for line in lines:
+                print(f"  {line}")
+            if regressions:
+                print(f"{len(regressions)} regression(s)")
+                status = 1
+    if args.save_baseline:
+        save_baseline(args.save_baseline, results, settings)
+        print(f"Baseline saved to {os.path.relpath(args.save_baseline)}")
+    return status
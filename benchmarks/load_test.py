@@ -0,0 +1,264 @@
+"""Async load generator for the KYB bot against local Persona and Slack mocks.
+
+Starts the mock Persona API and mock Slack on background threads, with
+optional latency and error injection. It then boots the app in-process
+(real lifespan, throwaway data files) and drives three scenarios:
+
+  commands  POST /slack/commands (/kyb), ack latency, then the time until
+            the result reaches the command's response_url
+  events    signed block_actions on /slack/events, ack latency, then the
+            time until the reply reaches its response_url
+  webhooks  POST /persona/webhook, ack latency, then the throughput of
+            the queue workers (fetch, screen, post to Slack)
+
+Each scenario reports p50/p95/p99 and throughput. Results can be saved as
+a baseline and later runs compared against it (exit 1 on regression).
+With --rate the load is open-loop: latency counts from each request's
+scheduled start, so a stalled server is not hidden by the generator
+slowing down.
+
+Run with: python -m benchmarks.load_test [--requests 500] [--concurrency 50] [--rate 200]
+          [--persona-latency-ms 80 --persona-related] [--slack-error-rate 0.05 --slack-error-status 429]
+          [--save-baseline | --compare]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+
+from benchmarks.harness import (
+    add_baseline_arguments,
+    finish,
+    format_summary,
+    latency_summary,
+    serve_in_thread,
+    slack_signature_headers,
+)
+from tools.faults import FaultSettings
+from tools.mock_persona import case_id_for, create_mock_persona_app
+from tools.mock_slack import create_mock_slack_app
+
+SIGNING_SECRET = "load-signing-secret"
+VERIFICATION_TOKEN = "v" * 24
+WEBHOOK_SECRET = "w" * 24
+SCENARIOS = ("commands", "events", "webhooks")
+
+Send = Callable[[int], Awaitable[bool]]
+
+
+async def drive(requests: int, concurrency: int, send: Send,
+                rate: Optional[float] = None) -> Tuple[List[float], int, float, Dict[int, float]]:
+    """Run ``send(i)`` for every i; returns (latencies, errors, elapsed, start time by i)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    started: Dict[int, float] = {}
+    errors = 0
+    begin = time.perf_counter()
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        scheduled = None
+        if rate:
+            scheduled = begin + i / rate
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        async with semaphore:
+            t0 = scheduled or time.perf_counter()
+            started[i] = t0
+            try:
+                ok = await send(i)
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - t0)
+            if not ok:
+                errors += 1
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies, errors, time.perf_counter() - begin, started
+
+
+async def wait_for_replies(slack_app, prefix: str, started: Dict[int, float],
+                           timeout: float) -> Tuple[List[float], float]:
+    """End-to-end latencies of the replies that reached mock Slack under ``prefix``"""
+    arrivals = slack_app.state.arrivals
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if all(f"{prefix}-{i}" in arrivals for i in started):
+            break
+        await asyncio.sleep(0.05)
+    latencies = [arrivals[f"{prefix}-{i}"] - t0 for i, t0 in started.items() if f"{prefix}-{i}" in arrivals]
+    end = max((arrivals[f"{prefix}-{i}"] for i in started if f"{prefix}-{i}" in arrivals),
+              default=time.perf_counter())
+    return latencies, end - min(started.values(), default=end)
+
+
+def block_action_body(i: int, slack_base: str) -> str:
+    action = ("approve", "reject", "flag")[i % 3]
+    payload = {
+        "type": "block_actions",
+        "team": {"id": "T0MOCK"},
+        "user": {"id": f"U{i % 50:04d}"},
+        "api_app_id": "A0MOCK",
+        "token": "legacy",
+        "trigger_id": f"trigger-{i}",
+        "response_url": f"{slack_base}/hooks/response/event-{i}",
+        "channel": {"id": "C0MOCK"},
+        "container": {"type": "message", "message_ts": "1.0"},
+        "actions": [{
+            "type": "button", "action_id": f"kyb_{action}", "block_id": "b",
+            "value": f"{action}_{case_id_for(i)}", "action_ts": str(time.time()),
+        }],
+    }
+    return urlencode({"payload": json.dumps(payload)})
+
+
+def persona_event(i: int, run_id: str, cases: int) -> bytes:
+    return json.dumps({"data": {
+        "type": "event",
+        "id": f"evt_{run_id}_{i}",
+        "attributes": {"name": "case.updated",
+                       "payload": {"data": {"type": "case", "id": case_id_for(i % cases)}}},
+    }}).encode()
+
+
+def app_environment(workdir: str, persona_base: str, slack_base: str, outbox_queue: int) -> Dict[str, str]:
+    """Settings for an in-process app talking to the mocks, with data files under ``workdir``"""
+    return dict(
+        SLACK_API_TOKEN="xoxb-load", SLACK_SIGNING_SECRET=SIGNING_SECRET,
+        SLACK_API_URL=f"{slack_base}/api/", SLACK_WEBHOOK_URL=f"{slack_base}/hooks/main",
+        SLACK_VERIFICATION_TOKEN=VERIFICATION_TOKEN, SLACK_OUTBOX_INTERVAL="0",
+        SLACK_OUTBOX_MAX_QUEUE=str(outbox_queue),
+        PERSONA_API_KEY="load", PERSONA_WEBHOOK_SECRET=WEBHOOK_SECRET,
+        PERSONA_BASE_URL=f"{persona_base}/api/v1", ENCRYPTION_KEY="e" * 44,
+        AUDIT_LOG_PATH=os.path.join(workdir, "audit.db"),
+        WEBHOOK_QUEUE_PATH=os.path.join(workdir, "queue.db"),
+        REVIEW_MESSAGES_PATH=os.path.join(workdir, "review_messages.db"),
+        IMPACT_INDEX_PATH=os.path.join(workdir, "impact_index.db"),
+        ENTITY_INDEX_PATH=os.path.join(workdir, "entity_index.db"),
+        REPORTS_PATH=os.path.join(workdir, "reports.db"),
+    )
+
+
+async def run(args) -> int:
+    persona_faults = FaultSettings(args.persona_latency_ms / 1000, args.persona_jitter_ms / 1000,
+                                   args.persona_error_rate, args.persona_error_status, seed=1)
+    slack_faults = FaultSettings(args.slack_latency_ms / 1000, args.slack_jitter_ms / 1000,
+                                 args.slack_error_rate, args.slack_error_status, seed=2)
+    persona_server, persona_base = serve_in_thread(
+        create_mock_persona_app(args.cases, faults=persona_faults, related=args.persona_related))
+    slack_app = create_mock_slack_app(slack_faults)
+    slack_server, slack_base = serve_in_thread(slack_app)
+
+    os.environ.update(app_environment(tempfile.mkdtemp(prefix="kyb-load-"), persona_base, slack_base,
+                                      max(4 * args.requests, 1000)))
+    import main  # after the environment is set
+    from utils.webhook_queue import get_webhook_queue
+
+    logging.getLogger().setLevel(args.log_level)
+    run_id = f"{int(time.time())}"
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def report(name: str, summary: Dict[str, Any]) -> None:
+        results[name] = summary
+        print(format_summary(name, summary))
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://kyb-bot", timeout=60) as client:
+
+            async def command(i: int) -> bool:
+                response = await client.post("/slack/commands", data={
+                    "token": VERIFICATION_TOKEN, "command": "/kyb", "text": case_id_for(i % args.cases),
+                    "user_id": f"U{i % 50:04d}", "response_url": f"{slack_base}/hooks/response/command-{i}",
+                })
+                return response.status_code == 200 and "being processed" in response.text
+
+            async def event(i: int) -> bool:
+                body = block_action_body(i, slack_base)
+                response = await client.post("/slack/events", content=body,
+                                             headers=slack_signature_headers(body, SIGNING_SECRET))
+                return response.status_code == 200
+
+            async def webhook(i: int) -> bool:
+                response = await client.post("/persona/webhook", content=persona_event(i, run_id, args.cases),
+                                             headers={"Persona-Signature": WEBHOOK_SECRET,
+                                                      "Content-Type": "application/json"})
+                return response.status_code == 200
+
+            if "commands" in args.scenarios:
+                latencies, errors, elapsed, started = await drive(args.requests, args.concurrency, command, args.rate)
+                report("commands_ack", latency_summary(latencies, elapsed, errors))
+                replies, span = await wait_for_replies(slack_app, "response/command", started, args.drain_timeout)
+                report("commands_reply", latency_summary(replies, span, args.requests - len(replies)))
+
+            if "events" in args.scenarios:
+                latencies, errors, elapsed, started = await drive(args.requests, args.concurrency, event, args.rate)
+                report("events_ack", latency_summary(latencies, elapsed, errors))
+                replies, span = await wait_for_replies(slack_app, "response/event", started, args.drain_timeout)
+                report("events_reply", latency_summary(replies, span, args.requests - len(replies)))
+
+            if "webhooks" in args.scenarios:
+                queue = get_webhook_queue()
+                before = await queue.stats()
+                settled_before = before["processed"] + before["dead"]
+                latencies, errors, elapsed, started = await drive(args.requests, args.concurrency, webhook, args.rate)
+                report("webhooks_ack", latency_summary(latencies, elapsed, errors))
+                begin = min(started.values())
+                deadline = time.perf_counter() + args.drain_timeout
+                while time.perf_counter() < deadline:
+                    stats = await queue.stats()
+                    if stats["processed"] + stats["dead"] - settled_before >= args.requests:
+                        break
+                    await asyncio.sleep(0.05)
+                settled = stats["processed"] + stats["dead"] - settled_before
+                dead = stats["dead"] - before["dead"]
+                span = time.perf_counter() - begin
+                results["webhooks_processed"] = {
+                    "requests": settled, "errors": args.requests - settled + dead,
+                    "drain_s": round(span, 3), "throughput_per_s": round(settled / span, 1),
+                }
+                print(f"{'webhooks_processed':<22} n={settled:<6} processed in {span:.2f} s "
+                      f"({settled / span:.1f}/s)")
+
+    persona_stats = httpx.get(f"{persona_base}/stats").json()
+    slack_stats = httpx.get(f"{slack_base}/stats").json()
+    persona_server.should_exit = slack_server.should_exit = True
+    print(f"\nmock Persona: {persona_stats}")
+    print(f"mock Slack:   {slack_stats}")
+
+    settings = {key: value for key, value in vars(args).items()
+                if key not in ("save_baseline", "compare", "tolerance", "log_level")}
+    return finish(args, results, settings)
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=None, help="open-loop arrival rate (requests/s)")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--cases", type=int, default=1000, help="distinct cases served by mock Persona")
+    parser.add_argument("--persona-related", action="store_true",
+                        help="cases reference reports/documents/inquiries fetched separately")
+    parser.add_argument("--drain-timeout", type=float, default=60.0)
+    for service in ("persona", "slack"):
+        parser.add_argument(f"--{service}-latency-ms", type=float, default=0.0)
+        parser.add_argument(f"--{service}-jitter-ms", type=float, default=0.0)
+        parser.add_argument(f"--{service}-error-rate", type=float, default=0.0)
+        parser.add_argument(f"--{service}-error-status", type=int, default=500)
+    parser.add_argument("--log-level", default="WARNING")
+    add_baseline_arguments(parser, "load")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
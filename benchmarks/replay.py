@@ -0,0 +1,323 @@
+"""Replay captured production traffic against a local instance.
+
+Reads a capture written by utils.traffic_capture (CAPTURE_TRAFFIC=1).
+Starts mock Persona and mock Slack on background threads and boots the
+app in-process with throwaway data files, as load_test does. Then it
+re-sends every captured /slack/commands, /slack/events and
+/persona/webhook request with the capture's own timing:
+
+  --speed 1     as captured
+  --speed 10    ten times faster
+  --speed max   back to back, at most --concurrency at a time
+
+Captured requests are made replayable:
+- Each production case ID maps to one mock case, in order of first
+  appearance, so the same capture always drives the same cases.
+- Verification tokens and response URLs are filled in for the mocks.
+- Slack requests are signed again.
+- Webhooks get the mock signing secret.
+
+Latency counts from each request's scheduled time (open loop), so a
+stalled build can't hide behind a slower generator. The report gives
+p50/p95/p99 per endpoint and the time for the webhook queue to drain.
+
+To compare two builds, replay the same capture on each:
+
+    git checkout main    && python -m benchmarks.replay capture.jsonl --save-run main.json
+    git checkout feature && python -m benchmarks.replay capture.jsonl --against main.json
+
+``--against`` prints latency changes beyond --tolerance. It also lists
+error diffs: requests whose outcome (status, or a command's failure
+reply) changed between the runs. It exits 1 on a regression or a new
+error.
+
+Run with: python -m benchmarks.replay CAPTURE [--speed 1|N|max] [--concurrency 100] [--limit N]
+          [--persona-latency-ms 80 --persona-related] [--save-run PATH] [--against PATH]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import httpx
+
+from benchmarks.harness import (
+    compare_baseline,
+    format_summary,
+    latency_summary,
+    serve_in_thread,
+    slack_signature_headers,
+)
+from benchmarks.load_test import SIGNING_SECRET, VERIFICATION_TOKEN, WEBHOOK_SECRET, app_environment
+from persona_client.events import event_case_id
+from tools.faults import FaultSettings
+from tools.mock_persona import case_id_for, create_mock_persona_app
+from tools.mock_slack import create_mock_slack_app
+from utils.traffic_capture import CAPTURED_PATHS
+
+ENDPOINTS = {"/slack/commands": "commands", "/slack/events": "events", "/persona/webhook": "webhooks"}
+MAX_DIFFS_SHOWN = 20
+
+
+def load_capture(path: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if record.get("path") in CAPTURED_PATHS and not record.get("truncated"):
+                records.append(record)
+    records.sort(key=lambda record: record["ts"])
+    return records[:limit] if limit else records
+
+
+def parse_speed(value: str) -> Optional[float]:
+    """None for "max", else the replay speed-up ("10" or "10x")"""
+    if value.lower() == "max":
+        return None
+    speed = float(value.lower().rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+class CaseMap:
+    """Production case IDs -> mock case IDs, in order of first appearance"""
+
+    def __init__(self, cases: int):
+        self.cases = cases
+        self._ids: Dict[str, str] = {}
+
+    def __call__(self, case_id: Optional[str]) -> Optional[str]:
+        if not case_id:
+            return case_id
+        if case_id not in self._ids:
+            self._ids[case_id] = case_id_for(len(self._ids) % self.cases)
+        return self._ids[case_id]
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+
+def prepare(record: Dict[str, Any], i: int, slack_base: str,
+            cases: CaseMap) -> Tuple[str, bytes, Dict[str, str]]:
+    """(path, body, headers) to re-send a captured request to the local app"""
+    path, body = record["path"], record["body"]
+    response_url = f"{slack_base}/hooks/response/replay-{i}"
+    if path == "/slack/commands":
+        fields = dict(body, token=VERIFICATION_TOKEN, response_url=response_url,
+                      text=cases(str(body.get("text", "")).strip()) or "")
+        return path, urlencode(fields).encode(), {"Content-Type": "application/x-www-form-urlencoded"}
+    if path == "/slack/events":
+        fields = dict(body)
+        payload = fields.get("payload")
+        if isinstance(payload, dict):
+            payload = dict(payload, token="replay", response_url=response_url)
+            actions = []
+            for action in payload.get("actions") or []:
+                verb, _, case_id = str(action.get("value", "")).partition("_")
+                actions.append(dict(action, value=f"{verb}_{cases(case_id)}") if case_id else action)
+            payload["actions"] = actions
+            fields["payload"] = json.dumps(payload)
+        encoded = urlencode(fields)
+        return path, encoded.encode(), slack_signature_headers(encoded, SIGNING_SECRET)
+    # Persona webhook: point the event at the mapped case
+    text = json.dumps(body)
+    case_id = event_case_id(body) if isinstance(body, dict) else None
+    if case_id:
+        text = text.replace(json.dumps(case_id), json.dumps(cases(case_id)))
+    return path, text.encode(), {"Persona-Signature": WEBHOOK_SECRET, "Content-Type": "application/json"}
+
+
+def outcome(path: str, status: int, text: str) -> str:
+    """A request's result for diffing runs: the status, and whether a command reply says it failed"""
+    if path == "/slack/commands" and status == 200:
+        try:
+            reply = json.loads(text).get("text", "")
+        except (ValueError, AttributeError):
+            return "200 unreadable"
+        if reply.startswith(("⚠️", "❌")):
+            return "200 failed"
+        if reply.startswith("⏳"):
+            return "200 busy"
+        if reply.startswith("❓"):
+            return "200 not found"
+    return str(status)
+
+
+def is_error(result: str) -> bool:
+    return not result.startswith("2") or result.endswith(("failed", "unreadable"))
+
+
+async def replay(client: httpx.AsyncClient, records: List[Dict[str, Any]], prepared, speed: Optional[float],
+                 concurrency: int) -> Tuple[List[Optional[float]], List[str], float]:
+    """Send every request on the capture's schedule; returns (latencies, outcomes, elapsed)"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[Optional[float]] = [None] * len(records)
+    outcomes: List[str] = [""] * len(records)
+    first = records[0]["ts"] if records else 0.0
+    begin = time.perf_counter()
+
+    async def one(i: int) -> None:
+        path, body, headers = prepared[i]
+        scheduled = None
+        if speed:
+            scheduled = begin + (records[i]["ts"] - first) / speed
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        async with semaphore:
+            t0 = scheduled or time.perf_counter()
+            try:
+                response = await client.post(path, content=body, headers=headers)
+                outcomes[i] = outcome(path, response.status_code, response.text)
+            except httpx.HTTPError as e:
+                outcomes[i] = type(e).__name__
+            latencies[i] = time.perf_counter() - t0
+
+    await asyncio.gather(*(one(i) for i in range(len(records))))
+    return latencies, outcomes, time.perf_counter() - begin
+
+
+def summarize(records, latencies, outcomes, elapsed: float) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = {}
+    groups: Dict[str, List[int]] = {"all": list(range(len(records)))}
+    for i, record in enumerate(records):
+        groups.setdefault(ENDPOINTS[record["path"]], []).append(i)
+    for name, indexes in groups.items():
+        results[name] = latency_summary([latencies[i] for i in indexes], elapsed,
+                                        errors=sum(is_error(outcomes[i]) for i in indexes))
+    return results
+
+
+def diff_outcomes(records, outcomes: List[str], previous: List[str]) -> Tuple[List[str], int]:
+    """(lines describing changed outcomes, number of new errors)"""
+    lines, new_errors, fixed, changed = [], 0, 0, 0
+    if len(previous) != len(outcomes):
+        return [f"runs replayed different captures ({len(previous)} vs {len(outcomes)} requests)"], 0
+    for i, (before, after) in enumerate(zip(previous, outcomes)):
+        if before == after:
+            continue
+        changed += 1
+        if is_error(after) and not is_error(before):
+            new_errors += 1
+        elif is_error(before) and not is_error(after):
+            fixed += 1
+        if len(lines) < MAX_DIFFS_SHOWN:
+            lines.append(f"#{i} {records[i]['path']}: {before} -> {after}")
+    lines.insert(0, f"outcomes: {changed} changed, {new_errors} new errors, {fixed} fixed")
+    return lines, new_errors
+
+
+async def run(args) -> int:
+    records = load_capture(args.capture, args.limit)
+    if not records:
+        print(f"No replayable requests in {args.capture}")
+        return 1
+    persona_faults = FaultSettings(args.persona_latency_ms / 1000, 0.0, 0.0, 500, seed=1)
+    persona_server, persona_base = serve_in_thread(
+        create_mock_persona_app(args.cases, faults=persona_faults, related=args.persona_related))
+    slack_app = create_mock_slack_app(FaultSettings(args.slack_latency_ms / 1000, 0.0, 0.0, 500, seed=2))
+    slack_server, slack_base = serve_in_thread(slack_app)
+
+    os.environ.update(app_environment(tempfile.mkdtemp(prefix="kyb-replay-"), persona_base, slack_base,
+                                      max(4 * len(records), 1000)))
+    os.environ.pop("CAPTURE_TRAFFIC", None)  # don't capture the replay
+    import main  # after the environment is set
+    from utils.webhook_queue import get_webhook_queue
+
+    logging.getLogger().setLevel(args.log_level)
+    cases = CaseMap(args.cases)
+    prepared = [prepare(record, i, slack_base, cases) for i, record in enumerate(records)]
+    span = records[-1]["ts"] - records[0]["ts"]
+    print(f"Replaying {len(records)} requests ({len(cases)} cases) captured over {span:.1f} s "
+          f"at {'max speed' if args.speed is None else f'{args.speed:g}x'}")
+
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://kyb-bot", timeout=60) as client:
+            latencies, outcomes, elapsed = await replay(client, records, prepared, args.speed, args.concurrency)
+            results = summarize(records, latencies, outcomes, elapsed)
+            if "webhooks" in results:
+                # The workers fetch, screen and post after the ack; wait for them
+                queue = get_webhook_queue()
+                sent = time.perf_counter()
+                while time.perf_counter() - sent < args.drain_timeout:
+                    stats = await queue.stats()
+                    if stats["by_status"].get("pending", 0) + stats["by_status"].get("processing", 0) == 0:
+                        break
+                    await asyncio.sleep(0.05)
+                results["webhooks_drain"] = {"requests": stats["processed"], "errors": stats["dead"],
+                                             "drain_ms": round((time.perf_counter() - sent) * 1000, 1)}
+    persona_server.should_exit = slack_server.should_exit = True
+
+    for name, summary in results.items():
+        if name == "webhooks_drain":
+            print(f"{name:<22} n={summary['requests']:<6} err={summary['errors']:<4} "
+                  f"queue drained {summary['drain_ms']:.0f} ms after the last request")
+        else:
+            print(format_summary(name, summary))
+    differs = sum(outcome(record["path"], record["status"], record.get("response", "")) != result
+                  for record, result in zip(records, outcomes))
+    print(f"{differs} of {len(records)} outcomes differ from the capture (production, other data)")
+
+    status = 0
+    if args.against:
+        lines, regressions = compare_baseline(args.against, results, args.tolerance)
+        with open(args.against, encoding="utf-8") as f:
+            saved = json.load(f)
+        diff_lines, new_errors = diff_outcomes(records, outcomes, saved.get("outcomes", []))
+        print(f"\nvs {os.path.relpath(args.against)} (tolerance {args.tolerance:.0%}):")
+        if saved.get("settings", {}).get("speed") != args.speed:
+            print(f"  note: that run replayed at speed {saved.get('settings', {}).get('speed') or 'max'}; "
+                  "latency and throughput are not comparable")
+        for line in lines + diff_lines:
+            print(f"  {line}")
+        status = int(bool(regressions or new_errors))
+    if args.save_run:
+        document = {
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "capture": os.path.abspath(args.capture),
+            "settings": {key: value for key, value in vars(args).items()
+                         if key not in ("save_run", "against", "tolerance", "log_level")},
+            "results": results,
+            "outcomes": outcomes,
+        }
+        with open(args.save_run, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Run saved to {os.path.relpath(args.save_run)}")
+    return status
+
+
+def main_cli() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", help="JSON lines written by CAPTURE_TRAFFIC=1")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="1 (as captured), N (N times faster) or max")
+    parser.add_argument("--concurrency", type=int, default=100, help="requests in flight at most")
+    parser.add_argument("--limit", type=int, help="replay only the first N requests")
+    parser.add_argument("--cases", type=int, default=1000, help="distinct cases served by mock Persona")
+    parser.add_argument("--persona-related", action="store_true",
+                        help="cases reference reports/documents/inquiries fetched separately")
+    parser.add_argument("--persona-latency-ms", type=float, default=0.0)
+    parser.add_argument("--slack-latency-ms", type=float, default=0.0)
+    parser.add_argument("--drain-timeout", type=float, default=60.0)
+    parser.add_argument("--save-run", metavar="PATH", help="write latencies and per-request outcomes here")
+    parser.add_argument("--against", metavar="PATH", help="diff against a run saved with --save-run")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative slowdown before a metric counts as a regression")
+    parser.add_argument("--log-level", default="WARNING")
+    return asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -1,119 +1,447 @@
 import os
 import json
-import httpx
-import uvicorn
-import slack_sdk
-from pydantic import BaseModel
-from fastapi import FastAPI, Request, HTTPException, Form
-from fastapi.responses import JSONResponse
-from utils.checklist import validate_kyb_checklist
-from slack_notify.notify import send_slack_message
-from dotenv import load_dotenv
-from secrets import compare_digest
-from cryptography.fernet import Fernet
-from slack_bolt import App
-from slack_bolt.adapter.fastapi import SlackRequestHandler
 import atexit
+import asyncio
 import logging
 import time
-from typing import Dict, Any
+import uuid
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from secrets import compare_digest
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from fastapi import APIRouter, FastAPI, Request, HTTPException, Form
+from fastapi.responses import JSONResponse, Response
 
-# Load environment variables from .env file
-load_dotenv()
+from persona_client.events import event_case_id, event_id, event_name
+from utils.audit_log import get_audit_log
+from utils.background import BackgroundTasks
+from utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, get_metrics, stage
+from utils.request_context import bind_request_id, current_request_id
+from utils.structured_logging import configure_logging, get_logging_pipeline
+from utils.webhook_queue import WebhookProcessor, body_event_id, get_webhook_queue
+
+# Heavy modules (httpx, slack_bolt/aiohttp, numpy via the screening index)
+# are imported where they are first used, so importing this module stays
+# cheap; python -m benchmarks.bench_import_time keeps it within budget.
+if TYPE_CHECKING:
+    from slack_bolt.adapter.fastapi.async_handler import AsyncSlackRequestHandler
+    from persona_client.models import Case
+    from utils.evaluation import CaseEvaluation
 
 # ===== INITIALIZATION =====
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+configure_logging()  # JSON off the event loop; see utils/structured_logging.py
 logger = logging.getLogger(__name__)
 
+# Per-stage latency of the case pipeline; formatting and Slack delivery
+# are timed in slack_notify
+PERSONA_FETCH = stage("persona_fetch")
+CHECKLIST = stage("checklist")
+
 # ===== ENVIRONMENT VALIDATION =====
-def validate_environment():
-    persona_api_key = os.getenv("PERSONA_API_KEY")
-    logging.info(f"PERSONA_API_KEY: {persona_api_key}")  # Debug line
-    if not persona_api_key:
-        logging.critical("Invalid PERSONA_API_KEY: Failed validation check")
-        raise RuntimeError("Environment configuration invalid")
-    
-    """Comprehensive environment validation with encryption support"""
-    required_vars = {
-        "SLACK_API_TOKEN": {
-            "description": "Bot User OAuth Token (xoxb-...)",
-            "validation": lambda x: x.startswith("xoxb-")
-        },
-        "PERSONA_API_KEY": {
-            "description": "Persona API Key",
-            "validation": lambda x: len(x) > 0  # Check if not empty
-        },
-        "PERSONA_WEBHOOK_SECRET": {
-            "description": "Webhook signing secret",
-            "validation": lambda x: len(x) >= 16
-        },
-        "SLACK_VERIFICATION_TOKEN": {
-            "description": "Legacy verification token",
-            "validation": lambda x: len(x) >= 24
-        },
-        "ENCRYPTION_KEY": {
-            "description": "Fernet key for token decryption",
-            "validation": lambda x: len(x) == 44
-        }
+REQUIRED_ENV = {
+    "SLACK_API_TOKEN": {
+        "description": "Bot User OAuth Token (xoxb-...)",
+        "validation": lambda x: x.startswith("xoxb-")
+    },
+    "PERSONA_API_KEY": {
+        "description": "Persona API Key",
+        "validation": lambda x: len(x) > 0  # Check if not empty
+    },
+    "PERSONA_WEBHOOK_SECRET": {
+        "description": "Webhook signing secret",
+        "validation": lambda x: len(x) >= 16
+    },
+    "SLACK_VERIFICATION_TOKEN": {
+        "description": "Legacy verification token",
+        "validation": lambda x: len(x) >= 24
+    },
+    "ENCRYPTION_KEY": {
+        "description": "Fernet key for token decryption",
+        "validation": lambda x: len(x) == 44
     }
+}
+
+def redact(value: Optional[str]) -> str:
+    """Log-safe form of a secret: the token type prefix and length, never the value"""
+    if not value:
+        return "<unset>"
+    prefix = value[:5] if value[:5] in ("xoxb-", "xoxp-", "xapp-") else ""
+    return f"{prefix}***({len(value)} chars)"
 
+@lru_cache(maxsize=None)
+def validate_environment() -> Dict[str, str]:
+    """Check the required settings once per process.
+
+    Returns the variables redacted for logging; raises (and is retried on
+    the next call) when something is missing or malformed.
+    """
     errors = []
-    for var, config in required_vars.items():
+    for var, config in REQUIRED_ENV.items():
         value = os.getenv(var)
         if not value:
             errors.append(f"Missing {var}: {config['description']}")
         elif not config['validation'](value):
-            errors.append(f"Invalid {var}: Failed validation check")
+            errors.append(f"Invalid {var} ({redact(value)}): Failed validation check")
 
     if errors:
         logger.critical("Environment validation failed:\n- " + "\n- ".join(errors))
         raise RuntimeError("Environment configuration invalid")
+    return {var: redact(os.getenv(var)) for var in REQUIRED_ENV}
 
 # ===== MAIN APPLICATION SETUP =====
-def create_app():
-    app = FastAPI()
-    
-    # Validate before startup
-    validate_environment()
-    
-    # Initialize Slack
-    slack_app = App(
-        token=os.getenv("SLACK_API_TOKEN"),
-        signing_secret=os.getenv("SLACK_SIGNING_SECRET")
-    )
-    
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Validate settings and open shared clients on startup, close them on shutdown"""
+    from utils.policy import get_policy_engine
+    from persona_client.client import startup_persona_client, shutdown_persona_client
+    from slack_notify.outbox import startup_slack_outbox, shutdown_slack_outbox
+    from slack_notify.digest import digest_enabled, get_digest_batcher
+    from slack_notify.review_messages import get_review_messages
+    from utils.impact_index import get_impact_index
+    from utils.entity_index import get_entity_index
+    from utils.reporting import get_report_store
+    from utils.traffic_capture import capture_enabled, get_traffic_recorder
+
+    started = time.perf_counter()
+    settings = validate_environment()
+    logger.info("Environment OK: %s", ", ".join(f"{var}={value}" for var, value in settings.items()))
+    get_policy_engine()  # compile config/config.yaml once, fail fast if invalid
+    await startup_persona_client()
+    await startup_slack_outbox()
+    start_slack_handler()  # Bolt app and auth.test, in the background
+    await get_webhook_queue().open()
+    await get_audit_log().open()
+    await get_review_messages().open()
+    await get_impact_index().open()
+    await get_entity_index().open()
+    await get_report_store().open()
+    await rescreen_policy_changes()  # queued before the workers start
+    await get_webhook_processor().start()
+    command_tasks.start()
+    logger.info("Startup complete in %.0f ms", (time.perf_counter() - started) * 1000)
+    try:
+        yield
+    finally:
+        # Unfinished /kyb jobs go to the webhook queue, so stop them first
+        await command_tasks.shutdown(
+            drain_timeout=float(os.getenv("SLACK_COMMAND_DRAIN_TIMEOUT", 10)),
+            persist=persist_kyb_command,
+        )
+        await get_webhook_processor().stop()
+        await get_audit_log().close()
+        await get_impact_index().close()
+        await get_entity_index().close()
+        await get_report_store().close()
+        await get_webhook_queue().close()
+        await shutdown_slack_handler()
+        if digest_enabled():
+            get_digest_batcher().stop()  # partial digest goes out before the outbox drains
+        await shutdown_slack_outbox()
+        await get_review_messages().close()  # after the outbox has reported back
+        await shutdown_persona_client()
+        if capture_enabled():
+            get_traffic_recorder().flush()
+        pipeline = get_logging_pipeline()
+        if pipeline is not None:
+            pipeline.flush()  # shutdown logs out before the process exits
+
+router = APIRouter()
+
+def create_app() -> FastAPI:
+    """Build the ASGI app; clients are opened by the lifespan, not here"""
+    from dotenv import load_dotenv
+    from utils.traffic_capture import CaptureMiddleware, capture_enabled
+
+    # Load environment variables from .env file
+    load_dotenv()
+    app = FastAPI(lifespan=lifespan)
+    if capture_enabled():
+        # Inside the metrics middleware, so captures carry the request ID
+        app.add_middleware(CaptureMiddleware)
+    app.add_middleware(MetricsMiddleware)
+    app.include_router(router)
+
     # Cleanup handler
     atexit.register(lambda: logger.info("Application shutting down..."))
-    
-    return app, slack_app
 
-app, slack_app = create_app()
-handler = SlackRequestHandler(slack_app)
+    return app
 
-# ===== CORE FUNCTIONS =====
-async def fetch_persona_case(case_id: str) -> Dict[str, Any]:
-    """Fetch KYB case data from Persona API"""
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.get(
-                f"https://withpersona.com/api/v1/cases/{case_id}",
-                headers={
-                    "Authorization": f"Bearer {os.getenv('PERSONA_API_KEY')}",
-                    "Persona-Version": "2023-01-05"
-                },
-                timeout=30.0
+# ===== SLACK APP (warmed up at startup) =====
+_slack_handler: Optional["AsyncSlackRequestHandler"] = None
+_slack_handler_lock: Optional[asyncio.Lock] = None
+_slack_warmup: Optional[asyncio.Task] = None
+
+async def get_slack_handler() -> "AsyncSlackRequestHandler":
+    """Bolt app and its request handler, built once (see start_slack_handler).
+
+    Interactivity runs on the event loop and Web API calls share one
+    pooled aiohttp session, opened here on the serving loop. The bot is
+    authorized once with auth.test, not per request.
+    """
+    global _slack_handler, _slack_handler_lock
+    if _slack_handler is not None:
+        return _slack_handler
+    if _slack_handler_lock is None:
+        _slack_handler_lock = asyncio.Lock()
+    async with _slack_handler_lock:
+        if _slack_handler is None:
+            from slack_bolt.async_app import AsyncApp
+            from slack_bolt.adapter.fastapi.async_handler import AsyncSlackRequestHandler
+            from slack_notify.web_client import (
+                SingleWorkspaceAuthorize, create_slack_web_client, startup_slack_web_client,
+            )
+
+            client = create_slack_web_client()
+            authorize = SingleWorkspaceAuthorize(client)
+            slack_app = AsyncApp(
+                signing_secret=os.getenv("SLACK_SIGNING_SECRET"),
+                client=client,
+                authorize=authorize,
             )
-            response.raise_for_status()
-            return response.json()
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Persona API Error: {e.response.text}")
-            return None
+            slack_app.action("kyb_approve")(handle_approve)
+            slack_app.action("kyb_flag")(handle_flag)
+            slack_app.action("kyb_reject")(handle_reject)
+            await startup_slack_web_client(client)
+            _slack_handler = AsyncSlackRequestHandler(slack_app)
+            try:
+                await authorize.prefetch()
+            except Exception as e:
+                # Not fatal: the first click retries auth.test
+                logger.warning("Slack auth.test failed: %s", e)
+    return _slack_handler
+
+def start_slack_handler() -> None:
+    """Build the Bolt app and run auth.test without holding up startup.
+
+    A click that arrives before this finishes waits for the same build and
+    the same single auth.test call; every later click acks from memory.
+    """
+    global _slack_warmup
+    _slack_warmup = asyncio.create_task(get_slack_handler(), name="slack-warmup")
+
+async def shutdown_slack_handler():
+    global _slack_handler, _slack_handler_lock, _slack_warmup
+    if _slack_warmup is not None:
+        _slack_warmup.cancel()
+        await asyncio.gather(_slack_warmup, return_exceptions=True)
+        _slack_warmup = None
+    if _slack_handler is not None:
+        from slack_notify.web_client import shutdown_slack_web_client
+        await shutdown_slack_web_client(_slack_handler.app.client)
+        _slack_handler = None
+    _slack_handler_lock = None  # bound to this event loop
+
+# ===== CORE FUNCTIONS =====
+async def fetch_persona_case(case_id: str, allow_stale: bool = True) -> Optional["Case"]:
+    """Fetch a KYB case and its related objects from Persona API (through the shared case cache).
+
+    The cache's fetcher decodes the case, then fetches its inquiries,
+    reports and documents concurrently (PersonaClient.get_related); any
+    that fail are listed in the case's ``incomplete`` field. While Persona
+    is down the cache serves its last snapshot, marked ``stale_since``
+    (unless ``allow_stale`` is False); with no snapshot either,
+    PersonaUnavailableError is raised. Returns
+    None when Persona rejects the request (unknown case, bad credentials).
+    """
+    import httpx
+    from persona_client.cache import get_case_cache
+    from persona_client.resilience import PersonaUnavailableError, is_unavailable
+
+    try:
+        with PERSONA_FETCH.time():
+            return await get_case_cache().get_case(case_id, allow_stale=allow_stale)
+    except httpx.HTTPStatusError as e:
+        logger.error("Persona API Error: %s", e.response.text)
+        if is_unavailable(e):
+            raise PersonaUnavailableError(f"Persona returned {e.response.status_code} for case {case_id}") from e
+        return None
+    except httpx.RequestError as e:
+        logger.error("Persona API request failed: %s", e)
+        raise PersonaUnavailableError(f"Persona unreachable for case {case_id}: {e}") from e
+
+class CaseNotFoundError(LookupError):
+    """Persona answered 4xx for a case: unknown ID or credentials it doesn't accept"""
+
+async def process_case(case_id: str, update: bool = False) -> "CaseEvaluation":
+    """Fetch a case, screen it once and queue the Slack review message.
+
+    ``update`` is for a case Persona says has changed: only the rules
+    reading a changed field run again, and the case's existing review
+    message is edited in place when its text changes (else left alone).
+    Otherwise a new review message is posted (a /kyb request).
+
+    Raises PersonaUnavailableError when Persona is down and the case was
+    never fetched before (or, for an update, at all), and CaseNotFoundError
+    when Persona rejects the request (unknown case, bad credentials), so
+    webhook events are retried by the queue. Nothing is screened, indexed
+    or posted for a case that could not be fetched.
+    """
+    from utils.evaluation import evaluate_case, get_recent_evaluations, reevaluate_case
+    from utils.impact_index import get_impact_index
+    from utils.entity_index import get_entity_index
+    from utils.reporting import get_report_store
+    from slack_notify.notify import build_slack_payload
+    from slack_notify.review_messages import get_review_messages
+    from slack_notify.digest import digest_enabled, get_digest_batcher
+
+    # 1. Fetch case data (a stale snapshot while Persona is down; an
+    # update must see the change, so it waits for Persona instead)
+    case_data = await fetch_persona_case(case_id, allow_stale=not update)
+    if case_data is None:
+        raise CaseNotFoundError(f"Persona rejected the request for case {case_id}")
+
+    # 2. Run compliance checks; the evaluation also carries the review flag
+    recent = get_recent_evaluations()
+    with CHECKLIST.time():
+        if update:
+            evaluation = reevaluate_case(case_data, recent.get(case_id))
+        else:
+            evaluation = evaluate_case(case_data)
+    if evaluation.case is not None:
+        # Shares an EIN, address or person with a flagged/rejected case?
+        evaluation.links = await get_entity_index().link(evaluation.case)
+    recent.remember(evaluation)
+    await get_impact_index().record(evaluation)
+    get_report_store().record_screening(evaluation)
+
+    # 3. Queue Slack message (delivered by the outbox workers); in digest
+    # mode clean, complete and fresh cases wait for the next summary, unless
+    # they already have a review message to update; the rest go out now
+    review_messages = get_review_messages()
+    if (digest_enabled() and evaluation.passed and not evaluation.incomplete and not evaluation.links
+            and evaluation.stale_since is None and not await review_messages.has_message(case_id)):
+        get_digest_batcher().add(evaluation)
+    else:
+        outcome = await review_messages.publish(case_id, build_slack_payload(case_data, evaluation=evaluation),
+                                                repost=not update)
+        if outcome == "dropped":
+            logger.error("Slack outbox full, case %s not posted", case_id)
+    return evaluation
+
+# ===== FAST-ACK /kyb COMMANDS =====
+# "async" acks the slash command at once and reports back via response_url;
+# "inline" runs the whole pipeline before replying (the old behaviour).
+SLACK_COMMAND_MODE = os.getenv("SLACK_COMMAND_MODE", "async").lower()
+KYB_COMMAND_EVENT = "kyb.command"
+
+command_tasks = BackgroundTasks(
+    max_concurrency=int(os.getenv("SLACK_COMMAND_CONCURRENCY", 8)),
+    max_pending=int(os.getenv("SLACK_COMMAND_MAX_PENDING", 500)),
+    name="kyb-command",
+)
+
+def format_command_result(case_id: str, evaluation: "CaseEvaluation") -> str:
+    if evaluation.passed:
+        return f"✅ Case {case_id} passed all checks. Review posted to the channel."
+    failures = evaluation.failures
+    return (f"⚠️ Case {case_id} has {len(failures)} issue(s). Review posted to the channel.\n• "
+            + "\n• ".join(failures))
+
+PERSONA_UNAVAILABLE_TEXT = "⏳ Persona is unavailable right now; try /kyb {case_id} again shortly."
+CASE_NOT_FOUND_TEXT = "❓ Case {case_id} was not found in Persona or could not be fetched; check the case ID."
+
+async def run_kyb_command(job: Dict[str, Any]):
+    """Background half of /kyb: screen the case and answer on response_url"""
+    from persona_client.resilience import PersonaUnavailableError
+    case_id = job["case_id"]
+    try:
+        evaluation = await process_case(case_id)
+        text = format_command_result(case_id, evaluation)
+    except PersonaUnavailableError:
+        text = PERSONA_UNAVAILABLE_TEXT.format(case_id=case_id)
+    except CaseNotFoundError:
+        text = CASE_NOT_FOUND_TEXT.format(case_id=case_id)
+    except Exception as e:
+        logger.error("Command failed: %s", e, exc_info=True)
+        text = "⚠️ Failed to process case. Admins notified."
+    from slack_notify.outbox import get_slack_outbox
+    get_slack_outbox().enqueue(
+        {"response_type": "ephemeral", "replace_original": False, "text": text},
+        webhook_url=job["response_url"],
+    )
+
+async def persist_kyb_command(job: Dict[str, Any]):
+    """Park an unfinished /kyb job in the durable queue for the next boot"""
+    body = json.dumps(job).encode()
+    await get_webhook_queue().put(f"kyb-command:{job['job_id']}", job["case_id"], KYB_COMMAND_EVENT, body)
+
+# ===== POLICY CHANGES =====
+POLICY_RESCREEN_EVENT = "kyb.policy-rescreen"
+
+async def rescreen_policy_changes() -> int:
+    """Queue a re-screen of the cases a policy edit can change.
+
+    The impact index remembers the policy its cases were screened
+    against; the diff with the current config/config.yaml picks the
+    affected cases from the index, and only those are queued. Returns
+    how many were queued.
+    """
+    from utils.impact_index import PolicySnapshot, diff_policies, get_impact_index
+    from utils.policy import get_policy_engine
+
+    index = get_impact_index()
+    current = PolicySnapshot.from_engine(get_policy_engine())
+    previous = index.policy
+    if previous == current:
+        return 0
+    queued = 0
+    if previous is not None:
+        diff = diff_policies(previous, current)
+        started = time.perf_counter()
+        affected = index.affected(diff)
+        lookup_ms = (time.perf_counter() - started) * 1000
+        fingerprint = current.fingerprint()
+        body = json.dumps({"policy_version": current.version}).encode()
+        for case_id in sorted(affected):
+            queued += await get_webhook_queue().put(
+                f"policy-rescreen:{fingerprint}:{case_id}", case_id, POLICY_RESCREEN_EVENT, body)
+        passed = sum(index.get(case_id).passed for case_id in affected)
+        logger.info("Policy %s -> %s changed %s: %d of %d indexed cases affected (%d had passed; found in "
+                    "%.1f ms), %d re-screens queued", previous.version, current.version, diff.summary(),
+                    len(affected), len(index), passed, lookup_ms, queued)
+    await index.save_policy(current)
+    return queued
+
+# Persona events that should (re)screen the case they refer to
+CASE_EVENTS = {"case.created", "case.updated", "case.status-updated"}
+
+async def handle_webhook_event(event: Dict[str, Any]):
+    """Worker-side handling of one stored Persona webhook event"""
+    if event["name"] == KYB_COMMAND_EVENT:
+        # Resumed /kyb job: keep the ID of the request that started it
+        with bind_request_id(event["data"].get("request_id")):
+            await run_kyb_command(event["data"])
+        return
+    if event["name"] == POLICY_RESCREEN_EVENT:
+        # Same case data, new policy: a full evaluation, the message edited in place
+        from utils.evaluation import get_recent_evaluations
+        get_recent_evaluations().forget(event["case_id"])
+        with bind_request_id(event["event_id"][:64]):
+            await process_case(event["case_id"], update=True)
+        return
+    if event["name"] not in CASE_EVENTS or not event["case_id"]:
+        return
+    from persona_client.cache import get_case_cache
+    with bind_request_id(event["event_id"][:64]):
+        get_case_cache().invalidate(event["case_id"])
+        await process_case(event["case_id"], update=True)
+
+_webhook_processor: Optional[WebhookProcessor] = None
+
+def get_webhook_processor() -> WebhookProcessor:
+    global _webhook_processor
+    if _webhook_processor is None:
+        _webhook_processor = WebhookProcessor(
+            get_webhook_queue(),
+            handle_webhook_event,
+            workers=int(os.getenv("WEBHOOK_WORKERS", 4)),
+            prune_interval=float(os.getenv("WEBHOOK_PRUNE_INTERVAL", 3600)),
+        )
+    return _webhook_processor
 
 # ===== ROUTES =====
-@app.post("/slack/commands")
+@router.post("/slack/commands")
 async def slack_command(
     request: Request,
     token: str = Form(...),
@@ -124,37 +452,42 @@ async def slack_command(
 ):
     """Handle /kyb commands with full compliance workflow"""
     if not compare_digest(token, os.getenv("SLACK_VERIFICATION_TOKEN")):
-        logger.error(f"Invalid token from user {user_id}")
+        logger.error("Invalid token from user %s", user_id)
         raise HTTPException(status_code=403)
 
     try:
         case_id = text.strip()
-        logger.info(f"Processing /kyb from {user_id} for case: {case_id}")
-
-        # 1. Fetch case data
-        case_data = await fetch_persona_case(case_id) or {
-            "id": case_id,
-            "business": {"name": "Unknown Business"},
-            "status": "error",
-            "verification_results": {},
-            "proof_of_address": {}
-        }
-
-        # 2. Run compliance checks
-        checklist_result = validate_kyb_checklist(case_data)
-        case_data["checklist_result"] = checklist_result
-
-        # 3. Determine if needs manual review
-        needs_review = any(
-            f.lower() in ["pep", "watchlist", "prohibited"]
-            for f in checklist_result.get("failures", [])
-        )
+        if not case_id:
+            return JSONResponse({"response_type": "ephemeral", "text": "Usage: /kyb <case id>"})
+        logger.info("Processing /kyb from %s for case: %s", user_id, case_id)
 
-        # 4. Send Slack message
-        await send_slack_message({
-            **case_data,
-            "needs_review": needs_review
-        })
+        if SLACK_COMMAND_MODE == "async" and response_url:
+            job = {
+                "job_id": uuid.uuid4().hex,
+                "case_id": case_id,
+                "response_url": response_url,
+                "user_id": user_id,
+                "request_id": current_request_id(),
+            }
+            if not command_tasks.submit(job, run_kyb_command):
+                return JSONResponse({
+                    "response_type": "ephemeral",
+                    "text": "⏳ Too many cases in progress, please retry in a minute."
+                })
+        else:
+            from persona_client.resilience import PersonaUnavailableError
+            try:
+                await process_case(case_id)
+            except PersonaUnavailableError:
+                return JSONResponse({
+                    "response_type": "ephemeral",
+                    "text": PERSONA_UNAVAILABLE_TEXT.format(case_id=case_id)
+                })
+            except CaseNotFoundError:
+                return JSONResponse({
+                    "response_type": "ephemeral",
+                    "text": CASE_NOT_FOUND_TEXT.format(case_id=case_id)
+                })
 
         return JSONResponse({
             "response_type": "ephemeral",
@@ -162,59 +495,87 @@ async def slack_command(
         })
 
     except Exception as e:
-        logger.error(f"Command failed: {str(e)}", exc_info=True)
+        logger.error("Command failed: %s", e, exc_info=True)
         return JSONResponse({
             "response_type": "ephemeral",
             "text": "⚠️ Failed to process case. Admins notified."
         })
 
 # ===== SLACK INTERACTIVITY =====
-def log_action(action: str, case_id: str):
-    """Log compliance actions for audit trail."""
-    logger.info(f"Action logged: {action.upper()} for case {case_id}")
+async def log_action(action: str, case_id: str, reviewer: str = None):
+    """Record a compliance action in the audit log, with the rules the reviewer saw."""
+    from utils.evaluation import get_recent_evaluations
+    from utils.entity_index import get_entity_index
+    from utils.reporting import get_report_store
+    evaluation = get_recent_evaluations().get(case_id)
+    record = await get_audit_log().append(
+        action, case_id, reviewer,
+        details=evaluation.summary() if evaluation is not None else None,
+    )
+    # Later applicants sharing this case's entities get linked to it
+    await get_entity_index().set_verdict(case_id, action, evaluation.case if evaluation is not None else None)
+    get_report_store().record_action(action, case_id, record.ts)
+    outcome = f" (rules: {', '.join(evaluation.rule_ids) or 'none'})" if evaluation else ""
+    logger.info("Action logged: %s for case %s by %s [audit #%s]%s",
+                action.upper(), case_id, reviewer, record.seq, outcome)
+    return evaluation
+
+def action_reviewer(body: Dict[str, Any]) -> str:
+    return (body.get("user") or {}).get("id")
+
+def action_case_id(body: Dict[str, Any]) -> str:
+    # Values look like "approve_<case id>"; Persona IDs contain underscores too
+    return body["actions"][0]["value"].split("_", 1)[1]
+
+def reply(body: Dict[str, Any], text: str):
+    """Answer a button click on its response_url through the pooled outbox"""
+    from slack_notify.outbox import get_slack_outbox
+    if not get_slack_outbox().enqueue({"text": text}, webhook_url=body.get("response_url")):
+        logger.error("Slack outbox full, reply to %s dropped", action_reviewer(body))
 
-@slack_app.action("kyb_approve")
-async def handle_approve(ack, body, respond):
+async def handle_approve(ack, body):
     await ack()
     try:
-        case_id = body["actions"][0]["value"].split("_")[1]
-        logger.info(f"Approving case {case_id}")
-        log_action("approve", case_id)
-        respond(text=f"✅ Case {case_id} approved!")
+        case_id = action_case_id(body)
+        logger.info("Approving case %s", case_id)
+        evaluation = await log_action("approve", case_id, action_reviewer(body))
+        if evaluation is not None and evaluation.needs_review:
+            reply(body, f"✅ Case {case_id} approved over review flags: {', '.join(evaluation.rule_ids)}")
+        else:
+            reply(body, f"✅ Case {case_id} approved!")
     except Exception as e:
-        logger.error(f"Approval failed: {str(e)}")
-        respond(text="❌ Approval failed")
+        logger.error("Approval failed: %s", e)
+        reply(body, "❌ Approval failed")
 
-@slack_app.action("kyb_flag")
-async def handle_flag(ack, body, respond):
+async def handle_flag(ack, body):
     await ack()
     try:
-        case_id = body["actions"][0]["value"].split("_")[1]
-        logger.info(f"Flagging case {case_id} for review")
-        log_action("flag", case_id)
-        respond(text=f"⚠️ Case {case_id} flagged for compliance review")
+        case_id = action_case_id(body)
+        logger.info("Flagging case %s for review", case_id)
+        await log_action("flag", case_id, action_reviewer(body))
+        reply(body, f"⚠️ Case {case_id} flagged for compliance review")
     except Exception as e:
-        logger.error(f"Flagging failed: {str(e)}")
-        respond(text="❌ Flagging failed")
+        logger.error("Flagging failed: %s", e)
+        reply(body, "❌ Flagging failed")
 
-@slack_app.action("kyb_reject")
-async def handle_reject(ack, body, respond):
+async def handle_reject(ack, body):
     await ack()
     try:
-        case_id = body["actions"][0]["value"].split("_")[1]
-        logger.info(f"Rejecting case {case_id}")
-        log_action("reject", case_id)
-        respond(text=f"❌ Case {case_id} rejected!")
+        case_id = action_case_id(body)
+        logger.info("Rejecting case %s", case_id)
+        await log_action("reject", case_id, action_reviewer(body))
+        reply(body, f"❌ Case {case_id} rejected!")
     except Exception as e:
-        logger.error(f"Rejection failed: {str(e)}")
-        respond(text="❌ Rejection failed")
+        logger.error("Rejection failed: %s", e)
+        reply(body, "❌ Rejection failed")
 
 # ===== OTHER ENDPOINTS =====
-@app.post("/slack/events")
+@router.post("/slack/events")
 async def slack_events(request: Request):
+    handler = await get_slack_handler()
     return await handler.handle(request)
 
-@app.post("/persona/webhook")
+@router.post("/persona/webhook")
 async def handle_persona_webhook(request: Request):
     secret = os.getenv("PERSONA_WEBHOOK_SECRET")
     if not secret:
@@ -227,14 +588,111 @@ async def handle_persona_webhook(request: Request):
     
     try:
         data = json.loads(body)
-        logger.info(f"Persona webhook: {data.get('event_type')}")
-        return {"status": "ok"}
     except json.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON")
 
-@app.get("/")
+    # Store first, process later: the ack only waits for the durable append
+    name = event_name(data)
+    case_id = event_case_id(data)
+    if case_id:
+        from persona_client.cache import get_case_cache
+        get_case_cache().invalidate(case_id)
+    event_key = event_id(data) or body_event_id(body)
+    stored = await get_webhook_queue().put(event_key, case_id, name, body)
+    if stored:
+        get_webhook_processor().notify()
+    logger.info("Persona webhook: %s %s (%s)", name, event_key, "queued" if stored else "duplicate")
+    return {"status": "ok", "duplicate": not stored}
+
+@router.get("/internal/cases/{case_id}/history")
+async def case_history(case_id: str, limit: int = 100, before: int = None):
+    """Audit trail of reviewer actions on a case, newest first"""
+    records = await get_audit_log().history(case_id, limit=min(limit, 1000), before=before)
+    return {"case_id": case_id, "actions": [record.to_dict() for record in records]}
+
+@router.get("/internal/stats")
+async def internal_stats():
+    """Connection and subsystem counters for capacity checks"""
+    from persona_client.client import get_persona_client
+    from persona_client.cache import get_case_cache
+    from slack_notify.outbox import get_slack_outbox
+    from slack_notify.digest import digest_enabled, get_digest_batcher
+    from slack_notify.review_messages import get_review_messages
+    from utils.evaluation import get_recent_evaluations
+    from utils.impact_index import get_impact_index
+    from utils.entity_index import get_entity_index
+    from utils.reporting import get_report_store
+    from utils.traffic_capture import capture_enabled, get_traffic_recorder
+
+    return {
+        "persona_pool": get_persona_client().stats(),
+        "slack_outbox": get_slack_outbox().stats(),
+        "slack_digest": get_digest_batcher().stats() if digest_enabled() else None,
+        "review_messages": get_review_messages().stats(),
+        "case_cache": get_case_cache().stats(),
+        "webhook_queue": await get_webhook_queue().stats(),
+        "kyb_commands": command_tasks.stats(),
+        "recent_evaluations": get_recent_evaluations().stats(),
+        "audit_log": get_audit_log().stats(),
+        "impact_index": get_impact_index().stats(),
+        "entity_index": await get_entity_index().stats(),
+        "reports": get_report_store().stats(),
+        "traffic_capture": get_traffic_recorder().stats() if capture_enabled() else None,
+    }
+
+@router.get("/internal/reports/compliance")
+async def compliance_report(week: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None):
+    """Compliance numbers for an ISO week or a range of UTC days (default: the last seven)"""
+    from utils.reporting import get_report_store, report_range
+
+    try:
+        first, last = report_range(week, since, until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    started = time.perf_counter()
+    report = await get_report_store().report(first, last)
+    report["query_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return report
+
+@router.post("/internal/screening/reload")
+async def reload_screening_index():
+    """Rebuild the screening index from SCREENING_LIST_PATH (incrementally) and swap it in"""
+    from utils.screening import refresh_screening_index, screening_list_paths
+
+    if not screening_list_paths():
+        raise HTTPException(status_code=409, detail="SCREENING_LIST_PATH is not set")
+    started = time.perf_counter()
+    index, rebuilt = await asyncio.get_running_loop().run_in_executor(None, refresh_screening_index)
+    return {"names": len(index), "rebuilt": rebuilt,
+            "reload_ms": round((time.perf_counter() - started) * 1000, 1)}
+
+@router.get("/internal/impact/proof-of-address")
+async def proof_of_address_crossing(day: Optional[str] = None, limit: int = 1000):
+    """Cases whose pending proof of address starts to count as expired on ``day`` (default today)"""
+    from datetime import date
+    from utils.impact_index import get_impact_index
+    from utils.policy import get_policy_engine
+
+    try:
+        on = date.fromisoformat(day) if day else date.today()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="day must be YYYY-MM-DD")
+    max_age_days = get_policy_engine().poa_max_age.days
+    case_ids = sorted(get_impact_index().poa_crossing(on, max_age_days))
+    return {"day": on.isoformat(), "max_age_days": max_age_days, "count": len(case_ids),
+            "case_ids": case_ids[:max(0, min(limit, 10_000))]}
+
+@router.get("/metrics")
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(get_metrics().render(), media_type=METRICS_CONTENT_TYPE)
+
+@router.get("/")
 async def health_check():
     return {"message": "KYB Bot is running"}
 
+app = create_app()
+
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=int(os.getenv("PORT", 8080)))
@@ -0,0 +1,186 @@
+import os
+import time
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import httpx
+
+from persona_client.client import get_persona_client
+from persona_client.models import Case, decode_case, with_related
+from persona_client.resilience import is_unavailable
+from utils.metrics import stage
+
+logger = logging.getLogger(__name__)
+
+_RELATED = stage("persona_related")
+
+# fetch(case_id, etag) -> (case or None when unchanged, etag)
+Fetcher = Callable[[str, Optional[str]], Awaitable[Tuple[Optional[Case], Optional[str]]]]
+
+
+async def _fetch_from_persona(case_id: str, etag: Optional[str]):
+    # Decoded and completed once here; every hit after that shares the same Case
+    client = get_persona_client()
+    case, etag = await client.get_case_if_modified(case_id, etag, decode=decode_case)
+    if case is not None and case.related:
+        with _RELATED.time():
+            fetched, missing = await client.get_related(case.related)
+        case = with_related(case, fetched, missing)
+    return case, etag
+
+
+class CacheEntry:
+    __slots__ = ("data", "etag", "fetched_at", "expired")
+
+    def __init__(self, data: Case, etag: Optional[str], fetched_at: float):
+        self.data = data
+        self.etag = etag
+        self.fetched_at = fetched_at
+        self.expired = False  # set by invalidate(); kept only as a stale fallback
+
+
+class CaseCache:
+    """Bounded TTL/LRU cache of Persona cases with single-flight loading.
+
+    Fresh entries are served from memory. Stale entries are revalidated
+    with If-None-Match when Persona sent an ETag, and concurrent requests
+    for the same case share one upstream call. Entries are evicted
+    least-recently-used once ``max_entries`` is reached.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0,
+                 fetcher: Optional[Fetcher] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._fetch = fetcher or _fetch_from_persona
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stale": 0,
+            "revalidated": 0,
+            "coalesced": 0,
+            "evictions": 0,
+            "invalidations": 0,
+            "incomplete": 0,
+            "stale_served": 0,
+        }
+
+    @classmethod
+    def from_env(cls, **overrides) -> "CaseCache":
+        settings = dict(
+            max_entries=int(os.getenv("PERSONA_CACHE_MAX_ENTRIES", 1024)),
+            ttl=float(os.getenv("PERSONA_CACHE_TTL", 30.0)),
+        )
+        settings.update(overrides)
+        return cls(**settings)
+
+    async def get_case(self, case_id: str, allow_stale: bool = True) -> Case:
+        """Return the case, from memory when fresh; the Case is shared, don't modify it.
+
+        If Persona is unreachable (transport error, open circuit, 429/5xx)
+        and the case was fetched before, that snapshot is returned with
+        ``stale_since`` set instead of raising (unless ``allow_stale`` is False).
+        """
+        entry = self._entries.get(case_id)
+        if entry is not None:
+            if not entry.expired and time.monotonic() - entry.fetched_at < self.ttl:
+                self._entries.move_to_end(case_id)
+                self._stats["hits"] += 1
+                return entry.data
+            self._stats["stale"] += 1
+
+        task = self._inflight.get(case_id)
+        if task is not None:
+            self._stats["coalesced"] += 1
+        else:
+            self._stats["misses"] += 1
+            task = asyncio.ensure_future(self._load(case_id, entry))
+            self._inflight[case_id] = task
+            task.add_done_callback(lambda t, key=case_id: self._finish(key, t))
+        # shield: one caller giving up must not cancel the shared fetch
+        try:
+            return await asyncio.shield(task)
+        except httpx.HTTPError as e:
+            stale = self._entries.get(case_id) if allow_stale and is_unavailable(e) else None
+            if stale is None:
+                raise
+            self._stats["stale_served"] += 1
+            age = time.monotonic() - stale.fetched_at
+            logger.warning("Persona unavailable (%s); serving case %s from %.0fs ago", e, case_id, age)
+            return stale.data.replace(stale_since=time.time() - age)
+
+    async def _load(self, case_id: str, entry: Optional[CacheEntry]) -> Case:
+        data, etag = await self._fetch(case_id, entry.etag if entry else None)
+        if data is None and entry is not None:
+            self._stats["revalidated"] += 1
+            data, etag = entry.data, entry.etag
+        elif data is None:
+            raise RuntimeError(f"Persona returned 304 for uncached case {case_id}")
+        if data.incomplete:
+            # Serve it, but let the next request retry the missing objects
+            self._stats["incomplete"] += 1
+        elif self._inflight.get(case_id) is asyncio.current_task():
+            # Only store if no webhook invalidated the case mid-fetch
+            self._store(case_id, CacheEntry(data, etag, time.monotonic()))
+        return data
+
+    def _finish(self, case_id: str, task: asyncio.Task) -> None:
+        if self._inflight.get(case_id) is task:
+            del self._inflight[case_id]
+        if not task.cancelled():
+            task.exception()  # mark retrieved when every waiter has gone
+
+    def _store(self, case_id: str, entry: CacheEntry) -> None:
+        self._entries[case_id] = entry
+        self._entries.move_to_end(case_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def peek(self, case_id: str) -> Optional[CacheEntry]:
+        """Cached entry regardless of freshness, without touching LRU order"""
+        return self._entries.get(case_id)
+
+    def invalidate(self, case_id: str) -> bool:
+        """Expire a case (e.g. on a Persona webhook); returns True if anything was cached.
+
+        The entry itself is kept, without its ETag, as the last known good
+        snapshot in case Persona is unreachable when the case is refetched.
+        """
+        self._stats["invalidations"] += 1
+        entry = self._entries.get(case_id)
+        if entry is not None:
+            entry.expired = True
+            entry.etag = None
+        removed = entry is not None
+        # A fetch already in flight may predate the change; detach it so
+        # the next request starts a new one and its result isn't stored.
+        removed = self._inflight.pop(case_id, None) is not None or removed
+        return removed
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["size"] = len(self._entries)
+        stats["max_entries"] = self.max_entries
+        stats["inflight"] = len(self._inflight)
+        lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["coalesced"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_case_cache: Optional[CaseCache] = None
+
+
+def get_case_cache() -> CaseCache:
+    global _case_cache
+    if _case_cache is None:
+        _case_cache = CaseCache.from_env()
+    return _case_cache
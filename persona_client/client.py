@@ -0,0 +1,337 @@
+import os
+import asyncio
+import logging
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+
+import httpx
+
+from persona_client.resilience import Resilience
+
+logger = logging.getLogger(__name__)
+
+PERSONA_BASE_URL = "https://withpersona.com/api/v1"
+PERSONA_VERSION = "2023-01-05"
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+# Related object type prefix -> API collection
+RELATED_PATHS = {"inquiry": "inquiries", "report": "reports", "document": "documents"}
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+class PersonaClient:
+    """Process-wide pooled HTTP client for the Persona API.
+
+    One instance is opened in the FastAPI lifespan and shared by every
+    Persona call so TCP/TLS connections are kept alive and reused.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: str = PERSONA_BASE_URL,
+        http2: bool = False,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        timeout: float = 10.0,
+        connect_timeout: float = 5.0,
+        related_concurrency: int = 16,
+        related_per_case: int = 4,
+        related_timeout: float = 5.0,
+        resilience: Optional[Resilience] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        # Related-object fan-out: process-wide and per-case request limits,
+        # and how long one object may take, waiting for a slot included
+        self.related_concurrency = related_concurrency
+        self.related_per_case = related_per_case
+        self.related_timeout = related_timeout
+        self._related_slots: Optional[asyncio.Semaphore] = None
+        # Retries, hedging and circuit breaking; None sends each request once
+        self.resilience = resilience
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._stats = {
+            "requests": 0,
+            "responses": 0,
+            "errors": 0,
+            "new_connections": 0,
+            "tls_handshakes": 0,
+            "related_fetched": 0,
+            "related_missing": 0,
+        }
+
+    @classmethod
+    def from_env(cls, **overrides) -> "PersonaClient":
+        """Build a client from PERSONA_* environment settings"""
+        settings = dict(
+            api_key=os.getenv("PERSONA_API_KEY"),
+            base_url=os.getenv("PERSONA_BASE_URL", PERSONA_BASE_URL),
+            http2=os.getenv("PERSONA_HTTP2", "").lower() in ("1", "true", "yes"),
+            max_connections=_env_int("PERSONA_POOL_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=_env_int("PERSONA_POOL_MAX_KEEPALIVE", 10),
+            keepalive_expiry=_env_float("PERSONA_POOL_KEEPALIVE_EXPIRY", 30.0),
+            timeout=_env_float("PERSONA_TIMEOUT", 10.0),
+            connect_timeout=_env_float("PERSONA_CONNECT_TIMEOUT", 5.0),
+            related_concurrency=_env_int("PERSONA_RELATED_CONCURRENCY", 16),
+            related_per_case=_env_int("PERSONA_RELATED_PER_CASE", 4),
+            related_timeout=_env_float("PERSONA_RELATED_TIMEOUT", 5.0),
+            resilience=Resilience.from_env(),
+        )
+        settings.update(overrides)
+        return cls(**settings)
+
+    # ===== LIFECYCLE =====
+    async def open(self) -> None:
+        if self._client is not None:
+            return
+        http2 = self.http2
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("PERSONA_HTTP2 requested but 'h2' is not installed; using HTTP/1.1")
+                http2 = False
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={
+                "Authorization": f"Bearer {self.api_key or ''}",
+                "Persona-Version": PERSONA_VERSION,
+                "Accept": "application/json",
+            },
+            http2=http2,
+            limits=self.limits,
+            timeout=self.timeout,
+            transport=self._transport,
+        )
+        self._related_slots = asyncio.Semaphore(self.related_concurrency)
+        logger.info("Persona client opened (http2=%s, max_connections=%s)",
+                    http2, self.limits.max_connections)
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            logger.info("Persona client closed")
+
+    @property
+    def is_open(self) -> bool:
+        return self._client is not None
+
+    # ===== REQUESTS =====
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        # httpcore reports connection setup through the "trace" extension;
+        # anything that isn't a new TCP connection was served from the pool.
+        if event_name == "connection.connect_tcp.complete":
+            self._stats["new_connections"] += 1
+        elif event_name == "connection.start_tls.complete":
+            self._stats["tls_handshakes"] += 1
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[float] = None,
+        allow_not_modified: bool = False,
+    ) -> httpx.Response:
+        """Send a request through the shared pool (and the resilience layer); raises on HTTP errors"""
+        if self._client is None:
+            await self.open()
+
+        async def send(attempt_timeout: Optional[float] = None) -> httpx.Response:
+            self._stats["requests"] += 1
+            limit = timeout if attempt_timeout is None else min(timeout or attempt_timeout, attempt_timeout)
+            response = await self._client.request(
+                method,
+                path,
+                params=params,
+                headers=headers,
+                timeout=limit if limit is not None else httpx.USE_CLIENT_DEFAULT,
+                extensions={"trace": self._trace},
+            )
+            self._stats["responses"] += 1
+            return response
+
+        try:
+            if self.resilience is not None:
+                response = await self.resilience.call(send, idempotent=method in IDEMPOTENT_METHODS)
+            else:
+                response = await send()
+            if not (allow_not_modified and response.status_code == 304):
+                response.raise_for_status()
+            return response
+        except httpx.HTTPError:
+            self._stats["errors"] += 1
+            raise
+
+    async def get_json(self, path: str, **kwargs) -> Dict[str, Any]:
+        response = await self.request("GET", path, **kwargs)
+        return response.json()
+
+    async def get_case(self, case_id: str, **kwargs) -> Dict[str, Any]:
+        """GET /cases/{id}"""
+        return await self.get_json(f"/cases/{case_id}", **kwargs)
+
+    async def get_case_if_modified(
+        self, case_id: str, etag: Optional[str] = None,
+        decode: Optional[Callable[[bytes], Any]] = None, **kwargs
+    ) -> Tuple[Any, Optional[str]]:
+        """Conditional GET /cases/{id}; returns (None, etag) on 304 Not Modified.
+
+        ``decode`` turns the raw body into the returned case (e.g.
+        persona_client.models.decode_case); by default it is parsed as JSON.
+        """
+        headers = {"If-None-Match": etag} if etag else None
+        response = await self.request(
+            "GET", f"/cases/{case_id}", headers=headers, allow_not_modified=True, **kwargs
+        )
+        if response.status_code == 304:
+            return None, etag
+        body = decode(response.content) if decode else response.json()
+        return body, response.headers.get("ETag")
+
+    async def get_object(self, object_type: str, object_id: str, **kwargs) -> Dict[str, Any]:
+        """GET a related object such as /inquiries/{id} or /reports/{id}"""
+        return await self.get_json(f"/{object_type}/{object_id}", **kwargs)
+
+    async def get_related(
+        self, refs: Iterable[Tuple[str, str]], per_case: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> Tuple[List[Tuple[str, Dict[str, Any]]], List[Tuple[str, str]]]:
+        """Fetch a case's related objects concurrently.
+
+        ``refs`` are (type, id) pairs such as ("report/watchlist", "rep_1").
+        At most ``per_case`` of them are in flight for this call and
+        ``related_concurrency`` across the process, so the whole fan-out
+        takes about as long as the slowest object. Returns (fetched
+        (type, attributes) pairs, refs that failed or timed out); partial
+        results are expected and never raise.
+        """
+        if self._client is None:
+            await self.open()
+        refs = list(dict.fromkeys(refs))
+        local = asyncio.Semaphore(per_case or self.related_per_case)
+        timeout = self.related_timeout if timeout is None else timeout
+
+        async def fetch(obj_type: str, obj_id: str) -> Tuple[str, Dict[str, Any]]:
+            collection = RELATED_PATHS.get(obj_type.split("/", 1)[0])
+            if collection is None:
+                raise ValueError(f"no endpoint for {obj_type}")
+            async with local, self._related_slots:
+                # The clock starts once a slot is held: waiting for one isn't the object's fault
+                body = await asyncio.wait_for(self.get_object(collection, obj_id, timeout=timeout), timeout)
+            data = body.get("data") or {}
+            return data.get("type") or obj_type, data.get("attributes") or {}
+
+        results = await asyncio.gather(*(fetch(*ref) for ref in refs), return_exceptions=True)
+        fetched, missing = [], []
+        for ref, result in zip(refs, results):
+            if isinstance(result, (httpx.HTTPError, asyncio.TimeoutError, ValueError)):
+                logger.warning("Related object %s %s unavailable: %s", ref[0], ref[1],
+                               str(result) or type(result).__name__)
+                missing.append(ref)
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                fetched.append(result)
+        self._stats["related_fetched"] += len(fetched)
+        self._stats["related_missing"] += len(missing)
+        return fetched, missing
+
+    async def paginate(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        page_size: int = 100,
+        cursor: Optional[str] = None,
+        **kwargs,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every JSON:API page of a listing, following links.next.
+
+        ``cursor`` is a links.next value saved from an earlier run; paging
+        resumes from it instead of from ``path``.
+        """
+        if cursor:
+            next_path: Optional[str] = self._relative(cursor)
+            page_params = None
+        else:
+            next_path = path
+            page_params = dict(params or {})
+            page_params.setdefault("page[size]", page_size)
+        while next_path:
+            page = await self.get_json(next_path, params=page_params, **kwargs)
+            yield page
+            next_link = (page.get("links") or {}).get("next")
+            if not next_link:
+                break
+            # links.next already carries the cursor in its query string
+            next_path = self._relative(next_link)
+            page_params = None
+
+    def _relative(self, link: str) -> str:
+        if link.startswith(self.base_url):
+            return link[len(self.base_url):]
+        if link.startswith("/api/v1"):
+            return link[len("/api/v1"):]
+        return link
+
+    # ===== OBSERVABILITY =====
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats["reused_connections"] = max(stats["responses"] - stats["new_connections"], 0)
+        stats["reuse_ratio"] = (
+            round(stats["reused_connections"] / stats["responses"], 3)
+            if stats["responses"] else 0.0
+        )
+        stats["http2"] = self.http2
+        stats["max_connections"] = self.limits.max_connections
+        stats["related_concurrency"] = self.related_concurrency
+        if self.resilience is not None:
+            stats["resilience"] = self.resilience.stats()
+        return stats
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_persona_client: Optional[PersonaClient] = None
+
+
+def get_persona_client() -> PersonaClient:
+    """Return the shared client, creating it from the environment on first use"""
+    global _persona_client
+    if _persona_client is None:
+        _persona_client = PersonaClient.from_env()
+    return _persona_client
+
+
+async def startup_persona_client() -> PersonaClient:
+    client = get_persona_client()
+    await client.open()
+    return client
+
+
+async def shutdown_persona_client() -> None:
+    global _persona_client
+    if _persona_client is not None:
+        await _persona_client.close()
+        _persona_client = None
@@ -0,0 +1,29 @@
+from typing import Any, Dict, Optional
+
+# Persona webhooks wrap the event as JSON:API:
+#   {"data": {"id": "evt_...", "attributes": {"name": "case.updated",
+#             "payload": {"data": {"type": "case", "id": "case_..."}}}}}
+# Local scripts post a flat {"event_type": ..., "payload": {"id": ...}} shape,
+# so both are accepted.
+
+
+def event_name(event: Dict[str, Any]) -> Optional[str]:
+    attributes = (event.get("data") or {}).get("attributes") or {}
+    return attributes.get("name") or event.get("event_type")
+
+
+def event_id(event: Dict[str, Any]) -> Optional[str]:
+    data = event.get("data") or {}
+    return data.get("id") or event.get("id") or event.get("event_id")
+
+
+def event_case_id(event: Dict[str, Any]) -> Optional[str]:
+    """ID of the case an event refers to, if any"""
+    attributes = (event.get("data") or {}).get("attributes") or {}
+    payload = attributes.get("payload") or event.get("payload") or {}
+    obj = payload.get("data") if isinstance(payload.get("data"), dict) else payload
+    if obj.get("type") not in (None, "case"):
+        # Events for inquiries/reports carry the case as a relationship
+        related = ((obj.get("relationships") or {}).get("case") or {}).get("data") or {}
+        return related.get("id")
+    return obj.get("id")
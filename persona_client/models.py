@@ -0,0 +1,452 @@
+"""Typed KYB case model, decoded once from Persona responses.
+
+``decode_case`` takes the raw response body (or an already-parsed dict)
+and returns a ``Case`` made of slotted objects:
+
+- JSON:API envelopes are unwrapped. ``included`` objects are indexed
+  once, and each relationship is resolved to their attributes.
+- kebab-case documents (Persona's own spelling) are converted to
+  snake_case in one pass, unwrapping ``{"type", "value"}`` fields.
+- Field names used by Persona and by kyb-review-bot/payload_sample.json
+  (``tax_id``, ``name.first/last``, ``ownership_percent``,
+  ``physical_address``) are mapped onto the names the checklist reads.
+
+Related objects (inquiries, reports, documents) that the case only
+references are listed in ``Case.related``. ``with_related`` folds them
+in once they have been fetched; see PersonaClient.get_related.
+
+``diff_cases`` lists the fields that differ between two versions of a
+case, so a case update only re-runs the rules that read them.
+
+orjson is used for parsing when it is installed; it is optional.
+"""
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+try:
+    import orjson
+    _loads = orjson.loads
+    JSON_DECODER = "orjson"
+except ImportError:  # pragma: no cover - depends on the environment
+    import json
+    _loads = json.loads
+    JSON_DECODER = "json"
+
+RawCase = Union[bytes, bytearray, memoryview, str, Dict[str, Any]]
+# (JSON:API type, id), e.g. ("report/watchlist", "rep_123")
+Ref = Tuple[str, str]
+
+# Related object types fetched separately, by the prefix of their type
+RELATED_TYPES = ("inquiry", "report", "document")
+# Persona report type -> the verification check its verdict answers
+REPORT_CHECKS = {
+    "report/business-registry": "business_registry",
+    "report/watchlist": "watchlist",
+    "report/politically-exposed-person": "pep",
+    "report/adverse-media": "adverse_media",
+}
+POA_KINDS = frozenset({"proof_of_address", "proof-of-address", "utility_bill", "bank_statement"})
+
+_EMPTY: Dict[str, Any] = {}
+_NO_HITS: FrozenSet[str] = frozenset()
+
+
+def loads(raw: Union[bytes, bytearray, memoryview, str]) -> Any:
+    """Parse JSON with the fastest decoder available"""
+    if isinstance(raw, memoryview):
+        raw = bytes(raw)
+    return _loads(raw)
+
+
+def _is_kebab(obj: Dict[str, Any]) -> bool:
+    """True if ``obj`` or one of its nested objects uses kebab-case keys"""
+    if "-" in "".join(obj):
+        return True
+    for value in obj.values():
+        if type(value) is dict and "-" in "".join(value):
+            return True
+    return False
+
+
+def _snake(value: Any) -> Any:
+    """Snake-case every key and unwrap Persona ``{"type", "value"}`` fields, recursively"""
+    if type(value) is dict:
+        if "value" in value and "type" in value and len(value) == 2:
+            return _snake(value["value"])
+        return {key.replace("-", "_"): _snake(item) for key, item in value.items()}
+    if type(value) is list:
+        return [_snake(item) for item in value]
+    return value
+
+
+def _snake_case(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    """Attributes in the snake_case form the builders read.
+
+    Persona's API is kebab-case, internal payloads are snake_case;
+    converting once here keeps every field read a plain dict lookup.
+    """
+    return _snake(attributes) if _is_kebab(attributes) else attributes
+
+
+def _dict(value: Any) -> Dict[str, Any]:
+    return value if type(value) is dict else _EMPTY
+
+
+def _join(*parts: Any) -> Optional[str]:
+    text = " ".join(str(p).strip() for p in parts if p and str(p).strip())
+    return text or None
+
+
+def _number(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Address:
+    __slots__ = ("street_1", "street_2", "city", "state", "postal_code", "country")
+
+    def __init__(self, street_1=None, street_2=None, city=None, state=None, postal_code=None, country=None):
+        self.street_1 = street_1
+        self.street_2 = street_2
+        self.city = city
+        self.state = state
+        self.postal_code = postal_code
+        self.country = country
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> Optional["Address"]:
+        if not d:
+            return None
+        return cls(d.get("street_1") or d.get("address_street_1"), d.get("street_2"),
+                   d.get("city"), d.get("state") or d.get("subdivision"),
+                   d.get("postal_code"), d.get("country") or d.get("country_code"))
+
+    def one_line(self) -> Optional[str]:
+        return _join(self.street_1, self.street_2, self.city, _join(self.state, self.postal_code), self.country)
+
+
+class Person:
+    """Control person, beneficial owner or form filler"""
+    __slots__ = ("full_name", "email", "ownership", "birthdate")
+
+    def __init__(self, full_name: Optional[str], email: Optional[str] = None, ownership: Optional[float] = None,
+                 birthdate: Optional[str] = None):
+        self.full_name = full_name
+        self.email = email
+        self.ownership = ownership
+        self.birthdate = birthdate  # as Persona sends it, normally YYYY-MM-DD
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Person":
+        full_name = d.get("full_name")
+        if not full_name:
+            name = d.get("name")
+            if isinstance(name, dict):
+                full_name = _join(name.get("first"), name.get("middle"), name.get("last"))
+            elif name:
+                full_name = str(name)
+            else:
+                full_name = _join(d.get("name_first"), d.get("name_middle"), d.get("name_last"))
+        ownership = d.get("ownership")
+        if ownership is None:
+            ownership = d.get("ownership_percent") or d.get("ownership_percentage")
+        return cls(full_name, d.get("email") or d.get("email_address"), _number(ownership),
+                   d.get("birthdate") or d.get("date_of_birth") or d.get("dob"))
+
+
+class Business:
+    __slots__ = ("name", "legal_name", "ein", "address", "incorporation_country", "country",
+                 "industry", "physical_address", "registered_address")
+
+    def __init__(self, name=None, legal_name=None, ein=None, address=None, incorporation_country=None,
+                 country=None, industry=None, physical_address=None, registered_address=None):
+        self.name = name
+        self.legal_name = legal_name
+        self.ein = ein
+        self.address = address
+        self.incorporation_country = incorporation_country
+        self.country = country
+        self.industry = industry
+        self.physical_address: Optional[Address] = physical_address
+        self.registered_address: Optional[Address] = registered_address
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Business":
+        physical = Address.from_dict(_dict(d.get("physical_address")))
+        registered = Address.from_dict(_dict(d.get("registered_address")))
+        address = d.get("address")
+        if isinstance(address, dict):
+            physical = physical or Address.from_dict(address)
+            address = None
+        if not address and physical is not None:
+            address = physical.one_line()
+        # Same fallbacks as utils.policy.case_country
+        country = (d.get("country") or (physical.country if physical else None)
+                   or (registered.country if registered else None))
+        # The registered address is where the business is incorporated
+        incorporation = (d.get("incorporation_country") or d.get("incorporation_jurisdiction")
+                         or (registered.country if registered else None))
+        return cls(d.get("name") or d.get("business_name"), d.get("legal_name"),
+                   d.get("ein") or d.get("tax_id") or d.get("tax_identification_number"),
+                   address, incorporation, country, d.get("industry"), physical, registered)
+
+    def get(self, field: str, default: Any = None) -> Any:
+        """Attribute lookup by the field names config.yaml uses"""
+        return getattr(self, field, default)
+
+
+class ProofOfAddress:
+    __slots__ = ("status", "document_date", "document_type")
+
+    def __init__(self, status=None, document_date=None, document_type=None):
+        self.status = status
+        self.document_date = document_date
+        self.document_type = document_type
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "ProofOfAddress":
+        return cls(d.get("status"), d.get("document_date"), d.get("document_type"))
+
+
+class Verifications:
+    """Persona's verdict per check ("clear", "match", ...)"""
+    __slots__ = ("business_registry", "watchlist", "pep", "adverse_media")
+
+    def __init__(self, business_registry=None, watchlist=None, pep=None, adverse_media=None):
+        self.business_registry = business_registry
+        self.watchlist = watchlist
+        self.pep = pep
+        self.adverse_media = adverse_media
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "Verifications":
+        return cls(d.get("business_registry"), d.get("watchlist"), d.get("pep"), d.get("adverse_media"))
+
+    def clear(self, check: str) -> bool:
+        return getattr(self, check, None) == "clear"
+
+
+class Case:
+    """One KYB case; treat as read-only, it is shared through the case cache"""
+    __slots__ = ("id", "status", "created_at", "business", "control_person", "beneficial_owners",
+                 "form_filler", "proof_of_address", "verifications", "watchlist_hits",
+                 "related", "incomplete", "stale_since")
+
+    def __init__(self, id: Optional[str], status: str, created_at: Optional[str], business: Business,
+                 control_person: Optional[Person], beneficial_owners: Tuple[Person, ...],
+                 form_filler: Optional[Person], proof_of_address: ProofOfAddress,
+                 verifications: Verifications, watchlist_hits: FrozenSet[str] = _NO_HITS,
+                 related: Tuple[Ref, ...] = (), incomplete: Tuple[Ref, ...] = (),
+                 stale_since: Optional[float] = None):
+        self.id = id
+        self.status = status
+        self.created_at = created_at
+        self.business = business
+        self.control_person = control_person
+        self.beneficial_owners = beneficial_owners
+        self.form_filler = form_filler
+        self.proof_of_address = proof_of_address
+        self.verifications = verifications
+        # Subjects Persona flagged: "business", "control_person", "beneficial_owners"
+        self.watchlist_hits = watchlist_hits
+        # Related objects still to fetch, and those that could not be fetched
+        self.related = related
+        self.incomplete = incomplete
+        # Unix time of the snapshot when Persona was unreachable and a cached copy was served
+        self.stale_since = stale_since
+
+    @classmethod
+    def from_attributes(cls, case_id: Optional[str], a: Dict[str, Any]) -> "Case":
+        control = _dict(a.get("control_person"))
+        filler = _dict(a.get("form_filler"))
+        owners = a.get("beneficial_owners") or ()
+        hits = _dict(a.get("watchlist_hits"))
+        return cls(
+            case_id,
+            a.get("status") or "pending",
+            a.get("created_at"),
+            Business.from_dict(_dict(a.get("business"))),
+            Person.from_dict(control) if control else None,
+            tuple([Person.from_dict(o) for o in owners if type(o) is dict]),
+            Person.from_dict(filler) if filler else None,
+            ProofOfAddress.from_dict(_dict(a.get("proof_of_address"))),
+            Verifications.from_dict(_dict(a.get("verification_results"))),
+            frozenset([k for k, v in hits.items() if v]) if hits else _NO_HITS,
+        )
+
+    def replace(self, **changes: Any) -> "Case":
+        """A copy with some fields changed; the original may be shared"""
+        clone = Case.__new__(Case)
+        for name in Case.__slots__:
+            setattr(clone, name, changes[name] if name in changes else getattr(self, name))
+        return clone
+
+    @property
+    def contact_email(self) -> Optional[str]:
+        return self.form_filler.email if self.form_filler is not None else None
+
+
+def _resolve(ref: Any, included: Dict[Tuple[Any, Any], Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if type(ref) is not dict:
+        return None
+    obj = included.get((ref.get("type"), ref.get("id")))
+    if obj is None:
+        return None
+    attributes = dict(_snake_case(obj.get("attributes") or _EMPTY))
+    attributes.setdefault("id", obj.get("id"))
+    return attributes
+
+
+def _index(included: Any) -> Dict[Tuple[Any, Any], Dict[str, Any]]:
+    return {(obj.get("type"), obj.get("id")): obj for obj in included or () if type(obj) is dict}
+
+
+def _is_related(ref_type: Any) -> bool:
+    return isinstance(ref_type, str) and ref_type.split("/", 1)[0] in RELATED_TYPES
+
+
+def _decode_resource(data: Dict[str, Any], index: Dict[Tuple[Any, Any], Dict[str, Any]]) -> Case:
+    attributes = _snake_case(data.get("attributes") or _EMPTY)
+    relationships = data.get("relationships")
+    related: List[Ref] = []
+    fetched: List[Tuple[str, Dict[str, Any]]] = []
+    if relationships:
+        # Fill in each relationship the attributes don't already carry inline;
+        # inquiries, reports and documents are kept apart for with_related
+        attributes = dict(attributes)
+        for name, relationship in relationships.items():
+            key = name.replace("-", "_")
+            if key in attributes or type(relationship) is not dict:
+                continue
+            ref = relationship.get("data")
+            refs = ref if type(ref) is list else [ref]
+            people = []
+            for r in refs:
+                if type(r) is not dict:
+                    continue
+                obj = _resolve(r, index)
+                if _is_related(r.get("type")):
+                    if obj is not None:
+                        fetched.append((r["type"], obj))
+                    elif r.get("id"):
+                        related.append((r["type"], str(r["id"])))
+                elif obj is not None:
+                    people.append(obj)
+            if people:
+                attributes[key] = people if type(ref) is list else people[0]
+    case = Case.from_attributes(data.get("id"), attributes)
+    if fetched:
+        case = with_related(case, fetched)
+    if related:
+        case.related = tuple(related)
+    return case
+
+
+def decode_case(raw: RawCase) -> Case:
+    """Parse a Persona case (JSON:API document, bare resource or flat dict) into a Case"""
+    doc = raw if isinstance(raw, dict) else loads(raw)
+    data = doc.get("data")
+    if type(data) is not dict:
+        if type(doc.get("attributes")) is not dict:
+            # Flat shape: internal payloads, payload_sample.json
+            return Case.from_attributes(doc.get("id") or doc.get("kyb_case_id"), _snake_case(doc))
+        data = doc  # bare resource object, e.g. an item of a listing page
+    return _decode_resource(data, _index(doc.get("included")))
+
+
+def decode_cases(raw: RawCase) -> List[Case]:
+    """Decode a listing page (``data`` is a list), indexing ``included`` once for all items"""
+    doc = raw if isinstance(raw, dict) else loads(raw)
+    index = _index(doc.get("included"))
+    return [_decode_resource(item, index) for item in doc.get("data") or () if type(item) is dict]
+
+
+# ===== RELATED OBJECTS =====
+def _report_verdict(attributes: Dict[str, Any]) -> str:
+    if attributes.get("status") not in (None, "ready", "completed"):
+        return attributes.get("status") or "pending"
+    matched = attributes.get("has_match")
+    if matched is None:
+        matched = bool(attributes.get("matches") or attributes.get("match_count"))
+    return "match" if matched else "clear"
+
+
+def _proof_of_address(doc_type: str, attributes: Dict[str, Any]) -> Optional[ProofOfAddress]:
+    kind = attributes.get("kind") or attributes.get("document_type") or doc_type.split("/", 1)[-1]
+    if kind not in POA_KINDS:
+        return None
+    status = attributes.get("status")
+    return ProofOfAddress("approved" if status in ("approved", "passed") else status,
+                          attributes.get("document_date") or attributes.get("issue_date"), kind)
+
+
+def with_related(case: Case, objects: Iterable[Tuple[str, Dict[str, Any]]],
+                 missing: Iterable[Ref] = ()) -> Case:
+    """A copy of ``case`` completed from its related objects' attributes.
+
+    Report verdicts, a proof-of-address document and the inquiry's email
+    only fill in what the case itself doesn't carry. ``missing`` lists the
+    objects that could not be fetched; they end up in ``Case.incomplete``.
+    """
+    checks = {check: getattr(case.verifications, check) for check in Verifications.__slots__}
+    poa = case.proof_of_address
+    filler = case.form_filler
+    for obj_type, attributes in objects:
+        attributes = _snake_case(attributes)
+        check = REPORT_CHECKS.get(obj_type)
+        if check is not None:
+            if checks[check] is None:
+                checks[check] = _report_verdict(attributes)
+        elif obj_type.startswith("document"):
+            if poa.status is None and not poa.document_date:
+                poa = _proof_of_address(obj_type, attributes) or poa
+        elif obj_type == "inquiry" and (filler is None or not filler.email):
+            email = attributes.get("email_address") or attributes.get("email")
+            if email:
+                filler = Person(Person.from_dict(attributes).full_name, email)
+    return case.replace(form_filler=filler, proof_of_address=poa, verifications=Verifications(**checks),
+                        related=(), incomplete=case.incomplete + tuple(missing))
+
+
+# ===== FIELD-LEVEL DIFF =====
+# Case fields holding one slotted object, diffed attribute by attribute
+_NESTED = {
+    "business": Business.__slots__,
+    "control_person": Person.__slots__,
+    "form_filler": Person.__slots__,
+    "proof_of_address": ProofOfAddress.__slots__,
+    "verifications": Verifications.__slots__,
+}
+# Compared whole; ``related`` only lists what is left to fetch
+_SCALARS = ("id", "status", "created_at", "beneficial_owners", "watchlist_hits", "incomplete", "stale_since")
+
+
+def _value(obj: Any) -> Any:
+    """Comparable form of a field: slotted objects become tuples of their values"""
+    if isinstance(obj, (Address, Person)):
+        return tuple([_value(getattr(obj, name)) for name in obj.__slots__])
+    if type(obj) is tuple:
+        return tuple([_value(item) for item in obj])
+    return obj
+
+
+def diff_cases(old: Case, new: Case) -> FrozenSet[str]:
+    """Paths of the fields that differ between two versions of a case.
+
+    Nested objects are compared per attribute (``business.country``,
+    ``proof_of_address.status``, ``control_person.full_name``); a missing
+    person compares like one with every attribute empty. Owners, watchlist
+    hits and the other top-level fields are compared whole.
+    """
+    changed = [name for name in _SCALARS if _value(getattr(old, name)) != _value(getattr(new, name))]
+    for name, attributes in _NESTED.items():
+        before, after = getattr(old, name), getattr(new, name)
+        if before is after:
+            continue
+        for attribute in attributes:
+            if _value(getattr(before, attribute, None)) != _value(getattr(after, attribute, None)):
+                changed.append(f"{name}.{attribute}")
+    return frozenset(changed)
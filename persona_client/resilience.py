@@ -0,0 +1,346 @@
+"""Tail-latency protection for Persona calls.
+
+``Resilience.call`` wraps one logical request. Its parts:
+
+- Per-attempt timeout and overall deadline: one slow attempt can't use
+  up the whole request.
+- Retries with capped exponential backoff (full jitter, honouring
+  Retry-After) for timeouts, transport errors, 429 and 5xx. They apply
+  to idempotent requests only, and are paid for from a ``RetryBudget``
+  so a struggling Persona isn't hit with a retry storm.
+- Optional hedging: when an attempt is slower than the chosen
+  percentile of recent latencies, a second copy is sent and the first
+  good answer wins. Hedges draw on the same budget.
+- A ``CircuitBreaker``: after consecutive failures calls fail fast with
+  ``CircuitOpenError`` until a trial request succeeds again.
+
+Every event is counted in ``stats()`` and in the
+kyb_persona_resilience_events_total metric.
+"""
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+import httpx
+
+from utils.metrics import get_metrics
+from utils.retry import retry_after as parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+_EVENTS = get_metrics().counter(
+    "kyb_persona_resilience_events_total",
+    "Persona retries, hedges, budget refusals and circuit breaker transitions", ("event",))
+_BREAKER_OPEN = get_metrics().gauge(
+    "kyb_persona_circuit_open", "1 while the Persona circuit breaker is open or half-open").labels()
+
+# send(timeout) -> response; one attempt of the wrapped request
+Send = Callable[[float], Awaitable[httpx.Response]]
+
+
+class CircuitOpenError(httpx.RequestError):
+    """Persona is considered down; the request was not sent"""
+
+
+class PersonaUnavailableError(RuntimeError):
+    """Persona could not be reached and no earlier snapshot of the case exists"""
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+class RetryBudget:
+    """Retries allowed as a fraction of recent requests, plus a small floor.
+
+    Each request deposits ``ratio`` tokens and each retry or hedge spends
+    one, so extra load on Persona stays around ``ratio`` of the base rate
+    however bad things get. ``min_per_s`` tokens are added per second so
+    a quiet service can still retry.
+    """
+
+    def __init__(self, ratio: float = 0.2, min_per_s: float = 1.0, max_tokens: float = 20.0):
+        self.ratio = ratio
+        self.min_per_s = min_per_s
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_s)
+        self._updated = now
+
+    def deposit(self) -> None:
+        self._refill()
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def withdraw(self) -> bool:
+        self._refill()
+        if self._tokens < 1.0:
+            return False
+        self._tokens -= 1.0
+        return True
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+class CircuitBreaker:
+    """closed -> open after ``failure_threshold`` consecutive failures.
+
+    After ``reset_timeout`` seconds one trial request is let through
+    (half-open): success closes the circuit, failure opens it again. A
+    trial that never reports back (e.g. cancelled) is replaced by a new
+    one after another ``reset_timeout``.
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0,
+                 on_event: Optional[Callable[[str], None]] = None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_started: Optional[float] = None
+        self._on_event = on_event or (lambda event: None)
+
+    def allow(self) -> bool:
+        """True if a request may be sent now"""
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self.opened_at >= self.reset_timeout:
+            self.state = self.HALF_OPEN
+            self._trial_started = None
+            self._on_event("breaker_half_open")
+        if self.state == self.HALF_OPEN and (self._trial_started is None
+                                             or now - self._trial_started >= self.reset_timeout):
+            self._trial_started = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        was_closed = self.state == self.CLOSED
+        self.state = self.CLOSED
+        self.failures = 0
+        self._trial_started = None
+        if not was_closed:
+            logger.info("Persona circuit breaker closed")
+            self._on_event("breaker_closed")
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or (self.state == self.CLOSED
+                                            and self.failures >= self.failure_threshold):
+            if self.state == self.CLOSED:
+                logger.warning("Persona circuit breaker opened after %s consecutive failures", self.failures)
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+            self._trial_started = None
+            self._on_event("breaker_opened")
+
+    def retry_in(self) -> float:
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+
+class LatencyTracker:
+    """Recent successful attempt latencies, for the hedging threshold"""
+
+    def __init__(self, size: int = 512, min_samples: int = 20):
+        self.samples: Deque[float] = deque(maxlen=size)
+        self.min_samples = min_samples
+        self._cached: Dict[float, float] = {}
+        self._since_update = 0
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+        self._since_update += 1
+        if self._since_update >= 32:
+            self._cached.clear()
+            self._since_update = 0
+
+    def percentile(self, pct: float) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        value = self._cached.get(pct)
+        if value is None:
+            ordered = sorted(self.samples)
+            value = self._cached[pct] = ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+        return value
+
+
+class Resilience:
+    """Retry, hedging and circuit breaker policy for one Persona client"""
+
+    def __init__(self, max_retries: int = 2, backoff_base: float = 0.1, backoff_max: float = 2.0,
+                 attempt_timeout: float = 4.0, deadline: float = 10.0,
+                 budget: Optional[RetryBudget] = None,
+                 hedge_percentile: float = 0.0, hedge_min_delay: float = 0.05,
+                 breaker_failures: int = 5, breaker_reset: float = 10.0, seed: Optional[int] = None):
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        self.budget = budget or RetryBudget()
+        # 0 disables hedging; e.g. 95 hedges attempts slower than the recent p95
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.latencies = LatencyTracker()
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset, on_event=self._count)
+        self._rng = random.Random(seed)
+        self._stats: Dict[str, int] = {
+            "calls": 0, "retries": 0, "budget_exhausted": 0, "gave_up": 0, "hedges": 0,
+            "hedge_wins": 0, "attempt_timeouts": 0, "breaker_opened": 0, "breaker_half_open": 0,
+            "breaker_closed": 0, "breaker_rejected": 0,
+        }
+
+    @classmethod
+    def from_env(cls, **overrides) -> "Resilience":
+        settings = dict(
+            max_retries=int(_env_float("PERSONA_RETRIES", 2)),
+            backoff_base=_env_float("PERSONA_BACKOFF_BASE", 0.1),
+            backoff_max=_env_float("PERSONA_BACKOFF_MAX", 2.0),
+            attempt_timeout=_env_float("PERSONA_ATTEMPT_TIMEOUT", 4.0),
+            deadline=_env_float("PERSONA_DEADLINE", 10.0),
+            budget=RetryBudget(ratio=_env_float("PERSONA_RETRY_BUDGET", 0.2),
+                               min_per_s=_env_float("PERSONA_RETRY_MIN_PER_S", 1.0)),
+            hedge_percentile=_env_float("PERSONA_HEDGE_PERCENTILE", 0.0),
+            hedge_min_delay=_env_float("PERSONA_HEDGE_MIN_DELAY", 0.05),
+            breaker_failures=int(_env_float("PERSONA_BREAKER_FAILURES", 5)),
+            breaker_reset=_env_float("PERSONA_BREAKER_RESET", 10.0),
+        )
+        settings.update(overrides)
+        return cls(**settings)
+
+    def _count(self, event: str) -> None:
+        self._stats[event] += 1
+        _EVENTS.labels(event).inc()
+        if event.startswith("breaker_") and event != "breaker_rejected":
+            _BREAKER_OPEN.set(0 if self.breaker.state == CircuitBreaker.CLOSED else 1)
+
+    # ===== CALLS =====
+    async def call(self, send: Send, idempotent: bool = True) -> httpx.Response:
+        """Run ``send`` with retries/hedging; returns the final response or raises.
+
+        Retryable status codes that persist are returned (not raised), so
+        the caller's raise_for_status reports them as before.
+        """
+        self._stats["calls"] += 1
+        if not self.breaker.allow():
+            self._count("breaker_rejected")
+            raise CircuitOpenError(f"Persona circuit open, retrying in {self.breaker.retry_in():.1f}s")
+        self.budget.deposit()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        attempt = 0
+        while True:
+            retry_after = None
+            try:
+                response = await self._attempt(send, idempotent, deadline - loop.time())
+            except (httpx.TimeoutException, httpx.TransportError) as exc:
+                failure: Any = exc
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    self.breaker.record_success()
+                    return response
+                failure = response
+                retry_after = parse_retry_after(response)
+            self.breaker.record_failure()
+
+            attempt += 1
+            delay = retry_after if retry_after is not None else self._backoff(attempt)
+            if not idempotent or attempt > self.max_retries or loop.time() + delay >= deadline:
+                self._count("gave_up")
+                return _outcome(failure)
+            if not self.breaker.allow():
+                self._count("breaker_rejected")
+                return _outcome(failure)
+            if not self.budget.withdraw():
+                self._count("budget_exhausted")
+                return _outcome(failure)
+            self._count("retries")
+            await asyncio.sleep(delay)
+
+    async def _attempt(self, send: Send, idempotent: bool, remaining: float) -> httpx.Response:
+        timeout = max(0.001, min(self.attempt_timeout, remaining))
+        hedge_after = self._hedge_delay() if idempotent else None
+        if hedge_after is None or hedge_after >= timeout:
+            return await self._timed(send, timeout)
+
+        first = asyncio.ensure_future(self._timed(send, timeout))
+        done, _ = await asyncio.wait({first}, timeout=hedge_after)
+        if done or not self.budget.withdraw():
+            return await first
+        self._count("hedges")
+        hedge = asyncio.ensure_future(self._timed(send, timeout - hedge_after))
+        pending = {first, hedge}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None and task.result().status_code not in RETRYABLE_STATUS:
+                        if task is hedge:
+                            self._count("hedge_wins")
+                        return task.result()
+            # Both failed: report the original attempt's outcome
+            return first.result()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _timed(self, send: Send, timeout: float) -> httpx.Response:
+        start = time.perf_counter()
+        try:
+            # httpx timeouts are per phase; this bounds the whole attempt
+            response = await asyncio.wait_for(send(timeout), timeout)
+        except asyncio.TimeoutError:
+            self._count("attempt_timeouts")
+            raise httpx.ReadTimeout(f"Persona attempt exceeded {timeout:.2f}s") from None
+        if response.status_code not in RETRYABLE_STATUS:
+            self.latencies.add(time.perf_counter() - start)
+        return response
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge_percentile:
+            return None
+        threshold = self.latencies.percentile(self.hedge_percentile)
+        return None if threshold is None else max(threshold, self.hedge_min_delay)
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retrying clients from synchronising
+        return self._rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    # ===== OBSERVABILITY =====
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["breaker_state"] = self.breaker.state
+        stats["retry_tokens"] = round(self.budget.tokens, 2)
+        hedge_after = self._hedge_delay()
+        stats["hedge_after_ms"] = round(hedge_after * 1000, 1) if hedge_after is not None else None
+        return stats
+
+
+def is_unavailable(error: httpx.HTTPError) -> bool:
+    """Persona is down or overloaded, as opposed to rejecting this request"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return True
+
+
+def _outcome(failure: Any) -> httpx.Response:
+    if isinstance(failure, BaseException):
+        raise failure
+    return failure
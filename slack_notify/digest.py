@@ -0,0 +1,114 @@
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from slack_notify.notify import build_digest_payload
+from slack_notify.outbox import SlackOutbox, get_slack_outbox
+from utils.evaluation import CaseEvaluation
+
+logger = logging.getLogger(__name__)
+
+# Slack allows 50 blocks per message: one header plus one section per case
+MAX_DIGEST_CASES = 49
+
+
+class DigestBatcher:
+    """Coalesces passing cases into periodic summary posts.
+
+    A digest goes out ``window`` seconds after its first case, or as soon
+    as it holds ``max_cases``, whichever comes first. Only cases that
+    passed every check belong here; anything needing attention is posted
+    on its own straight away by the caller.
+
+    With ``channel`` (SLACK_DIGEST_CHANNEL, needs SLACK_API_TOKEN) digests
+    are posted there with chat.postMessage; otherwise they go to the
+    incoming webhook. Digested cases get no entry in ReviewMessages, since
+    chat.update would replace the whole digest: a later change to one of
+    them is posted as a new message (or joins a later digest).
+    """
+
+    def __init__(self, outbox: Optional[SlackOutbox] = None, window: float = 30.0,
+                 max_cases: int = 20, channel: Optional[str] = None):
+        self.outbox = outbox
+        self.window = window
+        self.max_cases = max(1, min(max_cases, MAX_DIGEST_CASES))
+        self.channel = channel
+        self._pending: List[Tuple[CaseEvaluation, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._added_latency: Deque[float] = deque(maxlen=2048)
+        self._stats = {"cases": 0, "digests": 0, "dropped": 0}
+
+    @classmethod
+    def from_env(cls, **overrides) -> "DigestBatcher":
+        settings = dict(
+            window=float(os.getenv("SLACK_DIGEST_WINDOW", 30)),
+            max_cases=int(os.getenv("SLACK_DIGEST_MAX_CASES", 20)),
+            channel=os.getenv("SLACK_DIGEST_CHANNEL"),
+        )
+        settings.update(overrides)
+        return cls(**settings)
+
+    def add(self, evaluation: CaseEvaluation) -> None:
+        self._pending.append((evaluation, time.monotonic()))
+        self._stats["cases"] += 1
+        if len(self._pending) >= self.max_cases:
+            self.flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+
+    def flush(self) -> int:
+        """Post whatever is pending now; returns the number of cases sent"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return 0
+        outbox = self.outbox or get_slack_outbox()
+        payload = build_digest_payload([e for e, _ in batch])
+        if self.channel:
+            queued = outbox.enqueue_api_call("chat.postMessage", dict(payload, channel=self.channel))
+        else:
+            queued = outbox.enqueue(payload)
+        if not queued:
+            self._stats["dropped"] += len(batch)
+            logger.error("Slack outbox full, digest of %d cases not posted", len(batch))
+            return 0
+        now = time.monotonic()
+        self._added_latency.extend(now - added for _, added in batch)
+        self._stats["digests"] += 1
+        return len(batch)
+
+    def stop(self) -> None:
+        """Send the partial digest on shutdown"""
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["pending"] = len(self._pending)
+        # Every case in a digest would otherwise have been its own post
+        stats["api_calls_saved"] = stats["cases"] - stats["dropped"] - len(self._pending) - stats["digests"]
+        latencies = sorted(self._added_latency)
+        if latencies:
+            stats["added_latency_p50"] = round(latencies[len(latencies) // 2], 3)
+            stats["added_latency_p95"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 3)
+            stats["added_latency_max"] = round(latencies[-1], 3)
+        return stats
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_digest: Optional[DigestBatcher] = None
+
+
+def digest_enabled() -> bool:
+    return os.getenv("SLACK_DIGEST_MODE", "off").lower() in ("1", "on", "true")
+
+
+def get_digest_batcher() -> DigestBatcher:
+    global _digest
+    if _digest is None:
+        _digest = DigestBatcher.from_env()
+    return _digest
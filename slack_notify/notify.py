@@ -1,130 +1,163 @@
 import os
-import requests
-from typing import Optional, Dict, Any, List
-
-# NEW: Add prohibited lists (from company doc)
-PROHIBITED_COUNTRIES = [
-    "Afghanistan", "Algeria", "Bangladesh", "Belarus", "Bhutan", 
-    "Bosnia and Herzegovina", "Burma (Myanmar)", "Burundi", 
-    "Central African Republic", "China", 
-    "The Democratic Republic of Congo", "Croatia", "Cuba", "Ethiopia", 
-    "Gaza Strip", "Guinea-Bissau", "Haiti", "Iran", "Iraq", "Kenya", 
-    "Kosovo", "Lebanon", "Libya", "Macedonia (North)", "Mali", 
-    "Montenegro", "Morocco", "Mozambique", "Nepal", "Nicaragua", 
-    "Niger", "North Korea", "Pakistan", "Qatar", "Russian Federation", 
-    "Serbia", "Slovenia", "Somalia", "South Sudan", "Sudan", "Syria", 
-    "Ukraine", "Venezuela (Bolivarian Republic of)", 
-    "West Bank (Palestinian Territory)", "Yemen", "Zimbabwe"
-    # ... [full list from company doc]
-]
-
-PROHIBITED_INDUSTRIES = [
-    "Gambling", "Marijuana/cannabis", "Guns", 
-    "Arms and ammunition", "Adult entertainment", 
-]
-
-def format_kyb_message(data: Dict[str, Any]) -> str:
-    verification = data.get("verification_results", {})
-    business = data.get("business", {})
-    checklist = data.get("checklist_result", {})
+from datetime import datetime
+from typing import Optional, Dict, Any, List, Union
+from persona_client.models import Case
+from utils.evaluation import CaseEvaluation, evaluate_case
+from utils.metrics import stage
+
+_FORMAT = stage("format")
+_SLACK_SEND = stage("slack_send")
+MAX_LINKS_SHOWN = 10
+
+def _mark(ok: bool, good: str, bad: str) -> str:
+    return f"✅ {good}" if ok else f"❌ {bad}"
+
+def format_kyb_message(data: Union[Dict[str, Any], Case], evaluation: Optional[CaseEvaluation] = None) -> str:
+    """Review text for a case; pass the pipeline's evaluation to avoid re-screening"""
+    evaluation = evaluation or evaluate_case(data)
+    verified = evaluation.verifications
 
     # ===== STATUS CALCULATION =====
-    country_status = (
-        "❌ Prohibited" 
-        if business.get("country") in PROHIBITED_COUNTRIES 
-        else "✅ Allowed"
-    )
-    industry_status = (
-        "❌ Prohibited" 
-        if business.get("industry") in PROHIBITED_INDUSTRIES 
-        else "✅ Allowed"
-    )
+    country_status = _mark(not evaluation.country_prohibited, "Allowed", "Prohibited")
+    if evaluation.country_code:
+        country_status += f" ({evaluation.country_code})"
+    industry_status = _mark(not evaluation.industry_prohibited, "Allowed", "Prohibited")
     
     # ===== CORE MESSAGE =====
     message = f"""
-✅ *KYB Case Review: {business.get('legal_name', business.get('name', 'N/A'))}*  
-📋 *Status*: {data.get('status', 'pending')}  
-🆔 *Case ID*: {data.get('id', 'N/A')}  
+✅ *KYB Case Review: {evaluation.business_name}*  
+📋 *Status*: {evaluation.status}  
+🆔 *Case ID*: {evaluation.case_id}  
 
 📍 *Location*: {country_status}  
 🏭 *Industry*: {industry_status}  
 
 🔍 *Verifications*:  
-   • Business Registry: {'✅ Valid' if verification.get('business_registry') == 'clear' else '❌ Invalid'}  
-   • Watchlist: {'✅ Clear' if verification.get('watchlist') == 'clear' else '❌ Match'}  
-   • PEP: {'✅ Clear' if verification.get('pep') == 'clear' else '❌ Match'}  
-   • Adverse Media: {'✅ Clear' if verification.get('adverse_media') == 'clear' else '❌ Match'}  
-   • Proof of Address: {'✅ Valid' if data.get('proof_of_address', {}).get('status') == 'approved' else '❌ Invalid'}  
+   • Business Registry: {_mark(verified['business_registry'], 'Valid', 'Invalid')}  
+   • Watchlist: {_mark(verified['watchlist'], 'Clear', 'Match')}  
+   • PEP: {_mark(verified['pep'], 'Clear', 'Match')}  
+   • Adverse Media: {_mark(verified['adverse_media'], 'Clear', 'Match')}  
+   • Proof of Address: {_mark(evaluation.proof_of_address_approved, 'Valid', 'Invalid')}  
 """
 
     # ===== FAILURES SECTION =====
-    if isinstance(checklist, dict):
-        failures = checklist.get("failures", [])
-        if failures:
-            message += "\n⚠️ *Issues Found:*\n• " + "\n• ".join(failures)
+    failures = evaluation.failures
+    if failures:
+        message += "\n⚠️ *Issues Found:*\n• " + "\n• ".join(failures)
+    if evaluation.links:
+        shown = [link.describe() for link in evaluation.links[:MAX_LINKS_SHOWN]]
+        if len(evaluation.links) > MAX_LINKS_SHOWN:
+            shown.append(f"... and {len(evaluation.links) - MAX_LINKS_SHOWN} more")
+        message += "\n\n🔗 *Linked to flagged or rejected cases:*\n• " + "\n• ".join(shown)
+    if evaluation.incomplete:
+        message += ("\n\n⏳ *Incomplete data* (not returned by Persona):\n• "
+                    + "\n• ".join(evaluation.incomplete))
+    if evaluation.stale_since is not None:
+        fetched = datetime.fromtimestamp(evaluation.stale_since).strftime("%Y-%m-%d %H:%M")
+        message += f"\n\n🕒 *Stale data*: Persona unavailable, showing the case as of {fetched}"
+    if evaluation.needs_review:
+        message += "\n\n🚩 *Needs manual review*"
     
     return message
 
-def format_buttons(case_id: str) -> List[dict]:
+def format_buttons(case_id: str, needs_review: bool = False) -> List[dict]:
     """Standardized button format for Slack messages"""
-    return [
+    elements = [
+        {
+            "type": "button",
+            "text": {"type": "plain_text", "text": "Approve"},
+            "style": "primary",
+            "action_id": "kyb_approve",  # ← Must match the decorator!
+            "value": f"approve_{case_id}"
+        },
         {
-            "type": "actions",
-            "elements": [
-                {
-                    "type": "button",
-                    "text": {"type": "plain_text", "text": "Approve"},
-                    "style": "primary",
-                    "action_id": "kyb_approve",  # ← Must match the decorator!
-                    "value": f"approve_{case_id}"
-                },
-                {
-                    "type": "button",
-                    "text": {"type": "plain_text", "text": "Reject"},
-                    "style": "danger",
-                    "action_id": "kyb_reject",
-                    "value": f"reject_{case_id}"
-                }
-            ]
+            "type": "button",
+            "text": {"type": "plain_text", "text": "Reject"},
+            "style": "danger",
+            "action_id": "kyb_reject",
+            "value": f"reject_{case_id}"
         }
     ]
+    if needs_review:
+        elements.append({
+            "type": "button",
+            "text": {"type": "plain_text", "text": "Flag for review"},
+            "action_id": "kyb_flag",
+            "value": f"flag_{case_id}"
+        })
+    return [{"type": "actions", "elements": elements}]
+
+def format_digest_line(evaluation: CaseEvaluation) -> str:
+    location = f"  📍 {evaluation.country_code}" if evaluation.country_code else ""
+    return f"✅ *{evaluation.business_name}*  🆔 {evaluation.case_id}{location}  📋 {evaluation.status}"
+
+def build_digest_payload(evaluations: List[CaseEvaluation]) -> Dict[str, Any]:
+    """One message for several cases that passed every check, each with its Approve button"""
+    blocks: List[dict] = [{
+        "type": "section",
+        "text": {"type": "mrkdwn", "text": f"📋 *KYB Digest*: {len(evaluations)} case(s) passed all checks"}
+    }]
+    for evaluation in evaluations:
+        blocks.append({
+            "type": "section",
+            "text": {"type": "mrkdwn", "text": format_digest_line(evaluation)},
+            "accessory": {
+                "type": "button",
+                "text": {"type": "plain_text", "text": "Approve"},
+                "style": "primary",
+                "action_id": "kyb_approve",
+                "value": f"approve_{evaluation.case_id}"
+            }
+        })
+    return {"text": f"📋 KYB Digest - {len(evaluations)} passed case(s)", "blocks": blocks}
+
+def build_slack_payload(data: Union[Dict[str, Any], Case, None] = None,
+                        text: Optional[str] = None,
+                        blocks: Optional[List[dict]] = None,
+                        evaluation: Optional[CaseEvaluation] = None) -> Dict[str, Any]:
+    """Build the webhook payload for a case, or for raw text/blocks"""
+    if data:
+        evaluation = evaluation or evaluate_case(data)
+        with _FORMAT.time():
+            return {
+                "text": f"📋 KYB Case Review - {evaluation.case_id}",
+                "blocks": [
+                    {
+                        "type": "section",
+                        "text": {
+                            "type": "mrkdwn",
+                            "text": format_kyb_message(data, evaluation)
+                        }
+                    },
+                    *format_buttons(evaluation.case_id, evaluation.needs_review)
+                ]
+            }
+    elif text or blocks:
+        return {"text": text, "blocks": blocks}
+    raise ValueError("Either data, text, or blocks must be provided")
 
 def send_slack_message(data: Optional[Dict[str, Any]] = None, 
                       text: Optional[str] = None, 
                       blocks: Optional[List[dict]] = None) -> bool:
+    """Blocking webhook post for scripts; the app uses slack_notify.outbox"""
+    import requests  # only scripts pay for it; the app never imports it
+
     SLACK_WEBHOOK_URL = os.getenv("SLACK_WEBHOOK_URL")
     if not SLACK_WEBHOOK_URL:
         raise ValueError("SLACK_WEBHOOK_URL environment variable not set")
 
     # Build the message payload
-    message = {}
-    if data:
-        message = {
-            "text": f"📋 KYB Case Review - {data.get('id', 'N/A')}",
-            "blocks": [
-                {
-                    "type": "section",
-                    "text": {
-                        "type": "mrkdwn",
-                        "text": format_kyb_message(data)
-                    }
-                },
-                *format_buttons(data.get('id', ''))  # Use the new button formatter
-            ]
-        }
-    elif text or blocks:
-        message = {"text": text, "blocks": blocks}
-    else:
-        raise ValueError("Either data, text, or blocks must be provided")
+    message = build_slack_payload(data, text, blocks)
 
     try:
-        response = requests.post(
-            SLACK_WEBHOOK_URL,
-            json=message,
-            timeout=10,
-            headers={'Content-Type': 'application/json'}
-        )
-        response.raise_for_status()
+        with _SLACK_SEND.time():
+            response = requests.post(
+                SLACK_WEBHOOK_URL,
+                json=message,
+                timeout=10,
+                headers={'Content-Type': 'application/json'}
+            )
+            response.raise_for_status()
         return True
     except requests.exceptions.RequestException as e:
         error_msg = f"Slack API Error: {str(e)}"
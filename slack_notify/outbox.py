@@ -0,0 +1,334 @@
+import os
+import time
+import random
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+import httpx
+
+from utils.metrics import get_metrics, stage
+from utils.request_context import bind_request_id, current_request_id
+from utils.retry import retry_after as parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Time waiting in the queue, then delivery including pacing and retries
+_SLACK_QUEUE = stage("slack_queue")
+_SLACK_SEND = stage("slack_send")
+
+# Called once a message is settled: with Slack's JSON reply (Web API) or
+# an empty dict (webhook) when delivered, with None when it failed
+OnDone = Callable[[Optional[Dict[str, Any]]], Awaitable[None]]
+
+
+class OutboundMessage:
+    """A Slack payload waiting in the outbox"""
+    __slots__ = ("payload", "url", "channel", "method", "on_done", "attempts", "enqueued_at", "request_id")
+
+    def __init__(self, payload: Dict[str, Any], url: str, channel: Optional[str] = None,
+                 method: Optional[str] = None, on_done: Optional[OnDone] = None):
+        self.payload = payload
+        self.url = url
+        self.channel = channel
+        # Web API method (chat.postMessage, chat.update); None for webhooks
+        self.method = method
+        self.on_done = on_done
+        self.attempts = 0
+        self.enqueued_at = time.monotonic()
+        self.request_id = current_request_id()
+
+    @property
+    def pacing_keys(self) -> List[str]:
+        # Web API calls share one URL per method, so pace them by channel only
+        keys = [] if self.method else [f"webhook:{self.url}"]
+        if self.channel:
+            keys.append(f"channel:{self.channel}")
+        return keys
+
+
+class KeyedRateLimiter:
+    """Minimum spacing between sends per key (webhook URL or channel).
+
+    Slack allows roughly one message per second per channel; a 429 pushes
+    the key's next slot out by the server's Retry-After.
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._next_allowed: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def acquire(self, key: str) -> None:
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            wait = self._next_allowed.get(key, 0.0) - now
+            if wait > 0:
+                await asyncio.sleep(wait)
+                now = time.monotonic()
+            self._next_allowed[key] = now + self.interval
+
+    def block(self, key: str, seconds: float) -> None:
+        until = time.monotonic() + seconds
+        if until > self._next_allowed.get(key, 0.0):
+            self._next_allowed[key] = until
+
+
+class SlackOutbox:
+    """Bounded in-memory queue of Slack posts drained by async workers.
+
+    Request handlers call ``enqueue`` (webhooks, response_url) or
+    ``enqueue_api_call`` (Web API) and return immediately; workers pace
+    delivery per webhook/channel, honor 429 Retry-After and retry transient
+    failures with jittered exponential backoff over one pooled client.
+    """
+
+    def __init__(
+        self,
+        webhook_url: Optional[str] = None,
+        workers: int = 4,
+        max_queue: int = 1000,
+        interval: float = 1.0,
+        max_retries: int = 5,
+        base_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+        timeout: float = 10.0,
+        api_url: Optional[str] = None,
+        api_token: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.webhook_url = webhook_url
+        self.api_url = (api_url or "https://slack.com/api/").rstrip("/") + "/"
+        self.api_token = api_token
+        self.workers = workers
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.limiter = KeyedRateLimiter(interval)
+        self.max_queue = max_queue
+        # Created in start() so the queue binds to the serving event loop
+        self._queue: Optional["asyncio.Queue[OutboundMessage]"] = None
+        self._timeout = timeout
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        self._tasks: List[asyncio.Task] = []
+        self._latencies: Deque[float] = deque(maxlen=2048)
+        self._stats = {
+            "enqueued": 0,
+            "sent": 0,
+            "failed": 0,
+            "retried": 0,
+            "rate_limited": 0,
+            "dropped": 0,
+        }
+
+    @classmethod
+    def from_env(cls, **overrides) -> "SlackOutbox":
+        settings = dict(
+            webhook_url=os.getenv("SLACK_WEBHOOK_URL"),
+            workers=int(os.getenv("SLACK_OUTBOX_WORKERS", 4)),
+            max_queue=int(os.getenv("SLACK_OUTBOX_MAX_QUEUE", 1000)),
+            interval=float(os.getenv("SLACK_OUTBOX_INTERVAL", 1.0)),
+            max_retries=int(os.getenv("SLACK_OUTBOX_MAX_RETRIES", 5)),
+            api_url=os.getenv("SLACK_API_URL"),
+            api_token=os.getenv("SLACK_API_TOKEN"),
+        )
+        settings.update(overrides)
+        return cls(**settings)
+
+    # ===== LIFECYCLE =====
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._client = httpx.AsyncClient(
+            timeout=self._timeout,
+            limits=httpx.Limits(max_connections=self.workers, max_keepalive_connections=self.workers),
+            headers={"Content-Type": "application/json"},
+            transport=self._transport,
+        )
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"slack-outbox-{i}")
+            for i in range(self.workers)
+        ]
+        logger.info("Slack outbox started with %s workers", self.workers)
+
+    async def stop(self, drain_timeout: float = 5.0) -> None:
+        """Give queued messages a chance to go out, then stop the workers"""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=drain_timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Slack outbox stopped before draining (%s still queued)", self._queue.qsize())
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # ===== PRODUCER SIDE =====
+    def enqueue(
+        self,
+        payload: Dict[str, Any],
+        webhook_url: Optional[str] = None,
+        channel: Optional[str] = None,
+    ) -> bool:
+        """Queue a payload for delivery; returns False if the outbox is full"""
+        url = webhook_url or self.webhook_url
+        if not url:
+            raise ValueError("SLACK_WEBHOOK_URL environment variable not set")
+        if self._queue is None:
+            raise RuntimeError("Slack outbox is not running")
+        return self._put(OutboundMessage(payload, url, channel or payload.get("channel")))
+
+    def enqueue_api_call(self, method: str, payload: Dict[str, Any],
+                         on_done: Optional[OnDone] = None) -> bool:
+        """Queue a Web API call such as chat.postMessage or chat.update.
+
+        ``on_done`` receives Slack's reply (with the message ``ts``) or
+        None if the call failed; returns False if the outbox is full.
+        """
+        if not self.api_token:
+            raise ValueError("SLACK_API_TOKEN environment variable not set")
+        if self._queue is None:
+            raise RuntimeError("Slack outbox is not running")
+        return self._put(OutboundMessage(payload, self.api_url + method, payload.get("channel"),
+                                         method=method, on_done=on_done))
+
+    def _put(self, message: OutboundMessage) -> bool:
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self._stats["dropped"] += 1
+            logger.error("Slack outbox full, dropping message")
+            return False
+        self._stats["enqueued"] += 1
+        return True
+
+    # ===== WORKERS =====
+    async def _worker(self, index: int) -> None:
+        while True:
+            message = await self._queue.get()
+            _SLACK_QUEUE.observe(time.monotonic() - message.enqueued_at)
+            # Logs and timings are attributed to the request that queued it
+            with bind_request_id(message.request_id):
+                try:
+                    reply = await self._send(message, index)
+                    if message.on_done is not None:
+                        await message.on_done(reply)
+                except Exception:
+                    logger.exception("Slack outbox callback failed")
+                finally:
+                    self._queue.task_done()
+
+    async def _send(self, message: OutboundMessage, index: int) -> Optional[Dict[str, Any]]:
+        try:
+            with _SLACK_SEND.time():
+                reply = await self._deliver(message)
+                if reply is None:
+                    _SLACK_SEND.errors.inc()
+                return reply
+        except Exception:
+            self._stats["failed"] += 1
+            logger.exception("Slack outbox worker %s failed to deliver", index)
+            return None
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter keeps retries from many workers from lining up
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * (2 ** attempt)))
+
+    async def _deliver(self, message: OutboundMessage) -> Optional[Dict[str, Any]]:
+        """Send with pacing and retries; Slack's reply ({} for webhooks), or None on failure"""
+        headers = {"Authorization": f"Bearer {self.api_token}"} if message.method else None
+        while True:
+            for key in message.pacing_keys:
+                await self.limiter.acquire(key)
+            message.attempts += 1
+            try:
+                response = await self._client.post(message.url, json=message.payload, headers=headers)
+            except httpx.RequestError as e:
+                response = None
+                error = str(e)
+            else:
+                error = f"Status: {response.status_code} | Response: {response.text}"
+
+            if response is not None and response.status_code < 300:
+                reply = response.json() if message.method else {}
+                if message.method and not reply.get("ok"):
+                    # The Web API reports errors in the body of a 200
+                    self._stats["failed"] += 1
+                    logger.error("Slack API Error: %s %s", message.method, reply.get('error'))
+                    return None
+                self._stats["sent"] += 1
+                self._latencies.append(time.monotonic() - message.enqueued_at)
+                return reply
+
+            if response is not None and response.status_code != 429 and response.status_code < 500:
+                self._stats["failed"] += 1
+                logger.error("Slack API Error: %s", error)
+                return None
+            if message.attempts > self.max_retries:
+                self._stats["failed"] += 1
+                logger.error("Slack API Error after %d attempts: %s", message.attempts, error)
+                return None
+
+            self._stats["retried"] += 1
+            if response is not None and response.status_code == 429:
+                self._stats["rate_limited"] += 1
+                retry_after = parse_retry_after(response)
+                if retry_after is None:
+                    retry_after = self._backoff(message.attempts)
+                for key in message.pacing_keys:
+                    self.limiter.block(key, retry_after)
+            else:
+                await asyncio.sleep(self._backoff(message.attempts))
+
+    # ===== OBSERVABILITY =====
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["queue_depth"] = self._queue.qsize() if self._queue is not None else 0
+        stats["queue_capacity"] = self.max_queue
+        latencies = sorted(self._latencies)
+        if latencies:
+            stats["send_latency_p50"] = round(latencies[len(latencies) // 2], 4)
+            stats["send_latency_p95"] = round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 4)
+            stats["send_latency_max"] = round(latencies[-1], 4)
+        return stats
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_outbox: Optional[SlackOutbox] = None
+
+_QUEUE_DEPTH = get_metrics().gauge("kyb_slack_outbox_queued", "Slack messages waiting in the outbox").labels()
+
+
+def _collect_queue_depth() -> None:
+    _QUEUE_DEPTH.set(_outbox._queue.qsize() if _outbox is not None and _outbox._queue is not None else 0)
+
+
+get_metrics().on_collect(_collect_queue_depth)
+
+
+def get_slack_outbox() -> SlackOutbox:
+    global _outbox
+    if _outbox is None:
+        _outbox = SlackOutbox.from_env()
+    return _outbox
+
+
+async def startup_slack_outbox() -> SlackOutbox:
+    outbox = get_slack_outbox()
+    await outbox.start()
+    return outbox
+
+
+async def shutdown_slack_outbox() -> None:
+    global _outbox
+    if _outbox is not None:
+        await _outbox.stop()
+        _outbox = None
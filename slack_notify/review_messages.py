@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import sqlite3
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, NamedTuple, Optional
+
+from slack_notify.outbox import SlackOutbox, get_slack_outbox
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = os.getenv("KYB_DATA_DIR", "data")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS review_messages (
+    case_id    TEXT PRIMARY KEY,
+    channel    TEXT,
+    ts         TEXT,
+    digest     TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Stores created before this had an evaluation column; it is left NULL
+_COLUMNS = "case_id, channel, ts, digest, updated_at"
+
+# publish() outcomes
+POSTED, UPDATED, UNCHANGED, COALESCED, DROPPED = "posted", "updated", "unchanged", "coalesced", "dropped"
+
+
+class ReviewMessage(NamedTuple):
+    """The Slack review message last published for a case"""
+    case_id: str
+    channel: Optional[str]
+    ts: Optional[str]  # None when posted through the webhook, which doesn't say
+    digest: str  # of the rendered payload
+    updated_at: float
+
+
+def payload_digest(payload: Dict[str, Any]) -> str:
+    """Stable hash of a rendered message, to tell whether an update changes it"""
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+class _InFlight:
+    """A post or update for a case that Slack hasn't confirmed yet"""
+    __slots__ = ("digest", "latest")
+
+    def __init__(self, digest: str):
+        self.digest = digest
+        # (payload, digest) rendered while this one was queued
+        self.latest: Optional[tuple] = None
+
+
+class ReviewMessages:
+    """Case ID -> its Slack review message, with in-place updates.
+
+    The first review of a case is posted; later ones edit that message
+    with chat.update, and only when the rendered text or buttons changed.
+    Posting through the Web API needs ``channel`` (and SLACK_API_TOKEN);
+    without it messages go to the incoming webhook, which can't be edited,
+    so changed reviews are posted again and unchanged ones are skipped.
+    While a case's message is still in the outbox, newer renderings are
+    coalesced: only the latest is sent once Slack has confirmed the first.
+    The mapping lives in SQLite (one dedicated thread) with an in-memory
+    copy, so updates keep editing the same message after a restart.
+    """
+
+    def __init__(self, path: Optional[str] = None, channel: Optional[str] = None,
+                 outbox: Optional[SlackOutbox] = None, max_cached: int = 10_000):
+        self.path = path or os.path.join(DEFAULT_DATA_DIR, "review_messages.db")
+        self.channel = channel
+        self.outbox = outbox
+        self.max_cached = max_cached
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="review-messages")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._records: "OrderedDict[str, ReviewMessage]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._stats = {POSTED: 0, UPDATED: 0, UNCHANGED: 0, COALESCED: 0, DROPPED: 0, "failed": 0}
+
+    @classmethod
+    def from_env(cls, **overrides) -> "ReviewMessages":
+        settings = dict(
+            path=os.getenv("REVIEW_MESSAGES_PATH"),
+            channel=os.getenv("SLACK_REVIEW_CHANNEL"),
+        )
+        settings.update(overrides)
+        return cls(**settings)
+
+    # ===== SYNC SIDE (store thread only) =====
+    def _open_sync(self) -> int:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # Losing the last mapping to an OS crash only means one extra post
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+        return conn.execute("SELECT COUNT(*) FROM review_messages").fetchone()[0]
+
+    def _get_sync(self, case_id: str) -> Optional[ReviewMessage]:
+        row = self._conn.execute(
+            f"SELECT {_COLUMNS} FROM review_messages WHERE case_id = ?", (case_id,)
+        ).fetchone()
+        return ReviewMessage(*row) if row else None
+
+    def _save_sync(self, record: ReviewMessage) -> None:
+        self._conn.execute(f"INSERT OR REPLACE INTO review_messages ({_COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                           record)
+
+    def _close_sync(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ===== ASYNC API =====
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def open(self) -> None:
+        stored = await self._run(self._open_sync)
+        logger.info("Review message store opened (%s cases%s)", stored,
+                    f", channel {self.channel}" if self.channel else ", webhook only")
+
+    async def close(self) -> None:
+        await self._run(self._close_sync)
+
+    async def get(self, case_id: str) -> Optional[ReviewMessage]:
+        record = self._records.get(case_id)
+        if record is None and self._conn is not None:
+            record = await self._run(self._get_sync, case_id)
+            if record is not None:
+                self._cache(record)
+        return record
+
+    async def has_message(self, case_id: str) -> bool:
+        return case_id in self._in_flight or await self.get(case_id) is not None
+
+    async def publish(self, case_id: str, payload: Dict[str, Any], repost: bool = False) -> str:
+        """Post or update the review message for a case; returns what happened.
+
+        ``repost`` always sends a new message (a /kyb request), which
+        then becomes the one later updates edit.
+        """
+        digest = payload_digest(payload)
+        in_flight = self._in_flight.get(case_id)
+        if in_flight is not None and not repost:
+            latest = in_flight.latest[1] if in_flight.latest else in_flight.digest
+            if digest == latest:
+                return self._count(UNCHANGED)
+            in_flight.latest = (payload, digest)
+            return self._count(COALESCED)
+
+        record = None if repost else await self.get(case_id)
+        if not repost and case_id in self._in_flight:
+            # Another review of this case was sent while we looked it up
+            return await self.publish(case_id, payload)
+        if record is not None and record.digest == digest:
+            return self._count(UNCHANGED)
+        return await self._send(case_id, payload, digest, record)
+
+    async def _send(self, case_id: str, payload: Dict[str, Any], digest: str,
+                    record: Optional[ReviewMessage]) -> str:
+        outbox = self.outbox or get_slack_outbox()
+        in_flight = _InFlight(digest)
+
+        async def on_done(reply: Optional[Dict[str, Any]]) -> None:
+            await self._settled(case_id, in_flight, digest, record, reply)
+
+        if record is not None and record.ts:
+            outcome = UPDATED
+            queued = outbox.enqueue_api_call(
+                "chat.update", dict(payload, channel=record.channel, ts=record.ts), on_done=on_done)
+        elif self.channel:
+            outcome = POSTED
+            queued = outbox.enqueue_api_call("chat.postMessage", dict(payload, channel=self.channel),
+                                             on_done=on_done)
+        else:
+            outcome = POSTED
+            queued = outbox.enqueue(payload)
+            if queued:
+                # Webhook posts don't report back; record the rendering now
+                await self._save(ReviewMessage(case_id, None, None, digest, time.time()))
+                return self._count(outcome)
+        if not queued:
+            return self._count(DROPPED)
+        self._in_flight[case_id] = in_flight
+        return self._count(outcome)
+
+    async def _settled(self, case_id: str, in_flight: _InFlight, digest: str,
+                       record: Optional[ReviewMessage], reply: Optional[Dict[str, Any]]) -> None:
+        if reply is None:
+            self._stats["failed"] += 1
+        else:
+            channel = reply.get("channel") or (record.channel if record else self.channel)
+            ts = reply.get("ts") or (record.ts if record else None)
+            await self._save(ReviewMessage(case_id, channel, ts, digest, time.time()))
+        # Reviews arriving until now were coalesced into in_flight.latest
+        if self._in_flight.get(case_id) is in_flight:
+            del self._in_flight[case_id]
+        latest = in_flight.latest
+        if latest is not None and case_id not in self._in_flight:
+            # Rendered while this one was in the outbox; send just the newest
+            await self.publish(case_id, latest[0])
+
+    async def _save(self, record: ReviewMessage) -> None:
+        self._cache(record)
+        if self._conn is not None:
+            await self._run(self._save_sync, record)
+
+    def _cache(self, record: ReviewMessage) -> None:
+        self._records[record.case_id] = record
+        self._records.move_to_end(record.case_id)
+        while len(self._records) > self.max_cached:
+            self._records.popitem(last=False)
+
+    def _count(self, outcome: str) -> str:
+        self._stats[outcome] += 1
+        return outcome
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["in_flight"] = len(self._in_flight)
+        stats["cached"] = len(self._records)
+        stats["channel"] = self.channel
+        return stats
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_review_messages: Optional[ReviewMessages] = None
+
+
+def get_review_messages() -> ReviewMessages:
+    global _review_messages
+    if _review_messages is None:
+        _review_messages = ReviewMessages.from_env()
+    return _review_messages
@@ -0,0 +1,83 @@
+import os
+import asyncio
+import logging
+from typing import Optional
+
+import aiohttp
+from slack_bolt.authorization import AuthorizeResult
+from slack_bolt.authorization.async_authorize import AsyncAuthorize
+from slack_sdk.web.async_client import AsyncWebClient
+from slack_sdk.web.async_slack_response import AsyncSlackResponse
+
+logger = logging.getLogger(__name__)
+
+
+def create_slack_web_client(token: Optional[str] = None) -> AsyncWebClient:
+    """Web API client for the async Bolt app.
+
+    The aiohttp session is attached in ``startup_slack_web_client`` so it
+    is created on the serving loop; until then the SDK falls back to a
+    session per call.
+    """
+    return AsyncWebClient(
+        token=token or os.getenv("SLACK_API_TOKEN"),
+        base_url=os.getenv("SLACK_API_URL", AsyncWebClient.BASE_URL),
+        timeout=int(os.getenv("SLACK_API_TIMEOUT", 10)),
+    )
+
+
+async def startup_slack_web_client(client: AsyncWebClient) -> None:
+    """Give the client one pooled keep-alive session for all Web API calls"""
+    if client.session is None or client.session.closed:
+        connector = aiohttp.TCPConnector(
+            limit=int(os.getenv("SLACK_API_MAX_CONNECTIONS", 20)),
+            keepalive_timeout=float(os.getenv("SLACK_API_KEEPALIVE_EXPIRY", 30)),
+        )
+        client.session = aiohttp.ClientSession(connector=connector)
+        logger.info("Slack Web API session opened")
+
+
+async def shutdown_slack_web_client(client: AsyncWebClient) -> None:
+    if client.session is not None and not client.session.closed:
+        await client.session.close()
+        logger.info("Slack Web API session closed")
+    client.session = None
+
+
+class SingleWorkspaceAuthorize(AsyncAuthorize):
+    """Bolt ``authorize`` for the one workspace this bot is installed in.
+
+    auth.test runs once, from ``prefetch`` at startup or else on the
+    first request (concurrent requests wait for that one call), and every
+    request after that is authorized from memory, so acks never wait on Slack.
+    """
+
+    def __init__(self, client: AsyncWebClient):
+        super().__init__()
+        self.client = client
+        self._auth_test: Optional[AsyncSlackResponse] = None
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def prefetch(self) -> None:
+        await self._result()
+
+    async def _result(self) -> AsyncSlackResponse:
+        if self._auth_test is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self._auth_test is None:
+                    self._auth_test = await self.client.auth_test()
+        return self._auth_test
+
+    async def __call__(self, *, context, enterprise_id, team_id, user_id, **kwargs) -> AuthorizeResult:
+        auth = await self._result()
+        return AuthorizeResult(
+            enterprise_id=auth.get("enterprise_id"),
+            team_id=auth.get("team_id"),
+            bot_id=auth.get("bot_id"),
+            bot_user_id=auth.get("user_id"),
+            bot_token=self.client.token,
+            user_id=user_id,
+            bot_scopes=auth.headers.get("x-oauth-scopes"),
+        )
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+from benchmarks.bench_policy import legacy_validate_kyb_checklist, make_cases
+from persona_client.models import decode_case
+from utils.batch import validate_kyb_checklist_batch
+from utils.policy import RULE_POA_EXPIRED, RULE_PROHIBITED_COUNTRY, PolicyEngine
+
+# Without the screening index get_policy_engine may attach from data/
+ENGINE = PolicyEngine.from_file()
+
+
+def clean_case(**business):
+    return {
+        "id": "case_clean",
+        "business": dict({"name": "Acme", "legal_name": "Acme LLC", "ein": "12-3456789",
+                          "address": "1 Main St", "incorporation_country": "US", "country": "United States"},
+                         **business),
+        "control_person": {"full_name": "Jane Doe"},
+        "beneficial_owners": [{"full_name": "Owner", "ownership": 30}],
+        "proof_of_address": {"status": "approved"},
+        "verification_results": {"watchlist": "clear", "pep": "clear"},
+        "form_filler": {"email": "ops@example.com"},
+    }
+
+
+def test_engine_matches_legacy_checklist():
+    for case in make_cases(3000):
+        legacy = legacy_validate_kyb_checklist(case)
+        result = ENGINE.evaluate(case).to_checklist()
+        assert (result["passed"], result["failures"], result["contact_email"]) == \
+               (legacy["passed"], legacy["failures"], legacy["contact_email"]), case["id"]
+
+
+def test_engine_matches_legacy_on_edge_cases():
+    edge_cases = [
+        {},
+        {"business": {}, "beneficial_owners": [{"full_name": "No Share"}], "watchlist_hits": {"business": True}},
+        clean_case(),
+        clean_case(country=None, industry="Retail"),
+        dict(clean_case(), proof_of_address={"status": "pending", "document_date": "2020-1-5"}),
+        dict(clean_case(), watchlist_hits={"beneficial_owners": True, "control_person": True}),
+    ]
+    for case in edge_cases:
+        assert ENGINE.evaluate(case).to_checklist()["failures"] == legacy_validate_kyb_checklist(case)["failures"]
+
+
+def test_model_path_and_batch_match_dict_path():
+    as_of = datetime.now()
+    cases = make_cases(500)
+    batch = validate_kyb_checklist_batch(cases, as_of, engine=ENGINE)
+    for i, case in enumerate(cases):
+        expected = ENGINE.evaluate(case, as_of=as_of)
+        assert ENGINE.evaluate_model(decode_case(case), as_of).rule_ids == expected.rule_ids
+        assert batch[i] == expected.to_checklist()
+
+
+def test_prohibited_country_matches_iso_code_and_address_fallback():
+    for country in ("Afghanistan", " afghanistan ", "AF"):
+        assert RULE_PROHIBITED_COUNTRY in ENGINE.evaluate(clean_case(country=country)).rule_ids, country
+    fallback = clean_case(country=None, physical_address={"country": "AF"})
+    assert RULE_PROHIBITED_COUNTRY in ENGINE.evaluate(fallback).rule_ids
+    assert ENGINE.evaluate(clean_case()).passed
+
+
+def test_proof_of_address_expires_after_max_age():
+    as_of = datetime(2026, 6, 1, 12, 0)
+
+    def expired(document_date):
+        case = dict(clean_case(), proof_of_address={"status": "pending", "document_date": document_date})
+        return RULE_POA_EXPIRED in ENGINE.evaluate(case, as_of=as_of).rule_ids
+
+    assert expired((as_of - ENGINE.poa_max_age - timedelta(days=1)).date().isoformat())
+    assert not expired((as_of - ENGINE.poa_max_age + timedelta(days=1)).date().isoformat())
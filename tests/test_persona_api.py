@@ -0,0 +1,286 @@
+import asyncio
+
+import httpx
+import pytest
+
+from persona_client.cache import CaseCache
+from persona_client.models import decode_case
+from persona_client.resilience import CircuitBreaker, CircuitOpenError, Resilience, RetryBudget
+from utils.webhook_queue import WebhookProcessor, WebhookQueue
+
+
+def make_case(case_id, name="Acme"):
+    return decode_case({"id": case_id, "business": {"name": name}})
+
+
+class FakePersona:
+    """Fetcher for CaseCache that records calls and can be held mid-request"""
+
+    def __init__(self):
+        self.calls = []
+        self.release = asyncio.Event()
+        self.release.set()
+        self.error = None
+        self.name = "Acme"
+
+    async def __call__(self, case_id, etag):
+        self.calls.append((case_id, etag))
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        if etag == "v1" and self.name == "Acme":
+            return None, etag  # 304 Not Modified
+        return make_case(case_id, self.name), "v1"
+
+
+# ===== CASE CACHE =====
+def test_concurrent_requests_share_one_fetch():
+    async def run():
+        persona = FakePersona()
+        persona.release.clear()
+        cache = CaseCache(fetcher=persona)
+        waiters = [asyncio.ensure_future(cache.get_case("case_1")) for _ in range(5)]
+        await asyncio.sleep(0)
+        persona.release.set()
+        cases = await asyncio.gather(*waiters)
+        assert all(case is cases[0] for case in cases)
+        assert await cache.get_case("case_1") is cases[0]
+        return persona.calls, cache.stats()
+
+    calls, stats = asyncio.run(run())
+    assert calls == [("case_1", None)]
+    assert (stats["misses"], stats["coalesced"], stats["hits"], stats["inflight"]) == (1, 4, 1, 0)
+
+
+def test_one_caller_cancelling_does_not_cancel_the_shared_fetch():
+    async def run():
+        persona = FakePersona()
+        persona.release.clear()
+        cache = CaseCache(fetcher=persona)
+        first = asyncio.ensure_future(cache.get_case("case_1"))
+        second = asyncio.ensure_future(cache.get_case("case_1"))
+        await asyncio.sleep(0)
+        first.cancel()
+        persona.release.set()
+        case = await second
+        return persona.calls, case, first.cancelled()
+
+    calls, case, cancelled = asyncio.run(run())
+    assert cancelled and case.id == "case_1" and len(calls) == 1
+
+
+def test_stale_entry_is_revalidated_with_its_etag():
+    async def run():
+        persona = FakePersona()
+        cache = CaseCache(ttl=0, fetcher=persona)
+        first = await cache.get_case("case_1")
+        second = await cache.get_case("case_1")
+        return persona.calls, first, second, cache.stats()
+
+    calls, first, second, stats = asyncio.run(run())
+    assert calls == [("case_1", None), ("case_1", "v1")]
+    assert second is first and stats["revalidated"] == 1
+
+
+def test_invalidate_refetches_without_etag():
+    async def run():
+        persona = FakePersona()
+        cache = CaseCache(fetcher=persona)
+        await cache.get_case("case_1")
+        persona.name = "Acme Renamed"
+        assert cache.invalidate("case_1")
+        case = await cache.get_case("case_1")
+        return persona.calls, case
+
+    calls, case = asyncio.run(run())
+    assert calls == [("case_1", None), ("case_1", None)]
+    assert case.business.name == "Acme Renamed"
+
+
+def test_invalidate_during_fetch_discards_its_result():
+    async def run():
+        persona = FakePersona()
+        persona.release.clear()
+        cache = CaseCache(fetcher=persona)
+        before = asyncio.ensure_future(cache.get_case("case_1"))
+        await asyncio.sleep(0)
+        cache.invalidate("case_1")
+        persona.name = "Acme Renamed"
+        persona.release.set()
+        await before
+        assert cache.peek("case_1") is None
+        return await cache.get_case("case_1"), len(persona.calls)
+
+    case, fetches = asyncio.run(run())
+    assert case.business.name == "Acme Renamed" and fetches == 2
+
+
+def test_invalidated_case_is_served_stale_while_persona_is_down():
+    async def run():
+        persona = FakePersona()
+        cache = CaseCache(fetcher=persona)
+        await cache.get_case("case_1")
+        cache.invalidate("case_1")
+        persona.error = httpx.ConnectError("down")
+        stale = await cache.get_case("case_1")
+        with pytest.raises(httpx.ConnectError):
+            await cache.get_case("case_1", allow_stale=False)
+        with pytest.raises(httpx.ConnectError):
+            await cache.get_case("case_2")
+        return stale
+
+    stale = asyncio.run(run())
+    assert stale.id == "case_1" and stale.stale_since is not None
+
+
+# ===== CIRCUIT BREAKER AND RETRY BUDGET =====
+def test_breaker_opens_then_lets_one_trial_through():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+    breaker.opened_at -= 60
+    assert breaker.allow() and breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # only one trial at a time
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN and not breaker.allow()
+
+    breaker.opened_at -= 60
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.failures == 0 and breaker.allow()
+
+
+def test_retry_budget_is_a_fraction_of_requests():
+    budget = RetryBudget(ratio=0.5, min_per_s=0, max_tokens=2)
+    assert budget.withdraw() and budget.withdraw()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+
+
+def failing_send(calls, status=503):
+    async def send(timeout):
+        calls.append(timeout)
+        return httpx.Response(status)
+    return send
+
+
+def test_retries_stop_when_the_budget_is_spent():
+    async def run():
+        calls = []
+        resilience = Resilience(max_retries=5, backoff_base=0, breaker_failures=100,
+                                budget=RetryBudget(ratio=0, min_per_s=0, max_tokens=1))
+        response = await resilience.call(failing_send(calls))
+        return response, calls, resilience.stats()
+
+    response, calls, stats = asyncio.run(run())
+    assert response.status_code == 503
+    assert len(calls) == 2
+    assert (stats["retries"], stats["budget_exhausted"]) == (1, 1)
+
+
+def test_open_breaker_fails_fast():
+    async def run():
+        calls = []
+        resilience = Resilience(max_retries=5, backoff_base=0, breaker_failures=2, breaker_reset=60)
+        first = await resilience.call(failing_send(calls))
+        with pytest.raises(CircuitOpenError):
+            await resilience.call(failing_send(calls))
+        return first, calls, resilience.stats()
+
+    first, calls, stats = asyncio.run(run())
+    assert first.status_code == 503 and len(calls) == 2
+    assert stats["breaker_state"] == CircuitBreaker.OPEN
+    assert (stats["breaker_opened"], stats["breaker_rejected"]) == (1, 2)
+
+
+def test_non_idempotent_calls_are_not_retried():
+    async def run():
+        calls = []
+        response = await Resilience(backoff_base=0).call(failing_send(calls), idempotent=False)
+        return response, calls
+
+    response, calls = asyncio.run(run())
+    assert response.status_code == 503 and len(calls) == 1
+
+
+# ===== WEBHOOK QUEUE =====
+def test_redelivered_events_are_stored_once(tmp_path):
+    async def run():
+        queue = WebhookQueue(path=str(tmp_path / "queue.db"))
+        await queue.open()
+        try:
+            stored = [await queue.put("evt_1", "case_1", "case.updated", b"{}") for _ in range(3)]
+            claimed = await queue.claim()
+            return stored, claimed, await queue.stats()
+        finally:
+            await queue.close()
+
+    stored, claimed, stats = asyncio.run(run())
+    assert stored == [True, False, False]
+    assert [event["event_id"] for event in claimed] == ["evt_1"]
+    assert (stats["received"], stats["duplicates"]) == (1, 2)
+
+
+def test_events_claimed_before_a_crash_are_redelivered(tmp_path):
+    path = str(tmp_path / "queue.db")
+
+    async def crash():
+        queue = WebhookQueue(path=path)
+        await queue.open()
+        await queue.put("evt_1", "case_1", "case.updated", b'{"n": 1}')
+        await queue.put("evt_2", "case_2", "case.updated", b'{"n": 2}')
+        assert len(await queue.claim()) == 2
+        await queue.complete("evt_2")
+        await queue.close()  # evt_1 is still "processing"
+
+    async def restart():
+        queue = WebhookQueue(path=path)
+        await queue.open()
+        try:
+            return await queue.claim(), await queue.stats()
+        finally:
+            await queue.close()
+
+    asyncio.run(crash())
+    claimed, stats = asyncio.run(restart())
+    assert [(event["event_id"], event["attempts"]) for event in claimed] == [("evt_1", 2)]
+    assert stats["by_status"] == {"processing": 1, "done": 1}
+
+
+def test_processor_retries_then_dead_letters(tmp_path):
+    async def run():
+        queue = WebhookQueue(path=str(tmp_path / "queue.db"), max_attempts=2, retry_delay=0)
+        await queue.open()
+        handled = []
+
+        async def handler(event):
+            handled.append((event["event_id"], event["data"]))
+            if event["event_id"] == "evt_bad":
+                raise ValueError("boom")
+
+        processor = WebhookProcessor(queue, handler, workers=2, idle_interval=0.01)
+        await queue.put("evt_ok", "case_1", "case.updated", b'{"ok": true}')
+        await queue.put("evt_bad", "case_2", "case.updated", b'{"ok": false}')
+        await processor.start()
+        processor.notify()
+        for _ in range(200):
+            if (await queue.stats())["by_status"] == {"done": 1, "failed": 1}:
+                break
+            await asyncio.sleep(0.01)
+        await processor.stop()
+        stats = await queue.stats()
+        await queue.close()
+        return handled, stats
+
+    handled, stats = asyncio.run(run())
+    assert handled.count(("evt_ok", {"ok": True})) == 1
+    assert handled.count(("evt_bad", {"ok": False})) == 2
+    assert stats["by_status"] == {"done": 1, "failed": 1}
+    assert (stats["processed"], stats["retried"], stats["dead"]) == (1, 1, 1)
@@ -0,0 +1,68 @@
+import asyncio
+import json
+import sqlite3
+
+from utils.audit_log import GENESIS_HASH, AuditLog
+
+
+# ===== REVIEWER AUDIT TRAIL =====
+def append_actions(path, actions):
+    async def run():
+        log = AuditLog(path=path)
+        await log.open()
+        try:
+            records = await asyncio.gather(*[
+                log.append(action, case_id, reviewer="U123", details={"channel": "C1"})
+                for action, case_id in actions
+            ])
+            return records, await log.verify(), log.stats()
+        finally:
+            await log.close()
+
+    return asyncio.run(run())
+
+
+def test_concurrent_approvals_form_one_verified_chain(tmp_path):
+    path = str(tmp_path / "audit.db")
+    records, verified, stats = append_actions(path, [("approve", f"case_{i}") for i in range(20)])
+    assert [record.seq for record in records] == list(range(1, 21))
+    assert records[0].prev_hash == GENESIS_HASH
+    assert all(later.prev_hash == earlier.hash for earlier, later in zip(records, records[1:]))
+    assert verified == (True, 20, None)
+    assert stats["appended"] == 20 and stats["commits"] < 20  # group commit
+
+    # Reopening continues the same chain
+    more, verified, _ = append_actions(path, [("reject", "case_0")])
+    assert more[0].seq == 21 and more[0].prev_hash == records[-1].hash
+    assert verified == (True, 21, None)
+
+
+def test_audit_log_rejects_edits_and_verify_finds_tampering(tmp_path):
+    path = str(tmp_path / "audit.db")
+    append_actions(path, [("approve", "case_1"), ("approve", "case_2"), ("reject", "case_3")])
+
+    conn = sqlite3.connect(path)
+    try:
+        try:
+            conn.execute("UPDATE audit_log SET action = 'reject' WHERE seq = 2")
+        except sqlite3.DatabaseError as e:
+            assert "append-only" in str(e)
+        else:
+            raise AssertionError("audit log accepted an UPDATE")
+        # Someone with file access can still drop the trigger; verify catches the edit
+        conn.execute("DROP TRIGGER audit_log_no_update")
+        conn.execute("UPDATE audit_log SET details = ? WHERE seq = 2", (json.dumps({"channel": "C2"}),))
+        conn.commit()
+    finally:
+        conn.close()
+
+    async def verify():
+        log = AuditLog(path=path)
+        await log.open()
+        try:
+            return await log.verify()
+        finally:
+            await log.close()
+
+    assert asyncio.run(verify()) == (False, 1, 2)
+
@@ -0,0 +1,42 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+
+from slack_notify.outbox import SlackOutbox
+from utils.retry import retry_after as parse_retry_after
+
+
+def test_retry_after_seconds_date_and_garbage():
+    def retry_after(value):
+        return parse_retry_after(httpx.Response(429, headers={"Retry-After": value}))
+
+    assert retry_after("3") == 3.0
+    assert retry_after("soon") is None
+    assert retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    in_a_second = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=1), usegmt=True)
+    assert 0.0 <= retry_after(in_a_second) <= 1.0
+    assert parse_retry_after(httpx.Response(429)) is None
+
+
+def test_rate_limited_with_http_date_is_retried():
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(429, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"})
+        return httpx.Response(200, text="ok")
+
+    async def run():
+        outbox = SlackOutbox(webhook_url="https://hooks.example/x", interval=0, base_backoff=0.01,
+                             transport=httpx.MockTransport(handler))
+        await outbox.start()
+        assert outbox.enqueue({"text": "hi"})
+        await outbox.stop(drain_timeout=5)
+        return outbox.stats()
+
+    stats = asyncio.run(run())
+    assert len(calls) == 2
+    assert (stats["sent"], stats["rate_limited"], stats["failed"]) == (1, 1, 0)
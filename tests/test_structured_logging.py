@@ -0,0 +1,13 @@
+from utils.structured_logging import Redactor
+
+
+def test_field_names_inside_other_words_are_not_masked():
+    redactor = Redactor()
+    assert redactor.text("protein: 5 grams") == "protein: 5 grams"
+    assert redactor.text("Stein: 4, vein=3") == "Stein: 4, vein=3"
+
+
+def test_sensitive_fields_are_masked():
+    redactor = Redactor()
+    assert redactor.text('{"ssn": "123", "dob": "1990-01-01"}') == '{"ssn": [REDACTED], "dob": [REDACTED]}'
+    assert redactor.text("user_ssn=1 tax-id: 9") == "user_ssn=[REDACTED] tax-id: [REDACTED]"
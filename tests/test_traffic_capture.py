@@ -0,0 +1,84 @@
+import json
+
+from utils.structured_logging import REDACTED, Redactor
+from utils.traffic_capture import CaptureRedactor, encode_body
+
+INQUIRY_WEBHOOK = {
+    "data": {
+        "type": "event",
+        "id": "evt_abc123",
+        "attributes": {
+            "name": "inquiry.completed",
+            "created-at": "2026-10-01T12:00:00.000Z",
+            "payload": {
+                "data": {
+                    "type": "inquiry",
+                    "id": "inq_abc123",
+                    "attributes": {
+                        "status": "completed",
+                        "reference-id": "case_42",
+                        "name-first": "Jane",
+                        "name-middle": "Q",
+                        "name-last": "Doe",
+                        "birthdate": "1980-01-01",
+                        "address-street-1": "1 Main St",
+                        "address-street-2": "Apt 4",
+                        "address-city": "Springfield",
+                        "address-subdivision": "Illinois",
+                        "address-subdivision-abbr": "IL",
+                        "address-postal-code": "62701",
+                        "address-country-code": "US",
+                        "email-address": "jane@example.com",
+                        "phone-number": "+1 555 0100",
+                        "identification-number": "D1234567",
+                        "ip-address": "203.0.113.7",
+                        "fields": {
+                            "name-first": {"type": "string", "value": "Jane"},
+                            "identification-number": {"type": "string", "value": "D1234567"},
+                            "address-city": {"type": "string", "value": "Springfield"},
+                            "ssn": {"type": "string", "value": "123-45-6789"},
+                        },
+                    },
+                    "relationships": {"reports": {"data": [{"type": "report/watchlist", "id": "rep_1"}]}},
+                },
+            },
+        },
+    },
+}
+
+
+def redact(payload):
+    body_format, body = CaptureRedactor(b"k" * 16, Redactor()).body("application/json", json.dumps(payload).encode())
+    assert body_format == "json"
+    return body
+
+
+def test_persona_inquiry_pii_is_masked():
+    attributes = redact(INQUIRY_WEBHOOK)["data"]["attributes"]["payload"]["data"]["attributes"]
+    for key in ("name-first", "name-middle", "name-last", "birthdate", "address-street-1", "address-street-2",
+                "address-city", "address-subdivision", "address-subdivision-abbr", "address-postal-code",
+                "email-address", "phone-number", "identification-number", "ip-address"):
+        assert attributes[key] == REDACTED, key
+    for key in ("name-first", "identification-number", "address-city", "ssn"):
+        assert attributes["fields"][key] == REDACTED, key
+    assert attributes["address-country-code"] == "US"
+    assert "D1234567" not in json.dumps(attributes) and "203.0.113.7" not in json.dumps(attributes)
+
+
+def test_persona_ids_and_event_name_are_kept():
+    event = redact(INQUIRY_WEBHOOK)["data"]
+    inquiry = event["attributes"]["payload"]["data"]
+    assert (event["id"], event["attributes"]["name"]) == ("evt_abc123", "inquiry.completed")
+    assert (inquiry["id"], inquiry["attributes"]["reference-id"]) == ("inq_abc123", "case_42")
+    assert inquiry["relationships"]["reports"]["data"][0]["id"] == "rep_1"
+
+
+def test_slack_command_credentials_masked_and_user_pseudonymized():
+    redactor = CaptureRedactor(b"k" * 16, Redactor())
+    body = b"token=abc&user_id=U123&user_name=jane&text=case_1&response_url=https%3A%2F%2Fhooks.slack.com%2Fx"
+    body_format, fields = redactor.body("application/x-www-form-urlencoded", body)
+    assert body_format == "form"
+    assert fields["token"] == fields["response_url"] == fields["user_name"] == REDACTED
+    assert fields["user_id"] == redactor.pseudonym("U123") != "U123"
+    assert fields["text"] == "case_1"
+    assert b"hooks.slack.com" not in encode_body(body_format, fields)
@@ -0,0 +1,202 @@
+"""Screen existing Persona cases in bulk and write NDJSON results.
+
+Pages through GET /cases, fetches each case with bounded concurrency,
+runs it through the checklist and appends one JSON line per case. After
+every page the output is flushed and the listing cursor is checkpointed,
+so an interrupted run picks up where it stopped.
+
+Examples:
+    python -m tools.backfill --output backfill.jsonl
+    python -m tools.backfill --output backfill.jsonl --mock-cases 5000
+    python -m tools.backfill --output backfill.jsonl --base-url http://localhost:9000/api/v1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
+
+import httpx
+
+from persona_client.client import PersonaClient
+from persona_client.models import Case, decode_case, with_related
+from utils.policy import PolicyEngine, get_policy_engine
+
+logger = logging.getLogger("backfill")
+
+
+# ===== CHECKPOINTS =====
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    # Write-then-rename so a crash never leaves a half-written checkpoint
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+# ===== PIPELINE STAGES =====
+async def iter_pages(client: PersonaClient, page_size: int,
+                     cursor: Optional[str]) -> AsyncIterator[Tuple[List[Dict[str, Any]], Optional[str]]]:
+    """Yield (case summaries, next cursor) one listing page at a time"""
+    async for page in client.paginate("/cases", page_size=page_size, cursor=cursor):
+        yield page.get("data") or [], (page.get("links") or {}).get("next")
+
+
+async def fetch_cases(client: PersonaClient, summaries: List[Dict[str, Any]],
+                      semaphore: asyncio.Semaphore) -> List[Union[Case, Dict[str, Any]]]:
+    """Fetch, decode and complete (related objects) the cases of one page, ``semaphore`` cases at a time"""
+    async def fetch(summary):
+        async with semaphore:
+            try:
+                case, _ = await client.get_case_if_modified(summary["id"], decode=decode_case)
+                if case.related:
+                    # As the live path does (persona_client.cache): reports, documents, inquiries
+                    fetched, missing = await client.get_related(case.related)
+                    case = with_related(case, fetched, missing)
+                return case
+            except httpx.HTTPError as e:
+                return {"id": summary["id"], "_error": str(e)}
+            except ValueError as e:
+                return {"id": summary["id"], "_error": f"Invalid case data: {e}"}
+    return await asyncio.gather(*(fetch(s) for s in summaries))
+
+
+def screen(cases: List[Union[Case, Dict[str, Any]]], engine: PolicyEngine,
+           as_of: datetime) -> Iterator[Dict[str, Any]]:
+    """Lazily turn fetched cases (or their fetch errors) into result rows"""
+    expired_through = engine.expired_through(as_of)
+    for case in cases:
+        if isinstance(case, dict):
+            yield {"case_id": case["id"], "screened_at": as_of.isoformat(), "error": case["_error"]}
+            continue
+        row = {"case_id": case.id, "screened_at": as_of.isoformat()}
+        try:
+            result = engine.evaluate(case, expired_through=expired_through)
+        except ValueError as e:
+            row["error"] = f"Invalid case data: {e}"
+            yield row
+            continue
+        row.update(
+            status=case.status,
+            passed=result.passed,
+            needs_review=result.needs_review,
+            failures=[f.message for f in result.failures],
+            rule_ids=result.rule_ids,
+        )
+        yield row
+
+
+# ===== DRIVER =====
+async def run_backfill(client: PersonaClient, output: str, checkpoint: str,
+                       page_size: int = 100, concurrency: int = 8,
+                       limit: Optional[int] = None, restart: bool = False) -> Dict[str, Any]:
+    state = None if restart else load_checkpoint(checkpoint)
+    if state and state.get("done"):
+        logger.info("Checkpoint says the backfill already finished; use --restart to run again")
+        return state
+    if state is None:
+        state = {"next": None, "cases": 0, "pages": 0, "output_offset": 0,
+                 "as_of": datetime.now().isoformat(), "done": False}
+        mode = "w"
+    else:
+        logger.info(f"Resuming after {state['cases']} cases ({state['pages']} pages)")
+        mode = "r+" if os.path.exists(output) else "w"
+
+    as_of = datetime.fromisoformat(state["as_of"])
+    engine = get_policy_engine()
+    semaphore = asyncio.Semaphore(concurrency)
+    started = time.monotonic()
+    screened = 0
+
+    with open(output, mode, encoding="utf-8") as out:
+        # Drop anything written after the last checkpoint (a partial page)
+        out.seek(state["output_offset"])
+        out.truncate()
+        async for summaries, next_cursor in iter_pages(client, page_size, state["next"]):
+            cases = await fetch_cases(client, summaries, semaphore)
+            for row in screen(cases, engine, as_of):
+                out.write(json.dumps(row) + "\n")
+            out.flush()
+            os.fsync(out.fileno())
+
+            screened += len(summaries)
+            state.update(
+                next=next_cursor,
+                cases=state["cases"] + len(summaries),
+                pages=state["pages"] + 1,
+                output_offset=out.tell(),
+                done=next_cursor is None,
+            )
+            save_checkpoint(checkpoint, state)
+            rate = screened / max(time.monotonic() - started, 1e-9)
+            logger.info(f"{state['cases']} cases screened ({rate:.0f}/s)")
+            if limit is not None and state["cases"] >= limit:
+                break
+    return state
+
+
+def build_client(args) -> PersonaClient:
+    if args.mock_cases:
+        from tools.mock_persona import create_mock_persona_app
+        transport = httpx.ASGITransport(app=create_mock_persona_app(args.mock_cases, related=args.mock_related))
+        return PersonaClient(api_key="mock", base_url="http://mock-persona/api/v1", transport=transport)
+    overrides = {"max_connections": max(args.concurrency, 1)}
+    if args.base_url:
+        overrides["base_url"] = args.base_url
+    return PersonaClient.from_env(**overrides)
+
+
+async def main_async(args) -> int:
+    client = build_client(args)
+    await client.open()
+    try:
+        state = await run_backfill(
+            client, args.output, args.checkpoint or f"{args.output}.checkpoint",
+            page_size=args.page_size, concurrency=args.concurrency,
+            limit=args.limit, restart=args.restart,
+        )
+    finally:
+        await client.close()
+    logger.info(f"Backfill {'complete' if state.get('done') else 'stopped'}: {state['cases']} cases")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", required=True, help="NDJSON file to write results to")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: <output>.checkpoint)")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8, help="concurrent case fetches")
+    parser.add_argument("--limit", type=int,
+                        help="stop once this many cases are done (rounded up to a whole page)")
+    parser.add_argument("--restart", action="store_true", help="ignore any existing checkpoint")
+    parser.add_argument("--base-url", help="Persona API base URL (default: PERSONA_BASE_URL)")
+    parser.add_argument("--mock-cases", type=int, default=0,
+                        help="run against an in-process mock Persona with this many cases")
+    parser.add_argument("--mock-related", action="store_true",
+                        help="mock cases reference reports/documents/inquiries fetched separately")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        return asyncio.run(main_async(args))
+    except KeyboardInterrupt:
+        logger.warning("Interrupted; rerun the same command to resume from the checkpoint")
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
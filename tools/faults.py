@@ -0,0 +1,124 @@
+"""Latency and error injection for the local Persona and Slack stand-ins.
+
+``FaultInjectionMiddleware`` wraps a mock app: every request outside the
+control paths first sleeps ``latency`` (+/- ``jitter``) seconds, then
+fails with ``error_status`` at ``error_rate``. A 429 carries Retry-After.
+At ``tail_rate`` a request instead waits ``tail_latency``, the slow tail
+that hedged requests are meant to cut off.
+Settings live on ``app.state.faults`` and can be changed while a load
+test runs with ``PUT /_faults`` (JSON body with any of the fields).
+"""
+import asyncio
+import json
+import random
+from typing import Any, Dict, Optional
+
+
+class FaultSettings:
+    __slots__ = ("latency", "jitter", "error_rate", "error_status", "retry_after", "tail_rate",
+                 "tail_latency", "rng", "injected")
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 500, retry_after: float = 1.0, tail_rate: float = 0.0,
+                 tail_latency: float = 0.0, seed: Optional[int] = None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.rng = random.Random(seed)
+        self.injected = 0
+
+    def update(self, changes: Dict[str, Any]) -> None:
+        for name in ("latency", "jitter", "error_rate", "retry_after", "tail_rate", "tail_latency"):
+            if name in changes:
+                setattr(self, name, float(changes[name]))
+        if "error_status" in changes:
+            self.error_status = int(changes["error_status"])
+
+    def delay(self) -> float:
+        if self.tail_rate and self.rng.random() < self.tail_rate:
+            return self.tail_latency
+        if not self.jitter:
+            return self.latency
+        return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"latency": self.latency, "jitter": self.jitter, "error_rate": self.error_rate,
+                "error_status": self.error_status, "retry_after": self.retry_after,
+                "tail_rate": self.tail_rate, "tail_latency": self.tail_latency, "injected": self.injected}
+
+
+class FaultInjectionMiddleware:
+    CONTROL_PATHS = ("/_faults", "/stats")
+
+    def __init__(self, app, settings: FaultSettings):
+        self.app = app
+        self.settings = settings
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if path == "/_faults":
+            await self._control(scope, receive, send)
+            return
+        if path in self.CONTROL_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        settings = self.settings
+        delay = settings.delay()
+        if delay:
+            await asyncio.sleep(delay)
+        if settings.error_rate and settings.rng.random() < settings.error_rate:
+            settings.injected += 1
+            headers = [(b"content-type", b"application/json")]
+            if settings.error_status == 429:
+                headers.append((b"retry-after", str(settings.retry_after).encode()))
+            await _respond(send, settings.error_status, {"ok": False, "error": "injected_fault"}, headers)
+            return
+        await self.app(scope, receive, send)
+
+    async def _control(self, scope, receive, send):
+        if scope["method"] in ("PUT", "POST"):
+            body = b""
+            more = True
+            while more:
+                message = await receive()
+                body += message.get("body", b"")
+                more = message.get("more_body", False)
+            self.settings.update(json.loads(body or b"{}"))
+        await _respond(send, 200, self.settings.to_dict())
+
+
+async def _respond(send, status: int, payload: Dict[str, Any], headers=None) -> None:
+    await send({"type": "http.response.start", "status": status,
+                "headers": headers or [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": json.dumps(payload).encode()})
+
+
+def add_fault_injection(app, settings: Optional[FaultSettings] = None) -> FaultSettings:
+    """Wrap a mock FastAPI app; returns the live settings object"""
+    settings = settings or FaultSettings()
+    app.state.faults = settings
+    app.add_middleware(FaultInjectionMiddleware, settings=settings)
+    return settings
+
+
+def add_fault_arguments(parser) -> None:
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="added delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="+/- random spread on the delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500, help="status of injected failures")
+    parser.add_argument("--tail-rate", type=float, default=0.0, help="fraction of requests that are slow")
+    parser.add_argument("--tail-ms", type=float, default=0.0, help="delay of the slow requests")
+
+
+def fault_settings_from_args(args) -> FaultSettings:
+    return FaultSettings(latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                         error_rate=args.error_rate, error_status=args.error_status,
+                         tail_rate=args.tail_rate, tail_latency=args.tail_ms / 1000)
@@ -0,0 +1,213 @@
+"""Local stand-in for the Persona cases API.
+
+Serves a deterministic set of synthetic KYB cases with Persona-style
+JSON:API envelopes and cursor pagination, for backfill runs and tests
+that must not touch withpersona.com. With --related, verification
+results, proof of address and the form filler are served as separate
+reports, documents and inquiries that the case only references.
+``PATCH /api/v1/cases/{id}`` with ``{"attributes": {...}}`` changes a
+case's top-level attributes, to simulate case updates. Latency and
+failures can be injected (see tools.faults).
+
+Run with: python -m tools.mock_persona --port 9000 --cases 50000 [--related] [--latency-ms 80 --error-rate 0.01]
+then point PERSONA_BASE_URL at http://localhost:9000/api/v1
+"""
+import argparse
+import random
+from datetime import date, timedelta
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import FastAPI, HTTPException, Request
+
+from tools.faults import FaultSettings, add_fault_arguments, add_fault_injection, fault_settings_from_args
+
+COUNTRIES = ["US", "US", "US", "CA", "GB", "DE", "MX", "China", "Iran", "Kenya"]
+INDUSTRIES = ["Retail", "Software", "Logistics", "Consulting", "Gambling", "Guns"]
+REPORT_TYPES = {
+    "business_registry": "report/business-registry",
+    "watchlist": "report/watchlist",
+    "pep": "report/politically-exposed-person",
+    "adverse_media": "report/adverse-media",
+}
+
+
+def case_id_for(index: int) -> str:
+    return f"case_{index:08d}"
+
+
+def birthdate_for(index: int, n: int = 0) -> str:
+    # Not drawn from the case's rng, so the other fields stay as they were
+    return (date(1950, 1, 1) + timedelta(days=(index * 7919 + n * 104729) % 18000)).isoformat()
+
+
+def make_case(index: int, seed: int = 7, today: Optional[date] = None) -> Dict[str, Any]:
+    """Synthetic case ``index``; the same index always yields the same case"""
+    rng = random.Random(seed * 1_000_003 + index)
+    today = today or date.today()
+    owners = [
+        {"full_name": f"Owner {index}-{n}", "ownership": rng.choice([10, 25, 30, 51]),
+         "birthdate": birthdate_for(index, n + 1)}
+        for n in range(rng.randint(0, 3))
+    ]
+    return {
+        "type": "case",
+        "id": case_id_for(index),
+        "attributes": {
+            "status": rng.choice(["open", "pending", "approved", "declined"]),
+            "created_at": (today - timedelta(days=rng.randint(0, 365))).isoformat(),
+            "business": {
+                "name": f"Business {index}",
+                "legal_name": f"Business {index} LLC" if rng.random() > 0.05 else "",
+                "ein": f"{rng.randint(10, 99)}-{rng.randint(1000000, 9999999)}",
+                "address": f"{rng.randint(1, 999)} Main St",
+                "incorporation_country": "US",
+                "country": rng.choice(COUNTRIES),
+                "industry": rng.choice(INDUSTRIES),
+            },
+            "control_person": ({"full_name": f"Control Person {index}", "birthdate": birthdate_for(index)}
+                               if rng.random() > 0.03 else {}),
+            "beneficial_owners": owners,
+            "proof_of_address": {
+                "status": rng.choice(["approved", "pending"]),
+                "document_date": (today - timedelta(days=rng.randint(0, 200))).isoformat(),
+            },
+            "verification_results": {
+                "watchlist": "clear" if rng.random() > 0.05 else "match",
+                "pep": "clear" if rng.random() > 0.03 else "match",
+                "adverse_media": "clear",
+                "business_registry": "clear",
+            },
+            "form_filler": {"email": f"filler{index}@example.com"},
+        },
+    }
+
+
+def make_related_case(index: int, seed: int = 7,
+                      today: Optional[date] = None) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+    """make_case(index) split the way Persona serves it: (case, related objects by id)"""
+    case = make_case(index, seed, today)
+    attributes = dict(case["attributes"])
+    verification = attributes.pop("verification_results")
+    document = attributes.pop("proof_of_address")
+    filler = attributes.pop("form_filler")
+    objects: Dict[str, Dict[str, Any]] = {}
+    for check, report_type in REPORT_TYPES.items():
+        objects[f"rep_{index:08d}_{check}"] = {
+            "type": report_type,
+            "attributes": {"status": "ready", "has-match": verification[check] != "clear"},
+        }
+    objects[f"doc_{index:08d}"] = {
+        "type": "document/generic",
+        "attributes": {"kind": "proof_of_address", "issue-date": document["document_date"],
+                       "status": "passed" if document["status"] == "approved" else "processed"},
+    }
+    objects[f"inq_{index:08d}"] = {
+        "type": "inquiry",
+        "attributes": {"status": "completed", "email-address": filler["email"]},
+    }
+    for object_id, obj in objects.items():
+        obj["id"] = object_id
+
+    def refs(prefix: str):
+        return {"data": [{"type": obj["type"], "id": object_id}
+                         for object_id, obj in objects.items() if object_id.startswith(prefix)]}
+
+    relationships = {"reports": refs("rep_"), "documents": refs("doc_"), "inquiries": refs("inq_")}
+    return dict(case, attributes=attributes, relationships=relationships), objects
+
+
+def create_mock_persona_app(total_cases: int = 1000, seed: int = 7, max_page_size: int = 100,
+                            faults: Optional[FaultSettings] = None, related: bool = False) -> FastAPI:
+    app = FastAPI(title="Mock Persona")
+    app.state.total_cases = total_cases
+    app.state.received = Counter()
+    # case index -> attributes changed through PATCH
+    app.state.updates: Dict[int, Dict[str, Any]] = {}
+    add_fault_injection(app, faults)
+
+    def parse_index(case_id: str) -> int:
+        try:
+            index = int(case_id.rsplit("_", 1)[1])
+        except (IndexError, ValueError):
+            raise HTTPException(status_code=404, detail="Case not found")
+        if not 0 <= index < app.state.total_cases:
+            raise HTTPException(status_code=404, detail="Case not found")
+        return index
+
+    @app.get("/api/v1/cases")
+    async def list_cases(request: Request):
+        params = request.query_params
+        size = min(int(params.get("page[size]", 10)), max_page_size)
+        after = params.get("page[after]")
+        start = parse_index(after) + 1 if after else 0
+        end = min(start + size, app.state.total_cases)
+        app.state.received["list"] += 1
+        # Listings carry summaries only, like Persona's
+        data = [
+            {"type": "case", "id": case_id_for(i),
+             "attributes": {"status": make_case(i, seed)["attributes"]["status"]}}
+            for i in range(start, end)
+        ]
+        links = {"next": None}
+        if end < app.state.total_cases:
+            links["next"] = f"/api/v1/cases?page[size]={size}&page[after]={case_id_for(end - 1)}"
+        return {"data": data, "links": links}
+
+    @app.get("/api/v1/cases/{case_id}")
+    async def get_case(case_id: str):
+        app.state.received["get"] += 1
+        index = parse_index(case_id)
+        case = make_related_case(index, seed)[0] if related else make_case(index, seed)
+        if index in app.state.updates:
+            case = dict(case, attributes=dict(case["attributes"], **app.state.updates[index]))
+        return {"data": case}
+
+    @app.patch("/api/v1/cases/{case_id}")
+    async def update_case(case_id: str, request: Request):
+        app.state.received["update"] += 1
+        index = parse_index(case_id)
+        attributes = (await request.json()).get("attributes") or {}
+        app.state.updates.setdefault(index, {}).update(attributes)
+        return await get_case(case_id)
+
+    @app.get("/api/v1/{collection}/{object_id}")
+    async def get_related(collection: str, object_id: str):
+        if not related or collection not in ("reports", "documents", "inquiries"):
+            raise HTTPException(status_code=404, detail="Not found")
+        app.state.received["related"] += 1
+        try:
+            index = int(object_id.split("_")[1])
+        except (IndexError, ValueError):
+            raise HTTPException(status_code=404, detail="Object not found")
+        obj = make_related_case(parse_index(case_id_for(index)), seed)[1].get(object_id)
+        if obj is None:
+            raise HTTPException(status_code=404, detail="Object not found")
+        return {"data": obj}
+
+    @app.get("/stats")
+    async def stats():
+        return dict(app.state.received, faults=app.state.faults.to_dict())
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--cases", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--related", action="store_true",
+                        help="serve reports, documents and inquiries as separate related objects")
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    import uvicorn
+    app = create_mock_persona_app(args.cases, args.seed, faults=fault_settings_from_args(args),
+                                  related=args.related)
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
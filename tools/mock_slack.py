@@ -0,0 +1,68 @@
+"""Local stand-in for the Slack Web API and incoming webhooks.
+
+Answers auth.test / chat.* calls and accepts webhook or response_url
+posts, counting what it received and when each hook path was last hit,
+for load tests that must not touch slack.com. Latency and failures (429
+with Retry-After, 5xx) can be injected (see tools.faults).
+
+Run with: python -m tools.mock_slack --port 9100 [--latency-ms 50 --error-rate 0.02 --error-status 429]
+then set SLACK_API_URL=http://localhost:9100/api/ and point
+SLACK_WEBHOOK_URL at http://localhost:9100/hooks/main
+"""
+import argparse
+import time
+from collections import Counter
+from typing import Optional
+
+from fastapi import FastAPI, Request
+
+from tools.faults import FaultSettings, add_fault_arguments, add_fault_injection, fault_settings_from_args
+
+
+def create_mock_slack_app(faults: Optional[FaultSettings] = None) -> FastAPI:
+    app = FastAPI(title="Mock Slack")
+    app.state.received = Counter()
+    # perf_counter() of the last post per hook path, for in-process
+    # load tests that measure time to the reply
+    app.state.arrivals = {}
+    add_fault_injection(app, faults)
+
+    @app.post("/api/auth.test")
+    async def auth_test():
+        app.state.received["auth.test"] += 1
+        return {"ok": True, "url": "https://mock.slack.com/", "team": "Mock", "user": "kyb-bot",
+                "team_id": "T0MOCK", "user_id": "U0BOT", "bot_id": "B0BOT"}
+
+    @app.post("/api/{method}")
+    async def web_api(method: str, request: Request):
+        app.state.received[method] = app.state.received[method] + 1
+        ts = f"{time.time():.6f}"
+        return {"ok": True, "channel": "C0MOCK", "ts": ts, "message": {"ts": ts}}
+
+    @app.post("/hooks/{path:path}")
+    async def webhook(path: str, request: Request):
+        await request.body()
+        app.state.received["webhook"] += 1
+        app.state.arrivals[path] = time.perf_counter()
+        return "ok"
+
+    @app.get("/stats")
+    async def stats():
+        return dict(app.state.received, faults=app.state.faults.to_dict())
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_fault_arguments(parser)
+    args = parser.parse_args()
+
+    import uvicorn
+    uvicorn.run(create_mock_slack_app(fault_settings_from_args(args)), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compliance reports and columnar exports from the report store.
+
+``show`` prints the numbers for a range of UTC days from the running
+aggregates in the report store (REPORTS_PATH, default data/reports.db):
+cases screened, failures by rule, the prohibited-country hit rate and
+reviewer turnaround. ``export`` writes the screenings and actions not
+exported yet to Parquet or Arrow IPC files partitioned by day (needs
+pyarrow). Both are safe to run while the app is up.
+
+Examples:
+    python -m tools.report show --week 2026-W41
+    python -m tools.report show --since 2026-10-01 --until 2026-10-07 --json
+    python -m tools.report export --output data/exports --format parquet
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from typing import Any, Dict
+
+from utils.reporting import EXPORT_FORMATS, ReportStore, report_range
+
+logger = logging.getLogger("report")
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"Compliance report {report['since']} .. {report['until']}",
+        f"  cases screened:          {report['cases_screened']} ({report['screenings']} screenings)",
+        f"  passed:                  {report['passed']}",
+        f"  needs review:            {report['needs_review']}",
+        f"  prohibited-country hits: {report['prohibited_country_hits']} "
+        f"({report['prohibited_country_hit_rate']:.2%} of cases)",
+        "  failures by rule:",
+    ]
+    lines += [f"    {rule_id:<40} {count}" for rule_id, count in report["failures_by_rule"].items()] or ["    none"]
+    lines.append("  decisions (hours from first screening):")
+    for action, decision in sorted(report["decisions"].items()):
+        lines.append(f"    {action:<8} {decision['count']:>6}  mean {decision['mean_hours']}  "
+                     f"p50 <= {decision['p50_hours_at_most']}  p90 <= {decision['p90_hours_at_most']}")
+    if not report["decisions"]:
+        lines.append("    none")
+    return "\n".join(lines)
+
+
+async def main_async(args) -> int:
+    store = ReportStore.from_env(**({"path": args.db} if args.db else {}))
+    await store.open()
+    try:
+        if args.command == "show":
+            since, until = report_range(args.week, args.since, args.until)
+            report = await store.report(since, until)
+            print(json.dumps(report, indent=2) if args.json else format_report(report))
+        else:
+            started = time.perf_counter()
+            result = await store.export(args.output, args.format)
+            logger.info("Exported %d events to %d files in %.1f s (through seq %d)", result["events"],
+                        len(result["files"]), time.perf_counter() - started, result["last_seq"])
+    finally:
+        await store.close()
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="report store (default: REPORTS_PATH or data/reports.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    show = commands.add_parser("show", help="print a compliance report")
+    show.add_argument("--week", help="ISO week, e.g. 2026-W41")
+    show.add_argument("--since", help="first UTC day, YYYY-MM-DD (default: six days before --until)")
+    show.add_argument("--until", help="last UTC day, YYYY-MM-DD (default: today, UTC)")
+    show.add_argument("--json", action="store_true", help="print the report as JSON")
+    export = commands.add_parser("export", help="write new events as day-partitioned columnar files")
+    export.add_argument("--output", required=True, help="directory for the day=YYYY-MM-DD partitions")
+    export.add_argument("--format", choices=EXPORT_FORMATS, default="parquet")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    try:
+        return asyncio.run(main_async(args))
+    except (ValueError, RuntimeError) as e:
+        logger.error("%s", e)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,238 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = os.getenv("KYB_DATA_DIR", "data")
+GENESIS_HASH = "0" * 64
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS audit_log (
+    seq       INTEGER PRIMARY KEY,
+    ts        REAL NOT NULL,
+    action    TEXT NOT NULL,
+    case_id   TEXT NOT NULL,
+    reviewer  TEXT,
+    details   TEXT,
+    prev_hash TEXT NOT NULL,
+    hash      TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS audit_log_case ON audit_log (case_id, seq);
+CREATE INDEX IF NOT EXISTS audit_log_reviewer ON audit_log (reviewer, seq);
+CREATE TRIGGER IF NOT EXISTS audit_log_no_update BEFORE UPDATE ON audit_log
+BEGIN SELECT RAISE(ABORT, 'audit log is append-only'); END;
+CREATE TRIGGER IF NOT EXISTS audit_log_no_delete BEFORE DELETE ON audit_log
+BEGIN SELECT RAISE(ABORT, 'audit log is append-only'); END;
+"""
+
+_COLUMNS = "seq, ts, action, case_id, reviewer, details, prev_hash, hash"
+
+
+class AuditRecord(NamedTuple):
+    seq: int
+    ts: float
+    action: str
+    case_id: str
+    reviewer: Optional[str]
+    details: Optional[str]  # JSON text
+    prev_hash: str
+    hash: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = self._asdict()
+        record["details"] = json.loads(self.details) if self.details else None
+        return record
+
+
+def record_hash(prev_hash: str, seq: int, ts: float, action: str, case_id: str,
+                reviewer: Optional[str], details: Optional[str]) -> str:
+    """SHA-256 over the previous hash and this record's canonical JSON"""
+    body = json.dumps([seq, repr(ts), action, case_id, reviewer, details], separators=(",", ":"))
+    return hashlib.sha256(f"{prev_hash}\n{body}".encode("utf-8")).hexdigest()
+
+
+class AuditLog:
+    """Append-only, hash-chained audit trail of reviewer actions.
+
+    Appends are queued and written by a single writer task: everything
+    that arrived while the previous commit was syncing goes into the next
+    transaction, so concurrent approvals share one fsync (group commit).
+    ``append`` returns only after its batch is durable. Each record's
+    hash covers the previous one, and triggers reject UPDATE/DELETE, so
+    edits show up in ``verify``. Case and reviewer histories are served
+    from B-tree indexes.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_batch: int = 1000, max_pending: int = 100_000):
+        self.path = path or os.path.join(DEFAULT_DATA_DIR, "audit_log.db")
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audit-log")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._last_seq = 0
+        self._last_hash = GENESIS_HASH
+        self._stats = {"appended": 0, "commits": 0, "max_batch": 0, "commit_seconds": 0.0}
+
+    # ===== SYNC SIDE (audit thread only) =====
+    def _open_sync(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # FULL: every commit is fsynced; group commit keeps that affordable
+        conn.execute("PRAGMA synchronous=FULL")
+        conn.executescript(_SCHEMA)
+        last = conn.execute("SELECT seq, hash FROM audit_log ORDER BY seq DESC LIMIT 1").fetchone()
+        if last:
+            self._last_seq, self._last_hash = last
+        self._conn = conn
+
+    def _commit_sync(self, entries: List[Tuple[float, str, str, Optional[str], Optional[str]]]) -> List[AuditRecord]:
+        records = []
+        seq, prev = self._last_seq, self._last_hash
+        for ts, action, case_id, reviewer, details in entries:
+            seq += 1
+            digest = record_hash(prev, seq, ts, action, case_id, reviewer, details)
+            records.append(AuditRecord(seq, ts, action, case_id, reviewer, details, prev, digest))
+            prev = digest
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(f"INSERT INTO audit_log ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", records)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        self._last_seq, self._last_hash = seq, prev
+        return records
+
+    def _query_sync(self, column: str, value: str, limit: int, before: Optional[int]) -> List[AuditRecord]:
+        # Newest first; "before" pages backwards by sequence number
+        sql = f"SELECT {_COLUMNS} FROM audit_log WHERE {column} = ?"
+        params: List[Any] = [value]
+        if before is not None:
+            sql += " AND seq < ?"
+            params.append(before)
+        sql += " ORDER BY seq DESC LIMIT ?"
+        params.append(limit)
+        return [AuditRecord(*row) for row in self._conn.execute(sql, params)]
+
+    def _verify_sync(self) -> Tuple[bool, int, Optional[int]]:
+        prev = GENESIS_HASH
+        checked = 0
+        for row in self._conn.execute(f"SELECT {_COLUMNS} FROM audit_log ORDER BY seq"):
+            record = AuditRecord(*row)
+            expected = record_hash(prev, record.seq, record.ts, record.action, record.case_id,
+                                   record.reviewer, record.details)
+            if record.prev_hash != prev or record.hash != expected:
+                return False, checked, record.seq
+            prev = record.hash
+            checked += 1
+        return True, checked, None
+
+    def _close_sync(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ===== ASYNC API =====
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def open(self) -> None:
+        await self._run(self._open_sync)
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._writer = asyncio.create_task(self._write_loop(), name="audit-log-writer")
+
+    async def close(self) -> None:
+        """Flush queued appends, then close the database"""
+        if self._writer is not None:
+            await self._queue.put(None)
+            await self._writer
+            self._writer = None
+        await self._run(self._close_sync)
+
+    async def append(self, action: str, case_id: str, reviewer: Optional[str] = None,
+                     details: Optional[Dict[str, Any]] = None) -> AuditRecord:
+        """Record an action; returns once it is committed and synced"""
+        if self._writer is None:
+            raise RuntimeError("Audit log is not open")
+        entry = (time.time(), action, case_id, reviewer,
+                 json.dumps(details, sort_keys=True, default=str) if details else None)
+        done = asyncio.get_running_loop().create_future()
+        await self._queue.put((entry, done))
+        return await done
+
+    async def _write_loop(self) -> None:
+        queue = self._queue
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            batch = []
+            # Everything that queued up during the last commit joins this one
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.max_batch or queue.empty():
+                    break
+                item = queue.get_nowait()
+            stopping = item is None
+            if not batch:
+                continue
+            started = time.perf_counter()
+            try:
+                records = await self._run(self._commit_sync, [entry for entry, _ in batch])
+            except Exception as e:
+                logger.exception("Audit log commit failed")
+                for _, done in batch:
+                    if not done.done():
+                        done.set_exception(e)
+                continue
+            self._stats["commits"] += 1
+            self._stats["appended"] += len(records)
+            self._stats["max_batch"] = max(self._stats["max_batch"], len(records))
+            self._stats["commit_seconds"] += time.perf_counter() - started
+            for (_, done), record in zip(batch, records):
+                if not done.done():
+                    done.set_result(record)
+
+    async def history(self, case_id: str, limit: int = 100,
+                      before: Optional[int] = None) -> List[AuditRecord]:
+        """Actions on ``case_id``, newest first"""
+        return await self._run(self._query_sync, "case_id", case_id, limit, before)
+
+    async def by_reviewer(self, reviewer: str, limit: int = 100,
+                          before: Optional[int] = None) -> List[AuditRecord]:
+        return await self._run(self._query_sync, "reviewer", reviewer, limit, before)
+
+    async def verify(self) -> Tuple[bool, int, Optional[int]]:
+        """Walk the hash chain; returns (intact, records checked, first bad seq)"""
+        return await self._run(self._verify_sync)
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["commit_seconds"] = round(stats["commit_seconds"], 3)
+        stats["last_seq"] = self._last_seq
+        stats["queued"] = self._queue.qsize() if self._queue is not None else 0
+        stats["avg_batch"] = round(stats["appended"] / stats["commits"], 2) if stats["commits"] else 0.0
+        return stats
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_audit_log: Optional[AuditLog] = None
+
+
+def get_audit_log() -> AuditLog:
+    global _audit_log
+    if _audit_log is None:
+        _audit_log = AuditLog(path=os.getenv("AUDIT_LOG_PATH"))
+    return _audit_log
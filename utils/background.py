@@ -0,0 +1,97 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+Job = Callable[[Dict[str, Any]], Awaitable[Any]]
+Persist = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class BackgroundTasks:
+    """Tracked background jobs with a concurrency cap and graceful shutdown.
+
+    ``submit`` returns straight away; at most ``max_concurrency`` jobs run at
+    once and the rest wait their turn. On shutdown, running jobs get
+    ``drain_timeout`` seconds to finish and whatever is left (waiting or
+    still running) is handed to ``persist`` so it can be resumed later.
+    """
+
+    def __init__(self, max_concurrency: int = 8, max_pending: int = 1000, name: str = "jobs"):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self.name = name
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: Dict[asyncio.Task, Dict[str, Any]] = {}
+        self._running: Set[asyncio.Task] = set()
+        self._closed = True
+        self._stats = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0, "persisted": 0}
+
+    def start(self) -> None:
+        # Created here so the semaphore binds to the serving event loop
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._closed = False
+
+    def submit(self, payload: Dict[str, Any], job: Job) -> bool:
+        """Schedule ``job(payload)``; returns False when closed or saturated"""
+        if self._closed or len(self._tasks) >= self.max_pending:
+            self._stats["rejected"] += 1
+            return False
+        task = asyncio.ensure_future(self._run(payload, job))
+        self._tasks[task] = payload
+        task.add_done_callback(self._done)
+        self._stats["submitted"] += 1
+        return True
+
+    async def _run(self, payload: Dict[str, Any], job: Job) -> None:
+        async with self._semaphore:
+            task = asyncio.current_task()
+            self._running.add(task)
+            try:
+                await job(payload)
+                self._stats["completed"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._stats["failed"] += 1
+                logger.exception("Background %s job failed", self.name)
+            finally:
+                self._running.discard(task)
+
+    def _done(self, task: asyncio.Task) -> None:
+        self._tasks.pop(task, None)
+
+    async def shutdown(self, drain_timeout: float = 10.0,
+                       persist: Optional[Persist] = None) -> Tuple[int, int]:
+        """Stop accepting jobs, drain, then persist leftovers; returns (drained, persisted)"""
+        self._closed = True
+        tasks = list(self._tasks)
+        if not tasks:
+            return 0, 0
+        done, pending = await asyncio.wait(tasks, timeout=drain_timeout)
+        leftovers = [self._tasks.get(task) for task in pending]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        persisted = 0
+        for payload in leftovers:
+            if payload is None or persist is None:
+                continue
+            try:
+                await persist(payload)
+                persisted += 1
+            except Exception:
+                logger.exception("Could not persist pending %s job", self.name)
+        self._stats["persisted"] += persisted
+        if pending:
+            logger.warning("Background %s: %s jobs unfinished at shutdown, %s persisted",
+                           self.name, len(pending), persisted)
+        return len(done), persisted
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["running"] = len(self._running)
+        stats["waiting"] = len(self._tasks) - len(self._running)
+        stats["max_concurrency"] = self.max_concurrency
+        return stats
@@ -0,0 +1,56 @@
+"""Bulk screening for backfills and re-audits.
+
+Every case goes through ``PolicyEngine.evaluate`` against one pinned
+``as_of``, so each result matches ``validate_kyb_checklist(case, as_of)``
+exactly and the rules exist in one place only. Checklist dicts are built
+lazily; ``passed`` and ``failure_counts`` read the results directly.
+
+Callers screening millions of cases may want to pause the cyclic garbage
+collector around the call (see benchmarks/bench_batch.py); the results
+hold no cycles, but allocating that many triggers repeated collections.
+"""
+from collections import Counter
+from collections.abc import Sequence as SequenceABC
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from utils.policy import PolicyEngine, PolicyResult, get_policy_engine
+
+
+class BatchResult(SequenceABC):
+    """Rule outcomes for a batch of cases.
+
+    Indexing or iterating yields the same dicts ``validate_kyb_checklist``
+    returns; they are built on access so large batches stay compact.
+    """
+
+    def __init__(self, results: List[PolicyResult]):
+        self.results = results
+
+    @property
+    def passed(self) -> List[bool]:
+        return [result.passed for result in self.results]
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [result.to_checklist() for result in self.results[i]]
+        return self.results[i].to_checklist()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for result in self.results:
+            yield result.to_checklist()
+
+    def failure_counts(self) -> Dict[str, int]:
+        """Number of failing cases per rule ID"""
+        return dict(Counter(failure.rule_id for result in self.results for failure in result.failures))
+
+
+def validate_kyb_checklist_batch(cases: Sequence[Dict[str, Any]],
+                                 as_of: Optional[datetime] = None,
+                                 engine: Optional[PolicyEngine] = None) -> BatchResult:
+    """Screen many cases at once; ``as_of`` defaults to a single ``now``"""
+    engine = engine or get_policy_engine()
+    return BatchResult(engine.evaluate_many(cases, as_of or datetime.now()))
@@ -0,0 +1,92 @@
+"""ISO 3166-1 alpha-2 country codes and the names they go by.
+
+Persona sends alpha-2 codes ("US") while the policy lists countries by
+name ("Russian Federation"); both are resolved to the same code here.
+"""
+import unicodedata
+from typing import Any, Dict, Optional
+
+_ISO_3166 = """
+AD Andorra|AE United Arab Emirates|AF Afghanistan|AG Antigua and Barbuda|AI Anguilla
+AL Albania|AM Armenia|AO Angola|AQ Antarctica|AR Argentina|AS American Samoa|AT Austria
+AU Australia|AW Aruba|AX Aland Islands|AZ Azerbaijan|BA Bosnia and Herzegovina|BB Barbados
+BD Bangladesh|BE Belgium|BF Burkina Faso|BG Bulgaria|BH Bahrain|BI Burundi|BJ Benin
+BL Saint Barthelemy|BM Bermuda|BN Brunei Darussalam|BO Bolivia|BQ Bonaire, Sint Eustatius and Saba
+BR Brazil|BS Bahamas|BT Bhutan|BV Bouvet Island|BW Botswana|BY Belarus|BZ Belize|CA Canada
+CC Cocos (Keeling) Islands|CD Democratic Republic of the Congo|CF Central African Republic
+CG Congo|CH Switzerland|CI Cote d'Ivoire|CK Cook Islands|CL Chile|CM Cameroon|CN China
+CO Colombia|CR Costa Rica|CU Cuba|CV Cabo Verde|CW Curacao|CX Christmas Island|CY Cyprus
+CZ Czechia|DE Germany|DJ Djibouti|DK Denmark|DM Dominica|DO Dominican Republic|DZ Algeria
+EC Ecuador|EE Estonia|EG Egypt|EH Western Sahara|ER Eritrea|ES Spain|ET Ethiopia|FI Finland
+FJ Fiji|FK Falkland Islands|FM Micronesia|FO Faroe Islands|FR France|GA Gabon
+GB United Kingdom|GD Grenada|GE Georgia|GF French Guiana|GG Guernsey|GH Ghana|GI Gibraltar
+GL Greenland|GM Gambia|GN Guinea|GP Guadeloupe|GQ Equatorial Guinea|GR Greece
+GS South Georgia and the South Sandwich Islands|GT Guatemala|GU Guam|GW Guinea-Bissau|GY Guyana
+HK Hong Kong|HM Heard Island and McDonald Islands|HN Honduras|HR Croatia|HT Haiti|HU Hungary
+ID Indonesia|IE Ireland|IL Israel|IM Isle of Man|IN India|IO British Indian Ocean Territory
+IQ Iraq|IR Iran|IS Iceland|IT Italy|JE Jersey|JM Jamaica|JO Jordan|JP Japan|KE Kenya
+KG Kyrgyzstan|KH Cambodia|KI Kiribati|KM Comoros|KN Saint Kitts and Nevis|KP North Korea
+KR South Korea|KW Kuwait|KY Cayman Islands|KZ Kazakhstan|LA Laos|LB Lebanon|LC Saint Lucia
+LI Liechtenstein|LK Sri Lanka|LR Liberia|LS Lesotho|LT Lithuania|LU Luxembourg|LV Latvia
+LY Libya|MA Morocco|MC Monaco|MD Moldova|ME Montenegro|MF Saint Martin (French part)
+MG Madagascar|MH Marshall Islands|MK North Macedonia|ML Mali|MM Myanmar|MN Mongolia|MO Macao
+MP Northern Mariana Islands|MQ Martinique|MR Mauritania|MS Montserrat|MT Malta|MU Mauritius
+MV Maldives|MW Malawi|MX Mexico|MY Malaysia|MZ Mozambique|NA Namibia|NC New Caledonia|NE Niger
+NF Norfolk Island|NG Nigeria|NI Nicaragua|NL Netherlands|NO Norway|NP Nepal|NR Nauru|NU Niue
+NZ New Zealand|OM Oman|PA Panama|PE Peru|PF French Polynesia|PG Papua New Guinea|PH Philippines
+PK Pakistan|PL Poland|PM Saint Pierre and Miquelon|PN Pitcairn|PR Puerto Rico|PS Palestine
+PT Portugal|PW Palau|PY Paraguay|QA Qatar|RE Reunion|RO Romania|RS Serbia|RU Russian Federation
+RW Rwanda|SA Saudi Arabia|SB Solomon Islands|SC Seychelles|SD Sudan|SE Sweden|SG Singapore
+SH Saint Helena, Ascension and Tristan da Cunha|SI Slovenia|SJ Svalbard and Jan Mayen|SK Slovakia
+SL Sierra Leone|SM San Marino|SN Senegal|SO Somalia|SR Suriname|SS South Sudan
+ST Sao Tome and Principe|SV El Salvador|SX Sint Maarten (Dutch part)|SY Syria|SZ Eswatini
+TC Turks and Caicos Islands|TD Chad|TF French Southern Territories|TG Togo|TH Thailand
+TJ Tajikistan|TK Tokelau|TL Timor-Leste|TM Turkmenistan|TN Tunisia|TO Tonga|TR Turkey
+TT Trinidad and Tobago|TV Tuvalu|TW Taiwan|TZ Tanzania|UA Ukraine|UG Uganda
+UM United States Minor Outlying Islands|US United States|UY Uruguay|UZ Uzbekistan
+VA Holy See|VC Saint Vincent and the Grenadines|VE Venezuela|VG British Virgin Islands
+VI U.S. Virgin Islands|VN Viet Nam|VU Vanuatu|WF Wallis and Futuna|WS Samoa|XK Kosovo|YE Yemen
+YT Mayotte|ZA South Africa|ZM Zambia|ZW Zimbabwe
+"""
+
+# Other spellings seen in Persona payloads and in config/config.yaml
+_ALIASES = {
+    "USA": "US", "United States of America": "US", "UK": "GB", "Great Britain": "GB",
+    "Burma": "MM", "Burma (Myanmar)": "MM", "Russia": "RU", "Vietnam": "VN",
+    "The Democratic Republic of Congo": "CD", "DR Congo": "CD", "DRC": "CD",
+    "Republic of the Congo": "CG", "Ivory Coast": "CI", "Czech Republic": "CZ",
+    "Macedonia": "MK", "Macedonia (North)": "MK", "Swaziland": "SZ", "Turkiye": "TR",
+    "Iran, Islamic Republic of": "IR", "Syrian Arab Republic": "SY",
+    "Korea, Democratic People's Republic of": "KP", "Korea, Republic of": "KR",
+    "Lao People's Democratic Republic": "LA", "Venezuela (Bolivarian Republic of)": "VE",
+    "Bolivia (Plurinational State of)": "BO", "Palestinian Territory": "PS",
+    "State of Palestine": "PS", "Gaza Strip": "PS", "West Bank (Palestinian Territory)": "PS",
+    "West Bank": "PS", "Holy See (Vatican City State)": "VA", "Vatican City": "VA",
+}
+
+COUNTRY_NAMES: Dict[str, str] = dict(
+    entry.split(" ", 1) for line in _ISO_3166.split("\n") for entry in line.split("|") if entry
+)
+
+
+def _name_key(name: str) -> str:
+    name = unicodedata.normalize("NFKD", name.replace("'", ""))
+    return " ".join("".join(c for c in name if not unicodedata.combining(c)).split()).casefold()
+
+
+_CODES_BY_NAME: Dict[str, str] = {_name_key(name): code for code, name in COUNTRY_NAMES.items()}
+_CODES_BY_NAME.update((_name_key(name), code) for name, code in _ALIASES.items())
+
+
+def country_code(value: Any) -> Optional[str]:
+    """ISO alpha-2 code for a code or country name, or None if unknown"""
+    if not value or not isinstance(value, str):
+        return None
+    value = value.strip()
+    if len(value) == 2 and value.upper() in COUNTRY_NAMES:
+        return value.upper()
+    return _CODES_BY_NAME.get(_name_key(value))
+
+
+def country_name(code: Optional[str]) -> Optional[str]:
+    return COUNTRY_NAMES.get(code) if code else None
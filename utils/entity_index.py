@@ -0,0 +1,422 @@
+import os
+import re
+import time
+import asyncio
+import hashlib
+import logging
+import sqlite3
+import unicodedata
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from persona_client.models import Case
+from utils.policy import parse_document_date
+from utils.screening import normalize_person_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = os.getenv("KYB_DATA_DIR", "data")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entity_cases (
+    ref        INTEGER PRIMARY KEY,
+    case_id    TEXT NOT NULL UNIQUE,
+    business   TEXT,
+    verdict    TEXT,
+    keys       BLOB,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS entity_keys (
+    key   INTEGER NOT NULL,
+    risky INTEGER NOT NULL,
+    ref   INTEGER NOT NULL,
+    kind  INTEGER NOT NULL,
+    value TEXT,
+    PRIMARY KEY (key, risky, ref)
+) WITHOUT ROWID;
+"""
+
+# Reviewer verdicts that make a case a risk to be linked to
+RISKY_VERDICTS = {"flag": "flagged", "reject": "rejected"}
+_RISKY = frozenset(RISKY_VERDICTS.values())
+
+
+def _verdict(action: Optional[str]) -> Optional[str]:
+    return RISKY_VERDICTS.get(action, "approved" if action == "approve" else None)
+
+# What a key stands for; kept per posting to say what two cases share
+KIND_EIN = 1
+KIND_ADDRESS = 2
+KIND_CONTROL_PERSON = 3
+KIND_BENEFICIAL_OWNER = 4
+KIND_LABELS = {KIND_EIN: "EIN", KIND_ADDRESS: "address", KIND_CONTROL_PERSON: "control person",
+               KIND_BENEFICIAL_OWNER: "beneficial owner"}
+
+# Blocking keys group near-duplicates; candidates sharing one are
+# confirmed by trigram Dice similarity of their normalized values
+ADDRESS_THRESHOLD = 0.8
+NAME_THRESHOLD = 0.85
+MAX_CANDIDATES = 200  # near-duplicate postings read per blocking key; a huge block is a shared registered agent
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_ADDRESS_WORDS = {
+    "street": "st", "avenue": "ave", "av": "ave", "road": "rd", "boulevard": "blvd", "drive": "dr",
+    "lane": "ln", "court": "ct", "place": "pl", "square": "sq", "highway": "hwy", "parkway": "pkwy",
+    "suite": "ste", "apartment": "apt", "floor": "fl", "building": "bldg", "unit": "ste",
+    "north": "n", "south": "s", "east": "e", "west": "w",
+}
+
+
+class EntityKey(NamedTuple):
+    key: int  # 64-bit hash of the key's namespace and text
+    kind: int
+    value: Optional[str]  # normalized value to confirm a blocking key; None for exact keys
+
+
+class CaseLink(NamedTuple):
+    """A flagged or rejected case sharing an entity with the case at hand"""
+    case_id: str
+    business: Optional[str]
+    verdict: str
+    shared: Tuple[str, ...]  # e.g. ("EIN", "beneficial owner")
+
+    def describe(self) -> str:
+        name = f"{self.business}, " if self.business else ""
+        return f"{self.case_id} ({name}{self.verdict}): shares {', '.join(self.shared)}"
+
+
+# ===== NORMALIZATION =====
+def _hash(namespace: str, text: str) -> int:
+    digest = hashlib.blake2b(f"{namespace}:{text}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)  # fits SQLite's INTEGER
+
+
+def _trigrams(text: str) -> frozenset:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(a: str, b: str) -> float:
+    """Trigram Dice coefficient, as utils.screening scores names"""
+    if a == b:
+        return 1.0
+    x, y = _trigrams(a), _trigrams(b)
+    return 2 * len(x & y) / (len(x) + len(y))
+
+
+def normalize_ein(value: Any) -> Optional[str]:
+    digits = re.sub(r"\D", "", str(value or ""))
+    return digits if len(digits) == 9 and digits.strip("0") else None
+
+
+def normalize_address(value: Any) -> str:
+    text = unicodedata.normalize("NFKD", str(value).casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(_ADDRESS_WORDS.get(token, token) for token in _TOKEN_RE.findall(text))
+
+
+def address_block(normalized: str) -> Optional[str]:
+    """House number plus the first word of the street name"""
+    tokens = normalized.split()
+    for i, token in enumerate(tokens):
+        if token.isdigit():
+            street = next((t for t in tokens[i + 1:] if not t.isdigit()), None)
+            return f"{token}|{street}" if street else None
+    return None
+
+
+def person_block(name: str, birthdate: Any) -> Optional[Tuple[str, str]]:
+    """(blocking key, normalized name) for a person with a readable date of birth"""
+    if not name or not birthdate:
+        return None
+    try:
+        born = parse_document_date(str(birthdate)).isoformat()
+    except ValueError:
+        return None
+    normalized = normalize_person_name(name)
+    tokens = normalized.split()
+    if not tokens:
+        return None
+    # Sorted tokens, so "Doe, Jane" and "Jane Doe" share the block
+    return f"{born}|{tokens[0][0]}{tokens[-1][0]}", normalized
+
+
+def entity_keys(case: Case) -> List[EntityKey]:
+    """Exact and blocking keys for the entities of a case"""
+    keys: Dict[int, EntityKey] = {}
+    business = case.business
+    ein = normalize_ein(business.ein)
+    if ein:
+        key = _hash("ein", ein)
+        keys[key] = EntityKey(key, KIND_EIN, None)
+    addresses = {business.address,
+                 business.registered_address.one_line() if business.registered_address else None}
+    for address in addresses:
+        if not address:
+            continue
+        normalized = normalize_address(address)
+        block = address_block(normalized)
+        if block:
+            key = _hash("address", block)
+            keys.setdefault(key, EntityKey(key, KIND_ADDRESS, normalized))
+    people = [(KIND_CONTROL_PERSON, case.control_person)] if case.control_person is not None else []
+    people += [(KIND_BENEFICIAL_OWNER, owner) for owner in case.beneficial_owners]
+    for kind, person in people:
+        blocked = person_block(person.full_name, person.birthdate)
+        if blocked:
+            # One namespace for every role: a control person here may own a business there
+            key = _hash("person", blocked[0])
+            keys.setdefault(key, EntityKey(key, kind, blocked[1]))
+    return list(keys.values())
+
+
+def _pack(keys: Sequence[EntityKey]) -> bytes:
+    """A case's keys for entity_cases.keys: sorted int64s, then a hash of the values"""
+    ordered = sorted(keys)
+    values = _hash("values", "\x1f".join(k.value or "" for k in ordered))
+    return array("q", [k.key for k in ordered] + [values]).tobytes()
+
+
+def _unpack(blob: Optional[bytes]) -> List[int]:
+    values = array("q")
+    if blob:
+        values.frombytes(blob)
+    return values.tolist()[:-1]
+
+
+class EntityIndex:
+    """Links cases that share a business or person with flagged or rejected ones.
+
+    Every processed case is stored under hash keys for its entities:
+    its EIN (exact), its addresses and its control person and beneficial
+    owners (blocking keys). An address is blocked on house number and
+    street name. A person is blocked on date of birth and initials.
+    Candidates in a block are confirmed by trigram similarity of their
+    normalized values. So linking costs a few index probes per case
+    and never compares all pairs.
+
+    Postings carry the case's ``risky`` bit (a reviewer flagged or
+    rejected it). A lookup only reads risky postings, and a block shared
+    by thousands of harmless cases costs nothing. Everything lives in
+    SQLite. Keys are 64-bit integers in a WITHOUT ROWID table, so the
+    index stays on disk and compact rather than in memory. All access
+    runs on one dedicated thread.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(DEFAULT_DATA_DIR, "entity_index.db")
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="entity-index")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {"linked": 0, "links": 0, "indexed": 0, "unchanged": 0, "verdicts": 0}
+
+    @classmethod
+    def from_env(cls, **overrides) -> "EntityIndex":
+        settings = dict(path=os.getenv("ENTITY_INDEX_PATH"))
+        settings.update(overrides)
+        return cls(**settings)
+
+    # ===== SYNC SIDE (index thread only) =====
+    def _open_sync(self) -> int:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+        return self._count_sync()
+
+    def _lookup_sync(self, case_id: str, keys: Sequence[EntityKey]) -> List[CaseLink]:
+        if not keys:
+            return []
+        by_key = {k.key: k for k in keys}
+        select = ("SELECT k.key, k.kind, k.value, c.case_id, c.business, c.verdict FROM entity_keys k "
+                  "JOIN entity_cases c ON c.ref = k.ref WHERE k.risky = 1 AND ")
+        exact = [k.key for k in by_key.values() if k.value is None]
+        blocked = [k.key for k in by_key.values() if k.value is not None]
+        # Exact keys are read in full; blocks are capped one by one, so a
+        # crowded block (a registered agent's address) can't crowd out the rest
+        parts = [select + f"k.key IN ({','.join('?' * len(exact))})"] if exact else []
+        parts += [f"SELECT * FROM ({select}k.key = ? LIMIT {MAX_CANDIDATES})"] * len(blocked)
+        rows = self._conn.execute(" UNION ALL ".join(parts), exact + blocked).fetchall()
+        links: Dict[str, Tuple[str, str, List[str]]] = {}
+        for key, kind, value, other_id, business, verdict in rows:
+            if other_id == case_id:
+                continue
+            mine = by_key[key]
+            if mine.value is not None:
+                threshold = ADDRESS_THRESHOLD if kind == KIND_ADDRESS else NAME_THRESHOLD
+                if value is None or similarity(mine.value, value) < threshold:
+                    continue
+            label = KIND_LABELS[mine.kind]
+            shared = links.setdefault(other_id, (business, verdict, []))[2]
+            if label not in shared:
+                shared.append(label)
+        return [CaseLink(other_id, business, verdict, tuple(shared))
+                for other_id, (business, verdict, shared) in links.items()]
+
+    def _row_sync(self, case_id: str) -> Optional[Tuple[int, Optional[str], Optional[bytes]]]:
+        return self._conn.execute(
+            "SELECT ref, verdict, keys FROM entity_cases WHERE case_id = ?", (case_id,)).fetchone()
+
+    def _replace_keys_sync(self, ref: int, old: Iterable[int], old_risky: int,
+                           keys: Sequence[EntityKey], risky: int) -> None:
+        conn = self._conn
+        conn.executemany("DELETE FROM entity_keys WHERE key = ? AND risky = ? AND ref = ?",
+                         [(key, old_risky, ref) for key in old])
+        conn.executemany("INSERT OR REPLACE INTO entity_keys (key, risky, ref, kind, value) VALUES (?, ?, ?, ?, ?)",
+                         [(k.key, risky, ref, k.kind, k.value) for k in keys])
+
+    def _store_sync(self, case_id: str, business: Optional[str], keys: Sequence[EntityKey]) -> bool:
+        """Insert or update a case's keys; False when nothing changed"""
+        packed = _pack(keys)
+        row = self._row_sync(case_id)
+        if row is not None and row[2] == packed:
+            return False
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            if row is None:
+                ref = conn.execute(
+                    "INSERT INTO entity_cases (case_id, business, keys, updated_at) VALUES (?, ?, ?, ?)",
+                    (case_id, business, packed, time.time())).lastrowid
+                self._replace_keys_sync(ref, (), 0, keys, 0)
+            else:
+                ref, verdict, old = row
+                risky = int(verdict in _RISKY)
+                conn.execute("UPDATE entity_cases SET business = ?, keys = ?, updated_at = ? WHERE ref = ?",
+                             (business, packed, time.time(), ref))
+                self._replace_keys_sync(ref, _unpack(old), risky, keys, risky)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+    def _link_sync(self, case_id: str, business: Optional[str],
+                   keys: Sequence[EntityKey]) -> Tuple[List[CaseLink], bool]:
+        return self._lookup_sync(case_id, keys), self._store_sync(case_id, business, keys)
+
+    def _set_verdict_sync(self, case_id: str, verdict: Optional[str], business: Optional[str],
+                          keys: Optional[Sequence[EntityKey]]) -> None:
+        if keys is not None:
+            self._store_sync(case_id, business, keys)
+        row = self._row_sync(case_id)
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            if row is None:
+                conn.execute("INSERT INTO entity_cases (case_id, business, verdict, updated_at) VALUES (?, ?, ?, ?)",
+                             (case_id, business, verdict, time.time()))
+            else:
+                ref, old_verdict, packed = row
+                old_risky = int(old_verdict in _RISKY)
+                risky = int(verdict in _RISKY)
+                conn.execute("UPDATE entity_cases SET verdict = ?, updated_at = ? WHERE ref = ?",
+                             (verdict, time.time(), ref))
+                if risky != old_risky:
+                    # The bit is part of the posting's primary key: move the postings
+                    keys = []
+                    for key in _unpack(packed):
+                        posting = conn.execute("SELECT kind, value FROM entity_keys WHERE key = ? AND risky = ? "
+                                               "AND ref = ?", (key, old_risky, ref)).fetchone()
+                        if posting is not None:
+                            keys.append(EntityKey(key, *posting))
+                    self._replace_keys_sync(ref, [k.key for k in keys], old_risky, keys, risky)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _store_many_sync(self, cases: Sequence[Tuple[str, Optional[str], Optional[str], Sequence[EntityKey]]]) -> None:
+        """Bulk load of new cases (a backfill): (case_id, business, verdict, keys)"""
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            for case_id, business, verdict, keys in cases:
+                ref = conn.execute(
+                    "INSERT INTO entity_cases (case_id, business, verdict, keys, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (case_id, business, verdict, _pack(keys), time.time())).lastrowid
+                self._replace_keys_sync(ref, (), 0, keys, int(verdict in _RISKY))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _count_sync(self) -> int:
+        # Rows are never deleted, so the last ref is the count (COUNT(*) scans)
+        return self._conn.execute("SELECT MAX(ref) FROM entity_cases").fetchone()[0] or 0
+
+    def _close_sync(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ===== ASYNC API =====
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def open(self) -> None:
+        stored = await self._run(self._open_sync)
+        logger.info("Entity index opened (%s cases)", stored)
+
+    async def close(self) -> None:
+        await self._run(self._close_sync)
+
+    async def link(self, case: Case) -> List[CaseLink]:
+        """Flagged or rejected cases sharing an entity with ``case``, which is then indexed"""
+        if self._conn is None or not case.id:
+            return []
+        business = case.business.legal_name or case.business.name
+        links, stored = await self._run(self._link_sync, case.id, business, entity_keys(case))
+        self._stats["indexed" if stored else "unchanged"] += 1
+        if links:
+            self._stats["linked"] += 1
+            self._stats["links"] += len(links)
+        return links
+
+    async def add_many(self, cases: Iterable[Tuple[Case, Optional[str]]], batch: int = 10_000) -> int:
+        """Bulk-index cases not stored yet, with their reviewer action (a backfill)"""
+        added = 0
+        pending: List[Tuple[str, Optional[str], Optional[str], List[EntityKey]]] = []
+        for case, action in cases:
+            verdict = _verdict(action)
+            pending.append((case.id, case.business.legal_name or case.business.name, verdict, entity_keys(case)))
+            if len(pending) >= batch:
+                await self._run(self._store_many_sync, pending)
+                added += len(pending)
+                pending = []
+        if pending:
+            await self._run(self._store_many_sync, pending)
+            added += len(pending)
+        self._stats["indexed"] += added
+        return added
+
+    async def set_verdict(self, case_id: str, action: str, case: Optional[Case] = None) -> None:
+        """Record a reviewer action; flag and reject make the case's entities risky"""
+        if self._conn is None:
+            return
+        keys = entity_keys(case) if case is not None else None
+        business = (case.business.legal_name or case.business.name) if case is not None else None
+        verdict = _verdict(action)
+        await self._run(self._set_verdict_sync, case_id, verdict, business, keys)
+        self._stats["verdicts"] += 1
+
+    async def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self._stats)
+        if self._conn is not None:
+            stats["cases"] = await self._run(self._count_sync)
+        return stats
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_entity_index: Optional[EntityIndex] = None
+
+
+def get_entity_index() -> EntityIndex:
+    global _entity_index
+    if _entity_index is None:
+        _entity_index = EntityIndex.from_env()
+    return _entity_index
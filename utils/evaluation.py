@@ -0,0 +1,194 @@
+import os
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Union
+
+from persona_client.models import Case, diff_cases
+from utils.countries import country_code
+from utils.metrics import get_metrics
+from utils.policy import (
+    PolicyEngine,
+    PolicyResult,
+    STEPS,
+    case_country,
+    get_policy_engine,
+    RULE_PROHIBITED_COUNTRY,
+    RULE_PROHIBITED_INDUSTRY,
+)
+
+_EMPTY: Dict[str, Any] = {}
+
+# Persona verification checks shown to reviewers, in display order
+VERIFICATION_CHECKS = ("business_registry", "watchlist", "pep", "adverse_media")
+
+_STEPS = get_metrics().counter(
+    "kyb_policy_steps_total", "Policy evaluation steps on case updates, run again or carried over",
+    ("outcome",))
+_STEPS_RUN = _STEPS.labels("run")
+_STEPS_REUSED = _STEPS.labels("reused")
+
+
+class CaseEvaluation:
+    """A case screened once, shared by the formatter, review routing and actions.
+
+    Holds the normalized fields reviewers see next to the policy outcome,
+    so nothing downstream re-reads the raw payload or repeats a rule.
+    """
+    __slots__ = (
+        "case_id", "status", "business_name", "country", "country_code", "industry",
+        "verifications", "proof_of_address_approved", "incomplete", "stale_since", "result",
+        "evaluated_at", "case", "links",
+    )
+
+    def __init__(self, data: Union[Dict[str, Any], Case], result: PolicyResult, evaluated_at: datetime):
+        self.result = result
+        self.evaluated_at = evaluated_at
+        # Related objects (reports, documents, ...) Persona didn't return in time
+        self.incomplete: List[str] = []
+        # Epoch seconds of the snapshot served while Persona was unreachable
+        self.stale_since: Optional[float] = None
+        # The decoded case, kept so an update can be diffed against it
+        self.case: Optional[Case] = None
+        # Flagged/rejected cases sharing an entity (utils.entity_index.CaseLink)
+        self.links: List[Any] = []
+        if type(data) is Case:
+            self._from_model(data)
+            return
+        business = data.get("business", _EMPTY)
+        verification = data.get("verification_results", _EMPTY)
+        self.case_id: str = data.get("id", "N/A")
+        self.status: str = data.get("status", "pending")
+        self.business_name: str = business.get("legal_name") or business.get("name") or "N/A"
+        self.country = case_country(business)
+        self.country_code: Optional[str] = country_code(self.country)
+        self.industry = business.get("industry")
+        # check -> True when Persona reported it clear
+        self.verifications: Dict[str, bool] = {
+            check: verification.get(check) == "clear" for check in VERIFICATION_CHECKS
+        }
+        self.proof_of_address_approved = data.get("proof_of_address", _EMPTY).get("status") == "approved"
+
+    def _from_model(self, case: Case) -> None:
+        business = case.business
+        self.case_id = case.id or "N/A"
+        self.status = case.status
+        self.business_name = business.legal_name or business.name or "N/A"
+        self.country = business.country
+        self.country_code = country_code(self.country)
+        self.industry = business.industry
+        self.verifications = {check: case.verifications.clear(check) for check in VERIFICATION_CHECKS}
+        self.proof_of_address_approved = case.proof_of_address.status == "approved"
+        self.incomplete = [f"{obj_type} {obj_id}" for obj_type, obj_id in case.incomplete]
+        self.stale_since = case.stale_since
+        self.case = case
+
+    # ===== RULE OUTCOMES =====
+    @property
+    def passed(self) -> bool:
+        return self.result.passed
+
+    @property
+    def failures(self) -> List[str]:
+        return [f.message for f in self.result.failures]
+
+    @property
+    def rule_ids(self) -> List[str]:
+        return self.result.rule_ids
+
+    @property
+    def needs_review(self) -> bool:
+        return self.result.needs_review or bool(self.links)
+
+    @property
+    def contact_email(self) -> str:
+        return self.result.contact_email
+
+    def failed(self, rule_id: str) -> bool:
+        return any(f.rule_id == rule_id for f in self.result.failures)
+
+    @property
+    def country_prohibited(self) -> bool:
+        return self.failed(RULE_PROHIBITED_COUNTRY)
+
+    @property
+    def industry_prohibited(self) -> bool:
+        return self.failed(RULE_PROHIBITED_INDUSTRY)
+
+    def to_checklist(self) -> Dict[str, Any]:
+        checklist = self.result.to_checklist()
+        checklist["linked_cases"] = [link.describe() for link in self.links]
+        return checklist
+
+    def summary(self) -> Dict[str, Any]:
+        """Compact form for logs and audit records"""
+        return {
+            "case_id": self.case_id,
+            "passed": self.passed,
+            "needs_review": self.needs_review,
+            "rule_ids": self.rule_ids,
+            "country_code": self.country_code,
+            "policy_version": self.result.policy_version,
+            "linked_case_ids": [link.case_id for link in self.links],
+        }
+
+
+def evaluate_case(data: Union[Dict[str, Any], Case], engine: Optional[PolicyEngine] = None,
+                  as_of: Optional[datetime] = None) -> CaseEvaluation:
+    """Screen ``data`` once and wrap the outcome with its normalized fields"""
+    engine = engine or get_policy_engine()
+    return CaseEvaluation(data, engine.evaluate(data, as_of=as_of), as_of or datetime.now())
+
+
+def reevaluate_case(case: Case, previous: Optional[CaseEvaluation], engine: Optional[PolicyEngine] = None,
+                    as_of: Optional[datetime] = None) -> CaseEvaluation:
+    """Screen an updated case, re-running only the rules whose inputs changed.
+
+    ``previous`` is the case's last evaluation; without it (or its Case)
+    this is ``evaluate_case``.
+    """
+    engine = engine or get_policy_engine()
+    if previous is None or previous.case is None:
+        return evaluate_case(case, engine, as_of)
+    result, steps = engine.reevaluate(case, previous.result, diff_cases(previous.case, case), as_of=as_of)
+    _STEPS_RUN.inc(len(steps))
+    _STEPS_REUSED.inc(len(STEPS) - len(steps))
+    return CaseEvaluation(case, result, as_of or datetime.now())
+
+
+class RecentEvaluations:
+    """Last evaluation per case, so Slack actions can see what reviewers saw
+
+    This is also the only source of previous results for incremental
+    re-evaluation; it is not persisted, so after a restart (or once a case is
+    evicted) the next update to a case is screened in full.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CaseEvaluation]" = OrderedDict()
+
+    def remember(self, evaluation: CaseEvaluation) -> None:
+        self._entries[evaluation.case_id] = evaluation
+        self._entries.move_to_end(evaluation.case_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, case_id: str) -> Optional[CaseEvaluation]:
+        return self._entries.get(case_id)
+
+    def forget(self, case_id: str) -> None:
+        self._entries.pop(case_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"entries": len(self._entries), "max_entries": self.max_entries}
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_recent: Optional[RecentEvaluations] = None
+
+
+def get_recent_evaluations() -> RecentEvaluations:
+    global _recent
+    if _recent is None:
+        _recent = RecentEvaluations(int(os.getenv("KYB_RECENT_EVALUATIONS", 1000)))
+    return _recent
@@ -0,0 +1,368 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import sqlite3
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from utils.policy import PolicyEngine, country_key, expired_through, normalize_name, parse_document_date
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = os.getenv("KYB_DATA_DIR", "data")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS impact_cases (
+    case_id        TEXT PRIMARY KEY,
+    country        TEXT,
+    incorporation  TEXT,
+    industry       TEXT,
+    poa_date       TEXT,
+    missing        TEXT NOT NULL,
+    passed         INTEGER NOT NULL,
+    policy_version TEXT,
+    updated_at     REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS impact_meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+_COLUMNS = "case_id, country, incorporation, industry, poa_date, missing, passed, policy_version, updated_at"
+
+# Business fields a required-field rule can name; a case is indexed by the
+# ones it lacks. A rule on any other field needs a full re-screen.
+BUSINESS_FIELDS = ("name", "legal_name", "ein", "address", "incorporation_country", "country", "industry")
+
+
+class IndexedCase(NamedTuple):
+    """The attributes of an evaluated case that policy rules read"""
+    case_id: str
+    country: Optional[str]  # country_key() of the business country
+    incorporation: Optional[str]  # country_key() of the incorporation country
+    industry: Optional[str]  # normalize_name() of the industry
+    poa_date: Optional[str]  # ISO date of a proof of address not yet approved
+    missing: str  # comma-separated BUSINESS_FIELDS the case lacks
+    passed: int
+    policy_version: Optional[str]
+    updated_at: float
+
+    def keys(self) -> tuple:
+        return self[1:8]
+
+
+def index_evaluation(evaluation) -> Optional[IndexedCase]:
+    """IndexedCase for a CaseEvaluation (None without its decoded Case)"""
+    case = evaluation.case
+    if case is None:
+        return None
+    business = case.business
+    documents = case.proof_of_address
+    poa_date = None
+    if documents.status != "approved" and documents.document_date:
+        try:
+            poa_date = parse_document_date(documents.document_date).isoformat()
+        except ValueError:
+            pass  # the rule treats it as unreadable either way
+    return IndexedCase(
+        evaluation.case_id,
+        country_key(business.country) if business.country else None,
+        country_key(business.incorporation_country) if business.incorporation_country else None,
+        normalize_name(business.industry) if business.industry else None,
+        poa_date,
+        ",".join(field for field in BUSINESS_FIELDS if not getattr(business, field)),
+        int(evaluation.passed),
+        str(evaluation.result.policy_version),
+        time.time(),
+    )
+
+
+# ===== POLICY VERSIONS =====
+class PolicySnapshot(NamedTuple):
+    """The parts of a compiled policy the index can answer for"""
+    version: str
+    countries: Tuple[str, ...]  # country keys
+    industries: Tuple[str, ...]
+    required_fields: Tuple[str, ...]
+    poa_max_age_days: int
+
+    @classmethod
+    def from_engine(cls, engine: PolicyEngine) -> "PolicySnapshot":
+        return cls(str(engine.version), tuple(sorted(engine.country_keys)), tuple(sorted(engine.industry_keys)),
+                   tuple(engine.required_fields), engine.poa_max_age.days)
+
+    @classmethod
+    def from_json(cls, value: str) -> "PolicySnapshot":
+        d = json.loads(value)
+        return cls(d["version"], tuple(d["countries"]), tuple(d["industries"]), tuple(d["required_fields"]),
+                   int(d["poa_max_age_days"]))
+
+    def to_json(self) -> str:
+        return json.dumps(self._asdict(), sort_keys=True)
+
+    def fingerprint(self) -> str:
+        return hashlib.sha256(self.to_json().encode()).hexdigest()[:16]
+
+
+class PolicyDiff(NamedTuple):
+    """What changed between two policy snapshots; each entry can flip rules"""
+    countries: FrozenSet[str]  # added or removed
+    industries: FrozenSet[str]
+    required_fields: FrozenSet[str]
+    poa_max_age_days: Optional[Tuple[int, int]]  # (old, new) when changed
+
+    def __bool__(self) -> bool:
+        return bool(self.countries or self.industries or self.required_fields or self.poa_max_age_days)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "countries": sorted(self.countries),
+            "industries": sorted(self.industries),
+            "required_fields": sorted(self.required_fields),
+            "poa_max_age_days": list(self.poa_max_age_days) if self.poa_max_age_days else None,
+        }
+
+
+def diff_policies(old: PolicySnapshot, new: PolicySnapshot) -> PolicyDiff:
+    return PolicyDiff(
+        frozenset(old.countries).symmetric_difference(new.countries),
+        frozenset(old.industries).symmetric_difference(new.industries),
+        frozenset(old.required_fields).symmetric_difference(new.required_fields),
+        (old.poa_max_age_days, new.poa_max_age_days) if old.poa_max_age_days != new.poa_max_age_days else None,
+    )
+
+
+class ImpactIndex:
+    """Inverted index of evaluated cases by the attributes rules read.
+
+    Every screened case is indexed by business country, incorporation
+    country, industry, missing business fields and, while its proof of
+    address isn't approved, the document date (kept sorted, so dates
+    crossing the max-age window are a bisect away). ``affected(diff)``
+    answers "which cases can a policy edit change" with a few set
+    unions instead of re-screening everything; ``poa_crossing(day)``
+    lists the documents that expire on a given day.
+
+    Local name screening isn't indexed: a new sanctions list still means
+    re-screening by name. The index lives in SQLite (one dedicated
+    thread) and in memory; rows are written only when a case's indexed
+    attributes or outcome change. The last policy the cases were
+    screened against is kept next to them, so a policy edit made while
+    the app was down is detected at the next start.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.path.join(DEFAULT_DATA_DIR, "impact_index.db")
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="impact-index")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._cases: Dict[str, IndexedCase] = {}
+        self._countries: Dict[str, Set[str]] = {}
+        self._incorporations: Dict[str, Set[str]] = {}
+        self._industries: Dict[str, Set[str]] = {}
+        self._missing: Dict[str, Set[str]] = {}
+        self._poa: Dict[str, Set[str]] = {}
+        self._poa_dates: List[str] = []  # sorted keys of _poa (ISO dates sort as dates)
+        self.policy: Optional[PolicySnapshot] = None
+        self._stats = {"indexed": 0, "unchanged": 0, "queries": 0}
+
+    @classmethod
+    def from_env(cls, **overrides) -> "ImpactIndex":
+        settings = dict(path=os.getenv("IMPACT_INDEX_PATH"))
+        settings.update(overrides)
+        return cls(**settings)
+
+    # ===== IN-MEMORY INDEX =====
+    @staticmethod
+    def _link(postings: Dict[str, Set[str]], key: Optional[str], case_id: str) -> None:
+        if key:
+            postings.setdefault(key, set()).add(case_id)
+
+    @staticmethod
+    def _unlink(postings: Dict[str, Set[str]], key: Optional[str], case_id: str) -> bool:
+        """Remove a posting; True when it was the key's last one"""
+        ids = postings.get(key) if key else None
+        if ids is None:
+            return False
+        ids.discard(case_id)
+        if not ids:
+            del postings[key]
+            return True
+        return False
+
+    def _add(self, entry: IndexedCase) -> None:
+        previous = self._cases.get(entry.case_id)
+        if previous is not None:
+            self._remove(previous)
+        case_id = entry.case_id
+        self._cases[case_id] = entry
+        self._link(self._countries, entry.country, case_id)
+        self._link(self._incorporations, entry.incorporation, case_id)
+        self._link(self._industries, entry.industry, case_id)
+        for field in entry.missing.split(",") if entry.missing else ():
+            self._link(self._missing, field, case_id)
+        if entry.poa_date:
+            if entry.poa_date not in self._poa:
+                insort(self._poa_dates, entry.poa_date)
+            self._link(self._poa, entry.poa_date, case_id)
+
+    def _remove(self, entry: IndexedCase) -> None:
+        case_id = entry.case_id
+        self._unlink(self._countries, entry.country, case_id)
+        self._unlink(self._incorporations, entry.incorporation, case_id)
+        self._unlink(self._industries, entry.industry, case_id)
+        for field in entry.missing.split(",") if entry.missing else ():
+            self._unlink(self._missing, field, case_id)
+        if self._unlink(self._poa, entry.poa_date, case_id):
+            del self._poa_dates[bisect_left(self._poa_dates, entry.poa_date)]
+
+    # ===== SYNC SIDE (index thread only) =====
+    def _open_sync(self) -> int:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # The index is rebuilt by re-screening; an OS crash may lose the tail
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        for row in conn.execute(f"SELECT {_COLUMNS} FROM impact_cases"):
+            self._add(IndexedCase(*row))
+        row = conn.execute("SELECT value FROM impact_meta WHERE key = 'policy'").fetchone()
+        self.policy = PolicySnapshot.from_json(row[0]) if row else None
+        self._conn = conn
+        return len(self._cases)
+
+    def _save_sync(self, entry: IndexedCase) -> None:
+        self._conn.execute(f"INSERT OR REPLACE INTO impact_cases ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           entry)
+
+    def _save_many_sync(self, entries: List[IndexedCase]) -> None:
+        conn = self._conn
+        conn.execute("BEGIN")
+        try:
+            conn.executemany(f"INSERT OR REPLACE INTO impact_cases ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                             entries)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _save_policy_sync(self, value: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO impact_meta (key, value) VALUES ('policy', ?)", (value,))
+
+    def _close_sync(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ===== ASYNC API =====
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def open(self) -> None:
+        started = time.perf_counter()
+        # Built on the index thread; nothing reads the index until this returns
+        indexed = await self._run(self._open_sync)
+        logger.info("Impact index opened (%s cases in %.0f ms)", indexed, (time.perf_counter() - started) * 1000)
+
+    async def close(self) -> None:
+        await self._run(self._close_sync)
+
+    async def record(self, evaluation) -> None:
+        """Index a CaseEvaluation; stored only when what's indexed changed"""
+        entry = index_evaluation(evaluation)
+        if entry is None:
+            return
+        previous = self._cases.get(entry.case_id)
+        if previous is not None and previous.keys() == entry.keys():
+            self._stats["unchanged"] += 1
+            return
+        self._add(entry)
+        self._stats["indexed"] += 1
+        if self._conn is not None:
+            await self._run(self._save_sync, entry)
+
+    async def record_many(self, evaluations: Iterable[Any]) -> int:
+        """Index a batch (a backfill) in one transaction; returns how many changed"""
+        entries = []
+        for evaluation in evaluations:
+            entry = index_evaluation(evaluation)
+            if entry is None:
+                continue
+            previous = self._cases.get(entry.case_id)
+            if previous is None or previous.keys() != entry.keys():
+                self._add(entry)
+                entries.append(entry)
+        self._stats["indexed"] += len(entries)
+        if entries and self._conn is not None:
+            await self._run(self._save_many_sync, entries)
+        return len(entries)
+
+    async def save_policy(self, policy: PolicySnapshot) -> None:
+        self.policy = policy
+        if self._conn is not None:
+            await self._run(self._save_policy_sync, policy.to_json())
+
+    # ===== QUERIES =====
+    def affected(self, diff: PolicyDiff, as_of: Optional[datetime] = None) -> Set[str]:
+        """IDs of the cases whose screening outcome ``diff`` can change"""
+        self._stats["queries"] += 1
+        affected: Set[str] = set()
+        for key in diff.countries:
+            affected.update(self._countries.get(key, ()))
+            affected.update(self._incorporations.get(key, ()))
+        for key in diff.industries:
+            affected.update(self._industries.get(key, ()))
+        for field in diff.required_fields:
+            if field not in BUSINESS_FIELDS:
+                return set(self._cases)
+            affected.update(self._missing.get(field, ()))
+        if diff.poa_max_age_days:
+            as_of = as_of or datetime.now()
+            old, new = (expired_through(as_of, timedelta(days=days)) for days in diff.poa_max_age_days)
+            # Documents expired under one window and not the other
+            affected.update(self.poa_between(min(old, new) + timedelta(days=1), max(old, new)))
+        return affected
+
+    def poa_between(self, first: date, last: date) -> Set[str]:
+        """Cases with an unapproved proof of address dated ``first``..``last``"""
+        dates = self._poa_dates
+        ids: Set[str] = set()
+        for key in dates[bisect_left(dates, first.isoformat()):bisect_right(dates, last.isoformat())]:
+            ids.update(self._poa[key])
+        return ids
+
+    def poa_crossing(self, day: date, max_age_days: int) -> Set[str]:
+        """Cases whose unapproved proof of address starts to count as expired on ``day``"""
+        self._stats["queries"] += 1
+        return set(self._poa.get((day - timedelta(days=max_age_days)).isoformat(), ()))
+
+    def get(self, case_id: str) -> Optional[IndexedCase]:
+        return self._cases.get(case_id)
+
+    def __len__(self) -> int:
+        return len(self._cases)
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["cases"] = len(self._cases)
+        stats["poa_dates"] = len(self._poa_dates)
+        stats["policy_version"] = self.policy.version if self.policy else None
+        return stats
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_impact_index: Optional[ImpactIndex] = None
+
+
+def get_impact_index() -> ImpactIndex:
+    global _impact_index
+    if _impact_index is None:
+        _impact_index = ImpactIndex.from_env()
+    return _impact_index
@@ -0,0 +1,317 @@
+"""Lightweight in-process metrics with Prometheus text exposition.
+
+Counters, gauges and fixed-bucket histograms live in one registry. They
+are only updated from the event loop (or a single-threaded script), so
+the hot path takes no locks, and label children are created once and
+cached. ``stage(name).time()`` wraps a pipeline step: latency histogram,
+error counter and in-flight gauge in one ``with`` block.
+``MetricsMiddleware`` does the same per HTTP handler and tags each
+request with an ``X-Request-ID``.
+"""
+import re
+import math
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils.request_context import REQUEST_ID_HEADER, bind_request_id
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        # Buckets are "less than or equal", so the first bound >= value
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """The child for these label values; cache it for hot paths"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _labels(self, values: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labelnames, values)]
+        if extra:
+            pairs.append(f'{extra[0]}="{extra[1]}"')
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def _samples(self, values: Tuple[str, ...], child) -> List[str]:
+        return [f"{self.name}{self._labels(values)} {_format_value(child.value)}"]
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in sorted(self._children.items()):
+            lines.extend(self._samples(values, child))
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self) -> CounterChild:
+        return CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self) -> GaugeChild:
+        return GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> HistogramChild:
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _samples(self, values: Tuple[str, ...], child: HistogramChild) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), child.counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{self._labels(values, ('le', _format_value(bound)))} {cumulative}")
+        labels = self._labels(values)
+        lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+        lines.append(f"{self.name}_count{labels} {child.count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named metrics of one process; asking for an existing name returns it"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+        self._callbacks: List[Callable[[], None]] = []
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs):
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+        elif type(metric) is not cls or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"Metric {name} already registered as a different {metric.kind}")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def on_collect(self, callback: Callable[[], None]) -> None:
+        """Run ``callback`` before each render, e.g. to copy queue depths into gauges"""
+        self._callbacks.append(callback)
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        for callback in self._callbacks:
+            callback()
+        lines: List[str] = []
+        for name in sorted(self._metrics):
+            lines.extend(self._metrics[name].render())
+        return "\n".join(lines) + "\n"
+
+
+# ===== PIPELINE STAGES =====
+class Stage:
+    """Latency, errors and in-flight count of one named pipeline step"""
+    __slots__ = ("name", "latency", "errors", "in_flight")
+
+    def __init__(self, name: str, registry: MetricsRegistry):
+        self.name = name
+        self.latency = registry.histogram(
+            "kyb_stage_seconds", "Time spent in each case pipeline stage", ("stage",)).labels(name)
+        self.errors = registry.counter(
+            "kyb_stage_errors_total", "Stage runs that raised", ("stage",)).labels(name)
+        self.in_flight = registry.gauge(
+            "kyb_stage_in_flight", "Stage runs currently in progress", ("stage",)).labels(name)
+
+    def time(self) -> "StageTimer":
+        return StageTimer(self)
+
+    def observe(self, seconds: float, error: bool = False) -> None:
+        """Record a duration measured elsewhere"""
+        self.latency.observe(seconds)
+        if error:
+            self.errors.value += 1
+
+
+class StageTimer:
+    __slots__ = ("stage", "started")
+
+    def __init__(self, stage: Stage):
+        self.stage = stage
+
+    def __enter__(self) -> "StageTimer":
+        self.stage.in_flight.value += 1
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        stage = self.stage
+        stage.latency.observe(time.perf_counter() - self.started)
+        stage.in_flight.value -= 1
+        if exc_type is not None:
+            stage.errors.value += 1
+        return False
+
+
+_stages: Dict[str, Stage] = {}
+
+
+def stage(name: str) -> Stage:
+    """The shared Stage for ``name``; look it up once at module level"""
+    timer = _stages.get(name)
+    if timer is None:
+        timer = _stages[name] = Stage(name, get_metrics())
+    return timer
+
+
+# ===== HTTP MIDDLEWARE =====
+_VALID_REQUEST_ID = re.compile(r"[A-Za-z0-9._:-]{1,64}")
+_REQUEST_ID_KEY = REQUEST_ID_HEADER.lower().encode("latin-1")
+
+
+class MetricsMiddleware:
+    """ASGI middleware: per-handler request counts and latency, an in-flight
+    gauge, and a request ID (taken from ``X-Request-ID`` when it looks sane)
+    that is bound for logging and echoed on the response."""
+
+    def __init__(self, app, registry: Optional[MetricsRegistry] = None):
+        registry = registry or get_metrics()
+        self.app = app
+        self.requests = registry.counter(
+            "kyb_http_requests_total", "HTTP requests by handler, method and status",
+            ("handler", "method", "status"))
+        self.latency = registry.histogram(
+            "kyb_http_request_seconds", "HTTP request latency by handler", ("handler",))
+        self.in_flight = registry.gauge(
+            "kyb_http_requests_in_flight", "HTTP requests currently being served").labels()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        for key, value in scope["headers"]:
+            if key == _REQUEST_ID_KEY:
+                candidate = value.decode("latin-1")
+                request_id = candidate if _VALID_REQUEST_ID.fullmatch(candidate) else None
+                break
+        status = 500
+
+        with bind_request_id(request_id) as request_id:
+            header = (_REQUEST_ID_KEY, request_id.encode("latin-1"))
+
+            async def send_with_request_id(message):
+                nonlocal status
+                if message["type"] == "http.response.start":
+                    status = message["status"]
+                    message = dict(message, headers=list(message.get("headers", ())) + [header])
+                await send(message)
+
+            self.in_flight.value += 1
+            started = time.perf_counter()
+            try:
+                await self.app(scope, receive, send_with_request_id)
+            finally:
+                elapsed = time.perf_counter() - started
+                self.in_flight.value -= 1
+                # The router stores the matched endpoint in the shared scope
+                handler = getattr(scope.get("endpoint"), "__name__", "unmatched")
+                self.latency.labels(handler).observe(elapsed)
+                self.requests.labels(handler, scope["method"], str(status)).inc()
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_registry: Optional[MetricsRegistry] = None
+
+
+def get_metrics() -> MetricsRegistry:
+    global _registry
+    if _registry is None:
+        _registry = MetricsRegistry()
+    return _registry
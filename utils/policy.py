@@ -0,0 +1,515 @@
+import os
+import time as _time
+from datetime import date, datetime, time, timedelta
+from typing import TYPE_CHECKING, Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import yaml
+
+from utils.countries import country_code
+
+from persona_client.models import Case
+
+if TYPE_CHECKING:  # numpy-backed; imported when the engine is first built
+    from utils.screening import ScreeningIndex
+
+DEFAULT_CONFIG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "config.yaml"
+)
+
+MEMO_LIMIT = 4096
+_EMPTY: Dict[str, Any] = {}  # read-only default for missing sections
+
+# ===== RULE IDS =====
+RULE_BUSINESS_REQUIRED = "business.required"  # suffixed with the field name
+RULE_PROHIBITED_COUNTRY = "prohibited.country"
+RULE_PROHIBITED_INDUSTRY = "prohibited.industry"
+RULE_CONTROL_PERSON_NAME = "control_person.name"
+RULE_BENEFICIAL_OWNER_VALID = "beneficial_owner.valid"
+RULE_BENEFICIAL_OWNER_WATCHLIST = "beneficial_owner.watchlist"
+RULE_POA_MISSING = "proof_of_address.missing"
+RULE_POA_EXPIRED = "proof_of_address.expired"
+RULE_WATCHLIST_BUSINESS = "watchlist.business"
+RULE_WATCHLIST_PEP = "watchlist.pep"
+RULE_SCREENING_CONTROL_PERSON = "screening.control_person"
+RULE_SCREENING_BENEFICIAL_OWNER = "screening.beneficial_owner"
+
+# Rules that send a case to manual review instead of a routine decision
+REVIEW_RULES = frozenset({
+    RULE_PROHIBITED_COUNTRY,
+    RULE_PROHIBITED_INDUSTRY,
+    RULE_BENEFICIAL_OWNER_WATCHLIST,
+    RULE_WATCHLIST_BUSINESS,
+    RULE_WATCHLIST_PEP,
+    RULE_SCREENING_CONTROL_PERSON,
+    RULE_SCREENING_BENEFICIAL_OWNER,
+})
+
+# ===== RULE STEPS =====
+# evaluate_model runs its rules in these steps, in this order; a case
+# update re-runs only the steps that read a changed field (see reevaluate)
+STEP_REQUIRED = "required"
+STEP_COUNTRY = "country"
+STEP_INDUSTRY = "industry"
+STEP_CONTROL_PERSON = "control_person"
+STEP_BENEFICIAL_OWNERS = "beneficial_owners"
+STEP_PROOF_OF_ADDRESS = "proof_of_address"
+STEP_WATCHLIST = "watchlist"
+STEP_SCREENING = "screening"
+STEPS = (STEP_REQUIRED, STEP_COUNTRY, STEP_INDUSTRY, STEP_CONTROL_PERSON, STEP_BENEFICIAL_OWNERS,
+         STEP_PROOF_OF_ADDRESS, STEP_WATCHLIST, STEP_SCREENING)
+_STEP_ORDER = {step: i for i, step in enumerate(STEPS)}
+
+# Case fields each step reads, as persona_client.models.diff_cases names
+# them; the required-field step depends on the config (see PolicyEngine)
+STEP_INPUTS: Dict[str, FrozenSet[str]] = {
+    STEP_COUNTRY: frozenset({"business.country"}),
+    STEP_INDUSTRY: frozenset({"business.industry"}),
+    STEP_CONTROL_PERSON: frozenset({"control_person.full_name"}),
+    STEP_BENEFICIAL_OWNERS: frozenset({"beneficial_owners", "watchlist_hits"}),
+    STEP_PROOF_OF_ADDRESS: frozenset({"proof_of_address.status", "proof_of_address.document_date"}),
+    STEP_WATCHLIST: frozenset({"verifications.watchlist", "verifications.pep", "watchlist_hits"}),
+    STEP_SCREENING: frozenset({"control_person.full_name", "beneficial_owners"}),
+}
+# A proof of address expires as time passes, so it is re-checked every time
+CLOCK_STEPS = frozenset({STEP_PROOF_OF_ADDRESS})
+
+RULE_STEPS = {
+    RULE_PROHIBITED_COUNTRY: STEP_COUNTRY,
+    RULE_PROHIBITED_INDUSTRY: STEP_INDUSTRY,
+    RULE_CONTROL_PERSON_NAME: STEP_CONTROL_PERSON,
+    RULE_BENEFICIAL_OWNER_VALID: STEP_BENEFICIAL_OWNERS,
+    RULE_BENEFICIAL_OWNER_WATCHLIST: STEP_BENEFICIAL_OWNERS,
+    RULE_POA_MISSING: STEP_PROOF_OF_ADDRESS,
+    RULE_POA_EXPIRED: STEP_PROOF_OF_ADDRESS,
+    RULE_WATCHLIST_BUSINESS: STEP_WATCHLIST,
+    RULE_WATCHLIST_PEP: STEP_WATCHLIST,
+    RULE_SCREENING_CONTROL_PERSON: STEP_SCREENING,
+    RULE_SCREENING_BENEFICIAL_OWNER: STEP_SCREENING,
+}
+
+
+def rule_step(rule_id: str) -> str:
+    """The evaluation step that produces ``rule_id``"""
+    return RULE_STEPS.get(rule_id) or STEP_REQUIRED
+
+
+def normalize_name(value: Any) -> str:
+    """Case- and whitespace-insensitive key for list lookups"""
+    return " ".join(str(value).split()).casefold()
+
+
+def country_key(value: Any) -> str:
+    """ISO alpha-2 code when the country is known, else the normalized name"""
+    return country_code(value) or normalize_name(value)
+
+
+def case_country(business: Dict[str, Any]) -> Any:
+    """Business country, falling back to the physical then registered address"""
+    country = business.get("country")
+    if not country:
+        for address in ("physical_address", "registered_address"):
+            country = (business.get(address) or _EMPTY).get("country")
+            if country:
+                break
+    return country
+
+
+def parse_document_date(value: str) -> date:
+    """Parse a YYYY-MM-DD document date (ValueError if malformed)"""
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        # strptime also accepts non-padded forms such as 2024-5-1
+        return datetime.strptime(value, "%Y-%m-%d").date()
+
+
+def expired_through(as_of: datetime, max_age: timedelta) -> date:
+    """Latest document date that counts as expired at ``as_of``.
+
+    Equivalent to ``as_of - doc_date > max_age`` with the document date
+    taken at midnight, reduced to one date comparison per case.
+    """
+    cutoff = as_of - max_age
+    if cutoff.time() == time(0):
+        return cutoff.date() - timedelta(days=1)
+    return cutoff.date()
+
+
+class RuleResult(NamedTuple):
+    """A failed rule: stable ID plus the reviewer-facing message"""
+    rule_id: str
+    message: str
+
+
+class PolicyResult:
+    """Outcome of evaluating one case against the policy"""
+    __slots__ = ("failures", "contact_email", "policy_version", "screening_version")
+
+    def __init__(self, failures: List[RuleResult], contact_email: str, policy_version: Any,
+                 screening_version: Optional[str] = None):
+        self.failures = failures
+        self.contact_email = contact_email
+        self.policy_version = policy_version
+        # ScreeningIndex.version the case was screened against, if any
+        self.screening_version = screening_version
+
+    @property
+    def passed(self) -> bool:
+        return not self.failures
+
+    @property
+    def rule_ids(self) -> List[str]:
+        return [f.rule_id for f in self.failures]
+
+    @property
+    def needs_review(self) -> bool:
+        return any(f.rule_id in REVIEW_RULES for f in self.failures)
+
+    def to_checklist(self) -> Dict[str, Any]:
+        """The dict shape validate_kyb_checklist has always returned"""
+        return {
+            "passed": self.passed,
+            "failures": [f.message for f in self.failures],
+            "rule_ids": self.rule_ids,
+            "contact_email": self.contact_email,
+        }
+
+
+class PolicyEngine:
+    """KYB rules compiled from config/config.yaml.
+
+    Lists become normalized frozensets and rule IDs/messages are built
+    once, so evaluating a case is a handful of hash lookups and
+    comparisons.
+    """
+
+    def __init__(self, policy: Dict[str, Any]):
+        self.version = policy.get("version", 1)
+        business = policy.get("business") or {}
+        self.required_fields: List[str] = list(business.get("required_fields") or [])
+        self.prohibited_countries: List[str] = list(policy.get("prohibited_countries") or [])
+        self.prohibited_industries: List[str] = list(policy.get("prohibited_industries") or [])
+        # Countries compare by ISO code, so "CN" and "China" hit the same rule
+        self.country_keys: FrozenSet[str] = frozenset(country_key(c) for c in self.prohibited_countries)
+        self.industry_keys: FrozenSet[str] = frozenset(normalize_name(i) for i in self.prohibited_industries)
+        max_age_days = int((policy.get("proof_of_address") or {}).get("max_age_days", 90))
+        self.poa_max_age = timedelta(days=max_age_days)
+        # Local sanctions/PEP name screening; attached by get_policy_engine
+        self.screening: Optional["ScreeningIndex"] = None
+        self.screening_threshold = float((policy.get("screening") or {}).get("threshold", 0.85))
+        # raw value -> failure (or False); country/industry values repeat a lot
+        self._country_memo: Dict[Any, Any] = {}
+        self._industry_memo: Dict[Any, Any] = {}
+        self._date_memo: Dict[str, date] = {}
+        self._expired_through = date.min
+        self._expired_through_until = 0.0
+        # Fixed-message failures are immutable, so build them once
+        self._required = [
+            (field, RuleResult(f"{RULE_BUSINESS_REQUIRED}.{field}", f"Business {field.replace('_', ' ')} missing"))
+            for field in self.required_fields
+        ]
+        self._control_person_missing = RuleResult(RULE_CONTROL_PERSON_NAME, "Control person full name is missing")
+        self._owner_missing = RuleResult(RULE_BENEFICIAL_OWNER_VALID, "Valid beneficial owner missing")
+        self._owner_watchlist = RuleResult(RULE_BENEFICIAL_OWNER_WATCHLIST, "Beneficial owner watchlist match")
+        self._poa_missing = RuleResult(RULE_POA_MISSING, "Proof of address missing")
+        self._poa_expired = RuleResult(RULE_POA_EXPIRED, f"Proof of address expired (>{max_age_days} days)")
+        self._business_watchlist = RuleResult(RULE_WATCHLIST_BUSINESS, "Business watchlist match")
+        self._pep_match = RuleResult(RULE_WATCHLIST_PEP, "PEP match detected")
+        self._control_person_screening = RuleResult(
+            RULE_SCREENING_CONTROL_PERSON, "Control person matches local sanctions/PEP list")
+        self._owner_screening = RuleResult(
+            RULE_SCREENING_BENEFICIAL_OWNER, "Beneficial owner matches local sanctions/PEP list")
+        self.required_checks = list(self._required)
+        self.step_inputs: Dict[str, FrozenSet[str]] = dict(STEP_INPUTS)
+        self.step_inputs[STEP_REQUIRED] = frozenset(f"business.{field}" for field in self.required_fields)
+        self.fixed_failures: Dict[str, RuleResult] = {
+            failure.rule_id: failure for failure in (
+                self._control_person_missing, self._owner_missing, self._owner_watchlist,
+                self._poa_missing, self._poa_expired, self._business_watchlist, self._pep_match,
+                self._control_person_screening, self._owner_screening,
+            )
+        }
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> "PolicyEngine":
+        path = path or os.getenv("KYB_CONFIG_PATH", DEFAULT_CONFIG_PATH)
+        with open(path, "r", encoding="utf-8") as f:
+            config = yaml.safe_load(f) or {}
+        if "policy" not in config:
+            raise ValueError(f"No 'policy' section in {path}")
+        return cls(config["policy"])
+
+    # ===== LOOKUPS =====
+    @staticmethod
+    def _lookup(memo: Dict[Any, Any], keys: FrozenSet[str], value: Any, rule_id: str, label: str,
+                key: Callable[[Any], str] = normalize_name):
+        """Memoized membership test returning the failure for ``value`` or False"""
+        failure = memo.get(value)
+        if failure is None:
+            failure = (RuleResult(rule_id, f"Prohibited {label}: {value}")
+                       if key(value) in keys else False)
+            if len(memo) < MEMO_LIMIT:
+                memo[value] = failure
+        return failure
+
+    def is_prohibited_country(self, country: Any) -> bool:
+        return bool(country) and bool(self._country_failure(country))
+
+    def is_prohibited_industry(self, industry: Any) -> bool:
+        return bool(industry) and bool(self._industry_failure(industry))
+
+    @property
+    def screening_version(self) -> Optional[str]:
+        return self.screening.version if self.screening is not None else None
+
+    def is_screening_match(self, name: Any) -> bool:
+        """True if ``name`` fuzzily matches the local sanctions/PEP index"""
+        return (self.screening is not None and isinstance(name, str) and bool(name)
+                and self.screening.matches(name, self.screening_threshold))
+
+    def expired_through(self, as_of: Optional[datetime] = None) -> date:
+        """Latest document date that counts as expired at ``as_of``"""
+        return expired_through(as_of or datetime.now(), self.poa_max_age)
+
+    def _current_expired_through(self) -> date:
+        # The answer only changes when the cutoff crosses midnight, so keep
+        # it until then instead of calling datetime.now() for every case.
+        now = _time.time()
+        if now >= self._expired_through_until:
+            current = datetime.fromtimestamp(now)
+            self._expired_through = self.expired_through(current)
+            rollover = datetime.combine(self._expired_through + timedelta(days=1), time(0)) + self.poa_max_age
+            self._expired_through_until = rollover.timestamp()
+        return self._expired_through
+
+    def _country_failure(self, country: Any):
+        return self._lookup(self._country_memo, self.country_keys, country,
+                            RULE_PROHIBITED_COUNTRY, "country", country_key)
+
+    def _industry_failure(self, industry: Any):
+        return self._lookup(self._industry_memo, self.industry_keys, industry,
+                            RULE_PROHIBITED_INDUSTRY, "industry")
+
+    def _poa_failure(self, document_date: Optional[str], as_of: Optional[datetime],
+                     expired_through: Optional[date]) -> Optional[RuleResult]:
+        """Failure for a proof of address that isn't approved, or None"""
+        if not document_date:
+            return self._poa_missing
+        if expired_through is None:
+            expired_through = self.expired_through(as_of) if as_of else self._current_expired_through()
+        doc_day = self._date_memo.get(document_date)
+        if doc_day is None:
+            doc_day = parse_document_date(document_date)
+            if len(self._date_memo) < MEMO_LIMIT:
+                self._date_memo[document_date] = doc_day
+        return self._poa_expired if doc_day <= expired_through else None
+
+    # ===== EVALUATION =====
+    def evaluate(self, data: Union[Dict[str, Any], Case], as_of: Optional[datetime] = None,
+                 expired_through: Optional[date] = None) -> PolicyResult:
+        if type(data) is Case:
+            return self.evaluate_model(data, as_of, expired_through)
+        failures: List[RuleResult] = []
+        append = failures.append
+        business = data.get("business", _EMPTY)
+        verification = data.get("verification_results", _EMPTY)
+        documents = data.get("proof_of_address", _EMPTY)
+        watchlist_hits = data.get("watchlist_hits", _EMPTY)
+
+        # 1. Business required fields (one C-level pass when all present)
+        if not all(map(business.get, self.required_fields)):
+            for field, failure in self._required:
+                if not business.get(field):
+                    append(failure)
+
+        # 2. Prohibited country / industry
+        country = business.get("country") or case_country(business)
+        if country:
+            failure = self._country_memo.get(country)
+            if failure is None:
+                failure = self._country_failure(country)
+            if failure:
+                append(failure)
+        industry = business.get("industry")
+        if industry:
+            failure = self._industry_memo.get(industry)
+            if failure is None:
+                failure = self._industry_failure(industry)
+            if failure:
+                append(failure)
+
+        # 3. Control person
+        control_name = data.get("control_person", _EMPTY).get("full_name")
+        if not control_name:
+            append(self._control_person_missing)
+
+        # 4. Beneficial owners
+        for bo in data.get("beneficial_owners", ()):
+            if bo.get("full_name") and bo.get("ownership"):
+                break
+        else:
+            append(self._owner_missing)
+        if watchlist_hits.get("beneficial_owners"):
+            append(self._owner_watchlist)
+
+        # 5. Proof of address
+        if documents.get("status") != "approved":
+            failure = self._poa_failure(documents.get("document_date"), as_of, expired_through)
+            if failure:
+                append(failure)
+
+        # 6. Watchlist / PEP
+        if verification.get("watchlist") != "clear" or watchlist_hits.get("business"):
+            append(self._business_watchlist)
+        if verification.get("pep") != "clear" or watchlist_hits.get("control_person"):
+            append(self._pep_match)
+
+        # 7. Local name screening, independent of Persona's verdicts
+        if self.screening is not None:
+            if self.is_screening_match(control_name):
+                append(self._control_person_screening)
+            for bo in data.get("beneficial_owners", ()):
+                if self.is_screening_match(bo.get("full_name")):
+                    append(self._owner_screening)
+                    break
+
+        return PolicyResult(
+            failures,
+            data.get("form_filler", _EMPTY).get("email", "submitter@example.com"),
+            self.version,
+            self.screening_version,
+        )
+
+    def evaluate_model(self, case: Case, as_of: Optional[datetime] = None,
+                       expired_through: Optional[date] = None,
+                       steps: Optional[FrozenSet[str]] = None) -> PolicyResult:
+        """``evaluate`` for a decoded Case: the same rules, read from attributes.
+
+        ``steps`` limits the pass to those STEPS; the others report nothing.
+        """
+        failures: List[RuleResult] = []
+        append = failures.append
+        business = case.business
+        hits = case.watchlist_hits
+        every = steps is None
+
+        # 1. Business required fields
+        if every or STEP_REQUIRED in steps:
+            for field, failure in self._required:
+                if not getattr(business, field, None):
+                    append(failure)
+
+        # 2. Prohibited country / industry
+        country = business.country
+        if country and (every or STEP_COUNTRY in steps):
+            failure = self._country_memo.get(country)
+            if failure is None:
+                failure = self._country_failure(country)
+            if failure:
+                append(failure)
+        industry = business.industry
+        if industry and (every or STEP_INDUSTRY in steps):
+            failure = self._industry_memo.get(industry)
+            if failure is None:
+                failure = self._industry_failure(industry)
+            if failure:
+                append(failure)
+
+        # 3. Control person
+        control = case.control_person
+        control_name = control.full_name if control is not None else None
+        if not control_name and (every or STEP_CONTROL_PERSON in steps):
+            append(self._control_person_missing)
+
+        # 4. Beneficial owners
+        if every or STEP_BENEFICIAL_OWNERS in steps:
+            for bo in case.beneficial_owners:
+                if bo.full_name and bo.ownership:
+                    break
+            else:
+                append(self._owner_missing)
+            if "beneficial_owners" in hits:
+                append(self._owner_watchlist)
+
+        # 5. Proof of address
+        documents = case.proof_of_address
+        if documents.status != "approved" and (every or STEP_PROOF_OF_ADDRESS in steps):
+            failure = self._poa_failure(documents.document_date, as_of, expired_through)
+            if failure:
+                append(failure)
+
+        # 6. Watchlist / PEP
+        if every or STEP_WATCHLIST in steps:
+            verifications = case.verifications
+            if verifications.watchlist != "clear" or "business" in hits:
+                append(self._business_watchlist)
+            if verifications.pep != "clear" or "control_person" in hits:
+                append(self._pep_match)
+
+        # 7. Local name screening
+        if self.screening is not None and (every or STEP_SCREENING in steps):
+            if self.is_screening_match(control_name):
+                append(self._control_person_screening)
+            for bo in case.beneficial_owners:
+                if self.is_screening_match(bo.full_name):
+                    append(self._owner_screening)
+                    break
+
+        return PolicyResult(failures, case.contact_email or "submitter@example.com", self.version,
+                            self.screening_version)
+
+    def steps_to_rerun(self, changed: Iterable[str]) -> FrozenSet[str]:
+        """Steps whose input fields are among ``changed``, plus CLOCK_STEPS"""
+        changed = frozenset(changed)
+        return frozenset(step for step, inputs in self.step_inputs.items() if inputs & changed) | CLOCK_STEPS
+
+    def reevaluate(self, case: Case, previous: PolicyResult, changed: Iterable[str],
+                   as_of: Optional[datetime] = None) -> Tuple[PolicyResult, FrozenSet[str]]:
+        """Update ``previous`` (this case's last result) after ``changed`` fields moved.
+
+        Only the steps reading a changed field are run again; the other
+        steps' failures are carried over. The result equals a full
+        ``evaluate`` of ``case``. Returns it with the steps that ran; a
+        result from another policy version is recomputed in full, and one
+        screened against another index has its screening step run again.
+        """
+        if previous.policy_version != self.version:
+            return self.evaluate_model(case, as_of), frozenset(STEPS)
+        steps = self.steps_to_rerun(changed)
+        if previous.screening_version != self.screening_version:
+            steps = steps | {STEP_SCREENING}
+        fresh = self.evaluate_model(case, as_of, steps=steps)
+        kept = [f for f in previous.failures if rule_step(f.rule_id) not in steps]
+        if kept:
+            # Steps never interleave, so a stable sort restores evaluation order
+            failures = sorted(fresh.failures + kept, key=lambda f: _STEP_ORDER[rule_step(f.rule_id)])
+            fresh = PolicyResult(failures, fresh.contact_email, self.version, fresh.screening_version)
+        return fresh, steps
+
+    def evaluate_many(self, cases: Iterable[Union[Dict[str, Any], Case]],
+                      as_of: Optional[datetime] = None) -> List[PolicyResult]:
+        """Evaluate several cases against one pinned ``as_of`` instant"""
+        expired_through = self.expired_through(as_of)
+        return [self.evaluate(case, expired_through=expired_through) for case in cases]
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_engine: Optional[PolicyEngine] = None
+
+
+def get_policy_engine() -> PolicyEngine:
+    """Load config/config.yaml on first use and reuse the compiled engine"""
+    global _engine
+    if _engine is None:
+        from utils.screening import get_screening_index
+        _engine = PolicyEngine.from_file()
+        _engine.screening = get_screening_index()
+    return _engine
+
+
+def reload_policy_engine(path: Optional[str] = None) -> PolicyEngine:
+    global _engine
+    from utils.screening import get_screening_index
+    _engine = PolicyEngine.from_file(path)
+    _engine.screening = get_screening_index()
+    return _engine
@@ -0,0 +1,473 @@
+import os
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from utils.policy import RULE_PROHIBITED_COUNTRY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = os.getenv("KYB_DATA_DIR", "data")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS report_events (
+    seq            INTEGER PRIMARY KEY,
+    ts             REAL NOT NULL,
+    kind           TEXT NOT NULL,
+    case_id        TEXT NOT NULL,
+    action         TEXT,
+    passed         INTEGER,
+    needs_review   INTEGER,
+    rule_ids       TEXT,
+    country_code   TEXT,
+    industry       TEXT,
+    policy_version INTEGER,
+    turnaround     REAL
+);
+CREATE TABLE IF NOT EXISTS report_daily (
+    day    TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    key    TEXT NOT NULL,
+    value  REAL NOT NULL,
+    PRIMARY KEY (day, metric, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS report_cases (
+    case_id       TEXT PRIMARY KEY,
+    first_ts      REAL NOT NULL,
+    day           TEXT NOT NULL,
+    rule_ids      TEXT NOT NULL,
+    passed        INTEGER NOT NULL,
+    needs_review  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS report_exports (
+    name     TEXT PRIMARY KEY,
+    last_seq INTEGER NOT NULL
+);
+"""
+
+_EVENT_COLUMNS = ("seq, ts, kind, case_id, action, passed, needs_review, rule_ids, country_code, industry, "
+                  "policy_version, turnaround")
+
+KIND_SCREENING = "screening"
+KIND_ACTION = "action"
+
+# Upper bounds (seconds) of the turnaround histogram kept per action
+TURNAROUND_BUCKETS = (300, 900, 3600, 4 * 3600, 8 * 3600, 86400, 2 * 86400, 3 * 86400, 7 * 86400,
+                      14 * 86400, 30 * 86400)
+
+EXPORT_FORMATS = ("parquet", "arrow")
+EXPORT_BATCH = 100_000  # events read per export chunk
+
+
+class ReportEvent(NamedTuple):
+    """One screening or reviewer action, as exported"""
+    ts: float
+    kind: str
+    case_id: str
+    action: Optional[str] = None
+    passed: Optional[int] = None
+    needs_review: Optional[int] = None
+    rule_ids: Optional[str] = None  # JSON list
+    country_code: Optional[str] = None
+    industry: Optional[str] = None
+    policy_version: Optional[int] = None
+
+
+def utc_day(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).date().isoformat()
+
+
+def iso_week(value: str) -> Tuple[date, date]:
+    """Monday and Sunday of an ISO week such as 2026-W41"""
+    try:
+        year, week = value.upper().split("-W")
+        monday = date.fromisocalendar(int(year), int(week), 1)
+    except ValueError:
+        raise ValueError(f"Invalid ISO week {value!r}; expected YYYY-Www") from None
+    return monday, monday + timedelta(days=6)
+
+
+def report_range(week: Optional[str] = None, since: Optional[str] = None,
+                 until: Optional[str] = None) -> Tuple[date, date]:
+    """First and last UTC day of a report: an ISO week, or since/until (default: the last seven days)"""
+    if week:
+        return iso_week(week)
+    last = date.fromisoformat(until) if until else datetime.now(timezone.utc).date()
+    first = date.fromisoformat(since) if since else last - timedelta(days=6)
+    if first > last:
+        raise ValueError(f"since ({first}) is after until ({last})")
+    return first, last
+
+
+def bucket_quantile(counts: Dict[int, float], total: float, q: float) -> Optional[float]:
+    """Upper bound (seconds) of the bucket holding the q-quantile; None past the last bucket"""
+    seen = 0.0
+    for bound in TURNAROUND_BUCKETS:
+        seen += counts.get(bound, 0)
+        if seen >= q * total:
+            return bound
+    return None
+
+
+class ReportStore:
+    """Running compliance aggregates and an exportable event log.
+
+    Screenings and reviewer actions are queued by the request path and
+    written by a single writer task in batches. Each batch appends its
+    events to ``report_events`` and adds its deltas to per-day
+    aggregates in ``report_daily``: cases screened, outcomes, failures
+    by rule, prohibited-country hits, decisions and a turnaround
+    histogram per action. A report is a range scan over the daily rows,
+    so it never rescans events, whatever the history holds.
+
+    A case counts once per UTC day with its latest outcome there: a
+    same-day re-screen replaces its earlier contribution. Turnaround
+    runs from a case's first screening to each reviewer action.
+
+    ``export`` writes events not exported yet to Parquet or Arrow IPC
+    files, one directory per UTC day, and remembers how far it got.
+    It needs pyarrow; nothing else here does.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_batch: int = 1000, max_pending: int = 100_000):
+        self.path = path or os.path.join(DEFAULT_DATA_DIR, "reports.db")
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="reports")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+        self._stats = {"recorded": 0, "dropped": 0, "commits": 0, "exported": 0}
+
+    @classmethod
+    def from_env(cls, **overrides) -> "ReportStore":
+        settings = dict(path=os.getenv("REPORTS_PATH"),
+                        max_pending=int(os.getenv("REPORTS_MAX_PENDING", 100_000)))
+        settings.update(overrides)
+        return cls(**settings)
+
+    # ===== SYNC SIDE (reports thread only) =====
+    def _open_sync(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")  # the CLI may export while the app writes
+        conn.executescript(_SCHEMA)
+        self._conn = conn
+
+    def _apply_sync(self, events: Sequence[ReportEvent]) -> None:
+        """Append a batch of events and fold it into the daily aggregates"""
+        conn = self._conn
+        deltas: Dict[Tuple[str, str, str], float] = defaultdict(float)
+        rows = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for event in events:
+                day = utc_day(event.ts)
+                turnaround = None
+                if event.kind == KIND_SCREENING:
+                    self._screened_sync(event, day, deltas)
+                else:
+                    turnaround = self._acted_sync(event, day, deltas)
+                rows.append(tuple(event) + (turnaround,))
+            conn.executemany(
+                "INSERT INTO report_events (ts, kind, case_id, action, passed, needs_review, rule_ids, "
+                "country_code, industry, policy_version, turnaround) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows)
+            conn.executemany(
+                "INSERT INTO report_daily (day, metric, key, value) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (day, metric, key) DO UPDATE SET value = value + excluded.value",
+                [(day, metric, key, value) for (day, metric, key), value in deltas.items() if value])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _screened_sync(self, event: ReportEvent, day: str, deltas: Dict[Tuple[str, str, str], float]) -> None:
+        conn = self._conn
+        deltas[(day, "screenings", "")] += 1
+        previous = conn.execute("SELECT day, rule_ids, passed, needs_review FROM report_cases WHERE case_id = ?",
+                                (event.case_id,)).fetchone()
+        if previous is not None and previous[0] == day:
+            # Re-screened the same day: its latest outcome replaces the earlier one
+            _, rule_ids, passed, needs_review = previous
+            self._outcome(day, json.loads(rule_ids), passed, needs_review, -1, deltas)
+        else:
+            deltas[(day, "cases", "")] += 1
+        rule_ids = json.loads(event.rule_ids or "[]")
+        self._outcome(day, rule_ids, event.passed, event.needs_review, 1, deltas)
+        if previous is None:
+            conn.execute("INSERT INTO report_cases (case_id, first_ts, day, rule_ids, passed, needs_review) "
+                         "VALUES (?, ?, ?, ?, ?, ?)",
+                         (event.case_id, event.ts, day, event.rule_ids or "[]", event.passed, event.needs_review))
+        else:
+            conn.execute("UPDATE report_cases SET day = ?, rule_ids = ?, passed = ?, needs_review = ? "
+                         "WHERE case_id = ?",
+                         (day, event.rule_ids or "[]", event.passed, event.needs_review, event.case_id))
+
+    @staticmethod
+    def _outcome(day: str, rule_ids: List[str], passed: int, needs_review: int, sign: int,
+                 deltas: Dict[Tuple[str, str, str], float]) -> None:
+        deltas[(day, "passed", "")] += sign * passed
+        deltas[(day, "needs_review", "")] += sign * needs_review
+        for rule_id in rule_ids:
+            deltas[(day, "rule", rule_id)] += sign
+        if RULE_PROHIBITED_COUNTRY in rule_ids:
+            deltas[(day, "country_hit", "")] += sign
+
+    def _acted_sync(self, event: ReportEvent, day: str,
+                    deltas: Dict[Tuple[str, str, str], float]) -> Optional[float]:
+        action = event.action or ""
+        deltas[(day, "decisions", action)] += 1
+        first = self._conn.execute("SELECT first_ts FROM report_cases WHERE case_id = ?",
+                                   (event.case_id,)).fetchone()
+        if first is None:
+            return None  # screened before reporting existed
+        turnaround = max(0.0, event.ts - first[0])
+        deltas[(day, "turnaround_n", action)] += 1
+        deltas[(day, "turnaround_s", action)] += turnaround
+        bound = next((b for b in TURNAROUND_BUCKETS if turnaround <= b), 0)  # 0: beyond the last bucket
+        deltas[(day, "turnaround_le", f"{action}|{bound}")] += 1
+        return turnaround
+
+    def _report_sync(self, since: str, until: str) -> Dict[str, Any]:
+        totals: Dict[Tuple[str, str], float] = {}
+        for metric, key, value in self._conn.execute(
+                "SELECT metric, key, SUM(value) FROM report_daily WHERE day BETWEEN ? AND ? GROUP BY metric, key",
+                (since, until)):
+            totals[(metric, key)] = value
+        return build_report(since, until, totals)
+
+    def _export_mark_sync(self, name: str) -> int:
+        row = self._conn.execute("SELECT last_seq FROM report_exports WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def _events_after_sync(self, after: int, limit: int) -> List[tuple]:
+        return self._conn.execute(f"SELECT {_EVENT_COLUMNS} FROM report_events WHERE seq > ? ORDER BY seq LIMIT ?",
+                                  (after, limit)).fetchall()
+
+    def _export_sync(self, directory: str, fmt: str) -> Dict[str, Any]:
+        name = f"{os.path.abspath(directory)}|{fmt}"
+        last = self._export_mark_sync(name)
+        files: List[str] = []
+        exported = 0
+        while True:
+            rows = self._events_after_sync(last, EXPORT_BATCH)
+            if not rows:
+                break
+            files.extend(write_partitions(rows, directory, fmt))
+            exported += len(rows)
+            last = rows[-1][0]
+            # Files are named by their first seq, so a crash before this
+            # point rewrites the same files on the next run
+            self._conn.execute("INSERT INTO report_exports (name, last_seq) VALUES (?, ?) "
+                               "ON CONFLICT (name) DO UPDATE SET last_seq = excluded.last_seq", (name, last))
+        return {"events": exported, "files": files, "last_seq": last}
+
+    def _close_sync(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ===== ASYNC API =====
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def open(self) -> None:
+        await self._run(self._open_sync)
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._writer = asyncio.create_task(self._write_loop(), name="reports-writer")
+
+    async def close(self) -> None:
+        """Write what is queued, then close the database"""
+        if self._writer is not None:
+            await self._queue.put(None)
+            await self._writer
+            self._writer = None
+        await self._run(self._close_sync)
+
+    def _enqueue(self, event: ReportEvent) -> None:
+        if self._writer is None:
+            return
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self._stats["dropped"] += 1
+
+    def record_screening(self, evaluation, ts: Optional[float] = None) -> None:
+        """Queue a screening (a utils.evaluation.CaseEvaluation); never waits"""
+        result = evaluation.result
+        self._enqueue(ReportEvent(
+            ts or time.time(), KIND_SCREENING, evaluation.case_id,
+            passed=int(evaluation.passed), needs_review=int(evaluation.needs_review),
+            rule_ids=json.dumps(evaluation.rule_ids), country_code=evaluation.country_code,
+            industry=evaluation.industry, policy_version=result.policy_version,
+        ))
+
+    def record_action(self, action: str, case_id: str, ts: Optional[float] = None) -> None:
+        """Queue a reviewer action (approve, flag, reject); never waits"""
+        self._enqueue(ReportEvent(ts or time.time(), KIND_ACTION, case_id, action=action))
+
+    async def _write_loop(self) -> None:
+        queue = self._queue
+        stopping = False
+        while not stopping:
+            item = await queue.get()
+            batch = []
+            while item is not None:
+                batch.append(item)
+                if len(batch) >= self.max_batch or queue.empty():
+                    break
+                item = queue.get_nowait()
+            stopping = item is None
+            if not batch:
+                continue
+            try:
+                await self._run(self._apply_sync, batch)
+            except Exception:
+                logger.exception("Report store write failed (%d events lost)", len(batch))
+                continue
+            self._stats["commits"] += 1
+            self._stats["recorded"] += len(batch)
+
+    async def report(self, since: date, until: date) -> Dict[str, Any]:
+        """Compliance numbers for the UTC days ``since`` through ``until``"""
+        return await self._run(self._report_sync, since.isoformat(), until.isoformat())
+
+    async def export(self, directory: str, fmt: str = "parquet") -> Dict[str, Any]:
+        """Write the events not exported to ``directory`` yet (per directory and format)"""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}")
+        result = await self._run(self._export_sync, directory, fmt)
+        self._stats["exported"] += result["events"]
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["queued"] = self._queue.qsize() if self._queue is not None else 0
+        return stats
+
+
+# ===== REPORTS =====
+def build_report(since: str, until: str, totals: Dict[Tuple[str, str], float]) -> Dict[str, Any]:
+    """Turn summed daily rows ((metric, key) -> value) into the report"""
+    def total(metric: str, key: str = "") -> int:
+        return int(totals.get((metric, key), 0))
+
+    cases = total("cases")
+    rules = {key: int(value) for (metric, key), value in totals.items() if metric == "rule" and value}
+    decisions: Dict[str, Dict[str, Any]] = {}
+    for (metric, action), value in totals.items():
+        if metric != "decisions" or not value:
+            continue
+        timed = total("turnaround_n", action)
+        histogram = {}
+        for (other, key), count in totals.items():
+            if other == "turnaround_le" and key.startswith(f"{action}|"):
+                histogram[int(key.split("|", 1)[1])] = count
+        p50, p90 = (bucket_quantile(histogram, timed, q) if timed else None for q in (0.5, 0.9))
+        decisions[action] = {
+            "count": int(value),
+            "timed": timed,
+            "mean_hours": round(totals.get(("turnaround_s", action), 0) / timed / 3600, 2) if timed else None,
+            # Upper bounds of the histogram buckets; None is past 30 days
+            "p50_hours_at_most": round(p50 / 3600, 2) if p50 else None,
+            "p90_hours_at_most": round(p90 / 3600, 2) if p90 else None,
+        }
+    return {
+        "since": since,
+        "until": until,
+        "cases_screened": cases,
+        "screenings": total("screenings"),
+        "passed": total("passed"),
+        "needs_review": total("needs_review"),
+        "failures_by_rule": dict(sorted(rules.items(), key=lambda item: (-item[1], item[0]))),
+        "prohibited_country_hits": total("country_hit"),
+        "prohibited_country_hit_rate": round(total("country_hit") / cases, 4) if cases else 0.0,
+        "decisions": decisions,
+    }
+
+
+# ===== COLUMNAR EXPORT =====
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.ipc  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        raise RuntimeError("Columnar export needs pyarrow: pip install pyarrow") from None
+    return pyarrow
+
+
+def _schema(pa):
+    return pa.schema([
+        ("seq", pa.int64()),
+        ("ts", pa.timestamp("us", tz="UTC")),
+        ("kind", pa.string()),
+        ("case_id", pa.string()),
+        ("action", pa.string()),
+        ("passed", pa.bool_()),
+        ("needs_review", pa.bool_()),
+        ("rule_ids", pa.list_(pa.string())),
+        ("country_code", pa.string()),
+        ("industry", pa.string()),
+        ("policy_version", pa.int64()),
+        ("turnaround_s", pa.float64()),
+    ])
+
+
+def _columns(rows: Sequence[tuple]) -> Iterator[List[Any]]:
+    for i, column in enumerate(zip(*rows)):
+        if i == 1:
+            yield [datetime.fromtimestamp(ts, timezone.utc) for ts in column]
+        elif i in (5, 6):
+            yield [None if value is None else bool(value) for value in column]
+        elif i == 7:
+            yield [None if value is None else json.loads(value) for value in column]
+        else:
+            yield list(column)
+
+
+def write_partitions(rows: Sequence[tuple], directory: str, fmt: str) -> List[str]:
+    """Write report_events rows as one file per UTC day: <directory>/day=YYYY-MM-DD/part-<seq>.<ext>"""
+    pa = _pyarrow()
+    schema = _schema(pa)
+    by_day: Dict[str, List[tuple]] = defaultdict(list)
+    for row in rows:
+        by_day[utc_day(row[1])].append(row)
+    written = []
+    for day, chunk in sorted(by_day.items()):
+        partition = os.path.join(directory, f"day={day}")
+        os.makedirs(partition, exist_ok=True)
+        path = os.path.join(partition, f"part-{chunk[0][0]:012d}.{fmt}")
+        table = pa.Table.from_arrays([pa.array(values, type=field.type)
+                                      for values, field in zip(_columns(chunk), schema)], schema=schema)
+        tmp = f"{path}.tmp"
+        if fmt == "parquet":
+            pa.parquet.write_table(table, tmp, compression="zstd")
+        else:
+            with pa.ipc.new_file(tmp, schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp, path)
+        written.append(path)
+    return written
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_report_store: Optional[ReportStore] = None
+
+
+def get_report_store() -> ReportStore:
+    global _report_store
+    if _report_store is None:
+        _report_store = ReportStore.from_env()
+    return _report_store
@@ -0,0 +1,49 @@
+import random
+import logging
+from contextvars import ContextVar
+from typing import Optional
+
+# Set per HTTP request by the metrics middleware and per background job;
+# tasks started inside a request inherit it through the asyncio context.
+_request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+
+def new_request_id() -> str:
+    # Correlation only, not a secret: skip the urandom syscall of uuid4
+    return f"{random.getrandbits(64):016x}"
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+class bind_request_id:
+    """``with bind_request_id(rid):`` tags everything logged inside with ``rid``"""
+    __slots__ = ("request_id", "_token")
+
+    def __init__(self, request_id: Optional[str] = None):
+        self.request_id = request_id or new_request_id()
+
+    def __enter__(self) -> str:
+        self._token = _request_id.set(self.request_id)
+        return self.request_id
+
+    def __exit__(self, *exc) -> None:
+        _request_id.reset(self._token)
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds ``%(request_id)s`` to every record passing through a handler"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = _request_id.get() or "-"
+        return True
+
+
+def install_request_id_logging() -> None:
+    """Attach the filter to the root handlers so library records get it too"""
+    for handler in logging.getLogger().handlers:
+        if not any(isinstance(f, RequestIdFilter) for f in handler.filters):
+            handler.addFilter(RequestIdFilter())
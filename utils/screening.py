@@ -0,0 +1,436 @@
+"""Local fuzzy name screening against sanctions/PEP lists.
+
+Names from a locally supplied list (OFAC SDN CSV layout, or a CSV with a
+header row) are transliterated to ASCII, case-folded and reduced to their
+tokens in sorted order, so "PUTIN, Vladimir" and "Vladimir Putin" share
+one key. Each key is broken into character trigrams and stored in an
+inverted index; a lookup sums posting lists with NumPy and scores
+candidates by trigram Dice similarity.
+
+Snapshots are a directory of ``.npy`` arrays that are memory-mapped on
+load, so startup does not parse the list. When the list changes the index
+is rebuilt incrementally: trigrams of unchanged rows are taken from the
+previous snapshot and only new or edited rows are normalized.
+
+A running app picks up an edited list with POST /internal/screening/reload.
+
+Build or search from the command line:
+    python -m utils.screening build --list data/sdn.csv
+    python -m utils.screening search "Vladimir Putin"
+"""
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = os.getenv("KYB_DATA_DIR", "data")
+SNAPSHOT_VERSION = 1
+OFAC_NULL = "-0-"
+
+# Letters NFKD does not decompose into ASCII, plus Russian Cyrillic
+_TRANSLITERATION = str.maketrans({
+    "ß": "ss", "æ": "ae", "Æ": "AE", "œ": "oe", "Œ": "OE", "ø": "o", "Ø": "O",
+    "đ": "d", "Đ": "D", "ð": "d", "Ð": "D", "þ": "th", "Þ": "TH", "ł": "l", "Ł": "L",
+    "ı": "i", "ŋ": "ng",
+    **dict(zip(
+        "абвгдеёжзийклмнопрстуфхцчшщъыьэюя",
+        ["a", "b", "v", "g", "d", "e", "e", "zh", "z", "i", "y", "k", "l", "m", "n", "o",
+         "p", "r", "s", "t", "u", "f", "kh", "ts", "ch", "sh", "shch", "", "y", "", "e",
+         "yu", "ya"],
+    )),
+})
+_TOKEN_RE = re.compile(r"[^\W_]+")
+
+
+def normalize_person_name(value: Any) -> str:
+    """Transliterated, case-folded tokens in sorted order"""
+    text = unicodedata.normalize("NFKD", str(value).casefold().translate(_TRANSLITERATION))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(sorted(_TOKEN_RE.findall(text)))
+
+
+def name_trigrams(key: str) -> np.ndarray:
+    """Sorted unique trigram codes of a normalized key (three code points in a uint64)"""
+    padded = f" {key} "
+    codes = {(ord(padded[i]) << 42) | (ord(padded[i + 1]) << 21) | ord(padded[i + 2])
+             for i in range(len(padded) - 2)}
+    return np.array(sorted(codes), dtype=np.uint64)
+
+
+class WatchlistEntry(NamedTuple):
+    """One listed name (primary name or alias) of a listed party"""
+    uid: str
+    name: str
+    list: str  # "sanctions" or "pep"
+    entity_type: str
+    program: str
+
+
+class ScreeningMatch(NamedTuple):
+    entry: WatchlistEntry
+    score: float
+
+
+# ===== LIST LOADING =====
+def _ofac_value(value: str) -> str:
+    value = value.strip()
+    return "" if value == OFAC_NULL else value
+
+
+def load_watchlist(path: str) -> List[WatchlistEntry]:
+    """Read a list file into entries.
+
+    Files with a header row need a ``name`` column and may carry ``uid``,
+    ``list``, ``type``, ``program`` and ``aliases`` (``;``-separated).
+    Headerless files are read as OFAC ``sdn.csv``; an ``alt.csv`` next to
+    it contributes the aliases.
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    if not rows:
+        return []
+
+    entries: List[WatchlistEntry] = []
+    header = [column.strip().lower() for column in rows[0]]
+    if "name" in header:
+        for record in (dict(zip(header, row)) for row in rows[1:]):
+            name = (record.get("name") or "").strip()
+            if not name:
+                continue
+            uid = (record.get("uid") or record.get("id") or name).strip()
+            list_name = (record.get("list") or "sanctions").strip().lower()
+            entity_type = (record.get("type") or "").strip().lower()
+            program = (record.get("program") or "").strip()
+            for alias in [name] + (record.get("aliases") or "").split(";"):
+                if alias.strip():
+                    entries.append(WatchlistEntry(uid, alias.strip(), list_name, entity_type, program))
+        return entries
+
+    # OFAC SDN layout: ent_num, SDN_Name, SDN_Type, Program, ...
+    parties: Dict[str, WatchlistEntry] = {}
+    for row in rows:
+        if len(row) < 4 or not _ofac_value(row[1]):
+            continue
+        entry = WatchlistEntry(row[0].strip(), _ofac_value(row[1]), "sanctions",
+                               _ofac_value(row[2]).lower(), _ofac_value(row[3]))
+        parties[entry.uid] = entry
+        entries.append(entry)
+    alt_path = os.path.join(os.path.dirname(path), "alt.csv")
+    if os.path.exists(alt_path):
+        with open(alt_path, "r", encoding="utf-8-sig", newline="") as f:
+            # ent_num, alt_num, alt_type, alt_name, alt_remarks
+            for row in csv.reader(f):
+                party = parties.get(row[0].strip()) if len(row) >= 4 else None
+                if party is not None and _ofac_value(row[3]):
+                    entries.append(party._replace(name=_ofac_value(row[3])))
+    return entries
+
+
+def file_digest(paths: Sequence[str]) -> str:
+    digest = hashlib.sha256()
+    for path in paths:
+        for candidate in (path, os.path.join(os.path.dirname(path), "alt.csv")):
+            if os.path.exists(candidate):
+                with open(candidate, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ===== INDEX =====
+class ScreeningIndex:
+    """Trigram inverted index over normalized watchlist names.
+
+    Postings are stored CSR-style: ``grams`` holds the sorted trigram
+    codes, ``postings[offsets[g]:offsets[g + 1]]`` the rows containing
+    trigram ``g``. Entry details are a JSON blob that is only decoded for
+    rows that actually match.
+    """
+
+    ARRAYS = ("grams", "offsets", "postings", "gram_counts", "records", "record_offsets")
+
+    def __init__(self, grams: np.ndarray, offsets: np.ndarray, postings: np.ndarray,
+                 gram_counts: np.ndarray, records: np.ndarray, record_offsets: np.ndarray,
+                 meta: Optional[Dict[str, Any]] = None):
+        self.grams = grams
+        self.offsets = offsets
+        self.postings = postings
+        self.gram_counts = gram_counts
+        self.records = records
+        self.record_offsets = record_offsets
+        self.meta = meta or {}
+        self._stats = {"lookups": 0, "matches": 0}
+
+    def __len__(self) -> int:
+        return len(self.gram_counts)
+
+    # ===== BUILDING =====
+    @classmethod
+    def build(cls, entries: Iterable[WatchlistEntry],
+              previous: Optional["ScreeningIndex"] = None,
+              meta: Optional[Dict[str, Any]] = None) -> "ScreeningIndex":
+        """Index ``entries``, reusing trigrams of rows already in ``previous``"""
+        records: List[bytes] = []
+        seen = set()
+        for entry in entries:
+            record = json.dumps(list(entry), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            if record not in seen:
+                seen.add(record)
+                records.append(record)
+
+        reused = previous.row_grams_by_record() if previous is not None else {}
+        row_grams: List[np.ndarray] = []
+        computed = 0
+        for record in records:
+            grams = reused.get(record)
+            if grams is None:
+                grams = name_trigrams(normalize_person_name(WatchlistEntry(*json.loads(record)).name))
+                computed += 1
+            row_grams.append(grams)
+
+        counts = np.array([len(g) for g in row_grams], dtype=np.int32)
+        all_grams = np.concatenate(row_grams) if row_grams else np.zeros(0, dtype=np.uint64)
+        rows = np.repeat(np.arange(len(records), dtype=np.int32), counts)
+        order = np.lexsort((rows, all_grams))
+        all_grams, rows = all_grams[order], rows[order]
+        grams, starts = np.unique(all_grams, return_index=True)
+        offsets = np.append(starts, len(all_grams)).astype(np.int64)
+
+        blob = b"".join(records)
+        record_offsets = np.zeros(len(records) + 1, dtype=np.int64)
+        np.cumsum([len(r) for r in records], out=record_offsets[1:])
+
+        meta = dict(meta or {})
+        meta.update(version=SNAPSHOT_VERSION, rows=len(records), rows_computed=computed,
+                    built_at=time.time())
+        return cls(grams, offsets, rows, counts, np.frombuffer(blob, dtype=np.uint8),
+                   record_offsets, meta)
+
+    def _record(self, row: int) -> bytes:
+        return self.records[self.record_offsets[row]:self.record_offsets[row + 1]].tobytes()
+
+    def entry(self, row: int) -> WatchlistEntry:
+        return WatchlistEntry(*json.loads(self._record(row)))
+
+    def row_grams_by_record(self) -> Dict[bytes, np.ndarray]:
+        """Trigrams of every row keyed by its record, recovered from the postings"""
+        if not len(self):
+            return {}
+        owners = np.repeat(np.arange(len(self.grams)), np.diff(self.offsets))
+        order = np.argsort(self.postings, kind="stable")
+        by_row = np.asarray(self.grams)[owners[order]]
+        bounds = np.zeros(len(self) + 1, dtype=np.int64)
+        np.cumsum(self.gram_counts, out=bounds[1:])
+        return {self._record(row): by_row[bounds[row]:bounds[row + 1]] for row in range(len(self))}
+
+    # ===== LOOKUPS =====
+    def search(self, name: Any, threshold: float = 0.8, limit: int = 5) -> List[ScreeningMatch]:
+        """Listed names whose trigram Dice similarity to ``name`` is >= threshold"""
+        self._stats["lookups"] += 1
+        query = name_trigrams(normalize_person_name(name))
+        if not len(query) or not len(self.grams):
+            return []
+        positions = np.searchsorted(self.grams, query)
+        found = positions < len(self.grams)
+        found[found] = self.grams[positions[found]] == query[found]
+        positions = positions[found]
+        if not len(positions):
+            return []
+        offsets = self.offsets
+        hits = np.concatenate([self.postings[offsets[p]:offsets[p + 1]] for p in positions.tolist()])
+        shared = np.bincount(hits)
+        # Dice >= t needs at least t*q/(2-t) shared trigrams, whatever the row length
+        rows = np.flatnonzero(shared >= math.ceil(threshold * len(query) / (2 - threshold) - 1e-9))
+        scores = 2.0 * shared[rows] / (len(query) + self.gram_counts[rows])
+        keep = scores >= threshold
+        rows, scores = rows[keep], scores[keep]
+        if not len(rows):
+            return []
+        best = np.argsort(-scores, kind="stable")[:limit]
+        self._stats["matches"] += 1
+        return [ScreeningMatch(self.entry(int(rows[i])), round(float(scores[i]), 4)) for i in best]
+
+    def matches(self, name: Any, threshold: float = 0.8) -> bool:
+        return bool(self.search(name, threshold, limit=1))
+
+    # ===== SNAPSHOTS =====
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        for array in self.ARRAYS:
+            np.save(os.path.join(directory, f"{array}.npy"), np.asarray(getattr(self, array)))
+        with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+
+    @classmethod
+    def load(cls, directory: str) -> "ScreeningIndex":
+        """Memory-map a snapshot written by ``save``"""
+        with open(os.path.join(directory, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported screening snapshot version {meta.get('version')}")
+        # Plain ndarray views of the maps; np.memmap slicing is slow in hot loops
+        arrays = [np.load(os.path.join(directory, f"{array}.npy"), mmap_mode="r").view(np.ndarray)
+                  for array in cls.ARRAYS]
+        return cls(*arrays, meta=meta)
+
+    @property
+    def version(self) -> str:
+        """Identifies this snapshot; changes whenever the index is rebuilt"""
+        return f"{self.meta.get('source_digest', '')}-{self.meta.get('built_at', '')}"
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["rows"] = len(self)
+        stats["trigrams"] = len(self.grams)
+        stats["source_digest"] = self.meta.get("source_digest", "")[:12]
+        return stats
+
+
+# ===== SNAPSHOT STORE =====
+def _current_snapshot(index_dir: str) -> Optional[str]:
+    pointer = os.path.join(index_dir, "CURRENT")
+    if not os.path.exists(pointer):
+        return None
+    with open(pointer, "r", encoding="utf-8") as f:
+        name = f.read().strip()
+    return os.path.join(index_dir, name) if name else None
+
+
+def _publish_snapshot(index: ScreeningIndex, index_dir: str) -> str:
+    """Write a new snapshot directory and atomically point CURRENT at it"""
+    name = f"snapshot-{index.meta['source_digest'][:16]}-{int(index.meta['built_at'])}"
+    path = os.path.join(index_dir, name)
+    index.save(path)
+    pointer = os.path.join(index_dir, "CURRENT")
+    with open(f"{pointer}.tmp", "w", encoding="utf-8") as f:
+        f.write(name)
+    os.replace(f"{pointer}.tmp", pointer)
+    # Keep the previous snapshot around; processes may still have it mapped
+    snapshots = sorted((d for d in os.listdir(index_dir) if d.startswith("snapshot-")),
+                       key=lambda d: os.path.getmtime(os.path.join(index_dir, d)))
+    for stale in snapshots[:-2]:
+        shutil.rmtree(os.path.join(index_dir, stale), ignore_errors=True)
+    return path
+
+
+def build_screening_index(list_paths: Sequence[str], index_dir: str,
+                          force: bool = False) -> Tuple[ScreeningIndex, bool]:
+    """Load the current snapshot, rebuilding it if the lists changed.
+
+    Returns (index, rebuilt). A rebuild reuses every unchanged row of the
+    previous snapshot, so list updates only normalize the rows that differ.
+    """
+    digest = file_digest(list_paths)
+    previous: Optional[ScreeningIndex] = None
+    current = _current_snapshot(index_dir)
+    if current and os.path.isdir(current):
+        try:
+            previous = ScreeningIndex.load(current)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable screening snapshot %s: %s", current, e)
+    if previous is not None and not force and previous.meta.get("source_digest") == digest:
+        return previous, False
+
+    entries: List[WatchlistEntry] = []
+    for path in list_paths:
+        entries.extend(load_watchlist(path))
+    index = ScreeningIndex.build(entries, previous=previous,
+                                 meta={"source_digest": digest, "sources": list(list_paths)})
+    _publish_snapshot(index, index_dir)
+    logger.info("Screening index rebuilt: %d names, %d new or changed",
+                index.meta["rows"], index.meta["rows_computed"])
+    return index, True
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_index: Optional[ScreeningIndex] = None
+_refresh_lock = threading.Lock()
+
+
+def screening_list_paths() -> List[str]:
+    value = os.getenv("SCREENING_LIST_PATH", "")
+    return [path.strip() for path in value.split(",") if path.strip()]
+
+
+def screening_index_dir() -> str:
+    return os.getenv("SCREENING_INDEX_DIR", os.path.join(DEFAULT_DATA_DIR, "screening_index"))
+
+
+def get_screening_index() -> Optional[ScreeningIndex]:
+    """The local screening index, or None when no list is configured"""
+    global _index
+    if _index is None:
+        paths = screening_list_paths()
+        if paths:
+            _index, _ = build_screening_index(paths, screening_index_dir())
+        elif _current_snapshot(screening_index_dir()):
+            _index = ScreeningIndex.load(_current_snapshot(screening_index_dir()))
+    return _index
+
+
+def refresh_screening_index() -> Tuple[Optional[ScreeningIndex], bool]:
+    """Pick up an updated list (incremental rebuild) and swap it into the policy engine.
+
+    Blocking; run it off the event loop. Screenings already running finish
+    against the index they started with. Returns (index, rebuilt).
+    """
+    global _index
+    from utils.policy import get_policy_engine
+
+    paths = screening_list_paths()
+    if not paths:
+        return _index, False
+    with _refresh_lock:
+        index, rebuilt = build_screening_index(paths, screening_index_dir())
+        _index = index
+        get_policy_engine().screening = index
+    if rebuilt:
+        logger.info("Screening index swapped")
+    return index, rebuilt
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build or incrementally refresh the snapshot")
+    build.add_argument("--list", action="append", required=True, help="list CSV (repeatable)")
+    build.add_argument("--index-dir", default=screening_index_dir())
+    build.add_argument("--force", action="store_true")
+    search = sub.add_parser("search", help="look up a name in the current snapshot")
+    search.add_argument("name")
+    search.add_argument("--index-dir", default=screening_index_dir())
+    search.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.command == "build":
+        started = time.perf_counter()
+        index, rebuilt = build_screening_index(args.list, args.index_dir, force=args.force)
+        state = "rebuilt" if rebuilt else "up to date"
+        print(f"{len(index)} names, {state} in {time.perf_counter() - started:.2f}s")
+        return 0
+
+    snapshot = _current_snapshot(args.index_dir)
+    if not snapshot:
+        print(f"No screening snapshot in {args.index_dir}")
+        return 1
+    for match in ScreeningIndex.load(snapshot).search(args.name, args.threshold):
+        print(f"{match.score:.3f}  {match.entry.name}  [{match.entry.list} {match.entry.uid} {match.entry.program}]")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,328 @@
+"""Non-blocking, structured logging for the app.
+
+``configure_logging`` replaces ``logging.basicConfig``:
+
+- Records are put on a bounded queue by a ``QueueHandler`` and written
+  by a ``QueueListener`` thread. A slow or blocked stderr then stalls
+  that thread, not the event loop. When the queue is full, records are
+  dropped and counted instead of waiting.
+- Formatting happens on the listener thread: the ``%`` arguments of
+  ``logger.info("... %s", value)`` are applied there. Call sites should
+  pass arguments rather than f-strings so the loop never pays for
+  messages that are sampled away. Arguments are formatted after the
+  call returns, so don't mutate them afterwards.
+- Output is one JSON object per line (``LOG_FORMAT=text`` keeps the old
+  human format): time, level, logger, request ID, message, ``extra=``
+  fields and the traceback.
+- Sampling and rate limits are set per logger (a logger's children
+  included) and apply to records below WARNING. ``LOG_SAMPLING``
+  keeps a fraction of records, e.g. ``persona_client.cache=0.1``.
+  ``LOG_RATE_LIMIT`` caps records per second, e.g. ``httpx=20``.
+  Dropped records are counted in kyb_log_records_dropped_total.
+- Secrets are redacted from the final line: the values of the secret
+  environment variables, Slack/Bearer tokens and Persona keys. So are
+  PII fields found in case payloads (SSN, EIN/tax ID, date of birth),
+  both as ``extra=`` fields and as ``key: value`` text inside messages.
+"""
+import os
+import re
+import sys
+import json
+import time
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Pattern, Tuple
+
+from utils.metrics import get_metrics
+from utils.request_context import RequestIdFilter
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s'
+
+# Environment variables whose values must never reach the logs
+SECRET_ENV = ("SLACK_API_TOKEN", "SLACK_SIGNING_SECRET", "SLACK_VERIFICATION_TOKEN", "PERSONA_API_KEY",
+              "PERSONA_WEBHOOK_SECRET", "ENCRYPTION_KEY")
+# Field names (normalized: lower case, no separators) treated as PII or secrets
+SENSITIVE_FIELDS = frozenset({
+    "ssn", "socialsecuritynumber", "ein", "taxid", "taxidentificationnumber", "tin",
+    "dob", "dateofbirth", "birthdate", "password", "token", "apikey", "secret",
+    "authorization",
+})
+REDACTED = "[REDACTED]"
+
+_TOKEN_PATTERNS = (
+    re.compile(r"xox[abeprs]-[A-Za-z0-9-]+"),  # Slack tokens
+    re.compile(r"(?i)bearer\s+[A-Za-z0-9._~+/=-]+"),
+    re.compile(r"persona_(?:production|sandbox)_[A-Za-z0-9_-]+"),
+    re.compile(r"\b\d{3}-\d{2}-\d{4}\b"),  # SSN
+    re.compile(r"\b\d{2}-\d{7}\b"),  # EIN
+)
+# "ssn": "123", ssn=123, 'date_of_birth': '1990-01-01', tax-id: 12 ...
+_FIELD_PATTERN = re.compile(
+    r"""(?i)((?<![A-Za-z])["']?(?:ssn|social[_-]?security[_-]?number|ein|tax[_-]?id(?:entification[_-]?number)?"""
+    r"""|dob|date[_-]?of[_-]?birth|birth[_-]?date)["']?\s*[:=]\s*)("[^"]*"|'[^']*'|[^\s,;}\]]+)""")
+
+# LogRecord attributes that are not ``extra=`` fields
+_RESERVED = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+_DROPPED = get_metrics().counter(
+    "kyb_log_records_dropped_total", "Log records not written, by logger and reason (sampled, rate_limited, "
+    "queue_full)", ("logger", "reason"))
+
+
+def field_key(name: str) -> str:
+    return re.sub(r"[^a-z]", "", name.lower())
+
+
+class Redactor:
+    """Masks secret values, tokens and PII fields in log output"""
+
+    def __init__(self, secrets: Iterable[str] = ()):
+        # Longest first, so a secret containing another is masked whole
+        values = sorted({s for s in secrets if s and len(s) >= 6}, key=len, reverse=True)
+        self._secrets: Optional[Pattern[str]] = (
+            re.compile("|".join(re.escape(v) for v in values)) if values else None)
+
+    @classmethod
+    def from_env(cls) -> "Redactor":
+        return cls(os.getenv(name, "") for name in SECRET_ENV)
+
+    def text(self, value: str) -> str:
+        if self._secrets is not None:
+            value = self._secrets.sub(REDACTED, value)
+        value = _FIELD_PATTERN.sub(lambda m: m.group(1) + REDACTED, value)
+        for pattern in _TOKEN_PATTERNS:
+            value = pattern.sub(REDACTED, value)
+        return value
+
+    def value(self, value: Any) -> Any:
+        """Redact structured data: sensitive keys are masked, strings scanned"""
+        if isinstance(value, str):
+            return self.text(value)
+        if isinstance(value, dict):
+            return {key: REDACTED if field_key(str(key)) in SENSITIVE_FIELDS else self.value(item)
+                    for key, item in value.items()}
+        if isinstance(value, (list, tuple)):
+            return [self.value(item) for item in value]
+        if value is None or isinstance(value, (bool, int, float)):
+            return value
+        return self.text(str(value))
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, redacted"""
+
+    def __init__(self, redactor: Optional[Redactor] = None):
+        super().__init__()
+        self.redactor = redactor or Redactor()
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": self.redactor.text(record.getMessage()),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = REDACTED if field_key(key) in SENSITIVE_FIELDS else self.redactor.value(value)
+        if record.exc_info:
+            entry["exc_info"] = self.redactor.text(self.formatException(record.exc_info))
+        elif record.exc_text:
+            entry["exc_info"] = self.redactor.text(record.exc_text)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class RedactingTextFormatter(logging.Formatter):
+    """The classic text format, redacted"""
+
+    def __init__(self, redactor: Optional[Redactor] = None, fmt: str = TEXT_FORMAT):
+        super().__init__(fmt)
+        self.redactor = redactor or Redactor()
+
+    def format(self, record: logging.LogRecord) -> str:
+        return self.redactor.text(super().format(record))
+
+
+def _parse_settings(value: Optional[str]) -> Dict[str, float]:
+    """``"a.b=0.1,c=5"`` -> {"a.b": 0.1, "c": 5.0}"""
+    settings: Dict[str, float] = {}
+    for item in (value or "").split(","):
+        name, sep, number = item.strip().partition("=")
+        if sep and name:
+            settings[name.strip()] = float(number)
+    return settings
+
+
+class SamplingFilter(logging.Filter):
+    """Per-logger sampling and rate limits for records below WARNING.
+
+    Settings apply to the named logger and its children; the most
+    specific name wins. Decisions are made on the calling thread, before
+    the record is queued, so dropped records cost almost nothing.
+    """
+
+    def __init__(self, sampling: Optional[Dict[str, float]] = None,
+                 rate_limits: Optional[Dict[str, float]] = None, seed: Optional[int] = None):
+        super().__init__()
+        self.sampling = dict(sampling or {})
+        self.rate_limits = dict(rate_limits or {})
+        # logger name -> (sample rate or None, rate limit key or None)
+        self._resolved: Dict[str, Tuple[Optional[float], Optional[str]]] = {}
+        # rate limit key -> [tokens, last refill]
+        self._buckets: Dict[str, List[float]] = {}
+        self._counters: Dict[Tuple[str, str], Any] = {}
+        self.dropped = {"sampled": 0, "rate_limited": 0}
+        self._random = random.Random(seed).random
+
+    def _resolve(self, name: str) -> Tuple[Optional[float], Optional[str]]:
+        rate = limit_key = None
+        parts = name.split(".")
+        for i in range(len(parts), 0, -1):
+            prefix = ".".join(parts[:i])
+            if rate is None and prefix in self.sampling:
+                rate = self.sampling[prefix]
+            if limit_key is None and prefix in self.rate_limits:
+                limit_key = prefix
+        if rate is None and "root" in self.sampling:
+            rate = self.sampling["root"]
+        if limit_key is None and "root" in self.rate_limits:
+            limit_key = "root"
+        self._resolved[name] = (rate, limit_key)
+        return rate, limit_key
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        resolved = self._resolved.get(record.name)
+        rate, limit_key = resolved if resolved is not None else self._resolve(record.name)
+        if rate is not None and self._random() >= rate:
+            self._drop(record.name, "sampled")
+            return False
+        if limit_key is not None and not self._take(limit_key):
+            self._drop(record.name, "rate_limited")
+            return False
+        return True
+
+    def _take(self, key: str) -> bool:
+        per_second = self.rate_limits[key]
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [per_second, now]
+        bucket[0] = min(per_second, bucket[0] + (now - bucket[1]) * per_second)
+        bucket[1] = now
+        if bucket[0] < 1.0:
+            return False
+        bucket[0] -= 1.0
+        return True
+
+    def _drop(self, name: str, reason: str) -> None:
+        self.dropped[reason] += 1
+        counter = self._counters.get((name, reason))
+        if counter is None:
+            counter = self._counters[(name, reason)] = _DROPPED.labels(name, reason)
+        counter.inc()
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks and leaves formatting to the listener.
+
+    The stock ``prepare`` formats the message on the calling thread; here
+    only what can't wait is captured (the request ID, via the filter).
+    A full queue drops the record and counts it.
+    """
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            _DROPPED.labels(record.name, "queue_full").inc()
+
+
+class LoggingPipeline:
+    """The queue, its handler on the root logger and the listener thread"""
+
+    def __init__(self, stream=None, fmt: str = "json", level: int = logging.INFO, queue_size: int = 10_000,
+                 sampling: Optional[Dict[str, float]] = None, rate_limits: Optional[Dict[str, float]] = None,
+                 redactor: Optional[Redactor] = None):
+        self.redactor = redactor or Redactor.from_env()
+        self.queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+        self.output = logging.StreamHandler(stream or sys.stderr)
+        self.output.setFormatter(JsonFormatter(self.redactor) if fmt == "json"
+                                 else RedactingTextFormatter(self.redactor))
+        self.handler = NonBlockingQueueHandler(self.queue)
+        self.sampler = SamplingFilter(sampling, rate_limits)
+        self.handler.addFilter(self.sampler)
+        # The request ID lives in a contextvar: capture it before the thread hop
+        self.handler.addFilter(RequestIdFilter())
+        self.level = level
+        self.listener = logging.handlers.QueueListener(self.queue, self.output, respect_handler_level=True)
+
+    @classmethod
+    def from_env(cls, **overrides) -> "LoggingPipeline":
+        settings = dict(
+            fmt=os.getenv("LOG_FORMAT", "json").lower(),
+            level=logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").upper()),
+            queue_size=int(os.getenv("LOG_QUEUE_SIZE", 10_000)),
+            sampling=_parse_settings(os.getenv("LOG_SAMPLING")),
+            rate_limits=_parse_settings(os.getenv("LOG_RATE_LIMIT")),
+        )
+        settings.update(overrides)
+        return cls(**settings)
+
+    def install(self) -> None:
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(self.handler)
+        root.setLevel(self.level)
+        self.listener.start()
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self.sampler.dropped)
+        stats["queue_full"] = self.handler.dropped
+        stats["queue_depth"] = self.queue.qsize()
+        stats["queue_size"] = self.queue.maxsize
+        return stats
+
+    def flush(self, timeout: float = 2.0) -> None:
+        """Wait (bounded) until the listener has written what is queued"""
+        deadline = time.monotonic() + timeout
+        while self.queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.005)
+        self.output.flush()
+
+    def stop(self) -> None:
+        """Write out what is queued and stop the listener thread"""
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.output.flush()
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_pipeline: Optional[LoggingPipeline] = None
+
+
+def configure_logging(**overrides) -> LoggingPipeline:
+    """Route all logging through the pipeline (once per process)"""
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = LoggingPipeline.from_env(**overrides)
+        _pipeline.install()
+        atexit.register(_pipeline.stop)
+    return _pipeline
+
+
+def get_logging_pipeline() -> Optional[LoggingPipeline]:
+    return _pipeline
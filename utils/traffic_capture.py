@@ -0,0 +1,319 @@
+"""Opt-in capture of inbound Slack and Persona traffic for replay.
+
+With ``CAPTURE_TRAFFIC=1``, ``CaptureMiddleware`` records every request
+to ``/slack/commands``, ``/slack/events`` and ``/persona/webhook``. Each
+record holds the request body, the response status and body, and how
+long the app took. One JSON object per line is written to
+``CAPTURE_PATH`` (default ``data/captures/requests.jsonl``). Replay a
+capture with ``python -m benchmarks.replay``.
+
+- The request path only copies bytes and puts a tuple on a bounded
+  queue (``CAPTURE_QUEUE_SIZE``). A writer thread redacts, encodes and
+  appends. When the queue is full the record is dropped and counted
+  in kyb_capture_records_dropped_total.
+- Nothing that authenticates a request is kept. Signature headers,
+  Slack verification tokens, response URLs and trigger IDs are
+  dropped or masked. The replay signs and addresses requests itself.
+- PII is masked: names, emails, phone numbers, addresses (all but the
+  country), government ID numbers, IP addresses, and the
+  SSN/EIN/date-of-birth fields and patterns the log redactor knows.
+  Slack user IDs become stable pseudonyms (keyed by ``CAPTURE_SALT``),
+  so per-user load is kept. Case and event IDs are kept; they are
+  what a replay needs.
+- ``CAPTURE_SAMPLE`` keeps a fraction of requests (default all).
+"""
+import os
+import json
+import time
+import queue
+import atexit
+import hashlib
+import logging
+import random
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from utils.metrics import get_metrics
+from utils.request_context import current_request_id
+from utils.structured_logging import REDACTED, SENSITIVE_FIELDS, Redactor, field_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = os.getenv("KYB_DATA_DIR", "data")
+
+CAPTURED_PATHS = frozenset({"/slack/commands", "/slack/events", "/persona/webhook"})
+MAX_BODY_BYTES = 64 * 1024
+MAX_RESPONSE_BYTES = 4 * 1024
+
+# Normalized field names (see structured_logging.field_key) masked in bodies
+PII_FIELDS = SENSITIVE_FIELDS | frozenset({
+    "name", "fullname", "legalname", "firstname", "lastname", "middlename", "namefirst", "namelast",
+    "namemiddle", "username", "realname", "displayname", "email", "emailaddress", "phone", "phonenumber",
+    "street", "streetaddress", "city", "subdivision", "postalcode", "zip", "zipcode",
+    "identificationnumber", "idnumber", "documentnumber", "ipaddress", "ip",
+})
+# Every address part (address-street-1, address-city, address-subdivision, ...) but the country
+PII_PREFIXES = ("address",)
+PII_EXCEPTIONS = frozenset({"addresscountrycode"})
+# Values that would let a replay act as Slack: masked wherever they appear
+CREDENTIAL_FIELDS = frozenset({"token", "responseurl", "triggerid"})
+# Slack user IDs: replaced by pseudonyms
+USER_FIELDS = frozenset({"userid"})
+
+_DROPPED = get_metrics().counter(
+    "kyb_capture_records_dropped_total", "Captured requests not written because the capture queue was full")
+
+# (ts, method, path, query, content type, body, truncated, status, seconds, request ID, response body)
+Captured = Tuple[float, str, str, str, str, bytes, bool, int, float, Optional[str], bytes]
+
+
+def capture_enabled() -> bool:
+    return os.getenv("CAPTURE_TRAFFIC", "").lower() in ("1", "true", "yes", "on")
+
+
+class CaptureRedactor:
+    """Masks credentials and PII in captured Slack and Persona bodies"""
+
+    def __init__(self, salt: bytes, redactor: Optional[Redactor] = None):
+        self.salt = salt
+        self.redactor = redactor or Redactor.from_env()
+
+    def pseudonym(self, user_id: str) -> str:
+        return "U" + hashlib.blake2b(user_id.encode("utf-8"), key=self.salt, digest_size=5).hexdigest().upper()
+
+    def field(self, key: str, value: Any, resource_type: Optional[str] = None) -> Any:
+        name = field_key(key)
+        if name in CREDENTIAL_FIELDS:
+            return REDACTED
+        if name in USER_FIELDS and isinstance(value, str):
+            return self.pseudonym(value)
+        if name == "name" and resource_type == "event":
+            # A Persona event's "name" is the event type (case.updated), not a person
+            return self.json(value, resource_type)
+        if name in PII_FIELDS or (name.startswith(PII_PREFIXES) and name not in PII_EXCEPTIONS):
+            return REDACTED
+        return self.json(value, resource_type)
+
+    def json(self, value: Any, resource_type: Optional[str] = None) -> Any:
+        if isinstance(value, dict):
+            resource_type = value.get("type") if isinstance(value.get("type"), str) else resource_type
+            if isinstance(value.get("user"), dict):
+                # Slack payloads: {"user": {"id": "U123", "username": ...}}
+                value = dict(value, user={key: self.pseudonym(item) if key == "id" and isinstance(item, str)
+                                          else item for key, item in value["user"].items()})
+            return {key: self.field(str(key), item, resource_type) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.json(item, resource_type) for item in value]
+        if isinstance(value, str):
+            return self.redactor.text(value)
+        return value
+
+    def body(self, content_type: str, body: bytes) -> Tuple[str, Any]:
+        """(format, redacted body): form fields as a dict, JSON as a value, else text"""
+        text = body.decode("utf-8", "replace")
+        if content_type.startswith("application/x-www-form-urlencoded"):
+            fields: Dict[str, Any] = {}
+            for key, value in parse_qsl(text, keep_blank_values=True):
+                if key == "payload":
+                    try:
+                        fields[key] = self.json(json.loads(value))
+                        continue
+                    except ValueError:
+                        pass
+                fields[key] = self.field(key, value)
+            return "form", fields
+        if content_type.startswith("application/json") or text.lstrip().startswith(("{", "[")):
+            try:
+                return "json", self.json(json.loads(text))
+            except ValueError:
+                pass
+        return "text", self.redactor.text(text)
+
+
+def encode_body(body_format: str, body: Any) -> bytes:
+    """Bytes of a captured body, as sent (before any replay rewriting)"""
+    if body_format == "form":
+        return urlencode({key: json.dumps(value) if isinstance(value, (dict, list)) else value
+                          for key, value in body.items()}).encode()
+    if body_format == "json":
+        return json.dumps(body).encode()
+    return str(body).encode()
+
+
+class TrafficRecorder:
+    """Bounded queue of captured requests, written as JSON lines by one thread"""
+
+    def __init__(self, path: Optional[str] = None, queue_size: int = 10_000, sample: float = 1.0,
+                 salt: Optional[bytes] = None):
+        self.path = path or os.path.join(DEFAULT_DATA_DIR, "captures", "requests.jsonl")
+        self.sample = sample
+        self.redactor = CaptureRedactor(salt or os.urandom(16))
+        self._queue: "queue.Queue[Optional[Captured]]" = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stats = {"captured": 0, "written": 0, "dropped": 0, "sampled_out": 0, "errors": 0}
+
+    @classmethod
+    def from_env(cls, **overrides) -> "TrafficRecorder":
+        salt = os.getenv("CAPTURE_SALT")
+        settings = dict(
+            path=os.getenv("CAPTURE_PATH"),
+            queue_size=int(os.getenv("CAPTURE_QUEUE_SIZE", 10_000)),
+            sample=float(os.getenv("CAPTURE_SAMPLE", 1.0)),
+            salt=salt.encode("utf-8") if salt else None,
+        )
+        settings.update(overrides)
+        return cls(**settings)
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._thread = threading.Thread(target=self._write_loop, name="traffic-capture", daemon=True)
+            self._thread.start()
+        atexit.register(self.stop)
+        logger.info("Capturing %s to %s", ", ".join(sorted(CAPTURED_PATHS)), self.path)
+
+    def record(self, entry: Captured) -> None:
+        """Queue a request for writing; drops it rather than wait"""
+        if self.sample < 1.0 and random.random() >= self.sample:
+            self._stats["sampled_out"] += 1
+            return
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self._stats["dropped"] += 1
+            _DROPPED.inc()
+            return
+        self._stats["captured"] += 1
+
+    def to_line(self, entry: Captured) -> str:
+        ts, method, path, query, content_type, body, truncated, status, seconds, request_id, response = entry
+        body_format, redacted = self.redactor.body(content_type, body)
+        line = {
+            "ts": round(ts, 6), "method": method, "path": path, "query": self.redactor.redactor.text(query),
+            "content_type": content_type, "body_format": body_format, "body": redacted,
+            "status": status, "duration_ms": round(seconds * 1000, 3), "request_id": request_id,
+            "response": self.redactor.redactor.text(response.decode("utf-8", "replace")),
+        }
+        if truncated:
+            line["truncated"] = True
+        return json.dumps(line, ensure_ascii=False)
+
+    def _write_loop(self) -> None:
+        with open(self.path, "a", encoding="utf-8") as out:
+            while True:
+                entry = self._queue.get()
+                batch: List[Optional[Captured]] = [entry]
+                # Whatever queued up meanwhile goes out in the same write
+                while entry is not None and not self._queue.empty():
+                    entry = self._queue.get_nowait()
+                    batch.append(entry)
+                lines = []
+                for item in batch:
+                    if item is None:
+                        continue
+                    try:
+                        lines.append(self.to_line(item))
+                    except Exception:
+                        self._stats["errors"] += 1
+                        logger.exception("Could not encode a captured request")
+                if lines:
+                    out.write("\n".join(lines) + "\n")
+                    out.flush()
+                    self._stats["written"] += len(lines)
+                for item in batch:
+                    self._queue.task_done()
+                if batch[-1] is None:
+                    return
+
+    def flush(self) -> None:
+        """Wait until everything queued so far is written"""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def stop(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and thread.is_alive():
+            self._queue.put(None)
+            thread.join(timeout=5)
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["queued"] = self._queue.qsize()
+        stats["path"] = self.path
+        return stats
+
+
+class CaptureMiddleware:
+    """ASGI middleware: copies requests to CAPTURED_PATHS, with their response, to the recorder"""
+
+    def __init__(self, app, recorder: Optional["TrafficRecorder"] = None):
+        self.app = app
+        self.recorder = recorder or get_traffic_recorder()
+        self.recorder.start()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in CAPTURED_PATHS:
+            await self.app(scope, receive, send)
+            return
+        chunks: List[bytes] = []
+        response: List[bytes] = []
+        kept = sent = 0
+        truncated = False
+        status = 500
+
+        async def receive_and_keep():
+            nonlocal kept, truncated
+            message = await receive()
+            if message["type"] == "http.request":
+                body = message.get("body", b"")
+                room = MAX_BODY_BYTES - kept
+                truncated = truncated or len(body) > room
+                if room > 0:
+                    chunks.append(body[:room])
+                    kept += len(chunks[-1])
+            return message
+
+        async def send_and_keep(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and sent < MAX_RESPONSE_BYTES:
+                body = message.get("body", b"")[:MAX_RESPONSE_BYTES - sent]
+                response.append(body)
+                sent += len(body)
+            await send(message)
+
+        ts = time.time()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_and_keep, send_and_keep)
+        finally:
+            seconds = time.perf_counter() - started
+            content_type = ""
+            for key, value in scope["headers"]:
+                if key == b"content-type":
+                    content_type = value.decode("latin-1")
+                    break
+            self.recorder.record((
+                ts, scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"),
+                content_type, b"".join(chunks), truncated, status, seconds, current_request_id(),
+                b"".join(response),
+            ))
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_recorder: Optional[TrafficRecorder] = None
+
+
+def get_traffic_recorder() -> TrafficRecorder:
+    global _recorder
+    if _recorder is None:
+        _recorder = TrafficRecorder.from_env()
+    return _recorder
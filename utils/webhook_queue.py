@@ -0,0 +1,287 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DATA_DIR = os.getenv("KYB_DATA_DIR", "data")
+
+# Event handler used by the workers; raising schedules a retry
+EventHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS webhook_events (
+    event_id     TEXT PRIMARY KEY,
+    case_id      TEXT,
+    name         TEXT,
+    body         BLOB NOT NULL,
+    status       TEXT NOT NULL DEFAULT 'pending',
+    attempts     INTEGER NOT NULL DEFAULT 0,
+    received_at  REAL NOT NULL,
+    available_at REAL NOT NULL,
+    finished_at  REAL,
+    error        TEXT
+);
+CREATE INDEX IF NOT EXISTS webhook_events_ready
+    ON webhook_events (status, available_at);
+"""
+
+
+def body_event_id(body: bytes) -> str:
+    """Fallback dedupe key for events that carry no ID"""
+    return "sha256:" + hashlib.sha256(body).hexdigest()
+
+
+class WebhookQueue:
+    """Durable, deduplicating queue of verified Persona webhook events.
+
+    Events are appended to a SQLite database in WAL mode before the
+    webhook is acknowledged; the event ID is the primary key, so redelivered
+    events are dropped. All SQLite access runs on one dedicated thread so the
+    event loop never blocks on disk. Rows left in ``processing`` by a crash
+    are put back to ``pending`` on open.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_attempts: int = 5,
+                 retry_delay: float = 2.0, retention: float = 7 * 24 * 3600):
+        self.path = path or os.path.join(DEFAULT_DATA_DIR, "webhook_queue.db")
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.retention = retention
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="webhook-queue")
+        self._conn: Optional[sqlite3.Connection] = None
+        self._stats = {"received": 0, "duplicates": 0, "processed": 0, "retried": 0, "dead": 0, "pruned": 0}
+
+    # ===== SYNC SIDE (queue thread only) =====
+    def _open_sync(self) -> int:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL in WAL mode survives process crashes; only an OS crash can
+        # lose the last transactions, which Persona will redeliver.
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        recovered = conn.execute(
+            "UPDATE webhook_events SET status = 'pending' WHERE status = 'processing'"
+        ).rowcount
+        self._conn = conn
+        return recovered
+
+    def _put_sync(self, event_id: str, case_id: Optional[str], name: Optional[str], body: bytes) -> bool:
+        now = time.time()
+        cursor = self._conn.execute(
+            "INSERT OR IGNORE INTO webhook_events "
+            "(event_id, case_id, name, body, received_at, available_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (event_id, case_id, name, body, now, now),
+        )
+        return cursor.rowcount == 1
+
+    def _claim_sync(self, limit: int) -> List[Dict[str, Any]]:
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT event_id, case_id, name, body, attempts FROM webhook_events "
+                "WHERE status = 'pending' AND available_at <= ? ORDER BY available_at LIMIT ?",
+                (time.time(), limit),
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE webhook_events SET status = 'processing', attempts = attempts + 1 "
+                    "WHERE event_id = ?",
+                    [(row[0],) for row in rows],
+                )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return [
+            {"event_id": r[0], "case_id": r[1], "name": r[2], "body": r[3], "attempts": r[4] + 1}
+            for r in rows
+        ]
+
+    def _complete_sync(self, event_id: str) -> None:
+        self._conn.execute(
+            "UPDATE webhook_events SET status = 'done', finished_at = ?, error = NULL WHERE event_id = ?",
+            (time.time(), event_id),
+        )
+
+    def _fail_sync(self, event_id: str, attempts: int, error: str) -> bool:
+        """Schedule a retry, or dead-letter the event; returns True if dead"""
+        now = time.time()
+        if attempts >= self.max_attempts:
+            self._conn.execute(
+                "UPDATE webhook_events SET status = 'failed', finished_at = ?, error = ? WHERE event_id = ?",
+                (now, error, event_id),
+            )
+            return True
+        self._conn.execute(
+            "UPDATE webhook_events SET status = 'pending', available_at = ?, error = ? WHERE event_id = ?",
+            (now + self.retry_delay * (2 ** (attempts - 1)), error, event_id),
+        )
+        return False
+
+    def _counts_sync(self) -> Dict[str, int]:
+        return dict(self._conn.execute(
+            "SELECT status, COUNT(*) FROM webhook_events GROUP BY status"
+        ).fetchall())
+
+    def _prune_sync(self) -> int:
+        # Finished rows are kept for ``retention`` so late redeliveries still
+        # dedupe and dead letters can be inspected; then their bodies (PII) go
+        return self._conn.execute(
+            "DELETE FROM webhook_events WHERE status IN ('done', 'failed') AND finished_at < ?",
+            (time.time() - self.retention,),
+        ).rowcount
+
+    def _close_sync(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # ===== ASYNC API =====
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+
+    async def open(self) -> None:
+        recovered = await self._run(self._open_sync)
+        if recovered:
+            logger.warning("Webhook queue recovered %s in-flight events after restart", recovered)
+
+    async def close(self) -> None:
+        await self._run(self._close_sync)
+
+    async def put(self, event_id: str, case_id: Optional[str], name: Optional[str], body: bytes) -> bool:
+        """Durably append an event; returns False if it was already seen"""
+        inserted = await self._run(self._put_sync, event_id, case_id, name, body)
+        self._stats["received" if inserted else "duplicates"] += 1
+        return inserted
+
+    async def claim(self, limit: int = 10) -> List[Dict[str, Any]]:
+        return await self._run(self._claim_sync, limit)
+
+    async def complete(self, event_id: str) -> None:
+        await self._run(self._complete_sync, event_id)
+        self._stats["processed"] += 1
+
+    async def fail(self, event_id: str, attempts: int, error: str) -> None:
+        dead = await self._run(self._fail_sync, event_id, attempts, error)
+        self._stats["dead" if dead else "retried"] += 1
+
+    async def prune(self) -> int:
+        """Delete done and dead-lettered events finished more than ``retention`` seconds ago"""
+        pruned = await self._run(self._prune_sync)
+        self._stats["pruned"] += pruned
+        return pruned
+
+    async def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = dict(self._stats)
+        stats["by_status"] = await self._run(self._counts_sync) if self._conn else {}
+        return stats
+
+
+class WebhookProcessor:
+    """Pool of async workers draining a WebhookQueue into ``handler``"""
+
+    def __init__(self, queue: WebhookQueue, handler: EventHandler, workers: int = 4,
+                 batch_size: int = 10, idle_interval: float = 1.0, prune_interval: float = 3600.0):
+        self.queue = queue
+        self.handler = handler
+        self.workers = workers
+        self.batch_size = batch_size
+        self.idle_interval = idle_interval
+        self.prune_interval = prune_interval
+        self._pruned_at: Optional[float] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    async def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._pruned_at = None
+        self._tasks = [
+            asyncio.create_task(self._worker(i), name=f"webhook-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    def notify(self) -> None:
+        """Wake idle workers after a new event was stored"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self, timeout: float = 10.0) -> None:
+        """Let workers finish their current batch; unclaimed events stay queued"""
+        self._stopping = True
+        self.notify()
+        if self._tasks:
+            done, pending = await asyncio.wait(self._tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        self._tasks = []
+
+    async def _worker(self, index: int) -> None:
+        while not self._stopping:
+            try:
+                events = await self.queue.claim(self.batch_size)
+            except Exception:
+                logger.exception("Webhook worker %s could not claim events", index)
+                events = []
+            if not events:
+                await self._maybe_prune()
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.idle_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            for event in events:
+                await self._process(event)
+
+    async def _maybe_prune(self) -> None:
+        # Idle workers prune at most once per interval (and once soon after start)
+        now = time.monotonic()
+        if self._pruned_at is not None and now - self._pruned_at < self.prune_interval:
+            return
+        self._pruned_at = now
+        try:
+            pruned = await self.queue.prune()
+        except Exception:
+            logger.exception("Could not prune the webhook queue")
+            return
+        if pruned:
+            logger.info("Pruned %s finished webhook events older than %.0f s", pruned, self.queue.retention)
+
+    async def _process(self, event: Dict[str, Any]) -> None:
+        try:
+            event["data"] = json.loads(event["body"])
+            await self.handler(event)
+        except Exception as e:
+            logger.error("Webhook event %s failed (attempt %s): %s", event['event_id'], event['attempts'], e)
+            await self.queue.fail(event["event_id"], event["attempts"], str(e))
+        else:
+            await self.queue.complete(event["event_id"])
+
+
+# ===== PROCESS-WIDE INSTANCE =====
+_webhook_queue: Optional[WebhookQueue] = None
+
+
+def get_webhook_queue() -> WebhookQueue:
+    global _webhook_queue
+    if _webhook_queue is None:
+        _webhook_queue = WebhookQueue(
+            path=os.getenv("WEBHOOK_QUEUE_PATH"),
+            max_attempts=int(os.getenv("WEBHOOK_MAX_ATTEMPTS", 5)),
+            retention=float(os.getenv("WEBHOOK_RETENTION", 7 * 24 * 3600)),
+        )
+    return _webhook_queue